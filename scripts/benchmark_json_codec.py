@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+JSON 編解碼器基準測試
+====================
+
+比較標準庫 json 與 orjson 在典型負載上的序列化/反序列化效能：
+- 大型 /api/all-sessions 回應（大量會話與用戶消息）
+- 長命令輸出的 command_output WebSocket 訊息
+- 縮排格式的會話歷史檔案
+
+使用方式：
+  python scripts/benchmark_json_codec.py
+  python scripts/benchmark_json_codec.py --sessions 500 --iterations 200
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from mcp_feedback_enhanced.web.utils import json_codec
+
+
+def build_all_sessions_payload(session_count: int) -> dict:
+    """建立模擬的 /api/all-sessions 回應"""
+    now_ms = int(time.time() * 1000)
+    sessions = []
+    for i in range(session_count):
+        sessions.append(
+            {
+                "session_id": f"session-{i:05d}-3f2a9c1e",
+                "project_directory": f"/home/user/projects/專案-{i % 20}",
+                "summary": "已完成重構並新增單元測試，請確認變更內容。" * 4,
+                "status": "feedback_submitted" if i % 3 else "waiting",
+                "status_message": "等待用戶回饋",
+                "created_at": now_ms - i * 60000,
+                "last_activity": now_ms - i * 30000,
+                "feedback_completed": bool(i % 3),
+                "has_websocket": i == 0,
+                "is_current": i == 0,
+                "user_messages": [
+                    {
+                        "timestamp": now_ms - j * 1000,
+                        "content": f"第 {j} 則回饋：請調整錯誤處理並補上說明。",
+                        "images": [],
+                        "submission_method": "manual",
+                    }
+                    for j in range(5)
+                ],
+            }
+        )
+    return {"sessions": sessions}
+
+
+def build_command_output_payload(line_count: int) -> dict:
+    """建立模擬的長命令輸出訊息"""
+    lines = [
+        f"[{i:06d}] tests/unit/test_module.py::TestCase::test_{i} PASSED"
+        for i in range(line_count)
+    ]
+    return {"type": "command_output", "output": "\n".join(lines) + "\n", "seq": 1}
+
+
+def bench(label: str, func, iterations: int) -> float:
+    """執行並回傳每次操作的平均微秒數"""
+    func()  # 預熱
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - start) / iterations * 1_000_000
+    print(f"  {label:<28} {elapsed:>12.1f} µs")
+    return elapsed
+
+
+def run_codec(codec, payloads: dict, iterations: int) -> dict:
+    """對單一編解碼器執行所有負載"""
+    print(f"\n編解碼器: {codec.name}")
+    results = {}
+    for name, (payload, indent) in payloads.items():
+        encoded = codec.dumps_bytes(payload, indent=indent)
+        results[f"{name} dumps"] = bench(
+            f"{name} dumps ({len(encoded) // 1024} KB)",
+            lambda p=payload, i=indent: codec.dumps_bytes(p, indent=i),
+            iterations,
+        )
+        results[f"{name} loads"] = bench(
+            f"{name} loads", lambda e=encoded: codec.loads(e), iterations
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 編解碼器基準測試")
+    parser.add_argument("--sessions", type=int, default=200, help="會話數量")
+    parser.add_argument("--lines", type=int, default=5000, help="命令輸出行數")
+    parser.add_argument("--iterations", type=int, default=100, help="重複次數")
+    args = parser.parse_args()
+
+    all_sessions = build_all_sessions_payload(args.sessions)
+    payloads = {
+        "all-sessions": (all_sessions, False),
+        "command_output": (build_command_output_payload(args.lines), False),
+        "history file": (all_sessions, True),
+    }
+
+    codecs = [json_codec.StdlibJSONCodec()]
+    if json_codec.ORJSON_AVAILABLE:
+        codecs.append(json_codec.OrjsonCodec())
+    else:
+        print(
+            "未安裝 orjson（pip install mcp-feedback-enhanced[speedups]），僅測試標準庫"
+        )
+
+    results = [run_codec(codec, payloads, args.iterations) for codec in codecs]
+
+    if len(results) == 2:
+        print("\n加速比 (json / orjson):")
+        for key, baseline in results[0].items():
+            print(f"  {key:<28} {baseline / results[1][key]:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
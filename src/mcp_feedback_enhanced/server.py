@@ -23,14 +23,16 @@ MCP Feedback Enhanced 伺服器主要模組
 重構: 模塊化設計
 """
 
+import asyncio
 import base64
 import io
 import json
 import os
 import sys
+from collections.abc import Callable
 from typing import Annotated, Any
 
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
 from fastmcp.utilities.types import Image as MCPImage
 from mcp.types import TextContent
 from pydantic import Field
@@ -42,8 +44,23 @@ from .debug import server_debug_log as debug_log
 # 導入錯誤處理框架
 from .utils.error_handler import ErrorHandler, ErrorType
 
-# 導入資源管理器
-from .utils.resource_manager import create_temp_file
+# 導入回饋日誌與回饋資源
+from .utils.feedback_journal import get_feedback_journal
+from .utils.feedback_resources import (
+    RESULT_MODE_REFERENCE,
+    get_result_cache,
+    get_result_mode,
+    read_history_page,
+    read_image,
+    read_log_page,
+    read_session_summary,
+)
+from .utils.result_compaction import (
+    compact_log_text,
+    get_compaction_stats,
+    get_result_base64_budget,
+)
+from .utils.scripted_responder import get_responder_mode, get_scripted_responder
 
 
 # ===== 編碼初始化 =====
@@ -216,54 +233,6 @@ def is_remote_environment() -> bool:
     return False
 
 
-def save_feedback_to_file(feedback_data: dict, file_path: str | None = None) -> str:
-    """
-    將回饋資料儲存到 JSON 文件
-
-    Args:
-        feedback_data: 回饋資料字典
-        file_path: 儲存路徑，若為 None 則自動產生臨時文件
-
-    Returns:
-        str: 儲存的文件路徑
-    """
-    if file_path is None:
-        # 使用資源管理器創建臨時文件
-        file_path = create_temp_file(suffix=".json", prefix="feedback_")
-
-    # 確保目錄存在
-    directory = os.path.dirname(file_path)
-    if directory and not os.path.exists(directory):
-        os.makedirs(directory, exist_ok=True)
-
-    # 複製數據以避免修改原始數據
-    json_data = feedback_data.copy()
-
-    # 處理圖片數據：將 bytes 轉換為 base64 字符串以便 JSON 序列化
-    if "images" in json_data and isinstance(json_data["images"], list):
-        processed_images = []
-        for img in json_data["images"]:
-            if isinstance(img, dict) and "data" in img:
-                processed_img = img.copy()
-                # 如果 data 是 bytes，轉換為 base64 字符串
-                if isinstance(img["data"], bytes):
-                    processed_img["data"] = base64.b64encode(img["data"]).decode(
-                        "utf-8"
-                    )
-                    processed_img["data_type"] = "base64"
-                processed_images.append(processed_img)
-            else:
-                processed_images.append(img)
-        json_data["images"] = processed_images
-
-    # 儲存資料
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(json_data, f, ensure_ascii=False, indent=2)
-
-    debug_log(f"回饋資料已儲存至: {file_path}")
-    return file_path
-
-
 def create_feedback_text(feedback_data: dict) -> str:
     """
     建立格式化的回饋文字
@@ -280,13 +249,18 @@ def create_feedback_text(feedback_data: dict) -> str:
     if feedback_data.get("interactive_feedback"):
         text_parts.append(f"=== 用戶回饋 ===\n{feedback_data['interactive_feedback']}")
 
-    # 命令執行日誌
+    # 命令執行日誌（壓縮後再放入結果）
     if feedback_data.get("command_logs"):
-        text_parts.append(f"=== 命令執行日誌 ===\n{feedback_data['command_logs']}")
+        command_logs = compact_log_text(feedback_data["command_logs"])
+        debug_log(
+            f"命令日誌壓縮: {get_compaction_stats(feedback_data['command_logs'], command_logs)}"
+        )
+        text_parts.append(f"=== 命令執行日誌 ===\n{command_logs}")
 
     # 圖片附件概要
     if feedback_data.get("images"):
         images = feedback_data["images"]
+        base64_budget = get_result_base64_budget()
         text_parts.append(f"=== 圖片附件概要 ===\n用戶提供了 {len(images)} 張圖片：")
 
         for i, img in enumerate(images, 1):
@@ -333,7 +307,11 @@ def create_feedback_text(feedback_data: dict) -> str:
                             "enable_base64_detail", False
                         )
 
-                        if include_full_base64:
+                        if include_full_base64 and len(img_base64) > base64_budget:
+                            # 超出剩餘預算，圖片本身仍以 MCP 圖片附件回傳
+                            img_info += "\n     完整 Base64: 已省略（超出回傳大小預算）"
+                        elif include_full_base64:
+                            base64_budget -= len(img_base64)
                             # 根據檔案名推斷 MIME 類型
                             file_name = img.get("name", "image.png")
                             if file_name.lower().endswith((".jpg", ".jpeg")):
@@ -360,6 +338,45 @@ def create_feedback_text(feedback_data: dict) -> str:
     return "\n\n".join(text_parts) if text_parts else "用戶未提供任何回饋內容。"
 
 
+async def create_reference_text(feedback_data: dict) -> str:
+    """
+    建立引用模式的回饋文字：只包含用戶回饋，日誌與圖片以 MCP 資源 URI 引用
+
+    摘要可能需要讀取會話存儲，在線程中進行，不阻塞 MCP 事件循環。
+
+    Args:
+        feedback_data: 回饋資料字典（需包含 session_id）
+
+    Returns:
+        str: 格式化後的回饋文字
+    """
+    summary = await asyncio.to_thread(read_session_summary, feedback_data["session_id"])
+    text_parts = []
+
+    if feedback_data.get("interactive_feedback"):
+        text_parts.append(f"=== 用戶回饋 ===\n{feedback_data['interactive_feedback']}")
+
+    logs = summary["logs"]
+    if logs["total_lines"]:
+        text_parts.append(
+            f"=== 命令執行日誌 ===\n共 {logs['total_lines']} 行，"
+            f"{logs['page_count']} 頁：{logs['first_page']}"
+        )
+
+    if summary["images"]:
+        image_lines = [
+            f"  {image['index'] + 1}. {image['name']} ({image['size']} B): {image['uri']}"
+            for image in summary["images"]
+        ]
+        text_parts.append(
+            f"=== 圖片附件 ===\n用戶提供了 {len(image_lines)} 張圖片：\n"
+            + "\n".join(image_lines)
+        )
+
+    text_parts.append(f"💡 完整內容可讀取 MCP 資源：{summary['uri']}")
+    return "\n\n".join(text_parts)
+
+
 def process_images(images_data: list[dict]) -> list[MCPImage]:
     """
     處理圖片資料，轉換為 MCP 圖片對象
@@ -433,6 +450,11 @@ async def interactive_feedback(
         str, Field(description="AI 工作完成的摘要說明")
     ] = "我已完成了您請求的任務。",
     timeout: Annotated[int, Field(description="等待用戶回饋的超時時間（秒）")] = 600,
+    idempotency_key: Annotated[
+        str,
+        Field(description="冪等鍵，重試時傳入相同的值以重新連接到等待中的會話"),
+    ] = "",
+    ctx: Context | None = None,
 ) -> list:
     """Interactive feedback collection tool for LLM agents.
 
@@ -447,6 +469,7 @@ async def interactive_feedback(
         project_directory: Project directory path for context
         summary: Summary of AI work completed for user review
         timeout: Timeout in seconds for waiting user feedback (default: 600 seconds)
+        idempotency_key: Optional key; a retried call with the same key re-attaches to the pending session (derived from project_directory and summary when empty)
 
     Returns:
         list: List containing TextContent and MCPImage objects representing user feedback
@@ -464,17 +487,39 @@ async def interactive_feedback(
             project_directory = os.getcwd()
         project_directory = os.path.abspath(project_directory)
 
-        # 使用 Web 模式
-        debug_log("回饋模式: web")
-
-        result = await launch_web_feedback_ui(project_directory, summary, timeout)
+        # 無頭回應器：不啟動 Web UI，直接由規則、腳本或佇列回答
+        responder = get_scripted_responder()
+        if responder is not None:
+            debug_log(f"回饋模式: responder（{responder.mode}）")
+            result = await responder.respond(project_directory, summary)
+        else:
+            # 使用 Web 模式
+            debug_log("回饋模式: web")
+
+            result = await launch_web_feedback_ui(
+                project_directory,
+                summary,
+                timeout,
+                idempotency_key,
+                create_progress_reporter(ctx, timeout),
+            )
 
         # 處理取消情況
         if not result:
             return [TextContent(type="text", text="用戶取消了回饋。")]
 
-        # 儲存詳細結果
-        save_feedback_to_file(result)
+        # 記錄到回饋日誌（由背景線程寫入，不等待磁碟 I/O）
+        get_feedback_journal().record(result)
+
+        # 快取結果供 MCP 資源讀取；引用模式只回傳資源 URI
+        session_id = result.get("session_id")
+        if session_id:
+            get_result_cache().put(session_id, result)
+            if get_result_mode() == RESULT_MODE_REFERENCE:
+                debug_log("使用引用模式回傳回饋結果")
+                return [
+                    TextContent(type="text", text=await create_reference_text(result))
+                ]
 
         # 建立回饋項目列表
         feedback_items = []
@@ -520,7 +565,34 @@ async def interactive_feedback(
         return [TextContent(type="text", text=user_error_msg)]
 
 
-async def launch_web_feedback_ui(project_dir: str, summary: str, timeout: int) -> dict:
+def create_progress_reporter(ctx: Context | None, timeout: int):
+    """
+    建立等待回饋期間的 MCP 進度回報函數
+
+    進度值為已等待秒數、總量為 timeout，訊息附上分頁是否連接；
+    客戶端未帶 progressToken 時 FastMCP 不會發送通知。
+    """
+    if ctx is None:
+        return None
+
+    async def report(update: dict[str, Any]) -> None:
+        tab_state = "分頁已連接" if update["tab_connected"] else "分頁未連接"
+        await ctx.report_progress(
+            update["elapsed"],
+            total=timeout,
+            message=f"等待用戶回饋中（已等待 {update['elapsed']:.0f} 秒，{tab_state}）",
+        )
+
+    return report
+
+
+async def launch_web_feedback_ui(
+    project_dir: str,
+    summary: str,
+    timeout: int,
+    idempotency_key: str = "",
+    progress_callback: Any = None,
+) -> dict:
     """
     啟動 Web UI 收集回饋，支援自訂超時時間
 
@@ -528,6 +600,8 @@ async def launch_web_feedback_ui(project_dir: str, summary: str, timeout: int) -
         project_dir: 專案目錄路徑
         summary: AI 工作摘要
         timeout: 超時時間（秒）
+        idempotency_key: 冪等鍵（空字串時由專案目錄與摘要推導）
+        progress_callback: 等待期間的進度回報函數
 
     Returns:
         dict: 收集到的回饋資料
@@ -539,7 +613,9 @@ async def launch_web_feedback_ui(project_dir: str, summary: str, timeout: int) -
         from .web import launch_web_feedback_ui as web_launch
 
         # 傳遞 timeout 參數給 Web UI
-        return await web_launch(project_dir, summary, timeout)
+        return await web_launch(
+            project_dir, summary, timeout, idempotency_key or None, progress_callback
+        )
     except ImportError as e:
         # 使用統一錯誤處理
         error_id = ErrorHandler.log_error_with_context(
@@ -576,6 +652,7 @@ def get_system_info() -> str:
         "WSL 環境": is_wsl,
         "遠端環境": is_remote,
         "介面類型": "Web UI",
+        "無頭回應器": get_responder_mode(),
         "環境變數": {
             "SSH_CONNECTION": os.getenv("SSH_CONNECTION"),
             "SSH_CLIENT": os.getenv("SSH_CLIENT"),
@@ -591,6 +668,62 @@ def get_system_info() -> str:
     return json.dumps(system_info, ensure_ascii=False, indent=2)
 
 
+# ===== MCP 資源定義 =====
+async def _read_resource_json(reader: Callable[..., Any], *args: Any) -> str:
+    """在線程中讀取資源並編碼為 JSON（存儲讀取、日誌與 Base64 編碼不阻塞事件循環）"""
+    return await asyncio.to_thread(
+        lambda: json.dumps(reader(*args), ensure_ascii=False)
+    )
+
+
+@mcp.resource(
+    "feedback://sessions/{session_id}",
+    name="feedback_session",
+    mime_type="application/json",
+)
+async def feedback_session_resource(session_id: str) -> str:
+    """回饋會話摘要：用戶回饋文字，以及命令日誌分頁與圖片的資源 URI"""
+    return await _read_resource_json(read_session_summary, session_id)
+
+
+@mcp.resource(
+    "feedback://sessions/{session_id}/logs/{page}",
+    name="feedback_session_logs",
+    mime_type="application/json",
+)
+async def feedback_logs_resource(session_id: str, page: str) -> str:
+    """回饋會話的命令日誌分頁（page 從 0 開始，next 為下一頁 URI）"""
+    return await _read_resource_json(read_log_page, session_id, int(page))
+
+
+@mcp.resource(
+    "feedback://sessions/{session_id}/images/{index}",
+    name="feedback_session_image",
+    mime_type="application/json",
+)
+async def feedback_image_resource(session_id: str, index: str) -> str:
+    """回饋會話中的單張圖片（index 從 0 開始，data 為 Base64）"""
+    return await _read_resource_json(read_image, session_id, int(index))
+
+
+@mcp.resource(
+    "feedback://history", name="feedback_history", mime_type="application/json"
+)
+async def feedback_history_resource() -> str:
+    """會話歷史第一頁（時間倒序）"""
+    return await _read_resource_json(read_history_page, 0)
+
+
+@mcp.resource(
+    "feedback://history/{page}",
+    name="feedback_history_page",
+    mime_type="application/json",
+)
+async def feedback_history_page_resource(page: str) -> str:
+    """會話歷史分頁（page 從 0 開始，next 為下一頁 URI）"""
+    return await _read_resource_json(read_history_page, int(page))
+
+
 # ===== 主程式入口 =====
 def main():
     """主要入口點，用於套件執行
@@ -0,0 +1,339 @@
+"""
+回饋日誌
+========
+
+以追加式 JSONL 日誌保存每次 interactive_feedback 的結果，取代每次呼叫都在
+MCP 事件循環上同步寫出的 JSON 臨時文件：
+
+- 寫入交由背景線程處理，工具回應不等待任何磁碟 I/O
+- 圖片以內容雜湊（SHA-256）命名的二進位旁檔保存，日誌中只記錄引用，
+  相同內容的圖片只保存一份
+- 日誌分段保存，目前分段（含其引用的圖片旁檔）超過
+  MCP_FEEDBACK_JOURNAL_MAX_BYTES 時輪替，只保留最新的
+  MCP_FEEDBACK_JOURNAL_MAX_FILES 個分段；輪替後不再被任何分段引用的
+  圖片旁檔一併刪除
+- 多個 MCP 進程共用同一日誌目錄，每筆寫入（含圖片旁檔、輪替與清理）
+  都在目錄的檔案鎖內完成，避免一個進程的清理刪除另一個進程剛寫入的圖片
+
+日誌目錄預設為 ~/.cache/mcp-feedback-enhanced/journal，可由
+MCP_FEEDBACK_JOURNAL_DIR 指定。
+"""
+
+import atexit
+import base64
+import binascii
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from ..debug import debug_log
+
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+
+DEFAULT_MAX_SEGMENT_BYTES = 8 * 1024 * 1024
+DEFAULT_MAX_SEGMENTS = 5
+
+SEGMENT_PREFIX = "feedback-"
+SEGMENT_SUFFIX = ".jsonl"
+IMAGES_DIR_NAME = "images"
+LOCK_FILE_NAME = ".lock"
+
+
+def get_journal_dir() -> Path:
+    """回饋日誌目錄"""
+    configured = os.getenv("MCP_FEEDBACK_JOURNAL_DIR")
+    if configured:
+        return Path(configured).expanduser()
+    return Path.home() / ".cache" / "mcp-feedback-enhanced" / "journal"
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return max(int(os.getenv(name, str(default))), 1)
+    except ValueError:
+        return default
+
+
+class FeedbackJournal:
+    """追加式回饋日誌，寫入由背景線程完成"""
+
+    def __init__(
+        self,
+        journal_dir: Path | None = None,
+        max_segment_bytes: int | None = None,
+        max_segments: int | None = None,
+    ):
+        self.journal_dir = journal_dir or get_journal_dir()
+        self.images_dir = self.journal_dir / IMAGES_DIR_NAME
+        self.max_segment_bytes = max_segment_bytes or _get_int_env(
+            "MCP_FEEDBACK_JOURNAL_MAX_BYTES", DEFAULT_MAX_SEGMENT_BYTES
+        )
+        self.max_segments = max_segments or _get_int_env(
+            "MCP_FEEDBACK_JOURNAL_MAX_FILES", DEFAULT_MAX_SEGMENTS
+        )
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Condition()
+        self._writer: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        # 目前分段已計入的旁檔用量：(分段, 已掃描位置, 旁檔位元組, 已計入的旁檔)
+        self._segment_usage: tuple[Path, int, int, set[str]] | None = None
+        self.stats = {"records": 0, "images_written": 0, "rotations": 0, "errors": 0}
+
+    # ===== 公開介面 =====
+
+    def record(self, feedback_data: dict[str, Any]) -> None:
+        """排入一筆回饋結果（不阻塞，不做任何磁碟 I/O）"""
+        if self._closed:
+            return
+        entry = {"saved_at": int(time.time() * 1000), **feedback_data}
+        self._ensure_writer()
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put(entry)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """等待已排入的記錄寫入完成"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_lock:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._pending_lock.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        """寫完剩餘記錄並停止背景線程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def read_records(self) -> list[dict[str, Any]]:
+        """按時間順序讀取所有保留的記錄（圖片只包含引用）"""
+        records = []
+        for segment in self._list_segments():
+            with open(segment, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        records.append(json.loads(line))
+        return records
+
+    def read_image(self, sha256: str) -> bytes | None:
+        """讀取圖片旁檔"""
+        matches = list(self.images_dir.glob(f"{sha256}.*"))
+        return matches[0].read_bytes() if matches else None
+
+    def get_stats(self) -> dict[str, Any]:
+        segments = self._list_segments()
+        return {
+            **self.stats,
+            "pending": self._pending,
+            "segments": len(segments),
+            "bytes": sum(segment.stat().st_size for segment in segments),
+        }
+
+    # ===== 背景寫入 =====
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop, name="FeedbackJournalWriter", daemon=True
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            try:
+                self._write_entry(entry)
+                self.stats["records"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                debug_log(f"寫入回饋日誌失敗: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
+                    self._pending_lock.notify_all()
+
+    def _write_entry(self, entry: dict[str, Any]) -> None:
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_dir / LOCK_FILE_NAME, "a+b") as lock_file:
+            _lock(lock_file)
+            try:
+                self._write_entry_locked(entry)
+            finally:
+                _unlock(lock_file)
+
+    def _write_entry_locked(self, entry: dict[str, Any]) -> None:
+        # 先輪替再寫圖片旁檔：輪替時的清理只看已寫入分段的引用，
+        # 此時寫入的新圖片尚未被任何記錄引用
+        segment = self._current_segment()
+        if self._segment_bytes(segment) >= self.max_segment_bytes:
+            segment = self._rotate(segment)
+
+        entry["images"] = [
+            self._write_image(image) for image in entry.get("images") or []
+        ]
+        line = (
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str)
+            + "\n"
+        )
+        with open(segment, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _write_image(self, image: dict[str, Any]) -> dict[str, Any]:
+        """把圖片寫成內容雜湊命名的旁檔，返回引用"""
+        data = image.get("data")
+        if isinstance(data, str):
+            try:
+                data = base64.b64decode(data)
+            except (binascii.Error, ValueError):
+                data = None
+        reference = {"name": image.get("name", ""), "size": image.get("size", 0)}
+        if not isinstance(data, bytes) or not data:
+            return reference
+
+        digest = hashlib.sha256(data).hexdigest()
+        suffix = Path(reference["name"]).suffix.lower() or ".bin"
+        path = self.images_dir / f"{digest}{suffix}"
+        if not path.exists():
+            temp_path = path.with_suffix(f"{suffix}.tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+            self.stats["images_written"] += 1
+        reference.update({"size": len(data), "sha256": digest, "file": path.name})
+        return reference
+
+    # ===== 分段與輪替 =====
+
+    def _list_segments(self) -> list[Path]:
+        if not self.journal_dir.exists():
+            return []
+        return sorted(self.journal_dir.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    @staticmethod
+    def _segment_path(directory: Path, number: int) -> Path:
+        return directory / f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def _current_segment(self) -> Path:
+        segments = self._list_segments()
+        if segments:
+            return segments[-1]
+        return self._segment_path(self.journal_dir, 1)
+
+    def _segment_bytes(self, segment: Path) -> int:
+        """
+        分段大小加上其引用的圖片旁檔大小
+
+        只增量掃描上次之後追加的記錄（包含其他進程寫入的）。
+        """
+        if not segment.exists():
+            return 0
+        size = segment.stat().st_size
+        usage = self._segment_usage
+        if usage is None or usage[0] != segment or usage[1] > size:
+            usage = (segment, 0, 0, set())
+        _, scanned, image_bytes, files = usage
+        if scanned < size:
+            with open(segment, "rb") as f:
+                f.seek(scanned)
+                data = f.read(size - scanned)
+            # 只計入完整的行
+            data = data[: data.rfind(b"\n") + 1]
+            scanned += len(data)
+            for line in data.splitlines():
+                if not line.strip():
+                    continue
+                for image in json.loads(line).get("images", []):
+                    name = image.get("file")
+                    if name and name not in files:
+                        files.add(name)
+                        image_bytes += image.get("size", 0)
+        self._segment_usage = (segment, scanned, image_bytes, files)
+        return size + image_bytes
+
+    def _rotate(self, current: Path) -> Path:
+        """開始新的分段，刪除超出數量的舊分段與不再被引用的圖片"""
+        number = int(current.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]) + 1
+        next_segment = self._segment_path(self.journal_dir, number)
+        self.stats["rotations"] += 1
+
+        # 新分段也計入保留數量
+        segments = self._list_segments()
+        expired = segments[: max(len(segments) + 1 - self.max_segments, 0)]
+        if expired:
+            for segment in expired:
+                segment.unlink(missing_ok=True)
+            self._remove_unreferenced_images()
+        return next_segment
+
+    def _remove_unreferenced_images(self) -> None:
+        referenced = {
+            image["file"]
+            for record in self.read_records()
+            for image in record.get("images", [])
+            if image.get("file")
+        }
+        for path in self.images_dir.iterdir():
+            # .tmp 是寫入中的旁檔，不屬於任何記錄
+            if path.name not in referenced and path.suffix != ".tmp":
+                path.unlink(missing_ok=True)
+
+
+def _lock(lock_file: Any) -> None:
+    """取得日誌目錄的跨進程排他鎖（阻塞）"""
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        return
+    lock_file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK 重試約 10 秒後仍失敗時繼續等待
+            continue
+
+
+def _unlock(lock_file: Any) -> None:
+    if fcntl is not None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        return
+    lock_file.seek(0)
+    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+_journal: FeedbackJournal | None = None
+_journal_lock = threading.Lock()
+
+
+def get_feedback_journal() -> FeedbackJournal:
+    """獲取全域回饋日誌實例"""
+    global _journal
+    if _journal is None:
+        with _journal_lock:
+            if _journal is None:
+                _journal = FeedbackJournal()
+                atexit.register(_journal.close)
+    return _journal
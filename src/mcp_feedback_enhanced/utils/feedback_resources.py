@@ -0,0 +1,279 @@
+"""
+回饋 MCP 資源
+=============
+
+把用戶產生的內容以分頁的 MCP 資源提供給 AI 助手，讓工具結果可以只回傳引用：
+
+    feedback://sessions/{session_id}                會話摘要與資源引用
+    feedback://sessions/{session_id}/logs/{page}    命令日誌分頁
+    feedback://sessions/{session_id}/images/{index} 單張圖片（Base64）
+    feedback://history/{page}                       會話歷史分頁
+
+讀取順序：Web UI 中仍存在的會話 → 會話存儲（若已啟用）→ 最近回饋結果的快取。
+"""
+
+import base64
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from ..debug import debug_log
+from ..web.main import peek_web_ui_manager
+from ..web.utils.history_store import get_history_store
+
+
+RESOURCE_SCHEME = "feedback"
+
+# 工具結果模式：inline 直接內嵌日誌與圖片，reference 只回傳資源引用
+RESULT_MODE_INLINE = "inline"
+RESULT_MODE_REFERENCE = "reference"
+
+# 每頁日誌行數與每頁歷史會話數
+DEFAULT_LOG_PAGE_LINES = 500
+HISTORY_PAGE_SIZE = 20
+
+# 快取的最近回饋結果數量（結果包含圖片資料，數量不宜過大）
+DEFAULT_RESULT_CACHE_SIZE = 10
+
+IMAGE_MIME_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".bmp": "image/bmp",
+}
+
+
+def get_result_mode() -> str:
+    """從環境變數 MCP_FEEDBACK_RESULT_MODE 讀取工具結果模式"""
+    mode = os.getenv("MCP_FEEDBACK_RESULT_MODE", RESULT_MODE_INLINE).strip().lower()
+    if mode in (RESULT_MODE_INLINE, RESULT_MODE_REFERENCE):
+        return mode
+    debug_log(f"未知的工具結果模式 {mode}，使用 {RESULT_MODE_INLINE}")
+    return RESULT_MODE_INLINE
+
+
+def get_log_page_lines() -> int:
+    """從環境變數 MCP_RESOURCE_LOG_PAGE_LINES 讀取每頁日誌行數"""
+    try:
+        return max(
+            int(os.getenv("MCP_RESOURCE_LOG_PAGE_LINES", str(DEFAULT_LOG_PAGE_LINES))),
+            1,
+        )
+    except ValueError:
+        return DEFAULT_LOG_PAGE_LINES
+
+
+def guess_image_mime(name: str) -> str:
+    """根據檔案名推斷圖片 MIME 類型"""
+    return IMAGE_MIME_TYPES.get(os.path.splitext(name.lower())[1], "image/png")
+
+
+# ===== URI =====
+
+
+def session_uri(session_id: str) -> str:
+    return f"{RESOURCE_SCHEME}://sessions/{session_id}"
+
+
+def logs_uri(session_id: str, page: int = 0) -> str:
+    return f"{session_uri(session_id)}/logs/{page}"
+
+
+def image_uri(session_id: str, index: int) -> str:
+    return f"{session_uri(session_id)}/images/{index}"
+
+
+def history_uri(page: int = 0) -> str:
+    return f"{RESOURCE_SCHEME}://history/{page}"
+
+
+# ===== 結果快取 =====
+
+
+class FeedbackResultCache:
+    """最近回饋結果的 LRU 快取，Web UI 會話被清理後資源仍可讀取"""
+
+    def __init__(self, max_size: int = DEFAULT_RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._results: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, session_id: str, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._results.pop(session_id, None)
+            self._results[session_id] = result
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            result = self._results.get(session_id)
+            if result is not None:
+                self._results.move_to_end(session_id)
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+
+_result_cache: FeedbackResultCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> FeedbackResultCache:
+    """獲取全域回饋結果快取（大小由 MCP_RESOURCE_CACHE_SIZE 設定）"""
+    global _result_cache
+    if _result_cache is None:
+        with _cache_lock:
+            if _result_cache is None:
+                try:
+                    size = int(
+                        os.getenv(
+                            "MCP_RESOURCE_CACHE_SIZE", str(DEFAULT_RESULT_CACHE_SIZE)
+                        )
+                    )
+                except ValueError:
+                    size = DEFAULT_RESULT_CACHE_SIZE
+                _result_cache = FeedbackResultCache(max(size, 1))
+    return _result_cache
+
+
+# ===== 資源讀取 =====
+
+
+def _get_live_session(session_id: str) -> Any:
+    """Web UI 中仍存在的會話（不會為此啟動 Web UI）"""
+    manager = peek_web_ui_manager()
+    return manager.get_session(session_id) if manager else None
+
+
+def _get_session_store() -> Any:
+    manager = peek_web_ui_manager()
+    return manager.session_store if manager else None
+
+
+def _read_logs(session_id: str, offset: int, limit: int) -> tuple[list[str], int]:
+    """分頁讀取完整命令日誌，找不到會話時退回快取中壓縮過的日誌"""
+    session = _get_live_session(session_id)
+    if session is not None:
+        return session.command_logs.read_range(offset, limit), len(session.command_logs)
+
+    store = _get_session_store()
+    if store is not None and store.load_session(session_id) is not None:
+        return store.get_logs(session_id, offset, limit)
+
+    result = get_result_cache().get(session_id)
+    if result is None:
+        raise ValueError(f"找不到會話: {session_id}")
+    lines = (result.get("command_logs") or "").splitlines()
+    return lines[offset : offset + limit], len(lines)
+
+
+def _get_images(session_id: str) -> list[dict[str, Any]]:
+    session = _get_live_session(session_id)
+    if session is not None and session.images:
+        return session.images
+    result = get_result_cache().get(session_id)
+    return result.get("images", []) if result else []
+
+
+def _image_size(image: dict[str, Any]) -> int:
+    data = image.get("data")
+    if isinstance(data, bytes):
+        return len(data)
+    return image.get("size", 0)
+
+
+def read_log_page(session_id: str, page: int) -> dict[str, Any]:
+    """讀取命令日誌的第 page 頁（從 0 開始）"""
+    page_lines = get_log_page_lines()
+    page = max(page, 0)
+    lines, total = _read_logs(session_id, page * page_lines, page_lines)
+    page_count = (total + page_lines - 1) // page_lines
+    return {
+        "session_id": session_id,
+        "page": page,
+        "page_count": page_count,
+        "page_lines": page_lines,
+        "total_lines": total,
+        "lines": lines,
+        "next": logs_uri(session_id, page + 1) if page + 1 < page_count else None,
+    }
+
+
+def read_image(session_id: str, index: int) -> dict[str, Any]:
+    """讀取單張圖片，資料以 Base64 編碼"""
+    images = _get_images(session_id)
+    if not 0 <= index < len(images):
+        raise ValueError(f"會話 {session_id} 沒有第 {index} 張圖片")
+    image = images[index]
+    data = image.get("data", b"")
+    encoded = (
+        base64.b64encode(data).decode("ascii") if isinstance(data, bytes) else data
+    )
+    name = image.get("name", f"image-{index}.png")
+    return {
+        "session_id": session_id,
+        "index": index,
+        "name": name,
+        "mime_type": guess_image_mime(name),
+        "size": _image_size(image),
+        "data": encoded,
+    }
+
+
+def read_session_summary(session_id: str) -> dict[str, Any]:
+    """會話摘要：回饋文字與日誌、圖片的資源引用"""
+    session = _get_live_session(session_id)
+    result = get_result_cache().get(session_id)
+    if session is not None:
+        feedback = session.feedback_result or ""
+    elif result is not None:
+        feedback = result.get("interactive_feedback", "")
+    else:
+        store = _get_session_store()
+        snapshot = store.load_session(session_id) if store is not None else None
+        if snapshot is None:
+            raise ValueError(f"找不到會話: {session_id}")
+        feedback = snapshot.get("feedback_result") or ""
+
+    _, total_lines = _read_logs(session_id, 0, 0)
+    page_lines = get_log_page_lines()
+    return {
+        "session_id": session_id,
+        "uri": session_uri(session_id),
+        "interactive_feedback": feedback,
+        "logs": {
+            "total_lines": total_lines,
+            "page_count": (total_lines + page_lines - 1) // page_lines,
+            "first_page": logs_uri(session_id, 0),
+        },
+        "images": [
+            {
+                "index": index,
+                "name": image.get("name", ""),
+                "size": _image_size(image),
+                "uri": image_uri(session_id, index),
+            }
+            for index, image in enumerate(_get_images(session_id))
+        ],
+    }
+
+
+def read_history_page(page: int) -> dict[str, Any]:
+    """讀取會話歷史的第 page 頁（時間倒序）"""
+    page = max(page, 0)
+    sessions, total = get_history_store().read_page(
+        page * HISTORY_PAGE_SIZE, HISTORY_PAGE_SIZE
+    )
+    page_count = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+    return {
+        "page": page,
+        "page_count": page_count,
+        "total": total,
+        "sessions": sessions,
+        "next": history_uri(page + 1) if page + 1 < page_count else None,
+    }
@@ -23,6 +23,13 @@ from ..debug import debug_log
 from .error_handler import ErrorHandler, ErrorType
 
 
+# 按程式名稱彙總命令用量時最多追蹤的程式數量
+MAX_TRACKED_COMMANDS = 100
+
+# 資源統計中列出的最耗資源命令數量
+TOP_COMMANDS_LIMIT = 10
+
+
 class ResourceType:
     """資源類型常量"""
 
@@ -68,6 +75,10 @@ class ResourceManager:
             "last_cleanup": 0.0,  # 使用 0.0 而非 None，避免類型混淆
         }
 
+        # 命令資源用量彙總（按程式名稱）
+        self.command_usage: dict[str, dict[str, Any]] = {}
+        self._usage_lock = threading.Lock()
+
         # 配置
         self.auto_cleanup_enabled = True
         self.cleanup_interval = 300  # 5分鐘
@@ -279,6 +290,65 @@ class ResourceManager:
             debug_log(f"註冊進程失敗 [錯誤ID: {error_id}]: {e}")
             raise
 
+    def record_command_usage(self, command: str, usage: dict[str, Any]) -> None:
+        """
+        記錄已結束命令的資源用量，按程式名稱彙總
+
+        Args:
+            command: 執行的命令
+            usage: 資源用量（wall_time、cpu_user、cpu_system、peak_rss_bytes、output_bytes）
+        """
+        parts = command.split()
+        name = os.path.basename(parts[0]) if parts else command
+
+        with self._usage_lock:
+            entry = self.command_usage.pop(name, None) or {
+                "command": name,
+                "runs": 0,
+                "wall_time": 0.0,
+                "cpu_time": 0.0,
+                "peak_rss_bytes": 0,
+                "output_bytes": 0,
+            }
+            entry["runs"] += 1
+            entry["wall_time"] += usage.get("wall_time") or 0.0
+            entry["cpu_time"] += (usage.get("cpu_user") or 0.0) + (
+                usage.get("cpu_system") or 0.0
+            )
+            entry["peak_rss_bytes"] = max(
+                entry["peak_rss_bytes"], usage.get("peak_rss_bytes") or 0
+            )
+            entry["output_bytes"] += usage.get("output_bytes") or 0
+            entry["last_run"] = time.time()
+            # 重新插入以維持最近使用順序，超出上限時移除最久未執行的程式
+            self.command_usage[name] = entry
+            while len(self.command_usage) > MAX_TRACKED_COMMANDS:
+                self.command_usage.pop(next(iter(self.command_usage)))
+
+    def get_command_usage_stats(self) -> dict[str, Any]:
+        """
+        獲取命令資源用量彙總
+
+        Returns:
+            Dict[str, Any]: 總計與 CPU 時間最高的命令
+        """
+        with self._usage_lock:
+            entries = [dict(entry) for entry in self.command_usage.values()]
+
+        entries.sort(
+            key=lambda entry: (entry["cpu_time"], entry["wall_time"]), reverse=True
+        )
+        return {
+            "commands_run": sum(entry["runs"] for entry in entries),
+            "total_wall_time": round(sum(entry["wall_time"] for entry in entries), 3),
+            "total_cpu_time": round(sum(entry["cpu_time"] for entry in entries), 3),
+            "total_output_bytes": sum(entry["output_bytes"] for entry in entries),
+            "peak_rss_bytes": max(
+                (entry["peak_rss_bytes"] for entry in entries), default=0
+            ),
+            "top_commands": entries[:TOP_COMMANDS_LIMIT],
+        }
+
     def register_file_handle(self, file_handle: Any) -> None:
         """
         註冊文件句柄追蹤
@@ -669,6 +739,7 @@ class ResourceManager:
                 "auto_cleanup_enabled": self.auto_cleanup_enabled,
                 "cleanup_interval": self.cleanup_interval,
                 "temp_file_max_age": self.temp_file_max_age,
+                "command_usage": self.get_command_usage_stats(),
             }
         )
 
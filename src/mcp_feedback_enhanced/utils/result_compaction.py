@@ -0,0 +1,188 @@
+"""
+回傳結果壓縮
+============
+
+在建立回傳給 AI 助手的 MCP 結果前壓縮命令日誌，控制回應大小：
+- 連續重複的行合併為一行並標註重複次數
+- 保留開頭與結尾視窗，中間以省略標記取代
+- 以位元組或估算 token 預算限制輸出
+- 中間被省略的區段仍保留錯誤行
+"""
+
+import os
+import re
+from collections import deque
+from collections.abc import Iterable
+from typing import Any
+
+from ..debug import debug_log
+
+
+# 回傳日誌的預設位元組預算
+DEFAULT_RESULT_LOG_MAX_BYTES = 64 * 1024
+
+# 回傳結果中完整 Base64 圖片的預設位元組預算
+DEFAULT_RESULT_BASE64_MAX_BYTES = 1024 * 1024
+
+# 估算 token 時每個 token 對應的 ASCII 字元數
+CHARS_PER_TOKEN = 4
+
+# 開頭視窗與錯誤行各自最多佔用的預算比例，其餘留給結尾視窗
+HEAD_BUDGET_RATIO = 0.25
+ERROR_BUDGET_RATIO = 0.25
+
+# 單行最大長度，超出部分截斷
+MAX_LINE_CHARS = 2000
+
+# 視為錯誤行的模式
+ERROR_LINE_PATTERN = re.compile(
+    r"error|exception|traceback|fatal|fail|panic|錯誤|失敗|異常", re.IGNORECASE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """估算文字的 token 數：ASCII 約每 4 字元一個 token，其他字元各算一個"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return (len(text) - non_ascii + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN + non_ascii
+
+
+def _line_cost(line: str) -> int:
+    """
+    一行在預算中的成本（以位元組為單位）
+
+    取 UTF-8 位元組數與估算 token 換算位元組兩者的較大值，
+    使同一個預算同時限制位元組數與 token 數。
+    """
+    return max(
+        len(line.encode("utf-8")) + 1, estimate_tokens(line) * CHARS_PER_TOKEN + 1
+    )
+
+
+def _get_int_env(name: str, default: int) -> int:
+    try:
+        return max(int(os.getenv(name, str(default))), 0)
+    except ValueError:
+        debug_log(f"環境變數 {name} 不是有效的整數，使用預設值 {default}")
+        return default
+
+
+def get_result_log_budget() -> int:
+    """
+    回傳日誌的預算（位元組）
+
+    由 MCP_RESULT_LOG_MAX_BYTES 設定位元組上限；
+    MCP_RESULT_LOG_MAX_TOKENS 設定時再以估算 token 數限制。
+    """
+    budget = _get_int_env("MCP_RESULT_LOG_MAX_BYTES", DEFAULT_RESULT_LOG_MAX_BYTES)
+    max_tokens = _get_int_env("MCP_RESULT_LOG_MAX_TOKENS", 0)
+    if max_tokens:
+        budget = min(budget, max_tokens * CHARS_PER_TOKEN)
+    return budget
+
+
+def get_result_base64_budget() -> int:
+    """回傳結果中完整 Base64 圖片的預算（位元組），由 MCP_RESULT_BASE64_MAX_BYTES 設定"""
+    return _get_int_env("MCP_RESULT_BASE64_MAX_BYTES", DEFAULT_RESULT_BASE64_MAX_BYTES)
+
+
+def _collapse_repeats(lines: Iterable[str]) -> Iterable[tuple[str, int]]:
+    """合併連續重複的行，產生 (顯示文字, 原始行數)"""
+    previous: str | None = None
+    count = 0
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        if line == previous:
+            count += 1
+            continue
+        if previous is not None:
+            yield _format_repeat(previous, count), count
+        previous, count = line, 1
+    if previous is not None:
+        yield _format_repeat(previous, count), count
+
+
+def _format_repeat(line: str, count: int) -> str:
+    if len(line) > MAX_LINE_CHARS:
+        line = f"{line[:MAX_LINE_CHARS]}…（已截斷 {len(line) - MAX_LINE_CHARS} 字元）"
+    if count > 1:
+        return f"{line}  [重複 {count} 次]"
+    return line
+
+
+def compact_log_lines(lines: Iterable[str], budget: int | None = None) -> str:
+    """
+    壓縮日誌行
+
+    逐行串流處理，不需要把全部日誌載入記憶體：開頭視窗先佔用最多
+    HEAD_BUDGET_RATIO 的預算，其餘行進入結尾視窗；結尾視窗超出剩餘預算時
+    移出最舊的行，被移出的錯誤行在 ERROR_BUDGET_RATIO 內保留。
+
+    Args:
+        lines: 日誌行
+        budget: 預算（位元組），None 表示使用 get_result_log_budget()
+
+    Returns:
+        str: 壓縮後的日誌文字
+    """
+    if budget is None:
+        budget = get_result_log_budget()
+    head_budget = int(budget * HEAD_BUDGET_RATIO)
+    error_budget = int(budget * ERROR_BUDGET_RATIO)
+
+    # 項目為 (起始原始行號, 原始行數, 顯示文字, 成本)
+    head: list[tuple[int, int, str, int]] = []
+    errors: list[tuple[int, int, str, int]] = []
+    tail: deque[tuple[int, int, str, int]] = deque()
+    head_bytes = error_bytes = tail_bytes = 0
+    head_open = True
+    total = 0
+
+    for line, count in _collapse_repeats(lines):
+        cost = _line_cost(line)
+        entry = (total, count, line, cost)
+        total += count
+        if head_open:
+            if head_bytes + cost <= head_budget:
+                head.append(entry)
+                head_bytes += cost
+                continue
+            head_open = False
+
+        tail.append(entry)
+        tail_bytes += cost
+        while tail and tail_bytes > budget - head_bytes - error_bytes:
+            evicted = tail.popleft()
+            _, _, evicted_line, evicted_cost = evicted
+            tail_bytes -= evicted_cost
+            is_error = ERROR_LINE_PATTERN.search(evicted_line) is not None
+            if is_error and error_bytes + evicted_cost <= error_budget:
+                errors.append(evicted)
+                error_bytes += evicted_cost
+
+    parts: list[str] = []
+    expected = 0
+    for start, count, line, _ in [*head, *errors, *tail]:
+        if start > expected:
+            parts.append(f"... 已省略 {start - expected} 行 ...")
+        parts.append(line)
+        expected = start + count
+    if total > expected:
+        parts.append(f"... 已省略 {total - expected} 行 ...")
+    return "\n".join(parts)
+
+
+def compact_log_text(text: str, budget: int | None = None) -> str:
+    """壓縮日誌文字（按行處理）"""
+    if not text:
+        return text
+    return compact_log_lines(text.splitlines(), budget)
+
+
+def get_compaction_stats(original: str, compacted: str) -> dict[str, Any]:
+    """壓縮前後的大小統計"""
+    return {
+        "original_bytes": len(original.encode("utf-8")),
+        "compacted_bytes": len(compacted.encode("utf-8")),
+        "original_tokens": estimate_tokens(original),
+        "compacted_tokens": estimate_tokens(compacted),
+    }
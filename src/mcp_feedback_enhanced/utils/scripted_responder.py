@@ -0,0 +1,272 @@
+"""
+無頭腳本回應器
+==============
+
+無人值守的 CI / 批次代理流程中沒有人可以回答 interactive_feedback。
+設定 MCP_RESPONDER 後，工具呼叫直接由回應器回答，不啟動 Web UI 伺服器、
+不開啟瀏覽器：
+
+    MCP_RESPONDER=rules   MCP_RESPONDER_SOURCE=rules.json
+        依規則回答。規則檔格式：
+        {"default": "繼續", "rules": [
+            {"summary": "正則", "project": "正則", "response": "回饋文字"}
+        ]}
+        第一條 summary 與 project 都符合（未設定視為符合）的規則勝出。
+
+    MCP_RESPONDER=script  MCP_RESPONDER_SOURCE="python answer.py"
+        執行腳本，stdin 為 {"project_directory", "summary", "call"} JSON，
+        stdout 為回饋文字，或含 interactive_feedback / command_logs 的 JSON 物件。
+        逾時由 MCP_RESPONDER_SCRIPT_TIMEOUT（秒，預設 30）設定。
+
+    MCP_RESPONDER=queue   MCP_RESPONDER_SOURCE=answers.jsonl
+        依序使用預先寫好的回答，每行一筆（JSON 字串、含 interactive_feedback
+        的 JSON 物件或純文字），用完後使用預設回答。
+
+沒有符合的規則或佇列用完時回答 MCP_RESPONDER_DEFAULT（預設為空字串）。
+每次回答都附帶 responder 欄位，隨回饋結果寫入回饋日誌。
+"""
+
+import asyncio
+import json
+import os
+import re
+import shlex
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from ..debug import debug_log
+
+
+RESPONDER_MODES = ("rules", "script", "queue")
+DEFAULT_SCRIPT_TIMEOUT = 30.0
+
+
+def get_responder_mode() -> str | None:
+    """回應器模式（MCP_RESPONDER），未設定時為 None"""
+    mode = os.getenv("MCP_RESPONDER", "").strip().lower()
+    return mode or None
+
+
+def _get_script_timeout() -> float:
+    try:
+        return max(
+            float(
+                os.getenv("MCP_RESPONDER_SCRIPT_TIMEOUT", str(DEFAULT_SCRIPT_TIMEOUT))
+            ),
+            1.0,
+        )
+    except ValueError:
+        return DEFAULT_SCRIPT_TIMEOUT
+
+
+def _parse_answer(raw: Any) -> dict[str, Any]:
+    """把規則、腳本或佇列中的一筆回答轉為回饋欄位"""
+    if isinstance(raw, dict):
+        return {
+            "interactive_feedback": str(raw.get("interactive_feedback", "")),
+            "command_logs": str(raw.get("command_logs", "")),
+        }
+    return {"interactive_feedback": str(raw), "command_logs": ""}
+
+
+def _load_queue(path: Path) -> deque[dict[str, Any]]:
+    answers: deque[dict[str, Any]] = deque()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError:
+            raw = line
+        answers.append(_parse_answer(raw))
+    return answers
+
+
+class ScriptedResponder:
+    """以規則、腳本或預先寫好的佇列回答 interactive_feedback"""
+
+    def __init__(self, mode: str, source: str, default_response: str = ""):
+        if mode not in RESPONDER_MODES:
+            raise ValueError(
+                f"未知的回應器模式 {mode}，可用模式: {', '.join(RESPONDER_MODES)}"
+            )
+        if not source:
+            raise ValueError(f"回應器模式 {mode} 需要設定 MCP_RESPONDER_SOURCE")
+
+        self.mode = mode
+        self.source = source
+        self.default_response = default_response
+        self._lock = threading.Lock()
+        self._rules: list[dict[str, Any]] = []
+        self._queue: deque[dict[str, Any]] = deque()
+
+        if mode == "rules":
+            config = json.loads(Path(source).read_text(encoding="utf-8"))
+            self.default_response = config.get("default", default_response)
+            self._rules = [
+                {
+                    "summary": re.compile(rule["summary"])
+                    if rule.get("summary")
+                    else None,
+                    "project": re.compile(rule["project"])
+                    if rule.get("project")
+                    else None,
+                    "response": rule.get("response", ""),
+                }
+                for rule in config.get("rules", [])
+            ]
+        elif mode == "queue":
+            self._queue = _load_queue(Path(source))
+
+        self.stats: dict[str, Any] = {
+            "calls": 0,
+            "defaulted": 0,
+            "total_latency_ms": 0.0,
+            "last_answer_at": None,
+        }
+
+    async def respond(self, project_directory: str, summary: str) -> dict[str, Any]:
+        """回答一次 interactive_feedback 呼叫，返回與 Web UI 相同格式的結果"""
+        started = time.perf_counter()
+        with self._lock:
+            self.stats["calls"] += 1
+            call = self.stats["calls"]
+
+        if self.mode == "rules":
+            answer, detail = self._answer_from_rules(project_directory, summary)
+        elif self.mode == "queue":
+            answer, detail = self._answer_from_queue()
+        else:
+            answer, detail = await self._answer_from_script(
+                project_directory, summary, call
+            )
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.stats["total_latency_ms"] += latency_ms
+            self.stats["last_answer_at"] = int(time.time() * 1000)
+            if detail.get("defaulted"):
+                self.stats["defaulted"] += 1
+
+        debug_log(f"回應器（{self.mode}）回答第 {call} 次呼叫，耗時 {latency_ms:.2f}ms")
+        return {
+            "session_id": f"responder-{uuid.uuid4().hex[:12]}",
+            "command_logs": answer["command_logs"],
+            "interactive_feedback": answer["interactive_feedback"],
+            "images": [],
+            "settings": {},
+            "responder": {
+                "mode": self.mode,
+                "call": call,
+                "summary": summary,
+                **detail,
+            },
+        }
+
+    def _default_answer(self) -> tuple[dict[str, Any], dict[str, Any]]:
+        return _parse_answer(self.default_response), {"defaulted": True}
+
+    def _answer_from_rules(
+        self, project_directory: str, summary: str
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        for index, rule in enumerate(self._rules):
+            if rule["summary"] is not None and not rule["summary"].search(summary):
+                continue
+            if rule["project"] is not None and not rule["project"].search(
+                project_directory
+            ):
+                continue
+            return _parse_answer(rule["response"]), {"rule": index}
+        return self._default_answer()
+
+    def _answer_from_queue(self) -> tuple[dict[str, Any], dict[str, Any]]:
+        with self._lock:
+            if self._queue:
+                return self._queue.popleft(), {"remaining": len(self._queue)}
+        return self._default_answer()
+
+    async def _answer_from_script(
+        self, project_directory: str, summary: str, call: int
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        payload = json.dumps(
+            {"project_directory": project_directory, "summary": summary, "call": call},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        process = await asyncio.create_subprocess_exec(
+            *shlex.split(self.source, posix=os.name != "nt"),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=project_directory if os.path.isdir(project_directory) else None,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(payload), timeout=_get_script_timeout()
+            )
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+            raise RuntimeError(f"回應器腳本逾時: {self.source}") from None
+
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"回應器腳本失敗（退出碼 {process.returncode}）: "
+                f"{stderr.decode('utf-8', errors='replace').strip()}"
+            )
+
+        output = stdout.decode("utf-8", errors="replace").strip()
+        try:
+            raw = json.loads(output)
+        except ValueError:
+            raw = output
+        if not isinstance(raw, dict):
+            raw = output
+        return _parse_answer(raw), {"exit_code": process.returncode}
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            calls = self.stats["calls"]
+            return {
+                **self.stats,
+                "mode": self.mode,
+                "average_latency_ms": (
+                    round(self.stats["total_latency_ms"] / calls, 3) if calls else 0.0
+                ),
+                "queue_remaining": len(self._queue),
+            }
+
+
+_responder: ScriptedResponder | None = None
+_responder_config: tuple[str, str, str] | None = None
+_responder_lock = threading.Lock()
+
+
+def get_scripted_responder() -> ScriptedResponder | None:
+    """
+    獲取全域回應器實例，未設定 MCP_RESPONDER 時返回 None
+
+    環境變數改變時重新建立（佇列與統計隨之重置）。
+
+    Raises:
+        ValueError: 模式未知或缺少 MCP_RESPONDER_SOURCE
+    """
+    global _responder, _responder_config
+    mode = get_responder_mode()
+    if mode is None:
+        return None
+
+    config = (
+        mode,
+        os.getenv("MCP_RESPONDER_SOURCE", ""),
+        os.getenv("MCP_RESPONDER_DEFAULT", ""),
+    )
+    with _responder_lock:
+        if _responder is None or _responder_config != config:
+            _responder = ScriptedResponder(*config)
+            _responder_config = config
+            debug_log(f"已啟用無頭回應器: {mode}（{config[1]}）")
+        return _responder
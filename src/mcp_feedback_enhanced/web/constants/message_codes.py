@@ -33,10 +33,13 @@ class MessageCodes:
 
     # ========== 會話相關 ==========
     SESSION_NO_ACTIVE = "session.noActiveSession"
+    SESSION_NOT_FOUND = "session.notFound"
     SESSION_CREATED = "session.created"
     SESSION_UPDATED = "session.updated"
     SESSION_EXPIRED = "session.expired"
     SESSION_TIMEOUT = "session.timeout"
+    SESSION_CANCELLED = "session.cancelled"
+    SESSION_REATTACHED = "session.reattached"
     SESSION_CLEANED = "session.cleaned"
     SESSION_FEEDBACK_SUBMITTED = "session.feedbackSubmitted"
     SESSION_USER_MESSAGE_RECORDED = "session.userMessageRecorded"
@@ -77,6 +80,7 @@ class MessageCodes:
     ERROR_GET_LOG_LEVEL_FAILED = "error.getLogLevelFailed"
     ERROR_RESOURCE_CLEANUP = "error.resourceCleanup"
     ERROR_PROCESSING = "error.processing"
+    ERROR_UNAUTHORIZED = "error.unauthorized"
 
     # ========== 檔案相關 ==========
     FILE_UPLOAD_SUCCESS = "file.uploadSuccess"
@@ -103,6 +107,7 @@ LEGACY_KEY_MAPPING = {
     "SESSION_CLEANUP": "SESSION_CLEANED",
     "TIMEOUT_CLEANUP": "SESSION_TIMEOUT",
     "EXPIRED_CLEANUP": "SESSION_EXPIRED",
+    "CANCELLED_CLEANUP": "SESSION_CANCELLED",
     "MEMORY_PRESSURE_CLEANUP": "SYSTEM_MEMORY_PRESSURE",
     "MANUAL_CLEANUP": "SESSION_MANUAL_CLEANUP",
     "ERROR_CLEANUP": "SESSION_ERROR_CLEANUP",
@@ -27,9 +27,26 @@ from ..utils.error_handler import ErrorHandler, ErrorType
 from ..utils.memory_monitor import get_memory_monitor
 from .models import CleanupReason, SessionStatus, WebFeedbackSession
 from .routes import setup_routes
-from .utils import get_browser_opener
+from .utils import get_browser_opener, json_codec, wire_format
+from .utils.answer_queue import AnswerQueue
 from .utils.compression_config import get_compression_manager
+from .utils.idempotency import resolve_idempotency_key
 from .utils.port_manager import PortManager
+from .utils.progress import (
+    ProgressCallback,
+    get_progress_interval,
+    run_progress_keepalive,
+)
+from .utils.session_registry import SessionRegistry
+from .utils.session_store import get_max_resident_sessions, get_session_store
+from .utils.static_cache import CachedStaticFiles, is_static_cache_enabled
+
+
+# 列出持久化會話時每次從存儲讀取的快照數
+STORED_SESSION_BATCH_SIZE = 100
+
+# 未指定 limit 時一次最多列出的持久化會話數，其餘以 next_cursor 分頁
+MAX_STORED_SESSIONS_PER_PAGE = 200
 
 
 class WebUIManager:
@@ -102,7 +119,10 @@ class WebUIManager:
             self.port = PortManager.find_free_port_enhanced(
                 preferred_port=preferred_port, auto_cleanup=auto_cleanup, host=self.host
             )
-        self.app = FastAPI(title="MCP Feedback Enhanced")
+        self.app = FastAPI(
+            title="MCP Feedback Enhanced",
+            default_response_class=json_codec.FastJSONResponse,
+        )
 
         # 設置壓縮和緩存中間件
         self._setup_compression_middleware()
@@ -112,7 +132,14 @@ class WebUIManager:
 
         # 重構：使用單一活躍會話而非會話字典
         self.current_session: WebFeedbackSession | None = None
-        self.sessions: dict[str, WebFeedbackSession] = {}  # 保留用於向後兼容
+        # 保留用於向後兼容；帶版本號以支援 /api/all-sessions 的條件請求
+        self.sessions: SessionRegistry = SessionRegistry()
+        # 可選的會話存儲（MCP_SESSION_STORE=memory/sqlite/redis），未啟用時為 None
+        self.session_store = get_session_store()
+        # 節點標識，用於略過經由存儲發布/訂閱回傳的自身事件
+        self.node_id = self.sessions.instance_token
+        if self.session_store is not None:
+            self.session_store.subscribe(self._on_store_event)
 
         # 全局標籤頁狀態管理 - 跨會話保持
         self.global_active_tabs: dict[str, dict] = {}
@@ -120,6 +147,15 @@ class WebUIManager:
         # 會話更新通知標記
         self._pending_session_update = False
 
+        # 預先回答佇列：下一次呼叫到達時直接取出回饋，不等待用戶
+        self.answer_queue = AnswerQueue()
+
+        # 目前開啟的 SSE 事件串流數量（WebSocket 不可用時的回退通道）
+        self.event_stream_count = 0
+
+        # Web 伺服器所在的事件循環（用於從其他線程推送會話事件）
+        self.server_loop: asyncio.AbstractEventLoop | None = None
+
         # 會話清理統計
         self.cleanup_stats: dict[str, Any] = {
             "total_cleanups": 0,
@@ -219,8 +255,11 @@ class WebUIManager:
             """壓縮和緩存中間件"""
             response = await call_next(request)
 
-            # 添加緩存頭
-            if not config.should_exclude_path(request.url.path):
+            # 添加緩存頭（已自帶快取標頭的回應，例如記憶體靜態資源，不重新計算）
+            if (
+                "cache-control" not in response.headers
+                and not config.should_exclude_path(request.url.path)
+            ):
                 cache_headers = config.get_cache_headers(request.url.path)
                 for key, value in cache_headers.items():
                     response.headers[key] = value
@@ -229,7 +268,7 @@ class WebUIManager:
             try:
                 content_length = int(response.headers.get("content-length", 0))
                 content_encoding = response.headers.get("content-encoding", "")
-                was_compressed = "gzip" in content_encoding
+                was_compressed = content_encoding in ("gzip", "br")
 
                 if content_length > 0:
                     # 估算原始大小（如果已壓縮，假設壓縮比為 30%）
@@ -311,9 +350,16 @@ class WebUIManager:
         # Web UI 靜態文件
         web_static_path = Path(__file__).parent / "static"
         if web_static_path.exists():
-            self.app.mount(
-                "/static", StaticFiles(directory=str(web_static_path)), name="static"
-            )
+            static_app: StaticFiles
+            if is_static_cache_enabled():
+                # 靜態檔案載入記憶體，附帶預先計算的 ETag 與快取標頭
+                static_app = CachedStaticFiles(
+                    directory=web_static_path,
+                    cache_max_age=get_compression_manager().config.static_cache_max_age,
+                )
+            else:
+                static_app = StaticFiles(directory=str(web_static_path))
+            self.app.mount("/static", static_app, name="static")
         else:
             raise RuntimeError(f"Static files directory not found: {web_static_path}")
 
@@ -326,7 +372,34 @@ class WebUIManager:
         else:
             raise RuntimeError(f"Templates directory not found: {web_templates_path}")
 
-    def create_session(self, project_directory: str, summary: str) -> str:
+    def reattach_session(self, idempotency_key: str) -> WebFeedbackSession | None:
+        """
+        以冪等鍵重新連接到目前的會話
+
+        只有目前的會話帶有相同冪等鍵且仍在等待回饋（或剛被 MCP 客戶端取消）時
+        才會重新連接；會話、WebSocket 與頁面狀態都保持不變。
+
+        Returns:
+            WebFeedbackSession | None: 重新連接的會話，無法重新連接時為 None
+        """
+        session = self.current_session
+        if (
+            session is None
+            or session.idempotency_key != idempotency_key
+            or not session.can_reattach()
+        ):
+            return None
+
+        session.reattach()
+        debug_log(f"冪等鍵相同，重新連接到會話 {session.session_id}")
+        return session
+
+    def create_session(
+        self,
+        project_directory: str,
+        summary: str,
+        idempotency_key: str | None = None,
+    ) -> str:
         """創建新的回饋會話 - 重構為單一活躍會話模式，保留標籤頁狀態"""
         # 保存舊會話的引用和 WebSocket 連接
         old_session = self.current_session
@@ -337,7 +410,9 @@ class WebUIManager:
 
         # 創建新會話
         session_id = str(uuid.uuid4())
-        session = WebFeedbackSession(session_id, project_directory, summary)
+        session = WebFeedbackSession(
+            session_id, project_directory, summary, idempotency_key=idempotency_key
+        )
 
         # 如果有舊會話，處理狀態轉換和清理
         if old_session:
@@ -395,8 +470,148 @@ class WebUIManager:
             self._pending_session_update = True
             debug_log("沒有舊 WebSocket 連接，設置待更新標記")
 
+        # 持久化：狀態或用戶消息變更時由會話自行寫入快照
+        if self.session_store is not None:
+            session.session_store = self.session_store
+            session.persist()
+            self._evict_cold_sessions()
+
+        # 推送增量事件，前端據此更新會話列表而不必重新載入全部會話
+        session.event_listeners.append(self.publish_session_event)
+        self.publish_session_event(
+            {"type": "session_added", "session": session.get_summary_info()}
+        )
+
         return session_id
 
+    def _evict_cold_sessions(self) -> None:
+        """
+        將超出常駐上限的已結束會話移出記憶體（僅在啟用持久化存儲時）
+
+        被移出的會話仍可從持久化存儲讀取，讓長時間運行的伺服器記憶體維持有界。
+        """
+        max_resident = get_max_resident_sessions()
+        cold = sorted(
+            (
+                session
+                for session in self.sessions.values()
+                if session is not self.current_session and session.is_terminal()
+            ),
+            key=lambda s: s.created_at,
+        )
+        for session in cold[: max(len(cold) - max_resident, 0)]:
+            session.persist()
+            # WebSocket 已轉移給活躍會話，不能隨舊會話一起關閉
+            session.websocket = None
+            session.session_store = None
+            self.remove_session(session.session_id)
+            debug_log(f"會話 {session.session_id} 已移出記憶體，改由持久化存儲提供")
+
+    def load_stored_session(self, session_id: str) -> dict[str, Any] | None:
+        """從持久化存儲讀取不在記憶體中的會話快照（延遲恢復），存儲故障時返回 None"""
+        if self.session_store is None:
+            return None
+        try:
+            return self.session_store.load_session(session_id)
+        except Exception as e:
+            debug_log(f"從持久化存儲讀取會話 {session_id} 失敗: {e}")
+            return None
+
+    def list_stored_sessions(
+        self, offset: int = 0, limit: int | None = None, summary: bool = True
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        """
+        列出持久化存儲中不在記憶體的會話快照（按創建時間倒序）
+
+        已移出記憶體或伺服器重啟前的會話只能唯讀查看，
+        等待中的回饋不會恢復。存儲故障時只記錄日誌並返回已讀到的部分，
+        會話列表仍可由記憶體中的會話提供。
+
+        Args:
+            offset: 存儲中的起始位置（上一頁返回的偏移）
+            limit: 最多返回幾個快照，None 表示 MAX_STORED_SESSIONS_PER_PAGE
+            summary: 只讀取摘要，不含用戶消息與回饋結果
+
+        Returns:
+            tuple: (快照列表, 下一頁的存儲偏移或 None)
+        """
+        if self.session_store is None:
+            return [], None
+        if limit is None:
+            limit = MAX_STORED_SESSIONS_PER_PAGE
+        snapshots: list[dict[str, Any]] = []
+        while True:
+            try:
+                batch, total = self.session_store.list_sessions(
+                    offset, STORED_SESSION_BATCH_SIZE, summary=summary
+                )
+            except Exception as e:
+                debug_log(f"從持久化存儲列出會話失敗: {e}")
+                return snapshots, None
+            for index, snapshot in enumerate(batch):
+                if snapshot.get("session_id") in self.sessions:
+                    continue
+                snapshots.append(snapshot)
+                if len(snapshots) >= limit:
+                    next_offset = offset + index + 1
+                    return snapshots, next_offset if next_offset < total else None
+            offset += len(batch)
+            if not batch or offset >= total:
+                return snapshots, None
+
+    def publish_session_event(self, message: dict[str, Any]) -> None:
+        """
+        發布會話增量事件（session_added、session_status_changed、user_message_added）
+
+        事件一律經由發送當下的活躍會話連接推送，因此舊會話的狀態變更
+        在 WebSocket 轉移到新會話後仍能送達前端。可從任何線程調用。
+        """
+        session_id = message.get("session_id") or message.get("session", {}).get(
+            "session_id"
+        )
+        self.sessions.touch(session_id)
+        self._dispatch_session_event(message)
+
+        # 經由會話存儲廣播給其他節點，讓連接在其他節點的標籤頁也能收到
+        if self.session_store is not None:
+            self.session_store.publish({"node_id": self.node_id, "event": message})
+
+    def _on_store_event(self, payload: dict[str, Any]) -> None:
+        """
+        處理其他節點經由會話存儲發布的會話事件
+
+        先遞增註冊表版本，讓 ETag 失效、since= 增量包含該會話，再推送事件。
+        """
+        event = payload.get("event")
+        if payload.get("node_id") == self.node_id or not isinstance(event, dict):
+            return
+        session = event.get("session")
+        session_id = event.get("session_id") or (
+            session.get("session_id") if isinstance(session, dict) else None
+        )
+        self.sessions.touch_remote(session_id)
+        self._dispatch_session_event(event)
+
+    def _dispatch_session_event(self, message: dict[str, Any]) -> None:
+        """將會話事件交給事件循環，推送到本節點的活躍會話連接"""
+        loop = self.server_loop
+        if loop and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._deliver_session_event(message), loop)
+            return
+
+        try:
+            asyncio.get_running_loop().create_task(self._deliver_session_event(message))
+        except RuntimeError:
+            # 沒有可用的事件循環，僅寫入重放緩衝區，供重連或 SSE 續傳
+            if self.current_session:
+                self.current_session.replay_buffer.record(message)
+
+    async def _deliver_session_event(self, message: dict[str, Any]) -> None:
+        """透過當前活躍會話發送增量事件"""
+        session = self.current_session
+        if session:
+            await session.send_message(message)
+
     def get_session(self, session_id: str) -> WebFeedbackSession | None:
         """獲取回饋會話 - 保持向後兼容"""
         return self.sessions.get(session_id)
@@ -472,11 +687,10 @@ class WebUIManager:
             debug_log("沒有活躍的 WebSocket 連接，無法廣播消息")
             return
 
-        try:
-            await self.current_session.websocket.send_json(message)
+        if await self.current_session.send_message(message):
             debug_log(f"已廣播消息到活躍標籤頁: {message.get('type', 'unknown')}")
-        except Exception as e:
-            debug_log(f"廣播消息失敗: {e}")
+        else:
+            debug_log(f"廣播消息失敗: {message.get('type', 'unknown')}")
 
     def start_server(self):
         """啟動 Web 伺服器（優化版本，支援並行初始化）"""
@@ -536,12 +750,14 @@ class WebUIManager:
                         port=self.port,
                         log_level="warning",
                         access_log=False,
+                        ws_per_message_deflate=wire_format.is_deflate_enabled(),
                     )
 
                     server_instance = uvicorn.Server(config)
 
                     # 創建事件循環並啟動服務器
                     async def serve_with_async_init(server=server_instance):
+                        self.server_loop = asyncio.get_running_loop()
                         # 在服務器啟動的同時進行異步初始化
                         server_task = asyncio.create_task(server.serve())
                         init_task = asyncio.create_task(self._init_async_components())
@@ -782,7 +998,8 @@ class WebUIManager:
             }
 
             # 發送刷新通知
-            await self.current_session.websocket.send_json(refresh_message)
+            if not await self.current_session.send_message(refresh_message):
+                return False
             debug_log(f"已向現有標籤頁發送刷新通知: {self.current_session.session_id}")
 
             # 簡單等待一下讓消息發送完成
@@ -799,6 +1016,10 @@ class WebUIManager:
         try:
             # 快速檢測層：檢查 WebSocket 物件是否存在
             if not self.current_session or not self.current_session.websocket:
+                if self.current_session and self.event_stream_count > 0:
+                    # SSE 串流會自動跟隨新會話，不需要開啟新視窗
+                    debug_log(f"快速檢測：有 {self.event_stream_count} 個 SSE 串流")
+                    return True
                 debug_log("快速檢測：沒有當前會話或 WebSocket 連接")
                 return False
 
@@ -832,6 +1053,7 @@ class WebUIManager:
                                 )
                                 # 清理死連接
                                 self.current_session.websocket = None
+                                self.sessions.touch(self.current_session.session_id)
                                 return False
                     except ImportError:
                         # 如果導入失敗，使用替代方法
@@ -840,7 +1062,9 @@ class WebUIManager:
 
                 # 如果連接看起來是活的，嘗試發送 ping（非阻塞）
                 # 注意：FastAPI WebSocket 沒有內建的 ping 方法，這裡使用自定義消息
-                await websocket.send_json({"type": "ping", "timestamp": time.time()})
+                await wire_format.send_message(
+                    websocket, {"type": "ping", "timestamp": time.time()}
+                )
                 debug_log("準確檢測：成功發送 ping 消息，連接是活躍的")
                 return True
 
@@ -849,6 +1073,7 @@ class WebUIManager:
                 # 連接已死，清理它
                 if self.current_session:
                     self.current_session.websocket = None
+                    self.sessions.touch(self.current_session.session_id)
                 return False
 
         except Exception as e:
@@ -1061,6 +1286,11 @@ class WebUIManager:
         self.sessions.clear()
         self.current_session = None
 
+        # 提交會話存儲中尚未寫入的快照與日誌，並停止接收其他節點的事件
+        if self.session_store is not None:
+            self.session_store.flush()
+            self.session_store.unsubscribe(self._on_store_event)
+
         # 更新統計
         cleanup_duration = time.time() - cleanup_start_time
         self.cleanup_stats.update(
@@ -1096,8 +1326,17 @@ def get_web_ui_manager() -> WebUIManager:
     return _web_ui_manager
 
 
+def peek_web_ui_manager() -> WebUIManager | None:
+    """獲取已存在的 Web UI 管理器實例（不會建立新實例）"""
+    return _web_ui_manager
+
+
 async def launch_web_feedback_ui(
-    project_directory: str, summary: str, timeout: int = 600
+    project_directory: str,
+    summary: str,
+    timeout: int = 600,
+    idempotency_key: str | None = None,
+    progress_callback: ProgressCallback | None = None,
 ) -> dict:
     """
     啟動 Web 回饋介面並等待用戶回饋 - 重構為使用根路徑
@@ -1106,15 +1345,26 @@ async def launch_web_feedback_ui(
         project_directory: 專案目錄路徑
         summary: AI 工作摘要
         timeout: 超時時間（秒）
+        idempotency_key: 冪等鍵，未提供時由專案目錄與摘要推導
+        progress_callback: 等待期間定期調用的進度回報函數（MCP 進度通知保活）
 
     Returns:
         dict: 回饋結果，包含 logs、interactive_feedback 和 images
     """
     manager = get_web_ui_manager()
 
-    # 創建新會話（每次AI調用都應該創建新會話）
-    manager.create_session(project_directory, summary)
-    session = manager.get_current_session()
+    # 用戶已預先回答：直接以排隊的回饋完成會話，不啟動伺服器也不開啟瀏覽器
+    queued = manager.answer_queue.pop(project_directory)
+    if queued is not None:
+        return await answer_from_queue(manager, project_directory, summary, queued)
+
+    # 重試的呼叫重新連接到等待中的會話，否則創建新會話
+    key = resolve_idempotency_key(idempotency_key, project_directory, summary)
+    session = manager.reattach_session(key) if key else None
+    reattached = session is not None
+    if session is None:
+        manager.create_session(project_directory, summary, idempotency_key=key)
+        session = manager.get_current_session()
 
     if not session:
         raise RuntimeError("無法創建回饋會話")
@@ -1129,7 +1379,11 @@ async def launch_web_feedback_ui(
     # 使用根路徑 URL
     feedback_url = manager.get_server_url()  # 直接使用根路徑
 
-    if desktop_mode:
+    if reattached and session.websocket is not None:
+        # 重新連接：分頁仍連接在同一會話上，不開啟瀏覽器也不通知刷新
+        debug_log("重新連接到既有會話，保持分頁狀態")
+        has_active_tabs = True
+    elif desktop_mode:
         # 桌面模式：啟動桌面應用程式
         debug_log("檢測到桌面模式，啟動桌面應用程式...")
         has_active_tabs = await manager.launch_desktop_app(feedback_url)
@@ -1143,6 +1397,14 @@ async def launch_web_feedback_ui(
     if has_active_tabs:
         debug_log("檢測到活躍標籤頁，會話更新通知已發送")
 
+    # 等待期間定期回報進度，讓有請求逾時限制的客戶端保持請求存活
+    keepalive_task = None
+    interval = get_progress_interval()
+    if progress_callback is not None and interval > 0:
+        keepalive_task = asyncio.create_task(
+            run_progress_keepalive(session, progress_callback, interval)
+        )
+
     try:
         # 等待用戶回饋，傳遞 timeout 參數
         result = await session.wait_for_feedback(timeout)
@@ -1156,11 +1418,32 @@ async def launch_web_feedback_ui(
         debug_log(f"會話發生錯誤: {e}")
         raise
     finally:
+        if keepalive_task is not None:
+            keepalive_task.cancel()
         # 注意：不再自動清理會話和停止服務器，保持持久性
         # 會話將保持活躍狀態，等待下次 MCP 調用
         debug_log("會話保持活躍狀態，等待下次 MCP 調用")
 
 
+async def answer_from_queue(
+    manager: WebUIManager,
+    project_directory: str,
+    summary: str,
+    queued: dict[str, Any],
+) -> dict:
+    """以預先排隊的回饋建立並立即完成會話，會話仍會出現在會話歷史中"""
+    manager.create_session(project_directory, summary)
+    session = manager.get_current_session()
+    if not session:
+        raise RuntimeError("無法創建回饋會話")
+
+    debug_log(f"使用預先排隊的回饋 {queued['id']} 完成會話 {session.session_id}")
+    await session.submit_feedback(
+        queued["feedback"], queued["images"], queued["settings"]
+    )
+    return await session.collect_feedback_result()
+
+
 def stop_web_ui():
     """停止 Web UI 服務"""
     global _web_ui_manager
@@ -26,7 +26,17 @@ from fastapi import WebSocket
 from ...debug import web_debug_log as debug_log
 from ...utils.error_handler import ErrorHandler, ErrorType
 from ...utils.resource_manager import get_resource_manager, register_process
+from ...utils.result_compaction import compact_log_lines
 from ..constants import get_message_code
+from ..utils import wire_format
+from ..utils.command_jobs import CommandJob, CommandJobTable
+from ..utils.command_log import CommandLogRegistry
+from ..utils.message_buffer import MessageReplayBuffer
+from ..utils.spill_buffer import (
+    SpillRingBuffer,
+    get_log_buffer_bytes,
+    get_message_buffer_bytes,
+)
 
 
 class SessionStatus(Enum):
@@ -39,6 +49,7 @@ class SessionStatus(Enum):
     ERROR = "error"  # 錯誤（終態）
     TIMEOUT = "timeout"  # 超時（終態）
     EXPIRED = "expired"  # 已過期（終態）
+    CANCELLED = "cancelled"  # MCP 客戶端已取消（終態）
 
 
 class CleanupReason(Enum):
@@ -50,6 +61,7 @@ class CleanupReason(Enum):
     MANUAL = "manual"  # 手動清理
     ERROR = "error"  # 錯誤清理
     SHUTDOWN = "shutdown"  # 系統關閉清理
+    CANCELLED = "cancelled"  # MCP 請求取消清理
 
 
 # 常數定義
@@ -64,10 +76,92 @@ SUPPORTED_IMAGE_TYPES = {
 }
 TEMP_DIR = Path.home() / ".cache" / "interactive-feedback-mcp-web"
 
+# 會話詳情分頁大小
+DEFAULT_MESSAGES_PAGE_SIZE = 50
+DEFAULT_LOGS_PAGE_SIZE = 200
+MAX_DETAIL_PAGE_SIZE = 500
+
 # 訊息代碼現在從統一的常量文件導入
 # 使用 get_message_code 函數來獲取訊息代碼
 
 
+def _slice_page(items: list[Any], offset: int, limit: int) -> dict[str, Any]:
+    """切出一頁資料，並附上總數與下一頁位置"""
+    offset = max(offset, 0)
+    limit = min(max(limit, 1), MAX_DETAIL_PAGE_SIZE)
+    page = items[offset : offset + limit]
+    end = offset + len(page)
+    return {
+        "items": page,
+        "offset": offset,
+        "total": len(items),
+        "next_offset": end if end < len(items) else None,
+    }
+
+
+def _slice_tail_page(
+    tail: list[Any], base: int, offset: int, limit: int
+) -> dict[str, Any]:
+    """
+    分頁讀取只保留最新部分的列表
+
+    快照只持久化記憶體中的用戶消息，tail 對應全域索引 [base, base + len(tail))；
+    更早的消息已不在快照中，offset 小於 base 時從 base 開始。
+    """
+    total = base + len(tail)
+    offset = max(offset, base)
+    limit = min(max(limit, 1), MAX_DETAIL_PAGE_SIZE)
+    page = tail[offset - base : offset - base + limit]
+    end = offset + len(page)
+    return {
+        "items": page,
+        "offset": offset,
+        "total": total,
+        "next_offset": end if end < total else None,
+    }
+
+
+def build_stored_detail_info(
+    session_store: Any,
+    snapshot: dict[str, Any],
+    *,
+    messages_offset: int = 0,
+    messages_limit: int = DEFAULT_MESSAGES_PAGE_SIZE,
+    logs_offset: int = 0,
+    logs_limit: int = DEFAULT_LOGS_PAGE_SIZE,
+) -> dict[str, Any]:
+    """
+    以持久化快照組出與 get_detail_info 相同格式的會話詳情
+
+    用於已移出記憶體或伺服器重啟前的會話，命令日誌直接從存儲分頁讀取。
+    """
+    detail = {
+        key: value
+        for key, value in snapshot.items()
+        if key not in ("feedback_result", "user_messages_offset")
+    }
+    detail["user_messages"] = _slice_tail_page(
+        snapshot.get("user_messages") or [],
+        snapshot.get("user_messages_offset", 0),
+        messages_offset,
+        messages_limit,
+    )
+
+    logs_offset = max(logs_offset, 0)
+    logs_limit = min(max(logs_limit, 1), MAX_DETAIL_PAGE_SIZE)
+    logs, logs_total = session_store.get_logs(
+        snapshot["session_id"], logs_offset, logs_limit
+    )
+    end = logs_offset + len(logs)
+    detail["command_logs"] = {
+        "items": logs,
+        "offset": logs_offset,
+        "total": logs_total,
+        "next_offset": end if end < logs_total else None,
+    }
+    return detail
+
+
 def _safe_parse_command(command: str) -> list[str]:
     """
     安全解析命令字符串，避免 shell 注入攻擊
@@ -126,18 +220,33 @@ class WebFeedbackSession:
         summary: str,
         auto_cleanup_delay: int = 3600,
         max_idle_time: int = 1800,
+        *,
+        idempotency_key: str | None = None,
     ):
         self.session_id = session_id
         self.project_directory = project_directory
         self.summary = summary
+        # 冪等鍵：重試的 interactive_feedback 呼叫以相同的鍵重新連接到此會話
+        self.idempotency_key = idempotency_key
         self.websocket: WebSocket | None = None
         self.feedback_result: str | None = None
         self.images: list[dict] = []
         self.settings: dict[str, Any] = {}  # 圖片設定
         self.feedback_completed = threading.Event()
-        self.process: subprocess.Popen | None = None
-        self.command_logs: list[str] = []
-        self.user_messages: list[dict] = []  # 用戶消息記錄
+        # 命令日誌與用戶消息記錄：以位元組計量的有界緩衝區，超出部分溢出到磁碟
+        spill_dir = TEMP_DIR / "spill"
+        self.command_logs = SpillRingBuffer(
+            spill_dir / f"{session_id}-logs.jsonl", get_log_buffer_bytes()
+        )
+        self.user_messages = SpillRingBuffer(
+            spill_dir / f"{session_id}-messages.jsonl", get_message_buffer_bytes()
+        )
+        # 每次命令執行的完整輸出寫入獨立日誌檔案，透過 mmap 分頁讀取
+        self.command_runs = CommandLogRegistry(TEMP_DIR / "commands", session_id)
+        # 同時執行的命令工作表，輸出以輪詢方式公平送出
+        self.command_jobs = CommandJobTable(
+            self.send_message, on_output=self.add_log, on_exit=self._on_command_exit
+        )
         self._cleanup_done = False  # 防止重複清理
         # 移除語言設定，改由前端處理
 
@@ -168,11 +277,26 @@ class WebFeedbackSession:
         # 新增：活躍標籤頁管理
         self.active_tabs: dict[str, Any] = {}
 
+        # 出站訊息序號與重放緩衝區（支援斷線續傳）
+        self.replay_buffer = MessageReplayBuffer()
+
+        # 會話事件監聽器（狀態變更、用戶消息等增量事件，由 WebUIManager 註冊）
+        self.event_listeners: list[Callable[[dict[str, Any]], None]] = []
+
+        # 持久化會話存儲（MCP_SESSION_STORE 啟用時由 WebUIManager 設定）
+        self.session_store: Any = None
+
         # 新增：用戶設定的會話超時
         self.user_timeout_enabled = False
         self.user_timeout_seconds = 3600  # 預設 1 小時
         self.user_timeout_timer: threading.Timer | None = None
 
+        # 正在等待此會話回饋的呼叫數量（重試的呼叫重新連接時會大於 1）
+        self._active_waits = 0
+
+        # 在同步流程中發送分頁通知的任務（保留引用避免被回收）
+        self._notice_task: asyncio.Task | None = None
+
         # 確保臨時目錄存在
         TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -198,6 +322,42 @@ class WebFeedbackSession:
         """
         return get_message_code(key)
 
+    async def send_message(self, message: dict[str, Any]) -> bool:
+        """
+        發送訊息到前端，可重放的訊息會先分配序號並存入重放緩衝區
+
+        即使當前沒有 WebSocket 連接，可重放的訊息仍會被緩衝，
+        標籤頁重連後可從最後確認的序號續傳。
+
+        Args:
+            message: 要發送的訊息
+
+        Returns:
+            bool: 是否已成功發送到 WebSocket
+        """
+        self.replay_buffer.record(message)
+
+        if not self.websocket:
+            return False
+
+        try:
+            await wire_format.send_message(self.websocket, message)
+            return True
+        except Exception as e:
+            debug_log(f"發送 WebSocket 訊息失敗: {e}")
+            return False
+
+    async def send_event_stream_message(self, message: dict[str, Any]) -> bool:
+        """
+        回覆 SSE 客戶端的請求：經由重放緩衝區推送給事件串流訂閱者
+
+        SSE 客戶端透過 /api/events/message 發送請求，回覆不能走 WebSocket。
+
+        Returns:
+            bool: 是否有事件串流訂閱者
+        """
+        return self.replay_buffer.publish(message)
+
     def next_step(self, message: str | None = None) -> bool:
         """進入下一個狀態 - 單向流轉，不可倒退"""
         old_status = self.status
@@ -211,6 +371,7 @@ class WebFeedbackSession:
             SessionStatus.ERROR: None,  # 終態
             SessionStatus.TIMEOUT: None,  # 終態
             SessionStatus.EXPIRED: None,  # 終態
+            SessionStatus.CANCELLED: None,  # 終態
         }
 
         next_status = next_status_map.get(self.status)
@@ -243,6 +404,7 @@ class WebFeedbackSession:
         debug_log(
             f"✅ 會話 {self.session_id} 狀態流轉: {old_status.value} → {next_status.value} - {self.status_message}"
         )
+        self._emit_status_changed()
         return True
 
     def set_error(self, message: str = "會話發生錯誤") -> bool:
@@ -255,6 +417,7 @@ class WebFeedbackSession:
         debug_log(
             f"❌ 會話 {self.session_id} 設置為錯誤狀態: {old_status.value} → {self.status.value} - {message}"
         )
+        self._emit_status_changed()
         return True
 
     def set_expired(self, message: str = "會話已過期") -> bool:
@@ -267,8 +430,95 @@ class WebFeedbackSession:
         debug_log(
             f"⏰ 會話 {self.session_id} 設置為過期狀態: {old_status.value} → {self.status.value} - {message}"
         )
+        self._emit_status_changed()
         return True
 
+    def _emit_event(self, message: dict[str, Any]) -> None:
+        """持久化快照後通知所有事件監聽器"""
+        self.persist()
+        for listener in list(self.event_listeners):
+            try:
+                listener(message)
+            except Exception as e:
+                debug_log(f"會話 {self.session_id} 事件監聽器執行失敗: {e}")
+
+    def _emit_status_changed(self) -> None:
+        """發出會話狀態變更事件"""
+        self._emit_event(
+            {
+                "type": "session_status_changed",
+                "session_id": self.session_id,
+                "status": self.status.value,
+                "status_message": self.status_message,
+                "last_activity": int(self.last_activity * 1000),
+                "feedback_completed": self.feedback_completed.is_set(),
+            }
+        )
+
+    def get_summary_info(self) -> dict[str, Any]:
+        """獲取會話列表使用的會話摘要（時間戳為毫秒）"""
+        return {
+            "session_id": self.session_id,
+            "project_directory": self.project_directory,
+            "summary": self.summary,
+            "status": self.status.value,
+            "status_message": self.status_message,
+            "created_at": int(self.created_at * 1000),
+            "last_activity": int(self.last_activity * 1000),
+            "feedback_completed": self.feedback_completed.is_set(),
+            "user_message_count": len(self.user_messages),
+        }
+
+    def get_persisted_state(self) -> dict[str, Any]:
+        """
+        獲取寫入持久化存儲的會話快照（不含圖片數據與命令日誌）
+
+        用戶消息只包含記憶體中的最新部分，不讀取溢出檔案；
+        user_messages_offset 為其起始索引，總數見 user_message_count。
+        """
+        state = self.get_summary_info()
+        messages_offset, messages = self.user_messages.memory_snapshot()
+        state.update(
+            {
+                "feedback_result": self.feedback_result,
+                "user_messages": messages,
+                "user_messages_offset": messages_offset,
+            }
+        )
+        return state
+
+    def persist(self) -> None:
+        """將目前狀態排入持久化存儲（未啟用時不做任何事）"""
+        if self.session_store is None:
+            return
+        try:
+            self.session_store.save_snapshot(self.get_persisted_state())
+        except Exception as e:
+            debug_log(f"會話 {self.session_id} 持久化失敗: {e}")
+
+    def get_detail_info(
+        self,
+        messages_offset: int = 0,
+        messages_limit: int = DEFAULT_MESSAGES_PAGE_SIZE,
+        logs_offset: int = 0,
+        logs_limit: int = DEFAULT_LOGS_PAGE_SIZE,
+    ) -> dict[str, Any]:
+        """
+        獲取會話詳情，用戶消息與命令日誌分頁返回
+
+        Args:
+            messages_offset: 用戶消息起始位置
+            messages_limit: 用戶消息每頁數量（上限 MAX_DETAIL_PAGE_SIZE）
+            logs_offset: 命令日誌起始位置
+            logs_limit: 命令日誌每頁數量（上限 MAX_DETAIL_PAGE_SIZE）
+        """
+        detail = self.get_summary_info()
+        detail["user_messages"] = _slice_page(
+            self.user_messages, messages_offset, messages_limit
+        )
+        detail["command_logs"] = _slice_page(self.command_logs, logs_offset, logs_limit)
+        return detail
+
     def can_proceed(self) -> bool:
         """檢查是否可以進入下一步"""
         return self.status in [SessionStatus.WAITING, SessionStatus.FEEDBACK_SUBMITTED]
@@ -280,6 +530,7 @@ class WebFeedbackSession:
             SessionStatus.ERROR,
             SessionStatus.TIMEOUT,
             SessionStatus.EXPIRED,
+            SessionStatus.CANCELLED,
         ]
 
     def get_status_info(self) -> dict[str, Any]:
@@ -321,8 +572,12 @@ class WebFeedbackSession:
         if self.status == SessionStatus.EXPIRED:
             return True
 
-        # 檢查是否處於錯誤或超時狀態且超過一定時間
-        if self.status in [SessionStatus.ERROR, SessionStatus.TIMEOUT]:
+        # 檢查是否處於錯誤、超時或已取消狀態且超過一定時間
+        if self.status in [
+            SessionStatus.ERROR,
+            SessionStatus.TIMEOUT,
+            SessionStatus.CANCELLED,
+        ]:
             error_time = current_time - self.last_activity
             if error_time > 300:  # 錯誤狀態超過5分鐘視為過期
                 debug_log(
@@ -419,7 +674,8 @@ class WebFeedbackSession:
                 "is_active": self.is_active(),
                 "status": self.status.value,
                 "has_websocket": self.websocket is not None,
-                "has_process": self.process is not None,
+                "has_process": self.command_jobs.running_count() > 0,
+                "running_commands": self.command_jobs.running_count(),
                 "command_logs_count": len(self.command_logs),
                 "images_count": len(self.images),
             }
@@ -469,6 +725,7 @@ class WebFeedbackSession:
         Returns:
             dict: 回饋結果
         """
+        self._active_waits += 1
         try:
             # 使用比 MCP 超時稍短的時間（提前處理，避免邊界競爭）
             # 對於短超時（<30秒），提前1秒；對於長超時，提前5秒
@@ -495,12 +752,12 @@ class WebFeedbackSession:
                     raise TimeoutError("會話已因用戶設定的超時而關閉")
 
                 debug_log(f"會話 {self.session_id} 收到用戶回饋")
-                return {
-                    "logs": "\n".join(self.command_logs),
-                    "interactive_feedback": self.feedback_result or "",
-                    "images": self.images,
-                    "settings": self.settings,
-                }
+                return await self.collect_feedback_result()
+            if self._active_waits > 1:
+                # 重試的呼叫已重新連接並仍在等待，會話交由它繼續使用
+                debug_log(f"會話 {self.session_id} 的舊呼叫超時，保留會話給重試的呼叫")
+                raise TimeoutError(f"等待用戶回饋超時（{actual_timeout}秒）")
+
             # 超時了，立即清理資源
             debug_log(
                 f"會話 {self.session_id} 在 {actual_timeout} 秒後超時，開始清理資源..."
@@ -510,11 +767,120 @@ class WebFeedbackSession:
                 f"等待用戶回饋超時（{actual_timeout}秒），介面已自動關閉"
             )
 
+        except asyncio.CancelledError:
+            # MCP 客戶端取消了請求：沒有其他呼叫在等待時立即釋放資源，
+            # 然後繼續向上傳遞取消
+            if self._active_waits == 1:
+                self.cancel_wait()
+            raise
+        except TimeoutError:
+            raise
         except Exception as e:
             # 任何異常都要確保清理資源
             debug_log(f"會話 {self.session_id} 發生異常: {e}")
             await self._cleanup_resources_on_timeout()
             raise
+        finally:
+            self._active_waits -= 1
+
+    async def collect_feedback_result(self) -> dict[str, Any]:
+        """組出回傳給 MCP 的回饋結果"""
+        return {
+            "session_id": self.session_id,
+            "command_logs": await asyncio.to_thread(self.get_result_logs),
+            "interactive_feedback": self.feedback_result or "",
+            "images": self.images,
+            "settings": self.settings,
+        }
+
+    def cancel_wait(self, message: str = "MCP 客戶端已取消請求") -> None:
+        """
+        取消等待中的回饋請求並立即釋放資源
+
+        在已被取消的協程中執行，期間不能再 await（anyio 取消範圍會再次拋出
+        CancelledError），因此清理以同步方式完成，分頁通知則另建任務發送。
+        設置完成事件會讓執行器線程中的等待立即返回。
+
+        只取消計時器並釋放執行器線程中的等待；用戶消息、命令日誌、執行中的
+        命令與重放緩衝區都保留到會話真正被清理為止，讓帶相同冪等鍵的重試呼叫
+        重新連接後（見 reattach）仍能取得用戶已產生的所有內容。
+        已收到回饋的會話不受影響。
+        """
+        if self.is_terminal() or self.feedback_completed.is_set():
+            return
+
+        debug_log(f"會話 {self.session_id} 的回饋請求已被取消，釋放等待與計時器")
+        if self.cleanup_timer:
+            self.cleanup_timer.cancel()
+            self.cleanup_timer = None
+        if self.user_timeout_timer:
+            self.user_timeout_timer.cancel()
+            self.user_timeout_timer = None
+        self.feedback_completed.set()
+        self.status = SessionStatus.CANCELLED
+        self.status_message = message
+        self.last_activity = time.time()
+        self._emit_status_changed()
+
+        self._send_in_background(
+            {
+                "type": "notification",
+                "code": self.get_message_code("CANCELLED_CLEANUP"),
+                "severity": "warning",
+                "reason": CleanupReason.CANCELLED.value,
+            }
+        )
+
+    def can_reattach(self) -> bool:
+        """檢查重試的呼叫是否可以重新連接到此會話（仍在等待回饋或剛被取消）"""
+        if self._cleanup_done:
+            return False
+        if self.status == SessionStatus.CANCELLED:
+            return True
+        return self.is_awaiting_feedback()
+
+    def is_awaiting_feedback(self) -> bool:
+        """檢查會話是否仍在等待回饋（可以提交回饋）"""
+        return (
+            not self._cleanup_done
+            and self.status in [SessionStatus.WAITING, SessionStatus.ACTIVE]
+            and not self.feedback_completed.is_set()
+        )
+
+    def reattach(self) -> None:
+        """重試的呼叫重新連接到此會話，已取消的會話恢復為等待狀態"""
+        self.last_activity = time.time()
+        if self.status != SessionStatus.CANCELLED:
+            debug_log(f"重試的呼叫重新連接到等待中的會話 {self.session_id}")
+            return
+
+        debug_log(f"重試的呼叫重新連接到已取消的會話 {self.session_id}")
+        self.feedback_completed.clear()
+        self.status = SessionStatus.WAITING
+        self.status_message = "會話已重新連接"
+        self._schedule_auto_cleanup()
+        if self.user_timeout_enabled:
+            self.update_timeout_settings(True, self.user_timeout_seconds)
+        self._emit_status_changed()
+
+        self._send_in_background(
+            {
+                "type": "session_reattached",
+                "session_id": self.session_id,
+                "code": self.get_message_code("SESSION_REATTACHED"),
+            }
+        )
+
+    def _send_in_background(self, message: dict[str, Any]) -> None:
+        """在運行中的事件循環上另建任務發送訊息給分頁（供同步流程使用）"""
+        if not self.websocket:
+            return
+        try:
+            self._notice_task = asyncio.get_running_loop().create_task(
+                self.send_message(message)
+            )
+        except RuntimeError:
+            debug_log(f"沒有運行中的事件循環，略過發送 {message.get('type')} 訊息")
 
     async def submit_feedback(
         self,
@@ -539,11 +905,12 @@ class WebFeedbackSession:
         self.next_step("已送出反饋，等待下次 MCP 調用")
 
         self.feedback_completed.set()
+        self.persist()
 
         # 發送反饋已收到的消息給前端
         if self.websocket:
             try:
-                await self.websocket.send_json(
+                await self.send_message(
                     {
                         "type": "notification",
                         "code": self.get_message_code("FEEDBACK_SUBMITTED"),
@@ -590,6 +957,13 @@ class WebFeedbackSession:
         debug_log(
             f"會話 {self.session_id} 添加用戶消息，總數: {len(self.user_messages)}"
         )
+        self._emit_event(
+            {
+                "type": "user_message_added",
+                "session_id": self.session_id,
+                "message": user_message,
+            }
+        )
 
     def _process_images(self, images: list[dict]) -> list[dict]:
         """
@@ -650,23 +1024,33 @@ class WebFeedbackSession:
 
         return processed_images
 
+    def get_result_logs(self) -> str:
+        """
+        組出回傳給 MCP 的命令日誌
+
+        經過壓縮（合併重複行、保留開頭結尾與錯誤行、限制預算），
+        避免冗長的建置輸出讓回傳結果無限增長；
+        完整日誌仍可透過 /api/sessions/{session_id} 分頁讀取。
+        """
+        return compact_log_lines(self.command_logs)
+
     def add_log(self, log_entry: str):
         """添加命令日誌"""
         self.command_logs.append(log_entry)
+        if self.session_store is not None:
+            self.session_store.append_log(self.session_id, log_entry)
 
     async def run_command(self, command: str):
-        """執行命令並透過 WebSocket 發送輸出（安全版本）"""
-        if self.process:
-            # 終止現有進程
-            try:
-                self.process.terminate()
-                self.process.wait(timeout=5)
-            except:
-                try:
-                    self.process.kill()
-                except:
-                    pass
-            self.process = None
+        """執行命令並透過 WebSocket 發送輸出（安全版本），可與其他命令同時執行"""
+        if not self.command_jobs.has_capacity():
+            await self.send_message(
+                {
+                    "type": "command_error",
+                    "error": f"同時執行的命令已達上限 ({self.command_jobs.max_jobs})，"
+                    "請等待或取消其他命令",
+                }
+            )
+            return
 
         try:
             debug_log(f"執行命令: {command}")
@@ -677,14 +1061,11 @@ class WebFeedbackSession:
             except ValueError as e:
                 error_msg = f"命令安全檢查失敗: {e}"
                 debug_log(error_msg)
-                if self.websocket:
-                    await self.websocket.send_json(
-                        {"type": "command_error", "error": error_msg}
-                    )
+                await self.send_message({"type": "command_error", "error": error_msg})
                 return
 
             # 使用安全的方式執行命令（不使用 shell=True）
-            self.process = subprocess.Popen(
+            process = subprocess.Popen(
                 parsed_command,
                 shell=False,  # 安全：不使用 shell
                 cwd=self.project_directory,
@@ -695,69 +1076,38 @@ class WebFeedbackSession:
                 universal_newlines=True,
             )
 
-            # 註冊進程到資源管理器
+            # 註冊進程到資源管理器（只登記 PID：子進程由命令工作回收，
+            # 資源管理器不對 Popen 輪詢或 wait）
             register_process(
-                self.process,
+                process.pid,
                 description=f"WebFeedbackSession-{self.session_id}-command",
                 auto_cleanup=True,
             )
-
-            # 在背景線程中讀取輸出
-            async def read_output():
-                loop = asyncio.get_event_loop()
-                try:
-                    # 使用線程池執行器來處理阻塞的讀取操作
-                    def read_line():
-                        if self.process and self.process.stdout:
-                            return self.process.stdout.readline()
-                        return ""
-
-                    while True:
-                        line = await loop.run_in_executor(None, read_line)
-                        if not line:
-                            break
-
-                        self.add_log(line.rstrip())
-                        if self.websocket:
-                            try:
-                                await self.websocket.send_json(
-                                    {"type": "command_output", "output": line}
-                                )
-                            except Exception as e:
-                                debug_log(f"WebSocket 發送失敗: {e}")
-                                break
-
-                except Exception as e:
-                    debug_log(f"讀取命令輸出錯誤: {e}")
-                finally:
-                    # 等待進程完成
-                    if self.process:
-                        exit_code = self.process.wait()
-
-                        # 從資源管理器取消註冊進程
-                        self.resource_manager.unregister_process(self.process.pid)
-
-                        # 發送命令完成信號
-                        if self.websocket:
-                            try:
-                                await self.websocket.send_json(
-                                    {"type": "command_complete", "exit_code": exit_code}
-                                )
-                            except Exception as e:
-                                debug_log(f"發送完成信號失敗: {e}")
-
-            # 啟動異步任務讀取輸出
-            asyncio.create_task(read_output())
+            job = self.command_jobs.start(
+                process, self.command_runs.start(command), command
+            )
+            await self.send_message(
+                {
+                    "type": "command_started",
+                    "command_id": job.job_id,
+                    "command": command,
+                    "pid": process.pid,
+                }
+            )
 
         except Exception as e:
             debug_log(f"執行命令錯誤: {e}")
-            if self.websocket:
-                try:
-                    await self.websocket.send_json(
-                        {"type": "command_error", "error": str(e)}
-                    )
-                except:
-                    pass
+            await self.send_message({"type": "command_error", "error": str(e)})
+
+    def cancel_command(self, command_id: str) -> bool:
+        """取消指定的命令工作"""
+        return self.command_jobs.cancel(command_id)
+
+    def _on_command_exit(self, job: CommandJob) -> None:
+        """命令工作結束時記錄資源用量並取消註冊進程（於讀取線程調用）"""
+        if job.usage is not None:
+            self.resource_manager.record_command_usage(job.command, job.usage)
+        self.resource_manager.unregister_process(job.process.pid)
 
     async def _cleanup_resources_on_timeout(self):
         """超時時清理所有資源（保持向後兼容）"""
@@ -814,11 +1164,12 @@ class WebFeedbackSession:
                         CleanupReason.MANUAL: "MANUAL_CLEANUP",
                         CleanupReason.ERROR: "ERROR_CLEANUP",
                         CleanupReason.SHUTDOWN: "SHUTDOWN_CLEANUP",
+                        CleanupReason.CANCELLED: "CANCELLED_CLEANUP",
                     }
 
                     code_key = code_key_map.get(reason, "SESSION_CLEANUP")
 
-                    await self.websocket.send_json(
+                    await self.send_message(
                         {
                             "type": "notification",
                             "code": self.get_message_code(code_key),
@@ -838,20 +1189,13 @@ class WebFeedbackSession:
                     self.websocket = None
 
             # 3. 終止正在運行的命令進程
-            if self.process:
-                try:
-                    self.process.terminate()
-                    try:
-                        self.process.wait(timeout=3)
-                        debug_log(f"會話 {self.session_id} 命令進程已正常終止")
-                    except subprocess.TimeoutExpired:
-                        self.process.kill()
-                        debug_log(f"會話 {self.session_id} 命令進程已強制終止")
-                    resources_cleaned += 1
-                except Exception as e:
-                    debug_log(f"終止命令進程時發生錯誤: {e}")
-                finally:
-                    self.process = None
+            try:
+                terminated = await asyncio.to_thread(self.command_jobs.terminate_all)
+                if terminated:
+                    debug_log(f"會話 {self.session_id} 已終止 {terminated} 個命令進程")
+                    resources_cleaned += terminated
+            except Exception as e:
+                debug_log(f"終止命令進程時發生錯誤: {e}")
 
             # 4. 設置完成事件（防止其他地方還在等待）
             self.feedback_completed.set()
@@ -861,8 +1205,11 @@ class WebFeedbackSession:
             images_count = len(self.images)
 
             self.command_logs.clear()
+            self.user_messages.clear()
+            self.command_runs.clear()
             self.images.clear()
             self.settings.clear()
+            self.replay_buffer.clear()
 
             if logs_count > 0 or images_count > 0:
                 resources_cleaned += logs_count + images_count
@@ -875,6 +1222,8 @@ class WebFeedbackSession:
                 self.status = SessionStatus.TIMEOUT
             elif reason == CleanupReason.ERROR:
                 self.status = SessionStatus.ERROR
+            elif reason == CleanupReason.CANCELLED:
+                self.status = SessionStatus.CANCELLED
             else:
                 self.status = SessionStatus.COMPLETED
 
@@ -966,34 +1315,32 @@ class WebFeedbackSession:
             except:
                 pass
 
-            # 1. 取消自動清理定時器
+            # 1. 取消自動清理定時器與用戶超時計時器
             if self.cleanup_timer:
                 self.cleanup_timer.cancel()
                 self.cleanup_timer = None
                 resources_cleaned += 1
+            if self.user_timeout_timer:
+                self.user_timeout_timer.cancel()
+                self.user_timeout_timer = None
+                resources_cleaned += 1
 
             # 2. 清理進程
-            if self.process:
-                try:
-                    self.process.terminate()
-                    self.process.wait(timeout=5)
-                    debug_log(f"會話 {self.session_id} 命令進程已正常終止")
-                    resources_cleaned += 1
-                except:
-                    try:
-                        self.process.kill()
-                        debug_log(f"會話 {self.session_id} 命令進程已強制終止")
-                        resources_cleaned += 1
-                    except:
-                        pass
-                self.process = None
+            terminated = self.command_jobs.terminate_all()
+            if terminated:
+                debug_log(f"會話 {self.session_id} 已終止 {terminated} 個命令進程")
+                resources_cleaned += terminated
 
             # 3. 清理臨時數據
             logs_count = len(self.command_logs)
             images_count = len(self.images)
 
             self.command_logs.clear()
+            self.replay_buffer.clear()
             if not preserve_websocket:
+                # 會話即將移除，一併刪除用戶消息的溢出檔案與命令日誌檔案
+                self.user_messages.clear()
+                self.command_runs.clear()
                 self.images.clear()
                 self.settings.clear()
                 resources_cleaned += images_count
@@ -1012,6 +1359,8 @@ class WebFeedbackSession:
                     self.status = SessionStatus.TIMEOUT
                 elif reason == CleanupReason.ERROR:
                     self.status = SessionStatus.ERROR
+                elif reason == CleanupReason.CANCELLED:
+                    self.status = SessionStatus.CANCELLED
                 else:
                     self.status = SessionStatus.COMPLETED
 
@@ -6,17 +6,30 @@
 設置 Web UI 的主要路由和處理邏輯。
 """
 
-import json
+import asyncio
 import time
+from collections.abc import Awaitable, Callable
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from fastapi import Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 
 from ... import __version__
 from ...debug import web_debug_log as debug_log
 from ..constants import get_message_code as get_msg_code
+from ..models.feedback_session import (
+    DEFAULT_LOGS_PAGE_SIZE,
+    MAX_DETAIL_PAGE_SIZE,
+    build_stored_detail_info,
+)
+from ..utils import event_stream, json_codec, wire_format
+from ..utils.answer_queue import AnswerQueueFullError, summarize_entry
+from ..utils.api_auth import extract_api_token, get_api_token, is_api_token_valid
+from ..utils.command_log import read_command_log
+from ..utils.history_store import get_history_store
+from ..utils.json_codec import FastJSONResponse as JSONResponse
+from ..utils.session_store import summarize_snapshot
 
 
 if TYPE_CHECKING:
@@ -31,20 +44,22 @@ def load_user_layout_settings() -> str:
         settings_file = config_dir / "ui_settings.json"
 
         if settings_file.exists():
-            with open(settings_file, encoding="utf-8") as f:
-                settings = json.load(f)
-                layout_mode = settings.get("layoutMode", "combined-vertical")
-                debug_log(f"從設定檔案載入佈局模式: {layout_mode}")
-                # 修復 no-any-return 錯誤 - 確保返回 str 類型
-                return str(layout_mode)
-        else:
-            debug_log("設定檔案不存在，使用預設佈局模式: combined-vertical")
-            return "combined-vertical"
+            settings = json_codec.load_file(settings_file)
+            layout_mode = settings.get("layoutMode", "combined-vertical")
+            debug_log(f"從設定檔案載入佈局模式: {layout_mode}")
+            # 修復 no-any-return 錯誤 - 確保返回 str 類型
+            return str(layout_mode)
+        debug_log("設定檔案不存在，使用預設佈局模式: combined-vertical")
+        return "combined-vertical"
     except Exception as e:
         debug_log(f"載入佈局設定失敗: {e}，使用預設佈局模式: combined-vertical")
         return "combined-vertical"
 
 
+# 長輪詢 /api/pending-sessions 的最長等待秒數
+MAX_LONG_POLL_SECONDS = 60
+
+
 # 使用統一的訊息代碼系統
 # 從 ..constants 導入的 get_msg_code 函數會處理所有訊息代碼
 # 舊的 key 會自動映射到新的常量
@@ -103,10 +118,9 @@ def setup_routes(manager: "WebUIManager"):
 
             try:
                 if translation_file.exists():
-                    with open(translation_file, encoding="utf-8") as f:
-                        lang_data = json.load(f)
-                        translations[lang_code] = lang_data
-                        debug_log(f"成功載入 Web 翻譯: {lang_code}")
+                    lang_data = json_codec.load_file(translation_file)
+                    translations[lang_code] = lang_data
+                    debug_log(f"成功載入 Web 翻譯: {lang_code}")
                 else:
                     debug_log(f"Web 翻譯檔案不存在: {translation_file}")
                     translations[lang_code] = {}
@@ -172,40 +186,143 @@ def setup_routes(manager: "WebUIManager"):
                 "project_directory": current_session.project_directory,
                 "summary": current_session.summary,
                 "feedback_completed": current_session.feedback_completed.is_set(),
-                "command_logs": current_session.command_logs,
+                # 只返回最新一頁日誌，完整日誌透過 /api/sessions/{id} 分頁讀取
+                "command_logs": current_session.command_logs.tail(
+                    DEFAULT_LOGS_PAGE_SIZE
+                ),
+                "command_logs_total": len(current_session.command_logs),
                 "images_count": len(current_session.images),
             }
         )
 
     @manager.app.get("/api/all-sessions")
     async def get_all_sessions(request: Request):
-        """獲取所有會話的實時狀態"""
+        """
+        獲取所有會話的實時狀態
+
+        查詢參數：
+            limit: 每頁數量（游標分頁）
+            cursor: 上一頁返回的 next_cursor
+            fields: 以逗號分隔的欄位投影，例如 fields=session_id,status
+            since: 只返回此版本之後變更過的會話（含 removed 列表）
+
+        啟用持久化存儲時，記憶體中的會話列完後接著列出已移出記憶體或
+        伺服器重啟前的會話（restored 為 true，唯讀）；增量回應中其他節點
+        變更過的會話同樣從持久化存儲讀取。
+        回應帶有 ETag，If-None-Match 與當前版本相符時直接返回 304。
+        """
+
+        registry = manager.sessions
+        etag = registry.etag
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
 
         try:
-            sessions_data = []
+            params = request.query_params
+            try:
+                fields = parse_session_fields(params.get("fields"))
+                limit = parse_positive_int(params.get("limit"))
+                since = params.get("since")
+                since_version = int(since) if since else None
+                cursor = params.get("cursor")
+                # 預先驗證游標，讓格式錯誤返回 400 而非 500
+                if cursor and cursor.startswith(STORED_CURSOR_PREFIX):
+                    stored_offset: int | None = int(
+                        cursor.removeprefix(STORED_CURSOR_PREFIX)
+                    )
+                    page_ids, next_cursor = [], None
+                else:
+                    stored_offset = None
+                    page_ids, next_cursor = registry.page(cursor, limit)
+            except ValueError as e:
+                return JSONResponse(
+                    status_code=400,
+                    content={
+                        "error": f"Invalid query parameter: {e!s}",
+                        "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                    },
+                )
 
-            # 獲取所有會話的實時狀態
-            for session_id, session in manager.sessions.items():
-                session_info = {
-                    "session_id": session.session_id,
-                    "project_directory": session.project_directory,
-                    "summary": session.summary,
-                    "status": session.status.value,
-                    "status_message": session.status_message,
-                    "created_at": int(session.created_at * 1000),  # 轉換為毫秒
-                    "last_activity": int(session.last_activity * 1000),
-                    "feedback_completed": session.feedback_completed.is_set(),
-                    "has_websocket": session.websocket is not None,
-                    "is_current": session == manager.current_session,
-                    "user_messages": session.user_messages,  # 包含用戶消息記錄
-                }
-                sessions_data.append(session_info)
+            version = registry.version
+            changes = (
+                registry.changes_since(since_version)
+                if since_version is not None
+                else None
+            )
 
-            # 按創建時間排序（最新的在前）
-            sessions_data.sort(key=lambda x: x["created_at"], reverse=True)
+            if changes is not None:
+                changed_ids, removed_ids = changes
+                changed = set(changed_ids)
+                sessions_data = [
+                    build_session_list_item(manager, registry[session_id], fields)
+                    for session_id in registry.ordered_ids()
+                    if session_id in changed and session_id in registry
+                ]
+                remote_ids = [
+                    session_id
+                    for session_id in changed_ids
+                    if session_id not in registry
+                ]
+                if remote_ids:
+                    snapshots = await asyncio.to_thread(
+                        lambda: [
+                            manager.load_stored_session(session_id)
+                            for session_id in remote_ids
+                        ]
+                    )
+                    sessions_data.extend(
+                        build_stored_list_item(snapshot, fields)
+                        for snapshot in snapshots
+                        if snapshot is not None
+                    )
+                content: dict[str, Any] = {
+                    "sessions": sessions_data,
+                    "removed": removed_ids,
+                    "version": version,
+                    "delta": True,
+                }
+                debug_log(
+                    f"返回版本 {since_version} 之後的 {len(sessions_data)} 個變更會話"
+                )
+            else:
+                sessions_data = [
+                    build_session_list_item(manager, registry[session_id], fields)
+                    for session_id in page_ids
+                    if session_id in registry
+                ]
+                if next_cursor is None:
+                    # 記憶體中的會話已列完，以剩餘名額列出持久化存儲中的會話
+                    if stored_offset is None:
+                        stored_offset = 0
+                    remaining = None if limit is None else limit - len(sessions_data)
+                    # 存儲讀取（SQLite/Redis）在線程中進行，不阻塞事件循環
+                    stored, stored_next = await asyncio.to_thread(
+                        manager.list_stored_sessions,
+                        stored_offset,
+                        # 名額已滿時只讀一筆，判斷是否還有下一頁
+                        remaining if remaining != 0 else 1,
+                        # 未請求用戶消息時只讀取摘要
+                        summary=fields is None or "user_messages" not in fields,
+                    )
+                    if remaining == 0:
+                        stored_next = stored_offset if stored else None
+                    else:
+                        sessions_data.extend(
+                            build_stored_list_item(snapshot, fields)
+                            for snapshot in stored
+                        )
+                    if stored_next is not None:
+                        next_cursor = f"{STORED_CURSOR_PREFIX}{stored_next}"
+                content = {
+                    "sessions": sessions_data,
+                    "version": version,
+                    "total": len(registry),
+                    "next_cursor": next_cursor,
+                    "delta": False,
+                }
+                debug_log(f"返回 {len(sessions_data)} 個會話的實時狀態")
 
-            debug_log(f"返回 {len(sessions_data)} 個會話的實時狀態")
-            return JSONResponse(content={"sessions": sessions_data})
+            return JSONResponse(content=content, headers={"ETag": etag})
 
         except Exception as e:
             debug_log(f"獲取所有會話狀態失敗: {e}")
@@ -217,12 +334,336 @@ def setup_routes(manager: "WebUIManager"):
                 },
             )
 
+    @manager.app.get("/api/sessions/{session_id}")
+    async def get_session_detail(session_id: str, request: Request):
+        """
+        獲取單一會話詳情
+
+        查詢參數 messages_offset、messages_limit、logs_offset、logs_limit
+        分別控制用戶消息與命令日誌的分頁。
+        """
+
+        params = request.query_params
+        try:
+            page_args = {
+                name: int(params[name])
+                for name in (
+                    "messages_offset",
+                    "messages_limit",
+                    "logs_offset",
+                    "logs_limit",
+                )
+                if params.get(name)
+            }
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": f"Invalid query parameter: {e!s}",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+
+        session = manager.sessions.get(session_id)
+        if session is None:
+            # 不在記憶體中的會話從持久化存儲延遲恢復（唯讀快照）
+            # 存儲讀取可能等待批次提交，在線程中進行以免阻塞事件循環
+            snapshot = await asyncio.to_thread(manager.load_stored_session, session_id)
+            if snapshot is None:
+                return JSONResponse(
+                    status_code=404,
+                    content={
+                        "error": "Session not found",
+                        "messageCode": get_msg_code("SESSION_NOT_FOUND"),
+                    },
+                )
+            detail = await asyncio.to_thread(
+                build_stored_detail_info, manager.session_store, snapshot, **page_args
+            )
+            detail["has_websocket"] = False
+            detail["is_current"] = False
+            detail["restored"] = True
+            return JSONResponse(content=detail)
+
+        detail = session.get_detail_info(**page_args)
+        detail["has_websocket"] = session.websocket is not None
+        detail["is_current"] = session == manager.current_session
+        return JSONResponse(content=detail)
+
+    @manager.app.get("/api/sessions/{session_id}/commands")
+    async def list_session_commands(session_id: str):
+        """列出會話中執行過的命令與其日誌摘要"""
+
+        session = manager.sessions.get(session_id)
+        if session is None:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "Session not found",
+                    "messageCode": get_msg_code("SESSION_NOT_FOUND"),
+                },
+            )
+        commands = session.command_runs.list_info()
+        for info in commands:
+            job = session.command_jobs.get(info["command_id"])
+            if job is not None:
+                info["status"] = job.status.value
+        return JSONResponse(content={"commands": commands})
+
+    @manager.app.post("/api/sessions/{session_id}/commands/{command_id}/cancel")
+    async def cancel_command(session_id: str, command_id: str):
+        """取消正在執行的命令"""
+
+        session = manager.sessions.get(session_id)
+        job = session.command_jobs.get(command_id) if session else None
+        if job is None:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "Command not found",
+                    "messageCode": get_msg_code("SESSION_NOT_FOUND"),
+                },
+            )
+
+        cancelled = await asyncio.to_thread(session.cancel_command, command_id)
+        return JSONResponse(
+            content={
+                "cancelled": cancelled,
+                "command_id": command_id,
+                "status": job.status.value,
+            }
+        )
+
+    @manager.app.get("/api/sessions/{session_id}/commands/{command_id}/log")
+    async def get_command_log(session_id: str, command_id: str, request: Request):
+        """
+        分頁讀取命令輸出
+
+        查詢參數：tail=N 讀取最後 N 行；offset、limit 讀取範圍；
+        q、regex、ignore_case、start 搜尋。
+        """
+
+        session = manager.sessions.get(session_id)
+        log = session.command_runs.get(command_id) if session else None
+        if log is None:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "Command log not found",
+                    "messageCode": get_msg_code("SESSION_NOT_FOUND"),
+                },
+            )
+
+        try:
+            result = await asyncio.to_thread(
+                read_command_log, log, dict(request.query_params)
+            )
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": f"Invalid query parameter: {e!s}",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+        return JSONResponse(content=result)
+
+    @manager.app.get("/api/answer-queue")
+    async def list_answer_queue(request: Request, project_directory: str | None = None):
+        """列出預先排隊的回饋（可依專案目錄篩選，需要 API 權杖）"""
+        auth_error = api_auth_error(request)
+        if auth_error is not None:
+            return auth_error
+        return JSONResponse(
+            content={"answers": manager.answer_queue.list_entries(project_directory)}
+        )
+
+    @manager.app.post("/api/answer-queue")
+    async def enqueue_answer(request: Request):
+        """
+        預先排入下一次 interactive_feedback 呼叫的回饋
+
+        請求格式: {"project_directory", "feedback", "images"?, "settings"?}，
+        未指定專案目錄時使用目前會話的專案目錄。需要 API 權杖；
+        Web UI 經由 WebSocket 的 queue_feedback 訊息排隊。
+        """
+        auth_error = api_auth_error(request)
+        if auth_error is not None:
+            return auth_error
+        try:
+            data = json_codec.loads(await request.body())
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": "Invalid request body",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+
+        project_directory = data.get("project_directory")
+        current_session = manager.get_current_session()
+        if not project_directory and current_session:
+            project_directory = current_session.project_directory
+        if not project_directory:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": "project_directory is required",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+
+        try:
+            entry = manager.answer_queue.enqueue(
+                project_directory,
+                str(data.get("feedback", "")),
+                data.get("images") or [],
+                data.get("settings") or {},
+            )
+        except AnswerQueueFullError as e:
+            return JSONResponse(
+                status_code=409,
+                content={
+                    "error": str(e),
+                    "messageCode": get_msg_code("ERROR_OPERATION_FAILED"),
+                },
+            )
+        return JSONResponse(
+            content={
+                "answer": summarize_entry(entry),
+                "queued": manager.answer_queue.count(project_directory),
+            }
+        )
+
+    @manager.app.delete("/api/answer-queue/{answer_id}")
+    async def remove_queued_answer(answer_id: str, request: Request):
+        """移除預先排隊的回饋（需要 API 權杖）"""
+        auth_error = api_auth_error(request)
+        if auth_error is not None:
+            return auth_error
+        if not manager.answer_queue.remove(answer_id):
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "Queued answer not found",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+        return JSONResponse(content={"removed": answer_id})
+
+    @manager.app.get("/api/pending-sessions")
+    async def list_pending_sessions(request: Request):
+        """
+        列出等待回饋的會話（需要 API 權杖）
+
+        查詢參數：
+            since: 上次回應的 version；註冊表沒有更新的變更時等待
+            wait: 長輪詢最長等待秒數（預設 30，上限 60），需搭配 since
+        """
+        auth_error = api_auth_error(request)
+        if auth_error is not None:
+            return auth_error
+
+        params = request.query_params
+        try:
+            since = params.get("since")
+            since_version = int(since) if since else None
+            wait = min(
+                parse_positive_int(params.get("wait")) or 30, MAX_LONG_POLL_SECONDS
+            )
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": f"Invalid query parameter: {e!s}",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+
+        if since_version is not None:
+            await manager.sessions.wait_for_change(since_version, wait)
+
+        version = manager.sessions.version
+        pending = [
+            build_session_list_item(manager, manager.sessions[session_id])
+            for session_id in manager.sessions.ordered_ids()
+            if session_id in manager.sessions
+            and manager.sessions[session_id].is_awaiting_feedback()
+        ]
+        return JSONResponse(content={"sessions": pending, "version": version})
+
+    @manager.app.post("/api/sessions/{session_id}/feedback")
+    async def submit_session_feedback(session_id: str, request: Request):
+        """
+        為等待中的會話提交回饋（需要 API 權杖）
+
+        請求格式與 WebSocket submit_feedback 相同：
+        {"feedback", "images"?: [{"name", "data"(base64), "size"}], "settings"?}
+        """
+        auth_error = api_auth_error(request)
+        if auth_error is not None:
+            return auth_error
+
+        try:
+            data = json_codec.loads(await request.body())
+        except ValueError:
+            data = None
+        if (
+            not isinstance(data, dict)
+            or not isinstance(data.get("feedback", ""), str)
+            or not isinstance(data.get("images") or [], list)
+            or not isinstance(data.get("settings") or {}, dict)
+        ):
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": "Invalid request body",
+                    "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                },
+            )
+
+        session = manager.sessions.get(session_id)
+        if session is None:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "Session not found",
+                    "messageCode": get_msg_code("SESSION_NOT_FOUND"),
+                },
+            )
+        if not session.is_awaiting_feedback():
+            return JSONResponse(
+                status_code=409,
+                content={
+                    "error": "Session is not waiting for feedback",
+                    "status": session.status.value,
+                    "messageCode": get_msg_code("ERROR_OPERATION_FAILED"),
+                },
+            )
+
+        await session.submit_feedback(
+            data.get("feedback", ""),
+            data.get("images") or [],
+            data.get("settings") or {},
+        )
+        debug_log(f"會話 {session_id} 已透過 REST API 提交回饋")
+        return JSONResponse(
+            content={
+                "session_id": session_id,
+                "status": session.status.value,
+                "images_count": len(session.images),
+            }
+        )
+
     @manager.app.post("/api/add-user-message")
     async def add_user_message(request: Request):
         """添加用戶消息到當前會話"""
 
         try:
-            data = await request.json()
+            data = json_codec.loads(await request.body())
             current_session = manager.get_current_session()
 
             if not current_session:
@@ -256,55 +697,78 @@ def setup_routes(manager: "WebUIManager"):
             )
 
     @manager.app.websocket("/ws")
-    async def websocket_endpoint(websocket: WebSocket, lang: str = "zh-TW"):
-        """WebSocket 端點 - 重構後移除 session_id 依賴"""
+    async def websocket_endpoint(
+        websocket: WebSocket,
+        lang: str = "zh-TW",
+        session_id: str | None = None,
+        last_seq: int | None = None,
+    ):
+        """WebSocket 端點 - 重構後移除 session_id 依賴
+
+        重連的標籤頁可帶上 session_id 和 last_seq，若仍是同一會話且重放緩衝區
+        涵蓋缺少的訊息，則只補發差異訊息而不重新發送完整狀態。
+        """
         # 獲取當前活躍會話
         session = manager.get_current_session()
         if not session:
             await websocket.close(code=4004, reason="No active session")
             return
 
-        await websocket.accept()
+        negotiated_format = await wire_format.accept(websocket)
+        compression = (
+            "permessage-deflate" if wire_format.is_deflate_offered(websocket) else None
+        )
 
         # 語言由前端處理，不需要在後端設置
         debug_log(f"WebSocket 連接建立，語言由前端處理: {lang}")
+        debug_log(f"WebSocket 傳輸格式: {negotiated_format}，壓縮: {compression}")
 
         # 檢查會話是否已有 WebSocket 連接
         if session.websocket and session.websocket != websocket:
             debug_log("會話已有 WebSocket 連接，替換為新連接")
 
         session.websocket = websocket
+        manager.sessions.touch(session.session_id)
         debug_log(f"WebSocket 連接建立: 當前活躍會話 {session.session_id}")
 
+        # 判斷是否可以從最後確認的序號續傳
+        replay_messages = None
+        if session_id == session.session_id and last_seq is not None:
+            replay_messages = session.replay_buffer.get_since(last_seq)
+            if replay_messages is None:
+                debug_log(f"序號 {last_seq} 超出重放緩衝區範圍，改為完整同步")
+
         # 發送連接成功消息
         try:
-            await websocket.send_json(
+            await wire_format.send_message(
+                websocket,
                 {
                     "type": "connection_established",
                     "messageCode": get_msg_code("websocket_connected"),
-                }
+                    "session_id": session.session_id,
+                    "seq": session.replay_buffer.last_seq,
+                    "resumed": replay_messages is not None,
+                    "wire_format": negotiated_format,
+                    "compression": compression,
+                },
             )
 
+            if replay_messages is not None:
+                # 續傳：只補發斷線期間錯過的訊息
+                for replay_message in replay_messages:
+                    await wire_format.send_message(websocket, replay_message)
+                debug_log(
+                    f"已從序號 {last_seq} 續傳 {len(replay_messages)} 條訊息到前端"
+                )
             # 檢查是否有待發送的會話更新
-            if getattr(manager, "_pending_session_update", False):
+            elif getattr(manager, "_pending_session_update", False):
                 debug_log("檢測到待發送的會話更新，準備發送通知")
-                await websocket.send_json(
-                    {
-                        "type": "session_updated",
-                        "action": "new_session_created",
-                        "messageCode": get_msg_code("new_session_created"),
-                        "session_info": {
-                            "project_directory": session.project_directory,
-                            "summary": session.summary,
-                            "session_id": session.session_id,
-                        },
-                    }
-                )
+                await session.send_message(build_session_updated_message(session))
                 manager._pending_session_update = False
                 debug_log("✅ 已發送會話更新通知到前端")
             else:
                 # 發送當前會話狀態
-                await websocket.send_json(
+                await session.send_message(
                     {"type": "status_update", "status_info": session.get_status_info()}
                 )
                 debug_log("已發送當前會話狀態到前端")
@@ -314,8 +778,7 @@ def setup_routes(manager: "WebUIManager"):
 
         try:
             while True:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                message = await wire_format.receive_message(websocket)
 
                 # 重新獲取當前會話，以防會話已切換
                 current_session = manager.get_current_session()
@@ -336,14 +799,75 @@ def setup_routes(manager: "WebUIManager"):
             current_session = manager.get_current_session()
             if current_session and current_session.websocket == websocket:
                 current_session.websocket = None
+                manager.sessions.touch(current_session.session_id)
                 debug_log("已清理會話中的 WebSocket 連接")
 
+    @manager.app.get("/api/events")
+    async def session_events(
+        request: Request,
+        session_id: str | None = None,
+        last_seq: int | None = None,
+    ):
+        """SSE 事件串流 - WebSocket 不可用時的回退通道
+
+        推送與 WebSocket 相同的會話和狀態事件。瀏覽器自動重連時會帶上
+        Last-Event-ID，伺服器據此從重放緩衝區續傳。
+        """
+        if not manager.get_current_session():
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "No active session",
+                    "messageCode": get_msg_code("no_active_session"),
+                },
+            )
+
+        last_event_id = request.headers.get("last-event-id")
+        if last_event_id:
+            session_id, last_seq = event_stream.parse_event_id(last_event_id)
+
+        return StreamingResponse(
+            session_event_stream(manager, request, session_id, last_seq),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
+    @manager.app.post("/api/events/message")
+    async def post_event_message(request: Request):
+        """接收 SSE 客戶端的訊息（與 WebSocket 訊息格式相同）"""
+        session = manager.get_current_session()
+        if not session:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "error": "No active session",
+                    "messageCode": get_msg_code("no_active_session"),
+                },
+            )
+
+        try:
+            message = json_codec.loads(await request.body())
+            # 回覆經由事件串流送回 SSE 客戶端
+            await handle_websocket_message(
+                manager, session, message, reply=session.send_event_stream_message
+            )
+            return JSONResponse(content={"status": "success"})
+        except Exception as e:
+            debug_log(f"處理 SSE 客戶端訊息失敗: {e}")
+            return JSONResponse(
+                status_code=400,
+                content={"status": "error", "message": f"Invalid message: {e!s}"},
+            )
+
     @manager.app.post("/api/save-settings")
     async def save_settings(request: Request):
         """保存設定到檔案"""
 
         try:
-            data = await request.json()
+            data = json_codec.loads(await request.body())
 
             # 使用統一的設定檔案路徑
             config_dir = Path.home() / ".config" / "mcp-feedback-enhanced"
@@ -351,8 +875,7 @@ def setup_routes(manager: "WebUIManager"):
             settings_file = config_dir / "ui_settings.json"
 
             # 保存設定到檔案
-            with open(settings_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            json_codec.dump_file(data, settings_file)
 
             debug_log(f"設定已保存到: {settings_file}")
 
@@ -384,8 +907,7 @@ def setup_routes(manager: "WebUIManager"):
             settings_file = config_dir / "ui_settings.json"
 
             if settings_file.exists():
-                with open(settings_file, encoding="utf-8") as f:
-                    settings = json.load(f)
+                settings = json_codec.load_file(settings_file)
 
                 debug_log(f"設定已從檔案載入: {settings_file}")
                 return JSONResponse(content=settings)
@@ -438,36 +960,37 @@ def setup_routes(manager: "WebUIManager"):
 
     @manager.app.get("/api/load-session-history")
     async def load_session_history(request: Request):
-        """從檔案載入會話歷史"""
-
-        try:
-            # 使用統一的設定檔案路徑
-            config_dir = Path.home() / ".config" / "mcp-feedback-enhanced"
-            history_file = config_dir / "session_history.json"
+        """
+        載入會話歷史
 
-            if history_file.exists():
-                with open(history_file, encoding="utf-8") as f:
-                    history_data = json.load(f)
+        查詢參數 offset、limit 可分頁讀取（按時間倒序），未指定時返回全部。
+        """
 
-                debug_log(f"會話歷史已從檔案載入: {history_file}")
-
-                # 確保資料格式相容性
-                if isinstance(history_data, dict):
-                    # 新格式：包含版本資訊和其他元資料
-                    sessions = history_data.get("sessions", [])
-                    last_cleanup = history_data.get("lastCleanup", 0)
-                else:
-                    # 舊格式：直接是會話陣列（向後相容）
-                    sessions = history_data if isinstance(history_data, list) else []
-                    last_cleanup = 0
-
-                # 回傳會話歷史資料
+        try:
+            params = request.query_params
+            try:
+                offset = int(params.get("offset") or 0)
+                limit = parse_positive_int(params.get("limit"))
+            except ValueError as e:
                 return JSONResponse(
-                    content={"sessions": sessions, "lastCleanup": last_cleanup}
+                    status_code=400,
+                    content={
+                        "error": f"Invalid query parameter: {e!s}",
+                        "messageCode": get_msg_code("ERROR_INVALID_INPUT"),
+                    },
                 )
 
-            debug_log("會話歷史檔案不存在，返回空歷史")
-            return JSONResponse(content={"sessions": [], "lastCleanup": 0})
+            store = get_history_store()
+            sessions, total = store.read_page(max(offset, 0), limit)
+            debug_log(f"會話歷史已載入: {len(sessions)}/{total} 個會話")
+
+            return JSONResponse(
+                content={
+                    "sessions": sessions,
+                    "lastCleanup": store.last_cleanup,
+                    "total": total,
+                }
+            )
 
         except Exception as e:
             debug_log(f"載入會話歷史失敗: {e}")
@@ -480,32 +1003,105 @@ def setup_routes(manager: "WebUIManager"):
                 },
             )
 
+    @manager.app.post("/api/session-history/append")
+    async def append_session_history(request: Request):
+        """
+        追加會話歷史變更
+
+        請求主體：{"sessions": [新增或變更的會話], "removed": [會話 ID], "lastCleanup": 0}
+        """
+
+        try:
+            data = json_codec.loads(await request.body())
+            sessions = backfill_user_messages(manager, data.get("sessions", []))
+
+            written = get_history_store().append(
+                sessions, data.get("removed", []), data.get("lastCleanup")
+            )
+            debug_log(f"會話歷史追加了 {written} 筆變更")
+
+            return JSONResponse(
+                content={
+                    "status": "success",
+                    "messageCode": get_msg_code("session_history_saved"),
+                    "params": {"count": len(sessions)},
+                    "written": written,
+                }
+            )
+
+        except Exception as e:
+            debug_log(f"追加會話歷史失敗: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "status": "error",
+                    "message": f"Save failed: {e!s}",
+                    "messageCode": get_msg_code("save_failed"),
+                },
+            )
+
+    @manager.app.post("/api/session-history/compact")
+    async def compact_session_history(request: Request):
+        """
+        壓縮會話歷史日誌
+
+        請求主體：{"retentionHours": 72, "maxSessions": 100}（皆為可選）
+        """
+
+        try:
+            data = json_codec.loads(await request.body() or b"{}")
+            removed = get_history_store().compact(
+                data.get("retentionHours"), data.get("maxSessions")
+            )
+            return JSONResponse(content={"status": "success", "removed": removed})
+
+        except Exception as e:
+            debug_log(f"壓縮會話歷史失敗: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "status": "error",
+                    "message": f"Compact failed: {e!s}",
+                    "messageCode": get_msg_code("save_failed"),
+                },
+            )
+
+    @manager.app.post("/api/session-history/clear")
+    async def clear_session_history(request: Request):
+        """清空會話歷史"""
+
+        try:
+            get_history_store().clear()
+            debug_log("會話歷史已清空")
+            return JSONResponse(content={"status": "success"})
+
+        except Exception as e:
+            debug_log(f"清空會話歷史失敗: {e}")
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "status": "error",
+                    "message": f"Clear failed: {e!s}",
+                    "messageCode": get_msg_code("clear_failed"),
+                },
+            )
+
     @manager.app.post("/api/save-session-history")
     async def save_session_history(request: Request):
-        """保存會話歷史到檔案"""
+        """
+        以完整列表保存會話歷史（舊版 API）
 
-        try:
-            data = await request.json()
+        新版前端改用 /api/session-history/append 只傳送變更；
+        此端點保留給舊客戶端，只會追加與現有記錄不同的部分。
+        """
 
-            # 使用統一的設定檔案路徑
-            config_dir = Path.home() / ".config" / "mcp-feedback-enhanced"
-            config_dir.mkdir(parents=True, exist_ok=True)
-            history_file = config_dir / "session_history.json"
-
-            # 建立新格式的資料結構
-            history_data = {
-                "version": "1.0",
-                "sessions": data.get("sessions", []),
-                "lastCleanup": data.get("lastCleanup", 0),
-                "savedAt": int(time.time() * 1000),  # 當前時間戳
-            }
+        try:
+            data = json_codec.loads(await request.body())
+            sessions = backfill_user_messages(manager, data.get("sessions", []))
 
-            # 保存會話歷史到檔案
-            with open(history_file, "w", encoding="utf-8") as f:
-                json.dump(history_data, f, ensure_ascii=False, indent=2)
+            get_history_store().replace(sessions, data.get("lastCleanup", 0))
 
-            debug_log(f"會話歷史已保存到: {history_file}")
-            session_count = len(history_data["sessions"])
+            session_count = len(sessions)
             debug_log(f"保存了 {session_count} 個會話記錄")
 
             return JSONResponse(
@@ -537,16 +1133,14 @@ def setup_routes(manager: "WebUIManager"):
             settings_file = config_dir / "ui_settings.json"
 
             if settings_file.exists():
-                with open(settings_file, encoding="utf-8") as f:
-                    settings_data = json.load(f)
-                    log_level = settings_data.get("logLevel", "INFO")
-                    debug_log(f"從設定檔案載入日誌等級: {log_level}")
-                    return JSONResponse(content={"logLevel": log_level})
-            else:
-                # 預設日誌等級
-                default_log_level = "INFO"
-                debug_log(f"使用預設日誌等級: {default_log_level}")
-                return JSONResponse(content={"logLevel": default_log_level})
+                settings_data = json_codec.load_file(settings_file)
+                log_level = settings_data.get("logLevel", "INFO")
+                debug_log(f"從設定檔案載入日誌等級: {log_level}")
+                return JSONResponse(content={"logLevel": log_level})
+            # 預設日誌等級
+            default_log_level = "INFO"
+            debug_log(f"使用預設日誌等級: {default_log_level}")
+            return JSONResponse(content={"logLevel": default_log_level})
 
         except Exception as e:
             debug_log(f"獲取日誌等級失敗: {e}")
@@ -563,7 +1157,7 @@ def setup_routes(manager: "WebUIManager"):
         """設定日誌等級"""
 
         try:
-            data = await request.json()
+            data = json_codec.loads(await request.body())
             log_level = data.get("logLevel")
 
             if not log_level or log_level not in ["DEBUG", "INFO", "WARN", "ERROR"]:
@@ -583,15 +1177,13 @@ def setup_routes(manager: "WebUIManager"):
             # 載入現有設定或創建新設定
             settings_data = {}
             if settings_file.exists():
-                with open(settings_file, encoding="utf-8") as f:
-                    settings_data = json.load(f)
+                settings_data = json_codec.load_file(settings_file)
 
             # 更新日誌等級
             settings_data["logLevel"] = log_level
 
             # 保存設定到檔案
-            with open(settings_file, "w", encoding="utf-8") as f:
-                json.dump(settings_data, f, ensure_ascii=False, indent=2)
+            json_codec.dump_file(settings_data, settings_file)
 
             debug_log(f"日誌等級已設定為: {log_level}")
 
@@ -615,9 +1207,281 @@ def setup_routes(manager: "WebUIManager"):
             )
 
 
-async def handle_websocket_message(manager: "WebUIManager", session, data: dict):
-    """處理 WebSocket 消息"""
+# /api/all-sessions 可投影的欄位
+SESSION_LIST_FIELDS = frozenset(
+    {
+        "session_id",
+        "project_directory",
+        "summary",
+        "status",
+        "status_message",
+        "created_at",
+        "last_activity",
+        "feedback_completed",
+        "user_message_count",
+        "user_messages",
+        "has_websocket",
+        "is_current",
+        "restored",
+    }
+)
+
+# 持久化會話分頁游標的前綴（其後為存儲中的偏移）
+STORED_CURSOR_PREFIX = "stored:"
+
+
+def api_auth_error(request: Request) -> JSONResponse | None:
+    """驗證程式化 API 權杖，失敗時返回錯誤回應"""
+    if get_api_token() is None:
+        return JSONResponse(
+            status_code=403,
+            content={
+                "error": "REST feedback API is disabled; set MCP_API_TOKEN",
+                "messageCode": get_msg_code("ERROR_UNAUTHORIZED"),
+            },
+        )
+    if not is_api_token_valid(extract_api_token(request.headers)):
+        return JSONResponse(
+            status_code=401,
+            content={
+                "error": "Missing or invalid API token",
+                "messageCode": get_msg_code("ERROR_UNAUTHORIZED"),
+            },
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return None
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """檢查 If-None-Match 是否包含指定的 ETag（弱比較）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == target
+        for candidate in if_none_match.split(",")
+    )
+
+
+def parse_session_fields(fields: str | None) -> frozenset[str] | None:
+    """
+    解析 fields= 投影參數（session_id 一律包含）
+
+    Raises:
+        ValueError: 包含未知欄位
+    """
+    if not fields:
+        return None
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - SESSION_LIST_FIELDS
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return frozenset(requested | {"session_id"})
+
+
+def parse_positive_int(value: str | None) -> int | None:
+    """
+    解析正整數查詢參數
+
+    Raises:
+        ValueError: 不是正整數
+    """
+    if value is None or value == "":
+        return None
+    number = int(value)
+    if number <= 0:
+        raise ValueError(f"expected a positive integer, got {value}")
+    return number
+
+
+def build_session_list_item(
+    manager: "WebUIManager", session, fields: frozenset[str] | None = None
+) -> dict[str, Any]:
+    """
+    建立會話列表項目，指定 fields 時只保留投影欄位
+
+    列表預設只含摘要；以 fields 請求 user_messages 時只帶最新的
+    MAX_DETAIL_PAGE_SIZE 則，起始索引為 user_messages_offset，
+    更早的消息透過 /api/sessions/{session_id} 分頁獲取。
+    """
+    session_info = session.get_summary_info()
+    session_info["has_websocket"] = session.websocket is not None
+    session_info["is_current"] = session == manager.current_session
+    if fields is None:
+        return session_info
+    if "user_messages" in fields:
+        messages = session.user_messages.tail(MAX_DETAIL_PAGE_SIZE)
+        session_info["user_messages"] = messages
+        session_info["user_messages_offset"] = len(session.user_messages) - len(
+            messages
+        )
+        fields = fields | {"user_messages_offset"}
+    return {key: value for key, value in session_info.items() if key in fields}
+
+
+def build_stored_list_item(
+    snapshot: dict[str, Any], fields: frozenset[str] | None = None
+) -> dict[str, Any]:
+    """以持久化快照建立會話列表項目（不在記憶體中，唯讀）"""
+    session_info = summarize_snapshot(snapshot)
+    session_info["has_websocket"] = False
+    session_info["is_current"] = False
+    session_info["restored"] = True
+    if fields is None:
+        return session_info
+    if "user_messages" in fields:
+        session_info["user_messages"] = snapshot.get("user_messages") or []
+        session_info["user_messages_offset"] = snapshot.get("user_messages_offset", 0)
+        fields = fields | {"user_messages_offset"}
+    return {key: value for key, value in session_info.items() if key in fields}
+
+
+def backfill_user_messages(
+    manager: "WebUIManager", sessions: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """
+    會話列表只帶摘要，前端尚未載入用戶消息的會話由伺服器端補齊
+
+    只讀取前端缺少的部分，每個會話最多補齊 MAX_DETAIL_PAGE_SIZE 則，
+    其餘由前端透過 /api/sessions/{session_id} 分頁載入。
+    """
+    for session_data in sessions:
+        live_session = manager.sessions.get(session_data.get("session_id"))
+        if live_session is None:
+            continue
+        messages = session_data.get("user_messages") or []
+        if len(messages) < len(live_session.user_messages):
+            session_data["user_messages"] = messages + (
+                live_session.user_messages.read_range(
+                    len(messages), MAX_DETAIL_PAGE_SIZE
+                )
+            )
+    return sessions
+
+
+def build_session_updated_message(session) -> dict[str, Any]:
+    """建立新會話通知訊息"""
+    return {
+        "type": "session_updated",
+        "action": "new_session_created",
+        "messageCode": get_msg_code("new_session_created"),
+        "session_info": {
+            "project_directory": session.project_directory,
+            "summary": session.summary,
+            "session_id": session.session_id,
+        },
+    }
+
+
+async def session_event_stream(
+    manager: "WebUIManager",
+    request: Request,
+    session_id: str | None = None,
+    last_seq: int | None = None,
+):
+    """產生當前會話的 SSE 事件，會話切換時自動跟隨新會話"""
+    session = manager.get_current_session()
+    if not session:
+        return
+
+    # 先訂閱再讀取緩衝區，避免兩者之間的訊息遺失；重複的訊息依序號略過
+    queue = session.replay_buffer.subscribe()
+    manager.event_stream_count += 1
+    debug_log(f"SSE 串流建立: 會話 {session.session_id}")
+
+    try:
+        replay_messages = None
+        if session_id == session.session_id and last_seq is not None:
+            replay_messages = session.replay_buffer.get_since(last_seq)
+
+        sent_seq = session.replay_buffer.last_seq
+        yield event_stream.format_retry()
+        yield event_stream.format_event(
+            {
+                "type": "connection_established",
+                "messageCode": get_msg_code("websocket_connected"),
+                "session_id": session.session_id,
+                "seq": sent_seq,
+                "resumed": replay_messages is not None,
+                "transport": "sse",
+            }
+        )
+
+        if replay_messages is not None:
+            for message in replay_messages:
+                yield event_stream.format_event(message, session.session_id)
+        else:
+            yield event_stream.format_event(
+                {"type": "status_update", "status_info": session.get_status_info()}
+            )
+
+        keepalive_interval = event_stream.get_keepalive_interval()
+        last_write = time.time()
+
+        while not await request.is_disconnected():
+            current = manager.get_current_session()
+            if current and current is not session:
+                # 會話已切換：改為訂閱新會話，並補發新會話已產生的訊息
+                session.replay_buffer.unsubscribe(queue)
+                session = current
+                queue = session.replay_buffer.subscribe()
+                pending = session.replay_buffer.get_since(0) or []
+                if not any(m["type"] == "session_updated" for m in pending):
+                    pending.append(
+                        session.replay_buffer.record(
+                            build_session_updated_message(session)
+                        )
+                    )
+                sent_seq = 0
+                for message in pending:
+                    if message["seq"] > sent_seq:
+                        sent_seq = message["seq"]
+                        yield event_stream.format_event(message, session.session_id)
+                last_write = time.time()
+                debug_log(f"SSE 串流切換到新會話: {session.session_id}")
+                continue
+
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except TimeoutError:
+                if time.time() - last_write >= keepalive_interval:
+                    yield event_stream.format_keepalive()
+                    last_write = time.time()
+                continue
+
+            seq = message.get("seq")
+            if seq is None:
+                # 請求的回覆不帶序號，也不進入重放緩衝區
+                yield event_stream.format_event(message)
+                last_write = time.time()
+            elif seq > sent_seq:
+                sent_seq = seq
+                yield event_stream.format_event(message, session.session_id)
+                last_write = time.time()
+    finally:
+        session.replay_buffer.unsubscribe(queue)
+        manager.event_stream_count -= 1
+        debug_log("SSE 串流已關閉")
+
+
+async def handle_websocket_message(
+    manager: "WebUIManager",
+    session,
+    data: dict,
+    reply: Callable[[dict[str, Any]], Awaitable[bool]] | None = None,
+):
+    """
+    處理 WebSocket 消息
+
+    Args:
+        reply: 回覆請求的方式，預設經由會話的 WebSocket；
+               SSE 客戶端的請求改經由事件串流回覆
+    """
     message_type = data.get("type")
+    if reply is None:
+        reply = session.send_message
 
     if message_type == "submit_feedback":
         # 提交回饋
@@ -626,21 +1490,68 @@ async def handle_websocket_message(manager: "WebUIManager", session, data: dict)
         settings = data.get("settings", {})
         await session.submit_feedback(feedback, images, settings)
 
+    elif message_type == "queue_feedback":
+        # 回饋已提交後預先回答下一次呼叫，排入會話專案的佇列
+        try:
+            entry = manager.answer_queue.enqueue(
+                session.project_directory,
+                data.get("feedback", ""),
+                data.get("images", []),
+                data.get("settings", {}),
+            )
+        except AnswerQueueFullError as e:
+            await reply({"type": "answer_queue_error", "error": str(e)})
+        else:
+            await reply(
+                {
+                    "type": "answer_queued",
+                    "answer_id": entry["id"],
+                    "queued": manager.answer_queue.count(session.project_directory),
+                }
+            )
+
     elif message_type == "run_command":
         # 執行命令
         command = data.get("command", "")
         if command.strip():
             await session.run_command(command)
 
+    elif message_type == "cancel_command":
+        # 取消指定的命令工作，結束通知由 command_complete 送出
+        command_id = data.get("command_id", "")
+        if not await asyncio.to_thread(session.cancel_command, command_id):
+            await reply(
+                {
+                    "type": "command_error",
+                    "error": f"沒有正在執行的命令: {command_id}",
+                    "command_id": command_id,
+                }
+            )
+
+    elif message_type == "command_log_request":
+        # 分頁讀取命令輸出（tail、範圍或搜尋），結果只回傳給請求的連接
+        log = session.command_runs.get(data.get("command_id", ""))
+        if log is None:
+            log = session.command_runs.latest()
+        response: dict[str, Any] = {
+            "type": "command_log_page",
+            "request_id": data.get("request_id"),
+        }
+        if log is None:
+            response["error"] = "Command log not found"
+        else:
+            try:
+                response.update(await asyncio.to_thread(read_command_log, log, data))
+            except ValueError as e:
+                response["error"] = str(e)
+        await reply(response)
+
     elif message_type == "get_status":
         # 獲取會話狀態
-        if session.websocket:
-            try:
-                await session.websocket.send_json(
-                    {"type": "status_update", "status_info": session.get_status_info()}
-                )
-            except Exception as e:
-                debug_log(f"發送狀態更新失敗: {e}")
+        if not await reply(
+            {"type": "status_update", "status_info": session.get_status_info()}
+        ):
+            debug_log("發送狀態更新失敗")
 
     elif message_type == "heartbeat":
         # WebSocket 心跳處理（簡化版）
@@ -651,11 +1562,12 @@ async def handle_websocket_message(manager: "WebUIManager", session, data: dict)
         # 發送心跳回應
         if session.websocket:
             try:
-                await session.websocket.send_json(
+                await wire_format.send_message(
+                    session.websocket,
                     {
                         "type": "heartbeat_response",
                         "timestamp": data.get("timestamp", 0),
-                    }
+                    },
                 )
             except Exception as e:
                 debug_log(f"發送心跳回應失敗: {e}")
@@ -15,6 +15,9 @@
     window.MCPFeedback = window.MCPFeedback || {};
     const Utils = window.MCPFeedback.Utils;
 
+    // 命令輸出區塊保留的最大字元數
+    const MAX_COMMAND_OUTPUT_CHARS = 200000;
+
     /**
      * 主應用程式建構函數
      */
@@ -53,6 +56,10 @@
         this.isInitialized = false;
         this.pendingSubmission = null;
 
+        // 正在執行的命令（command_id → 命令）與最近一次輸出的命令
+        this.runningCommands = {};
+        this.lastOutputCommandId = null;
+
         // 初始化防抖函數
         this.initDebounceHandlers();
 
@@ -665,11 +672,35 @@
         console.log('📨 處理 WebSocket 訊息:', data);
 
         switch (data.type) {
+            case 'command_started':
+                this.runningCommands[data.command_id] = data.command;
+                break;
             case 'command_output':
+                // 多個命令同時執行時，輸出來源切換才標示命令 ID
+                if (data.command_id && data.command_id !== this.lastOutputCommandId &&
+                    Object.keys(this.runningCommands).length > 1) {
+                    this.appendCommandOutput('[' + data.command_id + ']\n');
+                }
+                this.lastOutputCommandId = data.command_id;
                 this.appendCommandOutput(data.output);
                 break;
             case 'command_complete':
-                this.appendCommandOutput('\n[命令完成，退出碼: ' + data.exit_code + ']\n');
+                delete this.runningCommands[data.command_id];
+                if (this.commandOutputTrimmed && data.command_id && this.currentSessionId) {
+                    this.appendCommandOutput('\n[完整輸出共 ' + data.line_count + ' 行: /api/sessions/' +
+                        this.currentSessionId + '/commands/' + data.command_id + '/log]');
+                    this.commandOutputTrimmed = false;
+                }
+                const label = data.command_id ? data.command_id + ' ' : '';
+                const doneText = data.status === 'cancelled' ? '命令已取消' : '命令完成';
+                let usageText = '';
+                if (data.usage) {
+                    usageText = '，耗時 ' + data.usage.wall_time + 's';
+                    if (data.usage.cpu_user !== null) {
+                        usageText += '，CPU ' + (data.usage.cpu_user + data.usage.cpu_system).toFixed(2) + 's';
+                    }
+                }
+                this.appendCommandOutput('\n[' + label + doneText + '，退出碼: ' + data.exit_code + usageText + ']\n');
                 this.enableCommandInput();
                 break;
             case 'command_error':
@@ -693,16 +724,45 @@
                 }
                 this._originalHandleSessionUpdated(data);
                 break;
+            case 'session_reattached':
+                // 重試的 MCP 呼叫重新連接到目前的會話：恢復等待回饋，保留已輸入的內容
+                console.log('🔁 會話已重新連接:', data.session_id);
+                if (window.i18nManager) {
+                    window.MCPFeedback.Utils.showMessage(window.i18nManager.t('session.reattached'), window.MCPFeedback.Utils.CONSTANTS.MESSAGE_INFO);
+                }
+                this.uiManager.setFeedbackState(window.MCPFeedback.Utils.CONSTANTS.FEEDBACK_WAITING, data.session_id);
+                break;
+            case 'answer_queued':
+                this.handleAnswerQueued(data);
+                break;
+            case 'answer_queue_error':
+                window.MCPFeedback.Utils.showMessage(data.error, window.MCPFeedback.Utils.CONSTANTS.MESSAGE_WARNING);
+                break;
             case 'desktop_close_request':
                 console.log('🖥️ 收到桌面關閉請求');
                 this.handleDesktopCloseRequest(data);
                 break;
+            case 'session_added':
+            case 'session_status_changed':
+            case 'user_message_added':
+                // 會話列表增量更新
+                if (this.sessionManager && this.sessionManager.dataManager) {
+                    this.sessionManager.dataManager.applySessionEvent(data);
+                }
+                break;
             case 'notification':
                 console.log('📢 收到通知:', data);
                 // 處理 FEEDBACK_SUBMITTED 通知
                 if (data.code === 'session.feedbackSubmitted' || data.code === 'FEEDBACK_SUBMITTED' || data.code === 201) {
                     console.log('✅ 回饋提交成功通知');
                     this.handleFeedbackReceived(data);
+                } else if (data.code === 'session.cancelled') {
+                    // AI 助手取消了請求：會話不再等待回饋，鎖定提交直到下一個會話
+                    console.log('🚫 回饋請求已被取消');
+                    const cancelMessage = window.i18nManager ?
+                        window.i18nManager.t('session.cancelled') : 'AI 助手已取消此次回饋請求';
+                    window.MCPFeedback.Utils.showMessage(cancelMessage, window.MCPFeedback.Utils.CONSTANTS.MESSAGE_WARNING);
+                    this.uiManager.setFeedbackState(window.MCPFeedback.Utils.CONSTANTS.FEEDBACK_SUBMITTED, this.currentSessionId);
                 }
                 break;
         }
@@ -712,8 +772,10 @@
      * 處理 WebSocket 訊息（防抖版本）
      */
     FeedbackApp.prototype.handleWebSocketMessage = function(data) {
-        // 命令輸出相關的訊息不應該使用防抖，需要立即處理
-        if (data.type === 'command_output' || data.type === 'command_complete' || data.type === 'command_error') {
+        // 命令輸出和會話列表增量事件不應該使用防抖，需要逐一立即處理
+        if (data.type === 'command_started' || data.type === 'command_output' ||
+            data.type === 'command_complete' || data.type === 'command_error' ||
+            data.type === 'session_added' || data.type === 'session_status_changed' || data.type === 'user_message_added') {
             this._originalHandleWebSocketMessage(data);
         } else if (this._debouncedHandleWebSocketMessage) {
             // 其他訊息類型使用防抖
@@ -767,8 +829,7 @@
         // 執行提交回饋後的自動命令
         this.executeAutoCommandOnFeedbackSubmit();
 
-        // 刷新會話列表以顯示最新狀態
-        this.refreshSessionList();
+        // 會話列表由伺服器推送的 session_status_changed 事件增量更新
 
         console.log('反饋已提交，頁面保持開啟狀態');
     };
@@ -1092,6 +1153,15 @@
     FeedbackApp.prototype.submitFeedback = function() {
         console.log('📤 嘗試提交回饋...');
 
+        // 回饋已提交：改為預先回答下一次 MCP 呼叫
+        if (this.uiManager && this.uiManager.getFeedbackState() === window.MCPFeedback.Utils.CONSTANTS.FEEDBACK_SUBMITTED) {
+            const queuedData = this.collectFeedbackData();
+            if (queuedData) {
+                this.queueFeedbackAhead(queuedData);
+            }
+            return;
+        }
+
         // 檢查是否可以提交回饋
         if (!this.canSubmitFeedback()) {
             console.log('⚠️ 無法提交回饋');
@@ -1108,6 +1178,41 @@
         this.submitFeedbackInternal(feedbackData);
     };
 
+    /**
+     * 預先回答：排入佇列，下一次 MCP 呼叫到達時直接使用
+     */
+    FeedbackApp.prototype.queueFeedbackAhead = function(feedbackData) {
+        const sent = this.webSocketManager && this.webSocketManager.isReady() && this.webSocketManager.send({
+            type: 'queue_feedback',
+            feedback: feedbackData.feedback,
+            images: feedbackData.images,
+            settings: feedbackData.settings
+        });
+
+        if (!sent) {
+            const sendFailedMessage = window.i18nManager ? window.i18nManager.t('feedback.sendFailed') : '發送失敗，請重試';
+            window.MCPFeedback.Utils.showMessage(sendFailedMessage, window.MCPFeedback.Utils.CONSTANTS.MESSAGE_ERROR);
+        }
+    };
+
+    /**
+     * 處理預先回答已排入佇列
+     */
+    FeedbackApp.prototype.handleAnswerQueued = function(data) {
+        const combinedFeedbackInput = window.MCPFeedback.Utils.safeQuerySelector('#combinedFeedbackText');
+        if (combinedFeedbackInput) {
+            combinedFeedbackInput.value = '';
+        }
+        if (this.imageHandler) {
+            this.imageHandler.clearImages();
+        }
+
+        const message = window.i18nManager ?
+            window.i18nManager.t('feedback.answerQueued', { count: data.queued }) :
+            '已預先排入下一次回饋（佇列中 ' + data.queued + ' 筆）';
+        window.MCPFeedback.Utils.showMessage(message, window.MCPFeedback.Utils.CONSTANTS.MESSAGE_SUCCESS);
+    };
+
     /**
      * 檢查是否可以提交回饋
      */
@@ -1428,6 +1533,19 @@
         }
     };
 
+    /**
+     * 取消正在執行的命令（未指定時取消最近啟動的命令）
+     */
+    FeedbackApp.prototype.cancelCommand = function(commandId) {
+        const running = Object.keys(this.runningCommands);
+        const targetId = commandId || running[running.length - 1];
+        if (!targetId || !this.webSocketManager) return false;
+        return this.webSocketManager.send({
+            type: 'cancel_command',
+            command_id: targetId
+        });
+    };
+
     /**
      * 添加命令輸出
      */
@@ -1450,7 +1568,14 @@
                 commandOutput.textContent = welcomeText;
             }
             
-            commandOutput.textContent += output;
+            let text = commandOutput.textContent + output;
+            // 瀏覽器只保留最新的輸出，完整內容由伺服器的命令日誌檔案分頁提供
+            if (text.length > MAX_COMMAND_OUTPUT_CHARS) {
+                const keep = text.slice(text.length - MAX_COMMAND_OUTPUT_CHARS / 2);
+                text = '[... 較早的輸出已省略 ...]\n' + keep.slice(keep.indexOf('\n') + 1);
+                this.commandOutputTrimmed = true;
+            }
+            commandOutput.textContent = text;
             commandOutput.scrollTop = commandOutput.scrollHeight;
         }
     };
@@ -31,6 +31,11 @@
         this.currentLatency = 0;
         this.averageLatency = 0;
         this.connectionQuality = 'unknown'; // excellent, good, fair, poor, unknown
+
+        // SSE 回退：WebSocket 連續失敗達到門檻後切換
+        this.transport = null;
+        this.fallbackThreshold = options.fallbackThreshold || 3;
+        this.consecutiveFailures = 0;
         
         // UI 元素
         this.statusIcon = null;
@@ -50,6 +55,30 @@
         console.log('🔍 ConnectionMonitor 初始化完成');
     }
 
+    /**
+     * 綁定傳輸管理器（WebSocketManager），用於自動切換到 SSE
+     */
+    ConnectionMonitor.prototype.attachTransport = function(transport) {
+        this.transport = transport;
+    };
+
+    /**
+     * 記錄連線失敗，連續失敗達到門檻時切換到 SSE 回退通道
+     */
+    ConnectionMonitor.prototype.recordConnectionFailure = function() {
+        this.consecutiveFailures++;
+
+        if (!this.transport || this.transport.isEventStreamActive()) {
+            return;
+        }
+
+        if (this.consecutiveFailures >= this.fallbackThreshold) {
+            console.log('🔍 WebSocket 連續失敗 ' + this.consecutiveFailures + ' 次，切換到 SSE');
+            this.consecutiveFailures = 0;
+            this.transport.startEventStream();
+        }
+    };
+
     /**
      * 初始化 UI 元素
      */
@@ -166,13 +195,17 @@
         // 處理特殊狀態
         switch (status) {
             case 'connected':
+                this.consecutiveFailures = 0;
                 if (!this.isMonitoring) {
                     this.startMonitoring();
                 }
                 break;
             case 'disconnected':
+                this.stopMonitoring();
+                break;
             case 'error':
                 this.stopMonitoring();
+                this.recordConnectionFailure();
                 break;
             case 'reconnecting':
                 this.reconnectCount++;
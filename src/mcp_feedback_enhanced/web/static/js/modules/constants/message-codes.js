@@ -34,6 +34,8 @@
             SESSION_UPDATED: 'session.updated',
             SESSION_EXPIRED: 'session.expired',
             SESSION_TIMEOUT: 'session.timeout',
+            SESSION_CANCELLED: 'session.cancelled',
+            SESSION_REATTACHED: 'session.reattached',
             SESSION_CLEANED: 'session.cleaned',
             FEEDBACK_SUBMITTED: 'session.feedbackSubmitted',
             USER_MESSAGE_RECORDED: 'session.userMessageRecorded',
@@ -94,7 +96,8 @@
             SERVER: 'error.server',
             TIMEOUT: 'error.timeout',
             INVALID_INPUT: 'error.invalidInput',
-            OPERATION_FAILED: 'error.operationFailed'
+            OPERATION_FAILED: 'error.operationFailed',
+            UNAUTHORIZED: 'error.unauthorized'
         },
 
         // 命令執行訊息
@@ -60,7 +60,10 @@
         this.detailsModal = new window.MCPFeedback.Session.DetailsModal({
             enableEscapeClose: options.enableEscapeClose !== false,
             enableBackdropClose: options.enableBackdropClose !== false,
-            showFullSessionId: options.showFullSessionId || false
+            showFullSessionId: options.showFullSessionId || false,
+            loadMoreMessages: function(sessionId, offset) {
+                return self.dataManager.fetchSessionDetails(sessionId, offset);
+            }
         });
 
         // 初始化防抖處理器
@@ -377,7 +380,38 @@
             return;
         }
 
-        this.detailsModal.showSessionDetails(currentSession);
+        this.openSessionDetails(currentSession);
+    };
+
+    /**
+     * 延遲載入會話詳情後顯示彈窗
+     *
+     * 會話列表只帶摘要，彈窗開啟時才向伺服器請求第一頁用戶訊息；
+     * 會話不在伺服器上或請求失敗時直接顯示本地資料。
+     */
+    SessionManager.prototype.openSessionDetails = function(sessionData) {
+        const self = this;
+
+        this.dataManager.fetchSessionDetails(sessionData.session_id, 0)
+            .then(function(detail) {
+                if (!detail) {
+                    self.detailsModal.showSessionDetails(sessionData);
+                    return;
+                }
+
+                const page = detail.user_messages;
+                self.detailsModal.showSessionDetails(Object.assign({}, sessionData, {
+                    summary: detail.summary,
+                    status: detail.status,
+                    user_messages: self.dataManager.mergeUserMessages(sessionData.user_messages || [], page.items),
+                    user_message_count: page.total,
+                    user_messages_next_offset: page.next_offset
+                }));
+            })
+            .catch(function(error) {
+                console.warn('📋 載入會話詳情失敗，使用本地資料:', error);
+                self.detailsModal.showSessionDetails(sessionData);
+            });
     };
 
 
@@ -391,7 +425,7 @@
         const sessionData = this.dataManager.findSessionById(sessionId);
 
         if (sessionData) {
-            this.detailsModal.showSessionDetails(sessionData);
+            this.openSessionDetails(sessionData);
         } else {
             const message = window.i18nManager ? 
                 window.i18nManager.t('sessionHistory.sessionNotFound', '找不到會話資料') : 
@@ -25,6 +25,11 @@
         this.currentSession = null;
         this.sessionHistory = [];
         this.lastStatusUpdate = null;
+        // 最近一次 /api/all-sessions 回應的 ETag，用於條件請求
+        this.sessionsEtag = null;
+        // 已同步到伺服器歷史記錄的會話內容（會話 ID → JSON），用於只傳送變更
+        this.syncedRecords = {};
+        this.historyCompacted = false;
 
         // 統計數據
         this.sessionStats = {
@@ -560,6 +565,7 @@
      */
     SessionDataManager.prototype.clearHistory = function() {
         this.sessionHistory = [];
+        this.sessionsEtag = null;
 
         // 清空伺服器端資料
         this.clearServerData();
@@ -635,17 +641,42 @@
 
         // 首先嘗試獲取實時會話狀態
         const lang = window.i18nManager ? window.i18nManager.getCurrentLanguage() : 'zh-TW';
-        fetch('/api/all-sessions?lang=' + lang)
+        const headers = {};
+        if (self.sessionsEtag) {
+            headers['If-None-Match'] = self.sessionsEtag;
+        }
+
+        fetch('/api/all-sessions?lang=' + lang, { headers: headers })
             .then(function(response) {
+                if (response.status === 304) {
+                    // 會話列表未變更，沿用本地資料
+                    return null;
+                }
                 if (response.ok) {
+                    self.sessionsEtag = response.headers.get('ETag');
                     return response.json();
                 } else {
                     throw new Error('獲取實時會話狀態失敗: ' + response.status);
                 }
             })
             .then(function(data) {
+                if (data === null) {
+                    console.log('📊 會話列表未變更（304）');
+                    return;
+                }
                 if (data && Array.isArray(data.sessions)) {
-                    // 使用實時會話狀態
+                    // 使用實時會話狀態；列表只帶摘要，保留本地已載入的用戶訊息
+                    const localMessages = {};
+                    self.sessionHistory.forEach(function(session) {
+                        if (session.user_messages && session.user_messages.length > 0) {
+                            localMessages[session.session_id] = session.user_messages;
+                        }
+                    });
+                    data.sessions.forEach(function(session) {
+                        if (!session.user_messages && localMessages[session.session_id]) {
+                            session.user_messages = localMessages[session.session_id];
+                        }
+                    });
                     self.sessionHistory = data.sessions;
                     console.log('📊 從伺服器載入', self.sessionHistory.length, '個實時會話狀態');
 
@@ -673,6 +704,151 @@
             });
     };
 
+    /**
+     * 從伺服器獲取單一會話詳情（用戶訊息分頁）
+     *
+     * 取得的訊息會合併回本地會話記錄，供匯出與保存使用。
+     * 會話不在伺服器上（例如只存在於歷史文件）時返回 null。
+     */
+    SessionDataManager.prototype.fetchSessionDetails = function(sessionId, messagesOffset) {
+        const self = this;
+        const url = '/api/sessions/' + encodeURIComponent(sessionId) +
+            '?messages_offset=' + (messagesOffset || 0);
+
+        return fetch(url)
+            .then(function(response) {
+                if (response.status === 404) {
+                    return null;
+                }
+                if (!response.ok) {
+                    throw new Error('獲取會話詳情失敗: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function(detail) {
+                if (!detail) {
+                    return null;
+                }
+
+                const page = detail.user_messages;
+                const targets = self.sessionHistory.filter(function(session) {
+                    return session.session_id === sessionId;
+                });
+                if (self.currentSession && self.currentSession.session_id === sessionId) {
+                    targets.push(self.currentSession);
+                }
+                targets.forEach(function(session) {
+                    session.user_messages = self.mergeUserMessages(session.user_messages || [], page.items);
+                    session.user_message_count = page.total;
+                });
+                return detail;
+            });
+    };
+
+    /**
+     * 確保會話的用戶訊息已完整載入
+     *
+     * 只請求本地訊息數少於伺服器 user_message_count 的會話，
+     * 請求失敗時保留本地資料，不影響後續操作。
+     */
+    SessionDataManager.prototype.ensureUserMessagesLoaded = function(sessions) {
+        const self = this;
+
+        if (!this.isUserMessageRecordingEnabled()) {
+            return Promise.resolve();
+        }
+
+        const loadAll = function(sessionId, offset) {
+            return self.fetchSessionDetails(sessionId, offset).then(function(detail) {
+                const nextOffset = detail && detail.user_messages.next_offset;
+                if (nextOffset !== null && nextOffset !== undefined) {
+                    return loadAll(sessionId, nextOffset);
+                }
+                return null;
+            });
+        };
+
+        const pending = sessions
+            .filter(function(session) {
+                const loaded = session.user_messages ? session.user_messages.length : 0;
+                return (session.user_message_count || 0) > loaded;
+            })
+            .map(function(session) {
+                return loadAll(session.session_id, 0).catch(function(error) {
+                    console.warn('📊 載入會話用戶訊息失敗:', session.session_id, error);
+                });
+            });
+
+        return Promise.all(pending);
+    };
+
+    /**
+     * 套用伺服器推送的會話增量事件
+     *
+     * 處理 session_added、session_status_changed 和 user_message_added，
+     * 只更新受影響的會話；找不到對應會話時回退到完整載入。
+     */
+    SessionDataManager.prototype.applySessionEvent = function(event) {
+        const sessionId = event.type === 'session_added' ?
+            (event.session && event.session.session_id) :
+            event.session_id;
+        if (!sessionId) {
+            return false;
+        }
+
+        const index = this.sessionHistory.findIndex(s => s.session_id === sessionId);
+
+        switch (event.type) {
+            case 'session_added':
+                // 新會話成為當前會話
+                this.sessionHistory.forEach(function(session) {
+                    session.is_current = false;
+                });
+                const added = Object.assign({ is_current: true, has_websocket: true }, event.session);
+                if (index !== -1) {
+                    this.sessionHistory[index] = Object.assign(this.sessionHistory[index], added);
+                } else {
+                    this.sessionHistory.unshift(added);
+                }
+                break;
+            case 'session_status_changed':
+                if (index === -1) {
+                    console.log('📊 本地沒有會話', sessionId, '，重新載入會話列表');
+                    this.loadFromServer();
+                    return false;
+                }
+                Object.assign(this.sessionHistory[index], {
+                    status: event.status,
+                    status_message: event.status_message,
+                    last_activity: event.last_activity,
+                    feedback_completed: event.feedback_completed
+                });
+                break;
+            case 'user_message_added':
+                if (index === -1) {
+                    this.loadFromServer();
+                    return false;
+                }
+                const target = this.sessionHistory[index];
+                target.user_messages = this.mergeUserMessages(target.user_messages || [], [event.message]);
+                break;
+            default:
+                return false;
+        }
+
+        this.updateStats();
+
+        if (this.onHistoryChange) {
+            this.onHistoryChange(this.sessionHistory);
+        }
+
+        if (this.onDataChanged) {
+            this.onDataChanged();
+        }
+
+        return true;
+    };
+
     /**
      * 從歷史文件載入會話數據（備用方案）
      */
@@ -691,6 +867,10 @@
             .then(function(data) {
                 if (data && Array.isArray(data.sessions)) {
                     self.sessionHistory = data.sessions;
+                    self.sessionsEtag = null;
+                    data.sessions.forEach(function(session) {
+                        self.syncedRecords[session.session_id] = JSON.stringify(session);
+                    });
                     console.log('📊 從歷史文件載入', self.sessionHistory.length, '個會話');
 
                     // 載入完成後進行清理和統計更新
@@ -770,16 +950,71 @@
     };
 
     /**
-     * 保存會話快照到伺服器
+     * 保存會話快照到伺服器（只追加有變更的會話）
      */
     SessionDataManager.prototype.saveSessionSnapshot = function(sessions) {
+        const changes = this.collectHistoryChanges(sessions, false);
+        this.postHistoryChanges(changes.sessions, [], '會話快照');
+    };
+
+    /**
+     * 保存會話歷史到伺服器
+     *
+     * 只傳送自上次同步後新增或變更的會話，以及本地已移除的會話 ID。
+     */
+    SessionDataManager.prototype.saveToServer = function() {
+        const changes = this.collectHistoryChanges(this.sessionHistory, true);
+        this.postHistoryChanges(changes.sessions, changes.removed, '會話歷史');
+    };
+
+    /**
+     * 比對上次同步的內容，找出需要傳送的會話變更
+     */
+    SessionDataManager.prototype.collectHistoryChanges = function(sessions, includeRemoved) {
+        const self = this;
+        const changed = [];
+        const present = {};
+
+        sessions.forEach(function(session) {
+            present[session.session_id] = true;
+            const serialized = JSON.stringify(session);
+            if (self.syncedRecords[session.session_id] !== serialized) {
+                changed.push(session);
+            }
+        });
+
+        const removed = includeRemoved ?
+            Object.keys(this.syncedRecords).filter(function(sessionId) {
+                return !present[sessionId];
+            }) :
+            [];
+
+        return { sessions: changed, removed: removed };
+    };
+
+    /**
+     * 將會話變更追加到伺服器端歷史記錄
+     */
+    SessionDataManager.prototype.postHistoryChanges = function(sessions, removed, label) {
+        const self = this;
+
+        if (sessions.length === 0 && removed.length === 0) {
+            console.log('📊 ' + label + '沒有變更，跳過保存');
+            return;
+        }
+
+        // 送出當下的內容快照，回應成功後才記為已同步
+        const snapshots = sessions.map(function(session) {
+            return [session.session_id, JSON.stringify(session)];
+        });
         const data = {
             sessions: sessions,
+            removed: removed,
             lastCleanup: TimeUtils.getCurrentTimestamp()
         };
 
         const lang = window.i18nManager ? window.i18nManager.getCurrentLanguage() : 'zh-TW';
-        fetch('/api/save-session-history?lang=' + lang, {
+        fetch('/api/session-history/append?lang=' + lang, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -788,60 +1023,56 @@
         })
         .then(function(response) {
             if (response.ok) {
-                console.log('📊 已保存會話快照到伺服器，包含', data.sessions.length, '個會話');
+                console.log('📊 已保存' + label + '變更到伺服器:', sessions.length, '個更新,', removed.length, '個移除');
                 return response.json();
             } else {
                 throw new Error('伺服器回應錯誤: ' + response.status);
             }
         })
         .then(function(result) {
+            snapshots.forEach(function(snapshot) {
+                self.syncedRecords[snapshot[0]] = snapshot[1];
+            });
+            removed.forEach(function(sessionId) {
+                delete self.syncedRecords[sessionId];
+            });
+
             if (result.messageCode && window.i18nManager) {
                 const message = window.i18nManager.t(result.messageCode, result.params);
-                console.log('📊 會話快照保存回應:', message);
+                console.log('📊 伺服器保存回應:', message);
             } else {
-                console.log('📊 會話快照保存回應:', result.message);
+                console.log('📊 伺服器保存回應:', result.message);
             }
         })
         .catch(function(error) {
-            console.error('📊 保存會話快照到伺服器失敗:', error);
+            console.error('📊 保存' + label + '到伺服器失敗:', error);
         });
     };
 
     /**
-     * 保存會話歷史到伺服器
+     * 依保留期限壓縮伺服器端的歷史記錄
      */
-    SessionDataManager.prototype.saveToServer = function() {
-        const data = {
-            sessions: this.sessionHistory,
-            lastCleanup: TimeUtils.getCurrentTimestamp()
-        };
-
-        const lang = window.i18nManager ? window.i18nManager.getCurrentLanguage() : 'zh-TW';
-        fetch('/api/save-session-history?lang=' + lang, {
+    SessionDataManager.prototype.compactServerHistory = function(retentionHours) {
+        fetch('/api/session-history/compact', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify(data)
+            body: JSON.stringify({ retentionHours: retentionHours })
         })
         .then(function(response) {
-            if (response.ok) {
-                console.log('📊 已保存', data.sessions.length, '個會話到伺服器');
-                return response.json();
-            } else {
+            if (!response.ok) {
                 throw new Error('伺服器回應錯誤: ' + response.status);
             }
+            return response.json();
         })
         .then(function(result) {
-            if (result.messageCode && window.i18nManager) {
-                const message = window.i18nManager.t(result.messageCode, result.params);
-                console.log('📊 伺服器保存回應:', message);
-            } else {
-                console.log('📊 伺服器保存回應:', result.message);
+            if (result.removed > 0) {
+                console.log('📊 伺服器端清理了', result.removed, '個過期會話');
             }
         })
         .catch(function(error) {
-            console.error('📊 保存會話歷史到伺服器失敗:', error);
+            console.warn('📊 壓縮伺服器端會話歷史失敗:', error);
         });
     };
 
@@ -849,20 +1080,14 @@
      * 清空伺服器端的會話歷史
      */
     SessionDataManager.prototype.clearServerData = function() {
-        const emptyData = {
-            sessions: [],
-            lastCleanup: TimeUtils.getCurrentTimestamp()
-        };
+        const self = this;
 
-        fetch('/api/save-session-history', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify(emptyData)
+        fetch('/api/session-history/clear', {
+            method: 'POST'
         })
         .then(function(response) {
             if (response.ok) {
+                self.syncedRecords = {};
                 console.log('📊 已清空伺服器端的會話歷史');
             } else {
                 throw new Error('伺服器回應錯誤: ' + response.status);
@@ -898,6 +1123,12 @@
             console.log('📊 清理了', cleanedCount, '個過期會話');
             this.saveToServer();
         }
+
+        // 伺服器端歷史可能包含本頁未載入的舊會話，每個頁面壓縮一次
+        if (!this.historyCompacted) {
+            this.historyCompacted = true;
+            this.compactServerHistory(retentionHours);
+        }
     };
 
     /**
@@ -921,7 +1152,23 @@
      */
     SessionDataManager.prototype.exportSessionHistory = function() {
         const self = this;
-        const exportData = {
+        const filename = 'session-history-' + new Date().toISOString().split('T')[0] + '.json';
+
+        // 會話列表只帶摘要，匯出前先補齊尚未載入的用戶訊息
+        this.ensureUserMessagesLoaded(this.sessionHistory).then(function() {
+            self.downloadJSON(self.buildHistoryExportData(), filename);
+            console.log('📊 匯出了', self.sessionHistory.length, '個會話');
+        });
+
+        return filename;
+    };
+
+    /**
+     * 建立會話歷史匯出資料
+     */
+    SessionDataManager.prototype.buildHistoryExportData = function() {
+        const self = this;
+        return {
             exportedAt: new Date().toISOString(),
             sessionCount: this.sessionHistory.length,
             sessions: this.sessionHistory.map(function(session) {
@@ -945,12 +1192,6 @@
                 return sessionData;
             })
         };
-
-        const filename = 'session-history-' + new Date().toISOString().split('T')[0] + '.json';
-        this.downloadJSON(exportData, filename);
-
-        console.log('📊 匯出了', this.sessionHistory.length, '個會話');
-        return filename;
     };
 
     /**
@@ -966,6 +1207,22 @@
             return null;
         }
 
+        const self = this;
+        const shortId = sessionId.substring(0, 8);
+        const filename = 'session-' + shortId + '-' + new Date().toISOString().split('T')[0] + '.json';
+
+        this.ensureUserMessagesLoaded([session]).then(function() {
+            self.downloadJSON(self.buildSessionExportData(session), filename);
+            console.log('📊 匯出會話:', sessionId);
+        });
+
+        return filename;
+    };
+
+    /**
+     * 建立單一會話匯出資料
+     */
+    SessionDataManager.prototype.buildSessionExportData = function(session) {
         const sessionData = {
             session_id: session.session_id,
             created_at: session.created_at,
@@ -983,17 +1240,10 @@
             sessionData.user_message_count = session.user_messages.length;
         }
 
-        const exportData = {
+        return {
             exportedAt: new Date().toISOString(),
             session: sessionData
         };
-
-        const shortId = sessionId.substring(0, 8);
-        const filename = 'session-' + shortId + '-' + new Date().toISOString().split('T')[0] + '.json';
-        this.downloadJSON(exportData, filename);
-
-        console.log('📊 匯出會話:', sessionId);
-        return filename;
     };
 
     /**
@@ -1024,6 +1274,8 @@
         this.currentSession = null;
         this.sessionHistory = [];
         this.lastStatusUpdate = null;
+        this.sessionsEtag = null;
+        this.syncedRecords = {};
         this.sessionStats = {
             todayCount: 0,
             averageDuration: 0
@@ -27,6 +27,9 @@
         this.enableBackdropClose = options.enableBackdropClose !== false;
         this.showFullSessionId = options.showFullSessionId || false;
 
+        // 載入更多用戶訊息的回調：function(sessionId, offset) -> Promise<會話詳情>
+        this.loadMoreMessages = options.loadMoreMessages || null;
+
         // 當前彈窗引用
         this.currentModal = null;
         this.keydownHandler = null;
@@ -93,7 +96,9 @@
 
         // 處理用戶訊息記錄
         const userMessages = sessionData.user_messages || [];
-        const userMessageCount = userMessages.length;
+        const userMessageCount = Math.max(sessionData.user_message_count || 0, userMessages.length);
+        const hasMoreMessages = sessionData.user_messages_next_offset !== null &&
+            sessionData.user_messages_next_offset !== undefined;
 
         return {
             sessionId: sessionId,
@@ -104,7 +109,8 @@
             projectDirectory: sessionData.project_directory || (window.i18nManager ? window.i18nManager.t('sessionManagement.sessionDetails.unknown') : '未知'),
             summary: sessionData.summary || (window.i18nManager ? window.i18nManager.t('sessionManagement.sessionDetails.noSummary') : '暫無摘要'),
             userMessages: userMessages,
-            userMessageCount: userMessageCount
+            userMessageCount: userMessageCount,
+            hasMoreMessages: hasMoreMessages && !!this.loadMoreMessages
         };
     };
 
@@ -199,6 +205,7 @@
 
         const sectionTitle = i18n ? i18n.t('sessionHistory.userMessages.title') : '用戶訊息記錄';
         const messageCountLabel = i18n ? i18n.t('sessionHistory.userMessages.messageCount') : '訊息數量';
+        const loadMoreLabel = i18n ? i18n.t('sessionHistory.userMessages.loadMore') : '載入更多';
 
         let messagesHtml = '';
 
@@ -266,11 +273,12 @@
                 <span class="detail-label">${sectionTitle}:</span>
                 <div class="detail-value">
                     <div class="user-messages-summary">
-                        <strong>${messageCountLabel}:</strong> ${userMessages.length}
+                        <strong>${messageCountLabel}:</strong> ${details.userMessageCount}
                     </div>
                     <div class="user-messages-list">
                         ${messagesHtml}
                     </div>
+                    ${details.hasMoreMessages ? `<button class="btn-secondary btn-load-more-messages">${loadMoreLabel}</button>` : ''}
                 </div>
             </div>
         `;
@@ -328,6 +336,15 @@
             });
         }
 
+        // 載入更多用戶訊息按鈕
+        const loadMoreBtn = this.currentModal.querySelector('.btn-load-more-messages');
+        if (loadMoreBtn) {
+            DOMUtils.addEventListener(loadMoreBtn, 'click', function() {
+                loadMoreBtn.disabled = true;
+                self.loadNextMessagesPage();
+            });
+        }
+
         // 复制用户消息按钮
         const copyMessageBtns = this.currentModal.querySelectorAll('.btn-copy-message');
         copyMessageBtns.forEach(function(btn) {
@@ -339,6 +356,37 @@
         });
     };
 
+    /**
+     * 載入下一頁用戶訊息並重新渲染彈窗
+     */
+    SessionDetailsModal.prototype.loadNextMessagesPage = function() {
+        const self = this;
+        const sessionData = this.currentSessionData;
+        if (!sessionData || !this.loadMoreMessages) return;
+
+        this.loadMoreMessages(sessionData.session_id, sessionData.user_messages_next_offset)
+            .then(function(detail) {
+                if (!detail || self.currentSessionData !== sessionData) return;
+
+                const page = detail.user_messages;
+                const existing = sessionData.user_messages || [];
+                const newMessages = page.items.filter(function(message) {
+                    return !existing.some(function(item) {
+                        return item.timestamp === message.timestamp;
+                    });
+                });
+                self.showSessionDetails(Object.assign({}, sessionData, {
+                    user_messages: existing.concat(newMessages),
+                    user_message_count: page.total,
+                    user_messages_next_offset: page.next_offset
+                }));
+            })
+            .catch(function(error) {
+                console.error('❌ 載入更多用戶訊息失敗:', error);
+                self.showError(error.message);
+            });
+    };
+
     /**
      * 顯示彈窗動畫
      */
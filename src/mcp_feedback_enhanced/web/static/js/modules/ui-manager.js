@@ -244,9 +244,10 @@
                     button.disabled = true;
                     break;
                 case Utils.CONSTANTS.FEEDBACK_SUBMITTED:
-                    button.textContent = window.i18nManager ? window.i18nManager.t('buttons.submitted') : '已提交';
-                    button.className = 'btn btn-success';
-                    button.disabled = true;
+                    // 已提交後可預先回答下一次 MCP 呼叫
+                    button.textContent = window.i18nManager ? window.i18nManager.t('buttons.answerAhead') : '⏭️ 預先回答下一次';
+                    button.className = 'btn btn-secondary';
+                    button.disabled = false;
                     break;
             }
         });
@@ -257,7 +258,8 @@
      */
     UIManager.prototype.updateFeedbackInputs = function() {
         const feedbackInput = Utils.safeQuerySelector('#combinedFeedbackText');
-        const canInput = this.feedbackState === Utils.CONSTANTS.FEEDBACK_WAITING;
+        const canInput = this.feedbackState === Utils.CONSTANTS.FEEDBACK_WAITING ||
+            this.feedbackState === Utils.CONSTANTS.FEEDBACK_SUBMITTED;
 
         if (feedbackInput) {
             feedbackInput.disabled = !canInput;
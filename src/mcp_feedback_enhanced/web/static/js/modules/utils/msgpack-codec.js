@@ -0,0 +1,262 @@
+/**
+ * MCP Feedback Enhanced - MessagePack 編解碼模組
+ * =============================================
+ *
+ * 提供 WebSocket 二進位傳輸格式所需的 MessagePack 編碼與解碼，
+ * 支援 nil、布林、整數、浮點數、字串、二進位、陣列和映射類型
+ */
+
+(function() {
+    'use strict';
+
+    // 確保命名空間存在
+    window.MCPFeedback = window.MCPFeedback || {};
+    window.MCPFeedback.Utils = window.MCPFeedback.Utils || {};
+
+    const textEncoder = new TextEncoder();
+    const textDecoder = new TextDecoder('utf-8');
+
+    /**
+     * 可自動擴容的位元組寫入器
+     */
+    function ByteWriter(initialSize) {
+        this.buffer = new Uint8Array(initialSize || 256);
+        this.view = new DataView(this.buffer.buffer);
+        this.length = 0;
+    }
+
+    ByteWriter.prototype.ensure = function(size) {
+        if (this.length + size <= this.buffer.length) {
+            return;
+        }
+        let newSize = this.buffer.length * 2;
+        while (newSize < this.length + size) {
+            newSize *= 2;
+        }
+        const newBuffer = new Uint8Array(newSize);
+        newBuffer.set(this.buffer.subarray(0, this.length));
+        this.buffer = newBuffer;
+        this.view = new DataView(newBuffer.buffer);
+    };
+
+    ByteWriter.prototype.writeUint8 = function(value) {
+        this.ensure(1);
+        this.buffer[this.length++] = value;
+    };
+
+    ByteWriter.prototype.writeWithView = function(size, method, value) {
+        this.ensure(size);
+        this.view[method](this.length, value);
+        this.length += size;
+    };
+
+    ByteWriter.prototype.writeBytes = function(bytes) {
+        this.ensure(bytes.length);
+        this.buffer.set(bytes, this.length);
+        this.length += bytes.length;
+    };
+
+    ByteWriter.prototype.toUint8Array = function() {
+        return this.buffer.slice(0, this.length);
+    };
+
+    function writeHeader(writer, length, fixPrefix, fixMax, prefix8, prefix16, prefix32) {
+        if (fixPrefix !== null && length <= fixMax) {
+            writer.writeUint8(fixPrefix | length);
+        } else if (prefix8 !== null && length < 0x100) {
+            writer.writeUint8(prefix8);
+            writer.writeUint8(length);
+        } else if (length < 0x10000) {
+            writer.writeUint8(prefix16);
+            writer.writeWithView(2, 'setUint16', length);
+        } else {
+            writer.writeUint8(prefix32);
+            writer.writeWithView(4, 'setUint32', length);
+        }
+    }
+
+    function encodeNumber(writer, value) {
+        if (!Number.isSafeInteger(value)) {
+            writer.writeUint8(0xcb);
+            writer.writeWithView(8, 'setFloat64', value);
+        } else if (value >= 0) {
+            if (value < 0x80) {
+                writer.writeUint8(value);
+            } else if (value < 0x100) {
+                writer.writeUint8(0xcc);
+                writer.writeUint8(value);
+            } else if (value < 0x10000) {
+                writer.writeUint8(0xcd);
+                writer.writeWithView(2, 'setUint16', value);
+            } else if (value < 0x100000000) {
+                writer.writeUint8(0xce);
+                writer.writeWithView(4, 'setUint32', value);
+            } else {
+                writer.writeUint8(0xcf);
+                writer.writeWithView(8, 'setBigUint64', BigInt(value));
+            }
+        } else if (value >= -0x20) {
+            writer.writeUint8(0xe0 | (value + 0x20));
+        } else if (value >= -0x80) {
+            writer.writeUint8(0xd0);
+            writer.writeWithView(1, 'setInt8', value);
+        } else if (value >= -0x8000) {
+            writer.writeUint8(0xd1);
+            writer.writeWithView(2, 'setInt16', value);
+        } else if (value >= -0x80000000) {
+            writer.writeUint8(0xd2);
+            writer.writeWithView(4, 'setInt32', value);
+        } else {
+            writer.writeUint8(0xd3);
+            writer.writeWithView(8, 'setBigInt64', BigInt(value));
+        }
+    }
+
+    function encodeValue(writer, value) {
+        if (value === null || value === undefined) {
+            writer.writeUint8(0xc0);
+        } else if (value === false) {
+            writer.writeUint8(0xc2);
+        } else if (value === true) {
+            writer.writeUint8(0xc3);
+        } else if (typeof value === 'number') {
+            encodeNumber(writer, value);
+        } else if (typeof value === 'string') {
+            const bytes = textEncoder.encode(value);
+            writeHeader(writer, bytes.length, 0xa0, 31, 0xd9, 0xda, 0xdb);
+            writer.writeBytes(bytes);
+        } else if (value instanceof Uint8Array || value instanceof ArrayBuffer) {
+            const bytes = value instanceof Uint8Array ? value : new Uint8Array(value);
+            writeHeader(writer, bytes.length, null, 0, 0xc4, 0xc5, 0xc6);
+            writer.writeBytes(bytes);
+        } else if (Array.isArray(value)) {
+            writeHeader(writer, value.length, 0x90, 15, null, 0xdc, 0xdd);
+            for (let i = 0; i < value.length; i++) {
+                encodeValue(writer, value[i]);
+            }
+        } else if (typeof value === 'object') {
+            // 與 JSON.stringify 一致：略過 undefined 和函數值
+            const keys = Object.keys(value).filter(function(key) {
+                return value[key] !== undefined && typeof value[key] !== 'function';
+            });
+            writeHeader(writer, keys.length, 0x80, 15, null, 0xde, 0xdf);
+            keys.forEach(function(key) {
+                encodeValue(writer, key);
+                encodeValue(writer, value[key]);
+            });
+        } else {
+            throw new TypeError('MessagePack 不支援的類型: ' + typeof value);
+        }
+    }
+
+    /**
+     * 位元組讀取器
+     */
+    function ByteReader(bytes) {
+        this.bytes = bytes;
+        this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        this.offset = 0;
+    }
+
+    ByteReader.prototype.readWithView = function(size, method) {
+        const value = this.view[method](this.offset);
+        this.offset += size;
+        return value;
+    };
+
+    ByteReader.prototype.readBytes = function(length) {
+        const bytes = this.bytes.subarray(this.offset, this.offset + length);
+        this.offset += length;
+        return bytes;
+    };
+
+    ByteReader.prototype.readString = function(length) {
+        return textDecoder.decode(this.readBytes(length));
+    };
+
+    ByteReader.prototype.readArray = function(length) {
+        const result = new Array(length);
+        for (let i = 0; i < length; i++) {
+            result[i] = this.readValue();
+        }
+        return result;
+    };
+
+    ByteReader.prototype.readMap = function(length) {
+        const result = {};
+        for (let i = 0; i < length; i++) {
+            const key = this.readValue();
+            result[key] = this.readValue();
+        }
+        return result;
+    };
+
+    ByteReader.prototype.readValue = function() {
+        const type = this.view.getUint8(this.offset++);
+
+        if (type < 0x80) return type;
+        if (type < 0x90) return this.readMap(type & 0x0f);
+        if (type < 0xa0) return this.readArray(type & 0x0f);
+        if (type < 0xc0) return this.readString(type & 0x1f);
+        if (type >= 0xe0) return type - 0x100;
+
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return this.readBytes(this.readWithView(1, 'getUint8')).slice();
+            case 0xc5: return this.readBytes(this.readWithView(2, 'getUint16')).slice();
+            case 0xc6: return this.readBytes(this.readWithView(4, 'getUint32')).slice();
+            case 0xca: return this.readWithView(4, 'getFloat32');
+            case 0xcb: return this.readWithView(8, 'getFloat64');
+            case 0xcc: return this.readWithView(1, 'getUint8');
+            case 0xcd: return this.readWithView(2, 'getUint16');
+            case 0xce: return this.readWithView(4, 'getUint32');
+            case 0xcf: return Number(this.readWithView(8, 'getBigUint64'));
+            case 0xd0: return this.readWithView(1, 'getInt8');
+            case 0xd1: return this.readWithView(2, 'getInt16');
+            case 0xd2: return this.readWithView(4, 'getInt32');
+            case 0xd3: return Number(this.readWithView(8, 'getBigInt64'));
+            case 0xd9: return this.readString(this.readWithView(1, 'getUint8'));
+            case 0xda: return this.readString(this.readWithView(2, 'getUint16'));
+            case 0xdb: return this.readString(this.readWithView(4, 'getUint32'));
+            case 0xdc: return this.readArray(this.readWithView(2, 'getUint16'));
+            case 0xdd: return this.readArray(this.readWithView(4, 'getUint32'));
+            case 0xde: return this.readMap(this.readWithView(2, 'getUint16'));
+            case 0xdf: return this.readMap(this.readWithView(4, 'getUint32'));
+            default:
+                throw new Error('MessagePack 不支援的類型標記: 0x' + type.toString(16));
+        }
+    };
+
+    /**
+     * MessagePack 工具
+     */
+    const MsgPack = {
+        /**
+         * 編碼為 MessagePack
+         * @param {*} value - 要編碼的值
+         * @returns {Uint8Array} 編碼結果
+         */
+        encode: function(value) {
+            const writer = new ByteWriter();
+            encodeValue(writer, value);
+            return writer.toUint8Array();
+        },
+
+        /**
+         * 解碼 MessagePack
+         * @param {ArrayBuffer|Uint8Array} data - 二進位資料
+         * @returns {*} 解碼結果
+         */
+        decode: function(data) {
+            const bytes = data instanceof Uint8Array ? data : new Uint8Array(data);
+            return new ByteReader(bytes).readValue();
+        }
+    };
+
+    window.MCPFeedback.Utils.MsgPack = MsgPack;
+
+    console.log('✅ MsgPack 模組載入完成');
+
+})();
@@ -31,6 +31,7 @@
                     'timeout': '已逾時',
                     'error': '錯誤',
                     'expired': '已過期',
+                    'cancelled': '已取消',
                     'connecting': '連接中',
                     'connected': '已連接',
                     'disconnected': '已斷開',
@@ -51,6 +52,7 @@
                 'timeout': 'session.timeout',
                 'error': 'status.error',
                 'expired': 'session.timeout',
+                'cancelled': 'session.cancelled',
                 'connecting': 'connectionMonitor.connecting',
                 'connected': 'connectionMonitor.connected',
                 'disconnected': 'connectionMonitor.disconnected',
@@ -104,6 +106,7 @@
             'timeout': '#ff5722',
             'error': '#f44336',
             'expired': '#757575',
+            'cancelled': '#757575',
             'connecting': '#ff9800',
             'connected': '#4caf50',
             'disconnected': '#757575',
@@ -228,6 +231,7 @@
                 'timeout', 
                 'error', 
                 'expired', 
+                'cancelled',
                 'closed'
             ];
             return completedStatuses.includes(status);
@@ -283,7 +287,8 @@
                 'feedback_submitted': 11,
                 'completed': 12,
                 'closed': 13,
-                'expired': 14
+                'expired': 14,
+                'cancelled': 15
             };
 
             return priorityMap[status] || 0;
@@ -349,9 +354,9 @@
         isValidStatusTransition: function(fromStatus, toStatus) {
             // 定義有效的狀態轉換規則
             const validTransitions = {
-                'waiting': ['active', 'processing', 'timeout', 'error', 'connected'],
+                'waiting': ['active', 'processing', 'timeout', 'error', 'connected', 'cancelled'],
                 'waiting_for_feedback': ['active', 'processing', 'timeout', 'error', 'feedback_submitted'],
-                'active': ['processing', 'feedback_submitted', 'completed', 'timeout', 'error'],
+                'active': ['processing', 'feedback_submitted', 'completed', 'timeout', 'error', 'cancelled'],
                 'processing': ['completed', 'feedback_submitted', 'error', 'timeout'],
                 'connecting': ['connected', 'error', 'disconnected', 'timeout'],
                 'connected': ['disconnected', 'error', 'reconnecting'],
@@ -361,6 +366,7 @@
                 'completed': ['closed'],
                 'error': ['connecting', 'waiting', 'closed'],
                 'timeout': ['closed', 'waiting'],
+                'cancelled': ['closed', 'waiting'],
                 'ready': ['active', 'waiting', 'processing']
             };
 
@@ -382,6 +388,7 @@
                 'timeout': '會話因超時而結束',
                 'error': '會話遇到錯誤',
                 'expired': '會話已過期',
+                'cancelled': 'AI 助手已取消此次回饋請求',
                 'connecting': '正在建立連接',
                 'connected': '連接已建立',
                 'disconnected': '連接已斷開',
@@ -12,6 +12,12 @@
     window.MCPFeedback = window.MCPFeedback || {};
     const Utils = window.MCPFeedback.Utils;
 
+    // 與伺服器協商的 WebSocket 子協議
+    const WIRE_SUBPROTOCOLS = {
+        msgpack: 'mcp-feedback.msgpack',
+        json: 'mcp-feedback.json'
+    };
+
     /**
      * WebSocket 管理器建構函數
      */
@@ -44,9 +50,29 @@
         this.pendingSubmission = null;
         this.sessionUpdatePending = false;
 
+        // 訊息序號追蹤（用於斷線續傳）
+        this.streamSessionId = null;
+        this.lastSeq = 0;
+        this.resumeRequested = false;
+
+        // 傳輸格式（由子協議協商，MessagePack 可減少遠端環境的傳輸量）
+        this.preferMsgPack = options.preferMsgPack !== false;
+        this.wireFormat = 'json';
+
+        // SSE 回退通道（WebSocket 被代理阻擋時由連線監控器啟用）
+        this.transport = 'websocket';
+        this.eventSource = null;
+        this.webSocketProbeTimer = null;
+        this.webSocketProbeInterval = options.webSocketProbeInterval || 60000;
+
         // 網路狀態檢測
         this.networkOnline = navigator.onLine;
         this.setupNetworkStatusDetection();
+
+        // 讓連線監控器在 WebSocket 持續失敗時切換到 SSE
+        if (this.connectionMonitor && this.connectionMonitor.attachTransport) {
+            this.connectionMonitor.attachTransport(this);
+        }
         
         // 會話超時計時器
         this.sessionTimeoutTimer = null;
@@ -73,8 +99,10 @@
         const wsUrl = protocol + '//' + host + '/ws';
 
         console.log('嘗試連接 WebSocket:', wsUrl);
-        const connectingMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.connecting') : '連接中...';
-        this.updateConnectionStatus('connecting', connectingMessage);
+        if (!this.isEventStreamActive()) {
+            const connectingMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.connecting') : '連接中...';
+            this.updateConnectionStatus('connecting', connectingMessage);
+        }
 
         try {
             // 如果已有連接，先關閉
@@ -85,8 +113,17 @@
 
             // 添加語言參數到 WebSocket URL
             const language = window.i18nManager ? window.i18nManager.getCurrentLanguage() : 'zh-TW';
-            const wsUrlWithLang = wsUrl + (wsUrl.includes('?') ? '&' : '?') + 'lang=' + language;
-            this.websocket = new WebSocket(wsUrlWithLang);
+            let wsUrlWithLang = wsUrl + (wsUrl.includes('?') ? '&' : '?') + 'lang=' + language;
+
+            // 帶上最後確認的序號，讓伺服器只補發斷線期間錯過的訊息
+            this.resumeRequested = !!this.streamSessionId;
+            if (this.resumeRequested) {
+                wsUrlWithLang += '&session_id=' + encodeURIComponent(this.streamSessionId) +
+                    '&last_seq=' + this.lastSeq;
+            }
+
+            this.websocket = new WebSocket(wsUrlWithLang, this.getSubprotocols());
+            this.websocket.binaryType = 'arraybuffer';
             this.setupWebSocketEvents();
 
         } catch (error) {
@@ -96,6 +133,28 @@
         }
     };
 
+    /**
+     * 獲取提供給伺服器協商的子協議（依偏好排序）
+     */
+    WebSocketManager.prototype.getSubprotocols = function() {
+        const protocols = [];
+        if (this.preferMsgPack && Utils.MsgPack) {
+            protocols.push(WIRE_SUBPROTOCOLS.msgpack);
+        }
+        protocols.push(WIRE_SUBPROTOCOLS.json);
+        return protocols;
+    };
+
+    /**
+     * 解碼收到的訊息：二進位幀為 MessagePack，文字幀為 JSON
+     */
+    WebSocketManager.prototype.decodeMessage = function(raw) {
+        if (raw instanceof ArrayBuffer) {
+            return Utils.MsgPack.decode(raw);
+        }
+        return Utils.safeJsonParse(raw, null);
+    };
+
     /**
      * 設置 WebSocket 事件監聽器
      */
@@ -123,8 +182,16 @@
      * 處理連接開啟
      */
     WebSocketManager.prototype.handleOpen = function() {
+        if (this.isEventStreamActive()) {
+            // WebSocket 已恢復，關閉 SSE 回退通道
+            console.log('🔄 WebSocket 已恢復，停止 SSE 回退通道');
+            this.stopEventStream();
+        }
+
         this.isConnected = true;
         this.connectionReady = false; // 等待連接確認
+        this.wireFormat = this.websocket.protocol === WIRE_SUBPROTOCOLS.msgpack ? 'msgpack' : 'json';
+        console.log('WebSocket 傳輸格式:', this.wireFormat);
         const connectedMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.connected') : '已連接';
         this.updateConnectionStatus('connected', connectedMessage);
         console.log('WebSocket 連接已建立');
@@ -141,8 +208,10 @@
         // 開始心跳
         this.startHeartbeat();
 
-        // 請求會話狀態
-        this.requestSessionStatus();
+        // 請求會話狀態（嘗試續傳時等待連接確認後再決定是否需要完整同步）
+        if (!this.resumeRequested) {
+            this.requestSessionStatus();
+        }
 
         // 調用外部回調
         if (this.onOpen) {
@@ -155,29 +224,45 @@
      */
     WebSocketManager.prototype.handleMessage = function(event) {
         try {
-            const data = Utils.safeJsonParse(event.data, null);
-            if (data) {
-                // 記錄訊息到監控器
-                if (this.connectionMonitor) {
-                    this.connectionMonitor.recordMessage();
-                }
-
-                this.processMessage(data);
-
-                // 調用外部回調
-                if (this.onMessage) {
-                    this.onMessage(data);
-                }
-            }
+            this.dispatchMessage(this.decodeMessage(event.data));
         } catch (error) {
             console.error('解析 WebSocket 訊息失敗:', error);
         }
     };
 
+    /**
+     * 分派已解碼的訊息（WebSocket 和 SSE 共用）
+     */
+    WebSocketManager.prototype.dispatchMessage = function(data) {
+        if (!data) {
+            return;
+        }
+
+        // 記錄訊息到監控器
+        if (this.connectionMonitor) {
+            this.connectionMonitor.recordMessage();
+        }
+
+        this.trackSequence(data);
+        this.processMessage(data);
+
+        // 調用外部回調
+        if (this.onMessage) {
+            this.onMessage(data);
+        }
+    };
+
     /**
      * 處理連接關閉
      */
     WebSocketManager.prototype.handleClose = function(event) {
+        if (this.isEventStreamActive()) {
+            // SSE 模式下的 WebSocket 探測失敗，保持 SSE 連接
+            console.log('WebSocket 探測未成功，繼續使用 SSE, code:', event.code);
+            this.websocket = null;
+            return;
+        }
+
         this.isConnected = false;
         this.connectionReady = false;
         console.log('WebSocket 連接已關閉, code:', event.code, 'reason:', event.reason);
@@ -211,6 +296,9 @@
      */
     WebSocketManager.prototype.handleError = function(error) {
         console.error('WebSocket 錯誤:', error);
+        if (this.isEventStreamActive()) {
+            return;
+        }
         const connectionErrorMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.connectionError') : '連接錯誤';
         this.updateConnectionStatus('error', connectionErrorMessage);
 
@@ -272,6 +360,14 @@
             case 'connection_established':
                 console.log('WebSocket 連接確認');
                 this.connectionReady = true;
+                if (this.resumeRequested && !data.resumed) {
+                    // 無法續傳，回退到完整同步
+                    console.log('🔄 無法從序號 ' + this.lastSeq + ' 續傳，執行完整同步');
+                    this.requestSessionStatus();
+                } else if (data.resumed) {
+                    console.log('🔄 已從序號 ' + this.lastSeq + ' 續傳');
+                }
+                this.resumeRequested = false;
                 this.handleConnectionReady();
                 // 處理訊息代碼
                 if (data.messageCode && window.i18nManager) {
@@ -306,6 +402,32 @@
         }
     };
 
+    /**
+     * 追蹤訊息序號
+     */
+    WebSocketManager.prototype.trackSequence = function(data) {
+        if (data.type === 'connection_established' && data.session_id) {
+            if (!data.resumed) {
+                // 新的訊息串流：從伺服器當前序號開始計算
+                this.lastSeq = data.seq || 0;
+            }
+            this.streamSessionId = data.session_id;
+            return;
+        }
+
+        if (typeof data.seq !== 'number') {
+            return;
+        }
+
+        if (data.type === 'session_updated' && data.session_info && data.session_info.session_id) {
+            // 新會話擁有獨立的序號串流
+            this.streamSessionId = data.session_info.session_id;
+            this.lastSeq = data.seq;
+        } else if (data.seq > this.lastSeq) {
+            this.lastSeq = data.seq;
+        }
+    };
+
     /**
      * 處理連接就緒
      */
@@ -336,9 +458,17 @@
      * 發送訊息
      */
     WebSocketManager.prototype.send = function(data) {
+        if (this.isEventStreamActive()) {
+            return this.sendViaHttp(data);
+        }
+
         if (this.websocket && this.websocket.readyState === WebSocket.OPEN) {
             try {
-                this.websocket.send(JSON.stringify(data));
+                if (this.wireFormat === 'msgpack') {
+                    this.websocket.send(Utils.MsgPack.encode(data));
+                } else {
+                    this.websocket.send(JSON.stringify(data));
+                }
                 return true;
             } catch (error) {
                 console.error('發送 WebSocket 訊息失敗:', error);
@@ -350,6 +480,111 @@
         }
     };
 
+    /**
+     * SSE 模式下透過 HTTP 發送訊息
+     */
+    WebSocketManager.prototype.sendViaHttp = function(data) {
+        fetch('/api/events/message', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(data)
+        }).then(function(response) {
+            if (!response.ok) {
+                console.error('透過 HTTP 發送訊息失敗:', response.status);
+            }
+        }).catch(function(error) {
+            console.error('透過 HTTP 發送訊息失敗:', error);
+        });
+        return true;
+    };
+
+    /**
+     * SSE 回退通道是否啟用中
+     */
+    WebSocketManager.prototype.isEventStreamActive = function() {
+        return this.transport === 'sse';
+    };
+
+    /**
+     * 啟用 SSE 回退通道
+     */
+    WebSocketManager.prototype.startEventStream = function() {
+        if (this.isEventStreamActive() || typeof EventSource === 'undefined') {
+            return false;
+        }
+
+        console.log('🔄 WebSocket 無法使用，切換到 SSE 回退通道');
+        this.transport = 'sse';
+        this.stopHeartbeat();
+        if (this.websocket) {
+            this.websocket.onclose = null;
+            this.websocket.close();
+            this.websocket = null;
+        }
+
+        // 帶上最後確認的序號；之後瀏覽器自動重連時會改用 Last-Event-ID
+        let url = '/api/events';
+        this.resumeRequested = !!this.streamSessionId;
+        if (this.resumeRequested) {
+            url += '?session_id=' + encodeURIComponent(this.streamSessionId) +
+                '&last_seq=' + this.lastSeq;
+        }
+
+        const self = this;
+        this.eventSource = new EventSource(url);
+
+        this.eventSource.onopen = function() {
+            self.isConnected = true;
+            self.reconnectAttempts = 0;
+            const sseMessage = window.i18nManager ?
+                window.i18nManager.t('connectionMonitor.connectedViaSSE', '已連接（SSE 回退模式）') :
+                '已連接（SSE 回退模式）';
+            self.updateConnectionStatus('connected', sseMessage);
+        };
+
+        this.eventSource.onmessage = function(event) {
+            self.dispatchMessage(Utils.safeJsonParse(event.data, null));
+        };
+
+        this.eventSource.onerror = function() {
+            self.connectionReady = false;
+            if (self.eventSource && self.eventSource.readyState === EventSource.CLOSED) {
+                console.error('SSE 回退通道已關閉');
+                self.stopEventStream();
+                self.isConnected = false;
+                const connectionFailedMessage = window.i18nManager ? window.i18nManager.t('connectionMonitor.connectionFailed') : '連接失敗';
+                self.updateConnectionStatus('error', connectionFailedMessage);
+            } else {
+                // 瀏覽器會自動重連並帶上 Last-Event-ID
+                self.resumeRequested = !!self.streamSessionId;
+            }
+        };
+
+        // 定期探測 WebSocket 是否恢復
+        this.webSocketProbeTimer = setInterval(function() {
+            if (!self.websocket && self.networkOnline) {
+                self.connect();
+            }
+        }, this.webSocketProbeInterval);
+
+        return true;
+    };
+
+    /**
+     * 停止 SSE 回退通道
+     */
+    WebSocketManager.prototype.stopEventStream = function() {
+        if (this.webSocketProbeTimer) {
+            clearInterval(this.webSocketProbeTimer);
+            this.webSocketProbeTimer = null;
+        }
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+        this.transport = 'websocket';
+    };
+
     /**
      * 請求會話狀態
      */
@@ -607,6 +842,7 @@
      * 關閉連接
      */
     WebSocketManager.prototype.close = function() {
+        this.stopEventStream();
         this.stopHeartbeat();
         this.stopSessionTimeout();
         if (this.websocket) {
@@ -0,0 +1,139 @@
+"""
+預先回答佇列
+============
+
+AI 助手工作期間，用戶可以預先寫好下一次 interactive_feedback 呼叫的回饋。
+回饋按專案目錄排入佇列（先進先出），下一次呼叫到達時直接取出並完成會話，
+不開啟瀏覽器、也不等待用戶操作。
+
+佇列可由 Web UI（回饋已提交後再次提交）或 REST 端點 /api/answer-queue 填入。
+每個專案最多保留 MCP_ANSWER_QUEUE_MAX 筆（預設 10），超出時拒絕新的回饋。
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+
+
+DEFAULT_MAX_QUEUED_ANSWERS = 10
+
+
+def get_max_queued_answers() -> int:
+    """每個專案最多排隊的回饋數量（MCP_ANSWER_QUEUE_MAX）"""
+    try:
+        return max(
+            int(os.getenv("MCP_ANSWER_QUEUE_MAX", str(DEFAULT_MAX_QUEUED_ANSWERS))),
+            1,
+        )
+    except ValueError:
+        return DEFAULT_MAX_QUEUED_ANSWERS
+
+
+def normalize_project_key(project_directory: str) -> str:
+    """專案目錄的佇列鍵"""
+    return os.path.normcase(os.path.abspath(project_directory))
+
+
+class AnswerQueueFullError(Exception):
+    """專案的預先回答佇列已滿"""
+
+
+class AnswerQueue:
+    """按專案目錄分組的預先回答佇列（線程安全）"""
+
+    def __init__(self, max_per_project: int | None = None):
+        self.max_per_project = max_per_project or get_max_queued_answers()
+        self._queues: dict[str, deque[dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"queued": 0, "answered": 0, "removed": 0}
+
+    def enqueue(
+        self,
+        project_directory: str,
+        feedback: str,
+        images: list[dict[str, Any]] | None = None,
+        settings: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """
+        排入一筆回饋
+
+        Raises:
+            AnswerQueueFullError: 該專案的佇列已滿
+        """
+        key = normalize_project_key(project_directory)
+        entry = {
+            "id": uuid.uuid4().hex,
+            "project_directory": key,
+            "feedback": feedback,
+            "images": images or [],
+            "settings": settings or {},
+            "queued_at": int(time.time() * 1000),
+        }
+        with self._lock:
+            queue = self._queues.setdefault(key, deque())
+            if len(queue) >= self.max_per_project:
+                raise AnswerQueueFullError(
+                    f"專案 {key} 的預先回答佇列已滿（{self.max_per_project} 筆）"
+                )
+            queue.append(entry)
+            self.stats["queued"] += 1
+        debug_log(f"預先回答已排入佇列: {key}（{len(queue)} 筆）")
+        return entry
+
+    def pop(self, project_directory: str) -> dict[str, Any] | None:
+        """取出專案最早排入的回饋，佇列為空時返回 None"""
+        key = normalize_project_key(project_directory)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue:
+                return None
+            entry = queue.popleft()
+            if not queue:
+                del self._queues[key]
+            self.stats["answered"] += 1
+        return entry
+
+    def remove(self, entry_id: str) -> bool:
+        """移除指定的排隊回饋"""
+        with self._lock:
+            for key, queue in self._queues.items():
+                for entry in queue:
+                    if entry["id"] == entry_id:
+                        queue.remove(entry)
+                        if not queue:
+                            del self._queues[key]
+                        self.stats["removed"] += 1
+                        return True
+        return False
+
+    def count(self, project_directory: str) -> int:
+        with self._lock:
+            return len(self._queues.get(normalize_project_key(project_directory), ()))
+
+    def list_entries(
+        self, project_directory: str | None = None
+    ) -> list[dict[str, Any]]:
+        """列出排隊中的回饋（不含圖片數據）"""
+        with self._lock:
+            if project_directory is None:
+                entries = [entry for queue in self._queues.values() for entry in queue]
+            else:
+                key = normalize_project_key(project_directory)
+                entries = list(self._queues.get(key, ()))
+        return [summarize_entry(entry) for entry in entries]
+
+
+def summarize_entry(entry: dict[str, Any]) -> dict[str, Any]:
+    """排隊回饋的摘要"""
+    return {
+        "id": entry["id"],
+        "project_directory": entry["project_directory"],
+        "feedback": entry["feedback"],
+        "image_count": len(entry["images"]),
+        "queued_at": entry["queued_at"],
+    }
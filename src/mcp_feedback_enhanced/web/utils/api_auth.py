@@ -0,0 +1,36 @@
+"""
+程式化回饋 API 認證
+===================
+
+/api/pending-sessions、/api/sessions/{id}/feedback 與 /api/answer-queue
+讓編輯器外掛、CLI 工具或壓力測試直接提交回饋，不經由瀏覽器。
+這些端點需要 MCP_API_TOKEN 設定的權杖，
+以 Authorization: Bearer <token> 或 X-API-Token 標頭提供；
+未設定 MCP_API_TOKEN 時端點停用。
+"""
+
+import hmac
+import os
+from collections.abc import Mapping
+
+
+def get_api_token() -> str | None:
+    """程式化 API 權杖（MCP_API_TOKEN），未設定時為 None"""
+    return os.getenv("MCP_API_TOKEN", "").strip() or None
+
+
+def extract_api_token(headers: Mapping[str, str]) -> str | None:
+    """從請求標頭取出客戶端提供的權杖"""
+    authorization = headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "bearer" and credentials.strip():
+        return credentials.strip()
+    return headers.get("x-api-token") or None
+
+
+def is_api_token_valid(provided: str | None) -> bool:
+    """以固定時間比較驗證權杖"""
+    expected = get_api_token()
+    if expected is None or provided is None:
+        return False
+    return hmac.compare_digest(provided.encode("utf-8"), expected.encode("utf-8"))
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+命令工作表
+==========
+
+每個會話以工作 ID 管理多個同時執行的命令：
+
+- 同時執行的數量受 MCP_MAX_CONCURRENT_COMMANDS 限制
+- 每個工作有自己的輸出串流（命令日誌檔案）與結束狀態
+- 可單獨取消任一工作
+- 輸出由單一傳送協程以輪詢方式公平分配：每輪每個工作最多送出
+  OUTPUT_QUANTUM 行，輸出量大的工作不會餓死其他工作
+- 工作結束時以 os.wait4 收集資源用量（牆鐘時間、CPU 時間、峰值 RSS、
+  輸出位元組），隨 command_complete 送出並彙總到 ResourceManager
+- 子進程由 JobProcess 包裝，只在讀取線程回收；其他線程的 poll()/wait()
+  只讀取回收結果，取消也只送出信號並等待結束事件，避免多處同時 wait
+  時落敗的一方得到 ECHILD 與錯誤的退出碼。呼叫端不應再直接操作原本的
+  Popen，也不應把它交給 ResourceManager 輪詢（只登記 PID）
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from enum import Enum
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from .command_log import CommandLogFile
+
+
+DEFAULT_MAX_CONCURRENT_COMMANDS = 4
+
+# 每輪每個工作最多送出的行數
+OUTPUT_QUANTUM = 64
+
+# 每個工作最多暫存的未送出行數，超出時丟棄最舊的（完整內容仍在命令日誌中）
+MAX_PENDING_LINES = 5000
+
+# 取消時等待進程結束的秒數，超過則強制終止
+TERMINATE_TIMEOUT = 5
+
+
+def get_max_concurrent_commands() -> int:
+    """從環境變數 MCP_MAX_CONCURRENT_COMMANDS 讀取同時執行的命令上限"""
+    try:
+        return max(
+            int(
+                os.getenv(
+                    "MCP_MAX_CONCURRENT_COMMANDS",
+                    str(DEFAULT_MAX_CONCURRENT_COMMANDS),
+                )
+            ),
+            1,
+        )
+    except ValueError:
+        return DEFAULT_MAX_CONCURRENT_COMMANDS
+
+
+class JobStatus(Enum):
+    """命令工作狀態"""
+
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+
+
+class JobProcess:
+    """
+    命令工作的子進程
+
+    擁有底層的 Popen，並且是唯一回收子進程的一方：reap() 在讀取線程中以
+    os.wait4 回收並取得資源用量（不支援時退回 Popen.wait()），
+    poll() 與 wait() 只讀取回收結果，不會與讀取線程競爭。
+    """
+
+    def __init__(self, popen: subprocess.Popen):
+        self._popen = popen
+        self.pid = popen.pid
+        self.args = popen.args
+        self.stdout = popen.stdout
+        self.returncode: int | None = None
+        self._lock = threading.Lock()
+        self._reaped = threading.Event()
+
+    def poll(self) -> int | None:
+        return self.returncode
+
+    def wait(self, timeout: float | None = None) -> int | None:
+        if not self._reaped.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout or 0)
+        return self.returncode
+
+    def terminate(self) -> None:
+        self._signal(self._popen.terminate)
+
+    def kill(self) -> None:
+        self._signal(self._popen.kill)
+
+    def reap(self) -> tuple[int | None, Any]:
+        """
+        等待子進程結束並回收（只在讀取線程調用）
+
+        Returns:
+            tuple: (退出碼, os.wait4 的 rusage；無法取得時為 None)
+        """
+        rusage = None
+        if hasattr(os, "wait4"):
+            try:
+                _, status, rusage = os.wait4(self.pid, 0)
+                exit_code: int | None = os.waitstatus_to_exitcode(status)
+            except ChildProcessError as e:
+                # 例如記憶體壓力清理時被其他程式碼以 PID 回收
+                debug_log(f"回收命令進程 {self.pid} 失敗: {e}")
+                exit_code = None
+        else:
+            exit_code = self._popen.wait()
+
+        with self._lock:
+            self.returncode = exit_code
+            # 子進程已由這裡回收，讓底層 Popen 不再對同一 PID 調用 waitpid
+            if self._popen.returncode is None:
+                self._popen.returncode = exit_code
+        self._reaped.set()
+        return exit_code, rusage
+
+    def _signal(self, send: Callable[[], None]) -> None:
+        # 回收後 PID 可能已被重用，不再送出信號
+        with self._lock:
+            if self.returncode is None and not self._reaped.is_set():
+                send()
+
+
+class CommandJob:
+    """單一命令工作"""
+
+    def __init__(
+        self, process: subprocess.Popen, log_file: CommandLogFile, command: str
+    ):
+        self.job_id = log_file.command_id
+        self.command = command
+        self.process = JobProcess(process)
+        self.log_file = log_file
+        self.status = JobStatus.RUNNING
+        self.exit_code: int | None = None
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self._pending: deque[str] = deque()
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._reader_done = False
+        self.completion_sent = False
+        self.usage: dict[str, Any] | None = None
+        # 讀取線程回收子進程後設定
+        self.exited = threading.Event()
+
+    def push(self, line: str) -> None:
+        """由讀取線程放入一行待送出的輸出"""
+        with self._lock:
+            self._pending.append(line)
+            if len(self._pending) > MAX_PENDING_LINES:
+                self._pending.popleft()
+                self._dropped += 1
+
+    def take(self, count: int) -> tuple[list[str], int, bool]:
+        """
+        取出最多 count 行待送出的輸出
+
+        Returns:
+            tuple: (輸出行, 被丟棄的行數, 是否已讀完且全部送出)
+        """
+        with self._lock:
+            lines = [
+                self._pending.popleft() for _ in range(min(count, len(self._pending)))
+            ]
+            dropped, self._dropped = self._dropped, 0
+            finished = self._reader_done and not self._pending
+            return lines, dropped, finished
+
+    def mark_exited(self, exit_code: int | None) -> None:
+        with self._lock:
+            self.exit_code = exit_code
+            self.finished_at = time.time()
+            if self.status == JobStatus.RUNNING:
+                self.status = JobStatus.COMPLETED
+            self._reader_done = True
+        self.exited.set()
+
+    @property
+    def is_running(self) -> bool:
+        return self.status == JobStatus.RUNNING
+
+    def get_info(self) -> dict[str, Any]:
+        """工作摘要（時間戳為毫秒）"""
+        return {
+            **self.log_file.get_info(),
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "exit_code": self.exit_code,
+            "pid": self.process.pid,
+            "usage": self.usage,
+        }
+
+    def collect_usage(self, rusage: Any) -> dict[str, Any]:
+        """
+        整理工作的資源用量
+
+        Args:
+            rusage: os.wait4 返回的 resource.struct_rusage，無法取得時為 None
+        """
+        end = self.finished_at or time.time()
+        usage: dict[str, Any] = {
+            "wall_time": round(end - self.started_at, 3),
+            "cpu_user": None,
+            "cpu_system": None,
+            "peak_rss_bytes": None,
+            "output_bytes": self.log_file.size,
+            "output_lines": self.log_file.line_count,
+        }
+        if rusage is not None:
+            # ru_maxrss 在 macOS 以位元組計，其他 Unix 以 KB 計
+            rss_unit = 1 if sys.platform == "darwin" else 1024
+            usage.update(
+                {
+                    "cpu_user": round(rusage.ru_utime, 3),
+                    "cpu_system": round(rusage.ru_stime, 3),
+                    "peak_rss_bytes": rusage.ru_maxrss * rss_unit,
+                }
+            )
+        self.usage = usage
+        return usage
+
+
+class CommandJobTable:
+    """會話的命令工作表"""
+
+    def __init__(
+        self,
+        send: Callable[[dict[str, Any]], Awaitable[Any]],
+        on_output: Callable[[str], None] | None = None,
+        on_exit: Callable[[CommandJob], None] | None = None,
+        max_jobs: int | None = None,
+    ):
+        self.send = send
+        self.on_output = on_output
+        self.on_exit = on_exit
+        self.max_jobs = get_max_concurrent_commands() if max_jobs is None else max_jobs
+        self.jobs: dict[str, CommandJob] = {}
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._delivery_task: asyncio.Task | None = None
+
+    # ===== 工作管理 =====
+
+    def running_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if job.is_running)
+
+    def has_capacity(self) -> bool:
+        return self.running_count() < self.max_jobs
+
+    def start(
+        self, process: subprocess.Popen, log_file: CommandLogFile, command: str
+    ) -> CommandJob:
+        """
+        登記新工作並開始讀取輸出（需在事件循環中調用）
+
+        工作取得 process 的所有權，之後透過 job.process（JobProcess）操作。
+        """
+        job = CommandJob(process, log_file, command)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            # 命令日誌已被輪替刪除的已結束工作不再保留
+            for job_id in [
+                jid
+                for jid, existing in self.jobs.items()
+                if not existing.is_running and not existing.log_file.path.exists()
+            ]:
+                self.jobs.pop(job_id)
+
+        self._ensure_delivery()
+        threading.Thread(
+            target=self._read_output,
+            args=(job,),
+            name=f"CommandJob-{job.job_id}",
+            daemon=True,
+        ).start()
+        return job
+
+    def get(self, job_id: str) -> CommandJob | None:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """取消指定工作，返回是否有正在執行的工作被取消"""
+        job = self.jobs.get(job_id)
+        if job is None or not job.is_running:
+            return False
+        job.status = JobStatus.CANCELLED
+        _terminate(job)
+        debug_log(f"命令工作 {job_id} 已取消")
+        return True
+
+    def terminate_all(self) -> int:
+        """終止所有正在執行的工作，返回終止的數量"""
+        with self._lock:
+            running = [job for job in self.jobs.values() if job.is_running]
+        for job in running:
+            job.status = JobStatus.CANCELLED
+            _terminate(job)
+        return len(running)
+
+    def list_info(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [job.get_info() for job in self.jobs.values()]
+
+    # ===== 輸出讀取與傳送 =====
+
+    def _read_output(self, job: CommandJob) -> None:
+        """在背景線程讀取工作輸出，寫入命令日誌並排入待送出佇列"""
+        exit_code = None
+        rusage = None
+        try:
+            stdout = job.process.stdout
+            if stdout is not None:
+                for line in iter(stdout.readline, ""):
+                    job.log_file.append(line)
+                    if self.on_output:
+                        self.on_output(line.rstrip())
+                    job.push(line)
+                    self._notify()
+            exit_code, rusage = job.process.reap()
+        except Exception as e:
+            debug_log(f"讀取命令工作 {job.job_id} 輸出錯誤: {e}")
+        finally:
+            job.log_file.finish(exit_code)
+            job.mark_exited(exit_code)
+            job.collect_usage(rusage)
+            if self.on_exit:
+                try:
+                    self.on_exit(job)
+                except Exception as e:
+                    debug_log(f"命令工作結束回調執行失敗: {e}")
+            self._notify()
+
+    def _notify(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wakeup.set)
+        except RuntimeError:
+            # 事件循環已關閉（例如伺服器停止時），輸出仍已寫入命令日誌
+            pass
+
+    def _ensure_delivery(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._wakeup is None:
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+        if self._delivery_task is None or self._delivery_task.done():
+            self._delivery_task = loop.create_task(self._deliver_loop())
+
+    async def _deliver_loop(self) -> None:
+        """以輪詢方式公平地送出各工作的輸出"""
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            progressed = True
+            while progressed:
+                progressed = False
+                for job in list(self.jobs.values()):
+                    if job.completion_sent:
+                        continue
+                    lines, dropped, finished = job.take(OUTPUT_QUANTUM)
+                    if dropped:
+                        lines.insert(
+                            0,
+                            f"[... 已略過 {dropped} 行輸出，完整內容見命令日誌 ...]\n",
+                        )
+                    if lines:
+                        progressed = True
+                        await self.send(
+                            {
+                                "type": "command_output",
+                                "output": "".join(lines),
+                                "command_id": job.job_id,
+                            }
+                        )
+                    if finished and not job.completion_sent:
+                        job.completion_sent = True
+                        await self._send_complete(job)
+                # 讓出事件循環，避免大量輸出時阻塞其他請求
+                await asyncio.sleep(0)
+
+            if all(job.completion_sent for job in list(self.jobs.values())):
+                return
+
+    async def _send_complete(self, job: CommandJob) -> None:
+        await self.send(
+            {
+                "type": "command_complete",
+                "exit_code": job.exit_code,
+                "command_id": job.job_id,
+                "status": job.status.value,
+                "line_count": job.log_file.line_count,
+                "usage": job.usage,
+            }
+        )
+
+
+def _terminate(job: CommandJob) -> None:
+    """
+    送出正常終止信號，逾時再強制終止
+
+    只在調用者的線程送出信號；等待與強制終止在背景線程進行，
+    可以安全地從事件循環（例如 MCP 取消處理）中調用。
+    子進程由讀取線程回收，這裡只等待工作的結束事件。
+    """
+    try:
+        job.process.terminate()
+    except Exception as e:
+        debug_log(f"終止命令進程失敗: {e}")
+        return
+    threading.Thread(
+        target=_kill_after_timeout,
+        args=(job,),
+        name=f"CommandJobTerminate-{job.job_id}",
+        daemon=True,
+    ).start()
+
+
+def _kill_after_timeout(job: CommandJob) -> None:
+    if job.exited.wait(TERMINATE_TIMEOUT):
+        return
+    debug_log(f"命令工作 {job.job_id} 未在 {TERMINATE_TIMEOUT} 秒內結束，強制終止")
+    try:
+        job.process.kill()
+    except Exception as e:
+        debug_log(f"終止命令進程失敗: {e}")
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+命令輸出日誌檔案
+================
+
+每個會話的每次命令執行各自寫入一個日誌檔案，以大區塊緩衝寫入，
+並維護稀疏的行偏移索引（每 INDEX_INTERVAL 行記錄一次起始位置）。
+讀取一律透過 mmap，tail、範圍讀取與搜尋都只觸及需要的頁面，
+即使輸出高達數 GB，伺服器也不需要把內容載入記憶體。
+讀取只在鎖內取得已寫入內容的快照（大小、行數與 mmap），掃描在鎖外進行，
+長時間的搜尋不會阻塞命令輸出的寫入。
+"""
+
+import mmap
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+
+
+# 寫入緩衝區大小
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# 稀疏索引間隔（行）：每隔這麼多行記錄一次檔案偏移
+INDEX_INTERVAL = 256
+
+# 單次讀取或搜尋返回的最大行數
+MAX_LINES_PER_PAGE = 1000
+
+# 每個會話保留的命令日誌數量，超出時刪除最舊的
+MAX_COMMAND_LOGS_PER_SESSION = 20
+
+
+class CommandLogFile:
+    """單次命令執行的輸出日誌"""
+
+    def __init__(self, path: Path, command_id: str, command: str):
+        self.path = path
+        self.command_id = command_id
+        self.command = command
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.exit_code: int | None = None
+        self._lock = threading.RLock()
+        self._line_count = 0
+        self._size = 0
+        # 第 i 個元素為第 i * INDEX_INTERVAL 行的起始偏移
+        self._index = array("q")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 寫入檔案在命令執行期間保持開啟，於 finish() 或 delete() 關閉
+        self._writer: Any = open(  # noqa: SIM115
+            self.path, "wb", buffering=WRITE_BUFFER_SIZE
+        )
+        self._dirty = False
+
+    # ===== 寫入 =====
+
+    def append(self, line: str) -> None:
+        """追加一行輸出（結尾換行會被正規化）"""
+        data = line.rstrip("\r\n").encode("utf-8", errors="replace") + b"\n"
+        with self._lock:
+            if self._writer is None:
+                return
+            if self._line_count % INDEX_INTERVAL == 0:
+                self._index.append(self._size)
+            self._writer.write(data)
+            self._size += len(data)
+            self._line_count += 1
+            self._dirty = True
+
+    def finish(self, exit_code: int | None) -> None:
+        """標記命令結束並關閉寫入檔案"""
+        with self._lock:
+            self.exit_code = exit_code
+            self.finished_at = time.time()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._dirty = False
+
+    def delete(self) -> None:
+        """關閉並刪除日誌檔案"""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            try:
+                self.path.unlink(missing_ok=True)
+            except OSError as e:
+                debug_log(f"刪除命令日誌失敗: {e}")
+
+    # ===== 讀取 =====
+
+    @property
+    def line_count(self) -> int:
+        return self._line_count
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get_info(self) -> dict[str, Any]:
+        """命令日誌摘要（時間戳為毫秒）"""
+        return {
+            "command_id": self.command_id,
+            "command": self.command,
+            "started_at": int(self.started_at * 1000),
+            "finished_at": int(self.finished_at * 1000) if self.finished_at else None,
+            "exit_code": self.exit_code,
+            "running": self.finished_at is None,
+            "line_count": self._line_count,
+            "size": self._size,
+        }
+
+    def read_range(self, start: int, count: int) -> dict[str, Any]:
+        """讀取從第 start 行開始的 count 行"""
+        count = min(max(count, 0), MAX_LINES_PER_PAGE)
+        mm, total, _ = self._snapshot()
+        start = min(max(start, 0), total)
+        end = min(start + count, total)
+        lines: list[str] = []
+        if mm is not None:
+            with mm:
+                if start < end:
+                    pos = self._line_offset(mm, start)
+                    for _ in range(end - start):
+                        newline = mm.find(b"\n", pos)
+                        lines.append(self._decode(mm[pos:newline]))
+                        pos = newline + 1
+        return self._page(lines, start, total)
+
+    def tail(self, count: int) -> dict[str, Any]:
+        """讀取最後 count 行"""
+        count = min(max(count, 0), MAX_LINES_PER_PAGE)
+        return self.read_range(max(self._line_count - count, 0), count)
+
+    def search(
+        self,
+        pattern: str,
+        start: int = 0,
+        limit: int = 100,
+        regex: bool = False,
+        ignore_case: bool = False,
+    ) -> dict[str, Any]:
+        """
+        從第 start 行開始搜尋符合的行
+
+        Returns:
+            dict: matches 為 [{"line": 行號, "text": 內容}]，
+                  next_start 為繼續搜尋的起始行（None 表示已搜尋到結尾）
+
+        Raises:
+            ValueError: 正則表達式無效
+        """
+        limit = min(max(limit, 1), MAX_LINES_PER_PAGE)
+        flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+        source = pattern.encode("utf-8")
+        try:
+            compiled = re.compile(source if regex else re.escape(source), flags)
+        except re.error as e:
+            raise ValueError(f"無效的正則表達式: {e}") from e
+
+        matches: list[dict[str, Any]] = []
+        mm, total, size = self._snapshot()
+        start = min(max(start, 0), total)
+        next_start = None
+        if mm is not None:
+            with mm:
+                if start < total and pattern:
+                    pos = self._line_offset(mm, start)
+                    line_no = start
+                    while pos < size:
+                        match = compiled.search(mm, pos, size)
+                        if match is None:
+                            break
+                        pos, line_no = self._advance_to(mm, pos, line_no, match.start())
+                        line_end = mm.find(b"\n", match.start(), size)
+                        matches.append(
+                            {"line": line_no, "text": self._decode(mm[pos:line_end])}
+                        )
+                        # 同一行只回報一次，從下一行繼續
+                        pos = line_end + 1
+                        line_no += 1
+                        if len(matches) >= limit:
+                            next_start = line_no if line_no < total else None
+                            break
+        return {"matches": matches, "next_start": next_start, "total": total}
+
+    # ===== 內部實現 =====
+
+    def _snapshot(self) -> tuple[mmap.mmap | None, int, int]:
+        """
+        在鎖內取得已寫入內容的快照
+
+        Returns:
+            tuple: (mmap, 行數, 位元組數)，尚無內容時 mmap 為 None。
+                   mmap 只涵蓋快照當下的內容，之後追加的行不影響掃描。
+        """
+        with self._lock:
+            if self._size == 0:
+                return None, self._line_count, 0
+            if self._dirty and self._writer is not None:
+                self._writer.flush()
+                self._dirty = False
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), self._size, access=mmap.ACCESS_READ)
+            return mm, self._line_count, self._size
+
+    def _advance_to(
+        self, mm: mmap.mmap, pos: int, line_no: int, target: int
+    ) -> tuple[int, int]:
+        """
+        從行首 pos（第 line_no 行）前進到 target 所在行的行首
+
+        先以稀疏索引跳到 target 之前最近的檢查點，再在 mmap 中逐一尋找換行，
+        不複製任何內容。
+        """
+        checkpoint = bisect_right(self._index, target) - 1
+        if checkpoint * INDEX_INTERVAL > line_no:
+            pos, line_no = self._index[checkpoint], checkpoint * INDEX_INTERVAL
+        while True:
+            newline = mm.find(b"\n", pos, target)
+            if newline == -1:
+                return pos, line_no
+            pos = newline + 1
+            line_no += 1
+
+    def _line_offset(self, mm: mmap.mmap, line: int) -> int:
+        """以稀疏索引定位第 line 行的起始偏移"""
+        checkpoint = min(line // INDEX_INTERVAL, len(self._index) - 1)
+        pos = self._index[checkpoint]
+        for _ in range(line - checkpoint * INDEX_INTERVAL):
+            pos = mm.find(b"\n", pos) + 1
+        return pos
+
+    def _page(self, lines: list[str], start: int, total: int) -> dict[str, Any]:
+        end = start + len(lines)
+        return {
+            "lines": lines,
+            "start": start,
+            "total": total,
+            "next_start": end if end < total else None,
+        }
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        return data.decode("utf-8", errors="replace")
+
+
+class CommandLogRegistry:
+    """會話內的命令日誌集合，超出上限時刪除最舊的日誌檔案"""
+
+    def __init__(self, log_dir: Path, session_id: str):
+        self.log_dir = log_dir
+        self.session_id = session_id
+        self._logs: dict[str, CommandLogFile] = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def start(self, command: str) -> CommandLogFile:
+        """為新的命令執行建立日誌檔案"""
+        with self._lock:
+            self._counter += 1
+            command_id = f"cmd-{self._counter}"
+            log = CommandLogFile(
+                self.log_dir / f"{self.session_id}-{command_id}.log",
+                command_id,
+                command,
+            )
+            self._logs[command_id] = log
+            while len(self._logs) > MAX_COMMAND_LOGS_PER_SESSION:
+                oldest_id = next(iter(self._logs))
+                self._logs.pop(oldest_id).delete()
+            return log
+
+    def get(self, command_id: str) -> CommandLogFile | None:
+        return self._logs.get(command_id)
+
+    def latest(self) -> CommandLogFile | None:
+        with self._lock:
+            return next(reversed(self._logs.values()), None)
+
+    def list_info(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [log.get_info() for log in self._logs.values()]
+
+    def clear(self) -> None:
+        """刪除所有命令日誌檔案"""
+        with self._lock:
+            for log in self._logs.values():
+                log.delete()
+            self._logs.clear()
+
+
+def read_command_log(log: CommandLogFile, params: dict[str, Any]) -> dict[str, Any]:
+    """
+    依參數讀取命令日誌（HTTP 與 WebSocket 共用）
+
+    參數：
+        q / regex / ignore_case / start / limit  搜尋
+        offset / limit                           範圍讀取
+        tail（預設 200）                          最後幾行
+
+    Raises:
+        ValueError: 參數無效
+    """
+    limit = int(params.get("limit") or 200)
+    if params.get("q"):
+        result = log.search(
+            str(params["q"]),
+            start=int(params.get("start") or 0),
+            limit=limit,
+            regex=_is_true(params.get("regex")),
+            ignore_case=_is_true(params.get("ignore_case")),
+        )
+        result["mode"] = "search"
+    elif params.get("offset") not in (None, ""):
+        result = log.read_range(int(params["offset"]), limit)
+        result["mode"] = "range"
+    else:
+        result = log.tail(int(params.get("tail") or limit))
+        result["mode"] = "tail"
+    result["command"] = log.get_info()
+    return result
+
+
+def _is_true(value: Any) -> bool:
+    return value is True or str(value).lower() in ("1", "true", "yes")
@@ -137,6 +137,19 @@ class CompressionManager:
             "bytes_compressed": 0,
             "compression_ratio": 0.0,
         }
+        self._precompressed_stats = self._new_precompressed_stats()
+
+    @staticmethod
+    def _new_precompressed_stats() -> dict[str, Any]:
+        return {
+            "assets": 0,
+            "asset_bytes_original": 0,
+            "asset_bytes_by_encoding": {},
+            "requests": 0,
+            "bytes_original": 0,
+            "bytes_sent": 0,
+            "bytes_saved": 0,
+        }
 
     def update_stats(
         self, original_size: int, compressed_size: int, was_compressed: bool
@@ -157,6 +170,25 @@ class CompressionManager:
                 1 - self._stats["bytes_compressed"] / self._stats["bytes_original"]
             ) * 100
 
+    def record_precompressed_asset(
+        self, original_size: int, variant_sizes: dict[str, int]
+    ):
+        """記錄一個預先壓縮的靜態檔案（各內容編碼的大小）"""
+        stats = self._precompressed_stats
+        stats["assets"] += 1
+        stats["asset_bytes_original"] += original_size
+        by_encoding = stats["asset_bytes_by_encoding"]
+        for encoding, size in variant_sizes.items():
+            by_encoding[encoding] = by_encoding.get(encoding, 0) + size
+
+    def record_precompressed_response(self, original_size: int, sent_size: int):
+        """記錄一次以預先壓縮版本回應的請求（不經過動態壓縮）"""
+        stats = self._precompressed_stats
+        stats["requests"] += 1
+        stats["bytes_original"] += original_size
+        stats["bytes_sent"] += sent_size
+        stats["bytes_saved"] += original_size - sent_size
+
     def get_stats(self) -> dict[str, Any]:
         """獲取壓縮統計"""
         stats = self._stats.copy()
@@ -165,6 +197,11 @@ class CompressionManager:
             / max(self._stats["requests_total"], 1)
             * 100
         )
+        precompressed = dict(self._precompressed_stats)
+        precompressed["asset_bytes_by_encoding"] = dict(
+            precompressed["asset_bytes_by_encoding"]
+        )
+        stats["precompressed"] = precompressed
         return stats
 
     def reset_stats(self):
@@ -176,6 +213,7 @@ class CompressionManager:
             "bytes_compressed": 0,
             "compression_ratio": 0.0,
         }
+        self._precompressed_stats = self._new_precompressed_stats()
 
 
 # 全域壓縮管理器實例
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events 格式工具
+===========================
+
+為無法使用 WebSocket 的環境（部分企業代理、SSH 跳板）提供 SSE 事件格式化。
+事件 ID 採用「會話 ID:序號」格式，瀏覽器重連時透過 Last-Event-ID 續傳。
+"""
+
+import os
+from typing import Any
+
+from . import json_codec
+
+
+# 保活註解的發送間隔（秒），避免代理因閒置而關閉連接
+DEFAULT_KEEPALIVE_INTERVAL = 15.0
+
+# 建議瀏覽器重連前等待的時間（毫秒）
+RETRY_INTERVAL_MS = 3000
+
+
+def get_keepalive_interval() -> float:
+    """從環境變數 MCP_SSE_KEEPALIVE 讀取保活間隔"""
+    try:
+        return float(os.getenv("MCP_SSE_KEEPALIVE", str(DEFAULT_KEEPALIVE_INTERVAL)))
+    except ValueError:
+        return DEFAULT_KEEPALIVE_INTERVAL
+
+
+def build_event_id(session_id: str, seq: int) -> str:
+    """建立事件 ID"""
+    return f"{session_id}:{seq}"
+
+
+def parse_event_id(event_id: str | None) -> tuple[str | None, int | None]:
+    """
+    解析 Last-Event-ID
+
+    Returns:
+        tuple: (會話 ID, 序號)，格式無效時為 (None, None)
+    """
+    if not event_id or ":" not in event_id:
+        return None, None
+
+    session_id, _, seq = event_id.rpartition(":")
+    try:
+        return session_id, int(seq)
+    except ValueError:
+        return None, None
+
+
+def format_event(message: dict[str, Any], session_id: str | None = None) -> str:
+    """
+    將訊息格式化為 SSE 事件
+
+    帶有序號的訊息會附上事件 ID，讓瀏覽器在重連時回報最後收到的位置。
+    """
+    lines = []
+    seq = message.get("seq")
+    if session_id and isinstance(seq, int):
+        lines.append(f"id: {build_event_id(session_id, seq)}")
+    lines.append(f"data: {json_codec.dumps(message)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def format_retry(retry_ms: int = RETRY_INTERVAL_MS) -> str:
+    """格式化重連間隔指令"""
+    return f"retry: {retry_ms}\n\n"
+
+
+def format_keepalive() -> str:
+    """格式化保活註解（瀏覽器會忽略）"""
+    return ": keepalive\n\n"
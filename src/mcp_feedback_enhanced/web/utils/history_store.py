@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+會話歷史存儲
+============
+
+以 JSONL 追加日誌保存會話歷史，取代每次保存都重寫整個 session_history.json。
+
+每一行是一筆操作：
+    {"op": "put", "session": {...}}        新增或更新會話
+    {"op": "del", "session_id": "..."}     移除會話
+    {"op": "meta", "lastCleanup": 0}       更新中繼資料
+
+記憶體中維護每個會話的最新記錄，保存時只追加變更的會話；
+過期記錄與被覆蓋的舊行由 compact() 以原子替換的方式清理。
+多個 MCP 伺服器進程共用同一檔案時，讀取前會補讀其他進程追加的行，
+檔案被其他進程壓縮（inode 改變或變小）時則重新載入。
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from . import json_codec
+
+
+HISTORY_FILE_NAME = "session_history.jsonl"
+LEGACY_HISTORY_FILE_NAME = "session_history.json"
+
+# 日誌行數超過「有效記錄數 × 倍數 + 餘量」時自動壓縮
+AUTO_COMPACT_RATIO = 2
+AUTO_COMPACT_SLACK = 100
+
+
+def get_history_dir() -> Path:
+    """會話歷史所在目錄（與設定檔相同）"""
+    return Path.home() / ".config" / "mcp-feedback-enhanced"
+
+
+def get_record_time(session: dict[str, Any]) -> float:
+    """會話記錄的時間（毫秒），與前端保留期限的計算方式一致"""
+    return (
+        session.get("saved_at")
+        or session.get("completed_at")
+        or session.get("created_at")
+        or 0
+    )
+
+
+class SessionHistoryStore:
+    """追加式會話歷史存儲"""
+
+    def __init__(self, history_dir: Path | None = None):
+        history_dir = history_dir or get_history_dir()
+        self.path = history_dir / HISTORY_FILE_NAME
+        self.legacy_path = history_dir / LEGACY_HISTORY_FILE_NAME
+        self._lock = threading.RLock()
+        self._records: dict[str, dict[str, Any]] = {}
+        self._last_cleanup = 0
+        self._line_count = 0
+        # 已讀取到的檔案位置與 inode，用於偵測其他進程的追加或壓縮
+        self._offset = 0
+        self._inode: int | None = None
+        self._loaded = False
+        self._order_cache: list[str] | None = None
+
+    # ===== 讀取 =====
+
+    def read_page(
+        self, offset: int = 0, limit: int | None = None
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        按時間倒序讀取一頁會話記錄
+
+        Returns:
+            tuple: (會話記錄列表, 總數)
+        """
+        with self._lock:
+            self._refresh()
+            order = self._get_order()
+            end = None if limit is None else offset + limit
+            return [self._records[sid] for sid in order[offset:end]], len(order)
+
+    def get(self, session_id: str) -> dict[str, Any] | None:
+        """獲取單一會話記錄"""
+        with self._lock:
+            self._refresh()
+            return self._records.get(session_id)
+
+    @property
+    def last_cleanup(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._last_cleanup
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取存儲統計"""
+        with self._lock:
+            self._refresh()
+            return {
+                "records": len(self._records),
+                "log_lines": self._line_count,
+                "file_size": self._offset,
+            }
+
+    # ===== 寫入 =====
+
+    def append(
+        self,
+        sessions: list[dict[str, Any]],
+        removed: list[str] | None = None,
+        last_cleanup: int | None = None,
+    ) -> int:
+        """
+        追加會話變更
+
+        內容與現有記錄相同的會話不會重複寫入。
+
+        Args:
+            sessions: 新增或變更的會話記錄
+            removed: 要移除的會話 ID
+            last_cleanup: 前端最後清理時間
+
+        Returns:
+            int: 實際寫入的操作數
+        """
+        with self._lock:
+            self._refresh()
+            operations: list[dict[str, Any]] = []
+
+            for session in sessions:
+                session_id = session.get("session_id")
+                if session_id and self._records.get(session_id) != session:
+                    operations.append({"op": "put", "session": session})
+
+            for session_id in removed or []:
+                if session_id in self._records:
+                    operations.append({"op": "del", "session_id": session_id})
+
+            if last_cleanup is not None and last_cleanup != self._last_cleanup:
+                operations.append({"op": "meta", "lastCleanup": last_cleanup})
+
+            if operations:
+                self._write(operations)
+                self._maybe_auto_compact()
+            return len(operations)
+
+    def replace(
+        self, sessions: list[dict[str, Any]], last_cleanup: int | None = None
+    ) -> int:
+        """以完整列表取代現有記錄（舊版整批保存 API 使用），只寫入差異"""
+        with self._lock:
+            self._refresh()
+            keep = {session.get("session_id") for session in sessions}
+            removed = [sid for sid in self._records if sid not in keep]
+            return self.append(sessions, removed, last_cleanup)
+
+    def clear(self) -> None:
+        """清空全部記錄"""
+        with self._lock:
+            self._refresh()
+            self._records.clear()
+            self._last_cleanup = 0
+            self._rewrite([])
+
+    def compact(
+        self, retention_hours: float | None = None, max_sessions: int | None = None
+    ) -> int:
+        """
+        壓縮日誌：只保留每個會話的最新記錄，並套用保留期限與數量上限
+
+        Args:
+            retention_hours: 保留期限（小時），超過的會話會被移除
+            max_sessions: 最多保留的會話數量（保留最新的）
+
+        Returns:
+            int: 被移除的會話數量
+        """
+        with self._lock:
+            self._refresh()
+            order = self._get_order()
+            keep = order
+            if retention_hours is not None:
+                cutoff = time.time() * 1000 - retention_hours * 3600 * 1000
+                keep = [
+                    sid for sid in keep if get_record_time(self._records[sid]) >= cutoff
+                ]
+            if max_sessions is not None:
+                keep = keep[: max(max_sessions, 0)]
+
+            removed_count = len(order) - len(keep)
+            self._rewrite(keep)
+            debug_log(
+                f"會話歷史已壓縮：保留 {len(keep)} 個會話，移除 {removed_count} 個"
+            )
+            return removed_count
+
+    # ===== 內部實現 =====
+
+    def _rewrite(self, keep: list[str]) -> None:
+        """以指定的會話重寫日誌（寫入暫存檔後原子替換）"""
+        # 寫回時按時間正序，讓後續追加的新記錄自然排在後面
+        lines = [{"op": "put", "session": self._records[sid]} for sid in reversed(keep)]
+        if self._last_cleanup:
+            lines.append({"op": "meta", "lastCleanup": self._last_cleanup})
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".jsonl.tmp")
+        with open(temp_path, "wb") as f:
+            for line in lines:
+                f.write(json_codec.dumps_bytes(line) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+        self._records = {sid: self._records[sid] for sid in keep}
+        self._order_cache = None
+        stat = self.path.stat()
+        self._offset = stat.st_size
+        self._inode = stat.st_ino
+        self._line_count = len(lines)
+
+    def _write(self, operations: list[dict[str, Any]]) -> None:
+        """追加操作到日誌並套用到記憶體索引"""
+        data = b"".join(json_codec.dumps_bytes(op) + b"\n" for op in operations)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(data)
+            end = f.tell()
+            if self._inode is None:
+                self._inode = os.fstat(f.fileno()).st_ino
+
+        # 其他進程在上次讀取後追加的行位於本次寫入之前，先補讀再套用本次操作
+        start = end - len(data)
+        if start > self._offset:
+            self._read_from(self._offset, start)
+        for operation in operations:
+            self._apply(operation)
+        self._line_count += len(operations)
+        self._offset = end
+
+    def _apply(self, operation: dict[str, Any]) -> None:
+        op = operation.get("op")
+        if op == "put":
+            session = operation.get("session") or {}
+            session_id = session.get("session_id")
+            if session_id:
+                self._records[session_id] = session
+        elif op == "del":
+            self._records.pop(operation.get("session_id"), None)
+        elif op == "meta":
+            self._last_cleanup = operation.get("lastCleanup", 0)
+        self._order_cache = None
+
+    def _refresh(self) -> None:
+        """首次使用時載入日誌，之後只補讀新增的部分"""
+        if not self._loaded:
+            self._loaded = True
+            if not self.path.exists() and self.legacy_path.exists():
+                self._migrate_legacy()
+                return
+
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._reset()
+            return
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # 檔案被其他進程壓縮或替換，重新完整載入
+            self._reset()
+            self._inode = stat.st_ino
+
+        if stat.st_size > self._offset:
+            self._read_from(self._offset)
+
+    def _reset(self) -> None:
+        self._records = {}
+        self._last_cleanup = 0
+        self._line_count = 0
+        self._offset = 0
+        self._inode = None
+        self._order_cache = None
+
+    def _read_from(self, offset: int, end: int | None = None) -> None:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read() if end is None else f.read(end - offset)
+
+        # 只處理完整的行，寫入到一半的最後一行留待下次讀取
+        complete = data.rfind(b"\n") + 1
+        for raw_line in data[:complete].splitlines():
+            if not raw_line.strip():
+                continue
+            try:
+                self._apply(json_codec.loads(raw_line))
+                self._line_count += 1
+            except Exception as e:
+                debug_log(f"略過無法解析的會話歷史記錄: {e}")
+        self._offset = offset + complete
+
+    def _migrate_legacy(self) -> None:
+        """將舊版 session_history.json 匯入為 JSONL（保留原檔案）"""
+        try:
+            history_data = json_codec.load_file(self.legacy_path)
+        except Exception as e:
+            debug_log(f"讀取舊版會話歷史失敗: {e}")
+            return
+
+        if isinstance(history_data, dict):
+            sessions = history_data.get("sessions", [])
+            self._last_cleanup = history_data.get("lastCleanup", 0)
+        else:
+            sessions = history_data if isinstance(history_data, list) else []
+
+        for session in sessions:
+            if isinstance(session, dict) and session.get("session_id"):
+                self._records[session["session_id"]] = session
+
+        self._rewrite(self._get_order())
+        debug_log(f"已將 {len(self._records)} 個會話從舊版歷史檔案遷移到 JSONL")
+
+    def _get_order(self) -> list[str]:
+        if self._order_cache is None:
+            self._order_cache = sorted(
+                self._records,
+                key=lambda sid: get_record_time(self._records[sid]),
+                reverse=True,
+            )
+        return self._order_cache
+
+    def _maybe_auto_compact(self) -> None:
+        threshold = len(self._records) * AUTO_COMPACT_RATIO + AUTO_COMPACT_SLACK
+        if self._line_count > threshold:
+            self.compact()
+
+
+_history_stores: dict[Path, SessionHistoryStore] = {}
+_history_stores_lock = threading.Lock()
+
+
+def get_history_store() -> SessionHistoryStore:
+    """獲取目前設定目錄對應的會話歷史存儲實例"""
+    history_dir = get_history_dir()
+    with _history_stores_lock:
+        store = _history_stores.get(history_dir)
+        if store is None:
+            store = SessionHistoryStore(history_dir)
+            _history_stores[history_dir] = store
+        return store
@@ -0,0 +1,44 @@
+"""
+回饋呼叫的冪等鍵
+================
+
+MCP 客戶端逾時後常以相同參數重試 interactive_feedback。帶相同冪等鍵的呼叫
+會重新連接到仍在等待回饋（或剛被取消）的會話及其 WebSocket，而不是建立新
+會話讓頁面重新載入、丟失用戶已輸入的內容。
+
+冪等鍵可由呼叫方明確提供；未提供時由專案目錄與摘要內容推導，
+設定 MCP_IDEMPOTENT_REATTACH=false 可停用推導（明確提供的鍵仍然有效）。
+"""
+
+import hashlib
+import os
+
+
+def is_derived_key_enabled() -> bool:
+    """是否由呼叫內容推導冪等鍵（MCP_IDEMPOTENT_REATTACH，預設啟用）"""
+    return os.getenv("MCP_IDEMPOTENT_REATTACH", "true").lower() not in (
+        "false",
+        "0",
+        "no",
+        "off",
+    )
+
+
+def derive_idempotency_key(project_directory: str, summary: str) -> str:
+    """由專案目錄與摘要推導冪等鍵"""
+    digest = hashlib.sha256()
+    digest.update(os.path.normpath(project_directory).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(summary.strip().encode("utf-8"))
+    return f"auto:{digest.hexdigest()[:32]}"
+
+
+def resolve_idempotency_key(
+    explicit_key: str | None, project_directory: str, summary: str
+) -> str | None:
+    """決定呼叫使用的冪等鍵：明確提供的鍵優先，否則在啟用時推導"""
+    if explicit_key:
+        return explicit_key
+    if is_derived_key_enabled():
+        return derive_idempotency_key(project_directory, summary)
+    return None
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+JSON 編解碼器
+=============
+
+統一 WebSocket、REST 回應和設定/歷史檔案的 JSON 序列化。
+安裝 orjson 時使用 orjson，否則回退到標準庫 json。
+
+可透過環境變數 MCP_JSON_CODEC 指定編解碼器：
+- auto（預設）：有 orjson 則使用 orjson
+- orjson：強制使用 orjson（未安裝時回退到標準庫並記錄日誌）
+- json：強制使用標準庫
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from ...debug import web_debug_log as debug_log
+
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    orjson = None  # type: ignore[assignment]
+    ORJSON_AVAILABLE = False
+
+
+class StdlibJSONCodec:
+    """標準庫 json 編解碼器"""
+
+    name = "json"
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """序列化為 UTF-8 bytes（緊湊格式，與 Starlette send_json 一致）"""
+        if indent:
+            text = json.dumps(obj, ensure_ascii=False, indent=2)
+        else:
+            text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        return text.encode("utf-8")
+
+    def loads(self, data: str | bytes) -> Any:
+        """反序列化 str 或 bytes"""
+        return json.loads(data)
+
+
+class OrjsonCodec(StdlibJSONCodec):
+    """orjson 編解碼器，遇到 orjson 不支援的物件時回退到標準庫"""
+
+    name = "orjson"
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # 例如超過 64 位元的整數，交給標準庫處理
+            return super().dumps_bytes(obj, indent=indent)
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+
+_codec: StdlibJSONCodec | None = None
+
+
+def _create_codec() -> StdlibJSONCodec:
+    """根據環境變數建立編解碼器"""
+    preference = os.getenv("MCP_JSON_CODEC", "auto").lower()
+
+    if preference == "json":
+        return StdlibJSONCodec()
+
+    if ORJSON_AVAILABLE:
+        return OrjsonCodec()
+
+    if preference == "orjson":
+        debug_log("MCP_JSON_CODEC=orjson 但未安裝 orjson，回退到標準庫 json")
+    return StdlibJSONCodec()
+
+
+def get_json_codec() -> StdlibJSONCodec:
+    """獲取全域 JSON 編解碼器實例"""
+    global _codec
+    if _codec is None:
+        _codec = _create_codec()
+        debug_log(f"JSON 編解碼器: {_codec.name}")
+    return _codec
+
+
+def reset_json_codec() -> None:
+    """重置全域編解碼器（重新讀取環境變數，主要供測試使用）"""
+    global _codec
+    _codec = None
+
+
+def dumps_bytes(obj: Any, indent: bool = False) -> bytes:
+    """序列化為 UTF-8 bytes，可直接用於 send_bytes 或 HTTP 回應主體"""
+    return get_json_codec().dumps_bytes(obj, indent=indent)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """序列化為 str，用於 WebSocket send_text"""
+    return dumps_bytes(obj, indent=indent).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    """反序列化 JSON 字串或 bytes"""
+    return get_json_codec().loads(data)
+
+
+def load_file(path: str | Path) -> Any:
+    """讀取 JSON 檔案"""
+    return loads(Path(path).read_bytes())
+
+
+def dump_file(obj: Any, path: str | Path) -> None:
+    """以縮排格式寫入 JSON 檔案（保留非 ASCII 字元）"""
+    Path(path).write_bytes(dumps_bytes(obj, indent=True))
+
+
+class FastJSONResponse(JSONResponse):
+    """使用全域編解碼器序列化的 JSON 回應"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
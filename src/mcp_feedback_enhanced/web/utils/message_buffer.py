@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+訊息重放緩衝區
+==============
+
+為每個會話的出站 WebSocket 訊息分配單調遞增的序號，並保留最近的訊息，
+讓斷線重連的標籤頁可以從最後確認的序號續傳，而不必重新載入完整狀態。
+"""
+
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Any
+
+
+# 預設保留的訊息數量
+DEFAULT_REPLAY_BUFFER_SIZE = 500
+
+# 需要序號並可重放的訊息類型（連接控制類訊息如 ping、心跳不在此列）
+REPLAYABLE_MESSAGE_TYPES = frozenset(
+    {
+        "command_started",
+        "command_output",
+        "command_complete",
+        "command_error",
+        "status_update",
+        "session_updated",
+        "notification",
+        "feedback_received",
+        "desktop_close_request",
+        "session_added",
+        "session_status_changed",
+        "user_message_added",
+    }
+)
+
+
+def get_replay_buffer_size() -> int:
+    """從環境變數 MCP_WS_REPLAY_BUFFER_SIZE 讀取緩衝區大小"""
+    try:
+        size = int(
+            os.getenv("MCP_WS_REPLAY_BUFFER_SIZE", str(DEFAULT_REPLAY_BUFFER_SIZE))
+        )
+    except ValueError:
+        return DEFAULT_REPLAY_BUFFER_SIZE
+    return max(size, 0)
+
+
+class MessageReplayBuffer:
+    """有界的訊息重放環形緩衝區"""
+
+    def __init__(self, max_size: int | None = None):
+        self.max_size = get_replay_buffer_size() if max_size is None else max_size
+        self._buffer: deque[dict[str, Any]] = deque()
+        self._last_seq = 0
+        # 已被擠出緩衝區的最大序號，用於判斷客戶端是否落後太多
+        self._evicted_seq = 0
+        self._lock = threading.Lock()
+        # 即時訂閱者（例如 SSE 串流），每個訂閱者對應其事件循環和佇列
+        self._subscribers: list[
+            tuple[asyncio.AbstractEventLoop, asyncio.Queue[dict[str, Any]]]
+        ] = []
+
+    @property
+    def last_seq(self) -> int:
+        """最後分配的序號"""
+        return self._last_seq
+
+    @staticmethod
+    def is_replayable(message: dict[str, Any]) -> bool:
+        """判斷訊息是否需要序號並可重放"""
+        return message.get("type") in REPLAYABLE_MESSAGE_TYPES
+
+    def record(self, message: dict[str, Any]) -> dict[str, Any]:
+        """
+        為訊息分配序號並存入緩衝區
+
+        Args:
+            message: 要發送的訊息（會被就地加上 seq 欄位）
+
+        Returns:
+            dict: 加上序號後的訊息；不可重放的訊息原樣返回
+        """
+        if not self.is_replayable(message):
+            return message
+
+        with self._lock:
+            self._last_seq += 1
+            message["seq"] = self._last_seq
+            self._buffer.append(message)
+
+            while len(self._buffer) > self.max_size:
+                evicted = self._buffer.popleft()
+                self._evicted_seq = evicted["seq"]
+
+            subscribers = list(self._subscribers)
+
+        self._deliver(subscribers, message)
+        return message
+
+    def publish(self, message: dict[str, Any]) -> bool:
+        """
+        推送訊息給即時訂閱者
+
+        可重放的訊息與 record() 相同會分配序號並存入緩衝區；
+        其他訊息（例如請求的回覆）只推送給目前的訂閱者，不帶序號。
+
+        Returns:
+            bool: 是否有訂閱者
+        """
+        if self.is_replayable(message):
+            self.record(message)
+            return self.subscriber_count > 0
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self._deliver(subscribers, message)
+        return bool(subscribers)
+
+    def _deliver(
+        self,
+        subscribers: list[
+            tuple[asyncio.AbstractEventLoop, asyncio.Queue[dict[str, Any]]]
+        ],
+        message: dict[str, Any],
+    ) -> None:
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # 訂閱者的事件循環已關閉
+                self.unsubscribe(queue)
+
+    @property
+    def subscriber_count(self) -> int:
+        """即時訂閱者數量"""
+        return len(self._subscribers)
+
+    def subscribe(self) -> "asyncio.Queue[dict[str, Any]]":
+        """
+        訂閱之後記錄的可重放訊息（需在事件循環中調用）
+
+        Returns:
+            asyncio.Queue: 接收新訊息的佇列，不再使用時需調用 unsubscribe
+        """
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        with self._lock:
+            self._subscribers.append((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[dict[str, Any]]") -> None:
+        """取消訂閱"""
+        with self._lock:
+            self._subscribers = [
+                (loop, subscribed)
+                for loop, subscribed in self._subscribers
+                if subscribed is not queue
+            ]
+
+    def get_since(self, last_seq: int) -> list[dict[str, Any]] | None:
+        """
+        獲取序號大於 last_seq 的訊息
+
+        Args:
+            last_seq: 客戶端最後確認的序號
+
+        Returns:
+            list: 需要重放的訊息（可能為空）
+            None: 無法續傳（客戶端落後超過緩衝區範圍或序號不屬於此串流）
+        """
+        with self._lock:
+            if last_seq < self._evicted_seq or last_seq > self._last_seq:
+                return None
+            return [message for message in self._buffer if message["seq"] > last_seq]
+
+    def clear(self) -> None:
+        """清空緩衝區（保留序號計數，避免重用序號）"""
+        with self._lock:
+            self._buffer.clear()
+            self._evicted_seq = self._last_seq
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取緩衝區統計"""
+        with self._lock:
+            return {
+                "last_seq": self._last_seq,
+                "buffered": len(self._buffer),
+                "max_size": self.max_size,
+                "subscribers": len(self._subscribers),
+                "oldest_seq": self._buffer[0]["seq"] if self._buffer else None,
+            }
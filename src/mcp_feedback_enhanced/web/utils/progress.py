@@ -0,0 +1,65 @@
+"""
+等待回饋時的進度保活
+====================
+
+部分 MCP 客戶端對請求有自己的逾時限制，等待用戶回饋的時間一長就會放棄請求
+並重試。等待期間定期回報進度（已等待秒數與分頁是否連接），支援「收到進度即
+重置逾時」的客戶端便會保持請求存活，不必為了長時間等待調大 timeout。
+
+回報間隔由 MCP_PROGRESS_INTERVAL（秒，預設 15）設定，設為 0 停用。
+客戶端請求未帶 progressToken 時 FastMCP 不會發送任何通知。
+"""
+
+import asyncio
+import os
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+
+
+DEFAULT_PROGRESS_INTERVAL = 15.0
+
+ProgressCallback = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+def get_progress_interval() -> float:
+    """進度回報間隔秒數（MCP_PROGRESS_INTERVAL，0 表示停用）"""
+    try:
+        return max(
+            float(os.getenv("MCP_PROGRESS_INTERVAL", str(DEFAULT_PROGRESS_INTERVAL))),
+            0.0,
+        )
+    except ValueError:
+        return DEFAULT_PROGRESS_INTERVAL
+
+
+def build_progress_update(session: Any, started_at: float) -> dict[str, Any]:
+    """目前的等待進度"""
+    return {
+        "session_id": session.session_id,
+        "elapsed": round(time.time() - started_at, 1),
+        "tab_connected": session.websocket is not None,
+        "status": session.status.value,
+    }
+
+
+async def run_progress_keepalive(
+    session: Any, report: ProgressCallback, interval: float
+) -> None:
+    """
+    在會話等待回饋期間每隔 interval 秒回報一次進度，直到被取消
+
+    回報失敗（例如客戶端已斷開）時停止回報，不影響等待本身。
+    """
+    started_at = time.time()
+    while not session.feedback_completed.is_set():
+        await asyncio.sleep(interval)
+        if session.feedback_completed.is_set():
+            return
+        try:
+            await report(build_progress_update(session, started_at))
+        except Exception as e:
+            debug_log(f"回報等待進度失敗，停止進度保活: {e}")
+            return
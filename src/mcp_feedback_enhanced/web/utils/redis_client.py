@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+精簡 Redis 客戶端
+================
+
+只實作 RESP2 協議中會話存儲需要的部分（一般命令、管線與訂閱），
+不需要額外安裝 redis 套件，也可直接連接任何相容 Redis 協議的伺服器。
+
+連線網址格式：redis://[:password@]host[:port][/db]
+"""
+
+import select
+import socket
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+from urllib.parse import unquote, urlparse
+
+from ...debug import web_debug_log as debug_log
+
+
+DEFAULT_REDIS_URL = "redis://127.0.0.1:6379/0"
+
+# 訂閱連線斷開後的重連間隔（秒）
+RESUBSCRIBE_DELAY = 1.0
+
+# 重送不會改變資料的命令；其餘命令在送出後失敗時不自動重試，避免重複套用
+READ_ONLY_COMMANDS = frozenset(
+    {"GET", "MGET", "LLEN", "LRANGE", "ZCARD", "ZREVRANGE", "PING"}
+)
+
+
+class RedisError(Exception):
+    """Redis 伺服器返回的錯誤回覆"""
+
+
+def encode_command(*args: Any) -> bytes:
+    """將命令編碼為 RESP 陣列"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode("utf-8")
+        else:
+            data = str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def read_reply(reader: Any) -> Any:
+    """
+    從緩衝讀取器解析一個 RESP 回覆
+
+    Raises:
+        ConnectionError: 連線已關閉
+        RedisError: 伺服器返回錯誤
+    """
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("Redis 連線已關閉")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode("utf-8")
+    if prefix == b"-":
+        raise RedisError(payload.decode("utf-8"))
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length < 0:
+            return None
+        return [read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"無法解析的 Redis 回覆: {line!r}")
+
+
+class RedisClient:
+    """同步 Redis 客戶端（線程安全，送出前偵測已斷開的連線並重連）"""
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL, timeout: float = 5.0):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"不支援的 Redis 網址: {url}")
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        path = parsed.path.lstrip("/")
+        self.db = int(path) if path else 0
+        self.timeout = timeout
+        self._sock: socket.socket | None = None
+        self._reader: Any = None
+        self._lock = threading.Lock()
+
+    def execute(self, *args: Any) -> Any:
+        """執行單一命令並返回回覆"""
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: list[tuple[Any, ...]]) -> list[Any]:
+        """
+        以管線一次送出多個命令，再依序讀取回覆
+
+        送出前會先丟棄已被伺服器關閉的閒置連線。送出後才失敗時（例如讀取逾時），
+        伺服器可能已經套用命令，因此只有全部為唯讀命令時才重試一次。
+
+        Raises:
+            RedisError: 任一命令返回錯誤（其餘回覆仍會被讀取）
+            ConnectionError, OSError: 連線失敗且不能安全重試
+        """
+        if not commands:
+            return []
+        payload = b"".join(encode_command(*command) for command in commands)
+        read_only = all(
+            str(command[0]).upper() in READ_ONLY_COMMANDS for command in commands
+        )
+        with self._lock:
+            try:
+                return self._roundtrip(payload, len(commands))
+            except (ConnectionError, OSError):
+                self._disconnect()
+                if not read_only:
+                    raise
+                return self._roundtrip(payload, len(commands))
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+    def _roundtrip(self, payload: bytes, count: int) -> list[Any]:
+        self._ensure_connected()
+        assert self._sock is not None
+        self._sock.sendall(payload)
+        replies: list[Any] = []
+        error: RedisError | None = None
+        for _ in range(count):
+            try:
+                replies.append(read_reply(self._reader))
+            except RedisError as e:
+                error = error or e
+                replies.append(e)
+        if error is not None:
+            raise error
+        return replies
+
+    def _ensure_connected(self) -> None:
+        if self._sock is not None and self._is_stale():
+            # 閒置期間被伺服器關閉的連線，命令尚未送出，重連是安全的
+            self._disconnect()
+        if self._sock is not None:
+            return
+        self._sock, self._reader = open_connection(
+            self.host, self.port, self.timeout, self.password, self.db
+        )
+
+    def _is_stale(self) -> bool:
+        """閒置的連線不應有可讀資料；可讀代表已被關閉（或協議已錯位）"""
+        assert self._sock is not None
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+
+def open_connection(
+    host: str, port: int, timeout: float, password: str | None, db: int
+) -> tuple[socket.socket, Any]:
+    """建立連線並完成 AUTH 與 SELECT"""
+    sock = socket.create_connection((host, port), timeout=timeout)
+    reader = sock.makefile("rb")
+    handshake = []
+    if password:
+        handshake.append(encode_command("AUTH", password))
+    if db:
+        handshake.append(encode_command("SELECT", db))
+    if handshake:
+        sock.sendall(b"".join(handshake))
+        for _ in handshake:
+            read_reply(reader)
+    return sock, reader
+
+
+class RedisSubscriber:
+    """在背景線程訂閱頻道，收到訊息時調用回調（斷線自動重新訂閱）"""
+
+    def __init__(
+        self, client: RedisClient, channel: str, callback: Callable[[bytes], None]
+    ):
+        self.client = client
+        self.channel = channel
+        self.callback = callback
+        self._sock: socket.socket | None = None
+        self._closed = False
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="RedisSubscriber", daemon=True
+        )
+        self._thread.start()
+
+    def wait_ready(self, timeout: float = 5.0) -> bool:
+        """等待訂閱生效（測試或需要確保不遺漏訊息時使用）"""
+        return self._ready.wait(timeout)
+
+    def close(self) -> None:
+        self._closed = True
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+                self._sock.close()
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        while not self._closed:
+            try:
+                self._listen()
+            except (ConnectionError, OSError, RedisError) as e:
+                if self._closed:
+                    break
+                debug_log(f"Redis 訂閱連線中斷，稍後重試: {e}")
+                self._ready.clear()
+                time.sleep(RESUBSCRIBE_DELAY)
+
+    def _listen(self) -> None:
+        # 訂閱連線不設讀取逾時，否則閒置時會被誤判為斷線
+        sock, reader = open_connection(
+            self.client.host,
+            self.client.port,
+            self.client.timeout,
+            self.client.password,
+            self.client.db,
+        )
+        sock.settimeout(None)
+        self._sock = sock
+        try:
+            sock.sendall(encode_command("SUBSCRIBE", self.channel))
+            while not self._closed:
+                reply = read_reply(reader)
+                if not isinstance(reply, list) or len(reply) < 3:
+                    continue
+                kind = reply[0]
+                if kind == b"subscribe":
+                    self._ready.set()
+                elif kind == b"message":
+                    try:
+                        self.callback(reply[2])
+                    except Exception as e:
+                        debug_log(f"Redis 訂閱回調執行失敗: {e}")
+        finally:
+            sock.close()
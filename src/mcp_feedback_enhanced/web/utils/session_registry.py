@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+會話註冊表
+==========
+
+帶版本號的會話字典。任何新增、移除或會話內容變更都會遞增註冊表版本，
+並記錄每個會話最後變更時的版本，讓 /api/all-sessions 可以：
+
+- 以版本號產生 ETag，未變更的輪詢直接返回 304
+- 依 since= 只返回指定版本之後變更過的會話（含已移除的會話 ID）
+- 重用已排序的會話順序，避免每次請求都重新排序
+- 讓長輪詢請求等待下一次變更，而不必反覆輪詢
+
+其他節點經由會話存儲廣播的變更以 touch_remote() 記錄，
+讓 ETag 與 since= 增量也反映不在本節點記憶體中的會話。
+"""
+
+import asyncio
+import bisect
+import threading
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from ..models import WebFeedbackSession
+
+
+# 保留的已移除會話（與遠端變更）記錄數量，超出後較舊的 since= 請求需要完整同步
+MAX_REMOVED_RECORDS = 1000
+
+
+class SessionRegistry(dict[str, "WebFeedbackSession"]):
+    """帶版本號的會話字典（與原本的 dict 介面相容）"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        # 每個進程唯一的標記，避免伺服器重啟後版本號重複導致 ETag 誤判
+        self.instance_token = uuid.uuid4().hex[:8]
+        self.version = 0
+        self._lock = threading.RLock()
+        self._session_versions: dict[str, int] = {}
+        self._removed: OrderedDict[str, int] = OrderedDict()
+        # 其他節點變更過、不在本節點記憶體中的會話
+        self._remote: OrderedDict[str, int] = OrderedDict()
+        # 已移除或遠端記錄被裁剪時的最大版本，早於此版本的 since= 無法計算差異
+        self._removed_floor = 0
+        # 排序快取：(版本, 排序鍵列表, 會話 ID 列表)
+        self._order_cache: tuple[int, list[tuple[float, str]], list[str]] | None = None
+        # 等待下一次變更的長輪詢請求：(事件循環, future)
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    # ===== dict 介面覆寫 =====
+
+    def __setitem__(self, session_id: str, session: "WebFeedbackSession") -> None:
+        with self._lock:
+            super().__setitem__(session_id, session)
+            self._removed.pop(session_id, None)
+            self._touch_locked(session_id)
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            super().__delitem__(session_id)
+            self._mark_removed_locked(session_id)
+
+    def pop(self, session_id: str, *args: Any) -> Any:  # type: ignore[override]
+        with self._lock:
+            if session_id not in self:
+                return super().pop(session_id, *args)
+            session = super().pop(session_id)
+            self._mark_removed_locked(session_id)
+            return session
+
+    def clear(self) -> None:
+        with self._lock:
+            for session_id in list(self.keys()):
+                self._mark_removed_locked(session_id)
+            super().clear()
+
+    # ===== 版本管理 =====
+
+    def touch(self, session_id: str | None = None) -> int:
+        """
+        標記會話內容已變更
+
+        Args:
+            session_id: 變更的會話 ID；為 None 時只遞增註冊表版本
+                （例如活躍會話切換）
+
+        Returns:
+            int: 新的註冊表版本
+        """
+        with self._lock:
+            if session_id is not None and session_id in self:
+                return self._touch_locked(session_id)
+            return self._bump_locked()
+
+    def touch_remote(self, session_id: str | None) -> int:
+        """
+        標記其他節點的會話已變更
+
+        會話在本節點記憶體中時等同 touch()；否則記錄在遠端變更中，
+        由 changes_since() 一併返回。
+
+        Returns:
+            int: 新的註冊表版本
+        """
+        with self._lock:
+            if session_id is None or session_id in self:
+                return self.touch(session_id)
+            self._bump_locked()
+            self._remote[session_id] = self.version
+            self._remote.move_to_end(session_id)
+            while len(self._remote) > MAX_REMOVED_RECORDS:
+                _, remote_version = self._remote.popitem(last=False)
+                self._removed_floor = max(self._removed_floor, remote_version)
+            return self.version
+
+    def _bump_locked(self) -> int:
+        self.version += 1
+        waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake_waiter, waiter)
+        return self.version
+
+    def _touch_locked(self, session_id: str) -> int:
+        self._bump_locked()
+        self._session_versions[session_id] = self.version
+        return self.version
+
+    def _mark_removed_locked(self, session_id: str) -> None:
+        self._bump_locked()
+        self._session_versions.pop(session_id, None)
+        self._removed[session_id] = self.version
+        while len(self._removed) > MAX_REMOVED_RECORDS:
+            _, removed_version = self._removed.popitem(last=False)
+            self._removed_floor = max(self._removed_floor, removed_version)
+
+    @property
+    def etag(self) -> str:
+        """當前版本對應的弱 ETag"""
+        return f'W/"{self.instance_token}-{self.version}"'
+
+    def changes_since(self, version: int) -> tuple[list[str], list[str]] | None:
+        """
+        獲取指定版本之後的變更
+
+        Returns:
+            tuple: (變更過的會話 ID, 已移除的會話 ID)；變更過的會話 ID
+                包含不在記憶體中的遠端會話
+            None: 版本過舊或不屬於此註冊表，需要完整同步
+        """
+        with self._lock:
+            if version < self._removed_floor or version > self.version:
+                return None
+            changed = [
+                session_id
+                for session_id, session_version in self._session_versions.items()
+                if session_version > version
+            ]
+            changed.extend(
+                session_id
+                for session_id, remote_version in self._remote.items()
+                if remote_version > version and session_id not in self._session_versions
+            )
+            removed = [
+                session_id
+                for session_id, removed_version in self._removed.items()
+                if removed_version > version
+            ]
+            return changed, removed
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """
+        等待註冊表版本超過 version（可由任何線程的變更喚醒）
+
+        Returns:
+            bool: 版本已超過 version 時為 True，逾時為 False
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            with self._lock:
+                if self.version > version:
+                    return True
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    return False
+                await asyncio.wait_for(waiter, remaining)
+            except TimeoutError:
+                return self.version > version
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    # ===== 排序與分頁 =====
+
+    def ordered_ids(self) -> list[str]:
+        """按創建時間排序的會話 ID（最新的在前），同一版本內重用快取"""
+        return self._get_order()[1]
+
+    def _get_order(self) -> tuple[list[tuple[float, str]], list[str]]:
+        with self._lock:
+            cache = self._order_cache
+            if cache is None or cache[0] != self.version:
+                keys = sorted(
+                    (-session.created_at, session_id)
+                    for session_id, session in self.items()
+                )
+                cache = (self.version, keys, [key[1] for key in keys])
+                self._order_cache = cache
+            return cache[1], cache[2]
+
+    def page(
+        self, cursor: str | None, limit: int | None
+    ) -> tuple[list[str], str | None]:
+        """
+        獲取一頁會話 ID
+
+        Args:
+            cursor: 上一頁返回的游標，None 表示第一頁
+            limit: 每頁數量，None 表示不限
+
+        Returns:
+            tuple: (會話 ID 列表, 下一頁游標或 None)
+
+        Raises:
+            ValueError: 游標格式無效
+        """
+        keys, ordered = self._get_order()
+        start = 0
+        if cursor:
+            start = bisect.bisect_right(keys, decode_cursor(cursor))
+
+        if limit is None:
+            return ordered[start:], None
+
+        end = start + limit
+        page_ids = ordered[start:end]
+        next_cursor = None
+        if end < len(ordered) and page_ids:
+            next_cursor = encode_cursor(keys[end - 1])
+        return page_ids, next_cursor
+
+
+def _wake_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def encode_cursor(key: tuple[float, str]) -> str:
+    """將排序鍵編碼為游標（創建時間:會話 ID）"""
+    return f"{-key[0]!r}:{key[1]}"
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    """
+    解析游標
+
+    Raises:
+        ValueError: 游標格式無效
+    """
+    created_at, separator, session_id = cursor.partition(":")
+    if not separator or not session_id:
+        raise ValueError(f"無效的游標: {cursor}")
+    return -float(created_at), session_id
@@ -0,0 +1,845 @@
+#!/usr/bin/env python3
+"""
+持久化會話存儲
+==============
+
+可抽換的會話存儲後端，讓伺服器崩潰或 MCP 重啟後仍能取回會話的狀態、
+用戶消息和命令日誌，並讓多個前端節點共用會話資料。
+
+透過環境變數 MCP_SESSION_STORE 選擇後端，預設關閉：
+
+- memory：進程內存儲，主要用於測試與單節點部署
+- sqlite：SQLite（WAL 模式），單機持久化
+- redis：任何相容 Redis 協議的伺服器（MCP_SESSION_STORE_URL），多節點共用
+
+sqlite 與 redis 的寫入由背景線程以群組提交（group commit）批次寫入：
+同一批次內同一會話只保留最新快照，SQLite 一次交易提交、Redis 一次管線送出。
+
+命令輸出的完整內容在每個節點的命令日誌檔案中，存儲只保留每個會話最新的
+MCP_SESSION_STORE_MAX_LOG_LINES 行（預設 1000），供崩潰恢復與其他節點查看。
+待提交的日誌行按會話合併在有界緩衝區中，不會逐行排入寫入佇列。
+啟動時不預先載入任何會話，只在請求時才從存儲讀取（延遲恢復）。
+
+各後端同時提供會話事件的發布/訂閱，讓一個節點上的狀態變更能推送到
+連接在其他節點的 WebSocket（redis 跨節點；memory 與 sqlite 只在進程內廣播）。
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable, Iterable
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from . import json_codec
+from .redis_client import DEFAULT_REDIS_URL, RedisClient, RedisSubscriber
+
+
+DB_FILE_NAME = "sessions.db"
+
+SUPPORTED_BACKENDS = ("memory", "sqlite", "redis")
+
+# 群組提交：最多等待的時間（秒）與單批最大操作數
+DEFAULT_COMMIT_INTERVAL = 0.05
+MAX_BATCH_SIZE = 500
+
+# 啟用持久化時，記憶體中保留的已結束會話數量上限
+DEFAULT_MAX_RESIDENT_SESSIONS = 20
+
+# 每個會話在存儲中保留的命令日誌行數上限
+DEFAULT_MAX_STORED_LOG_LINES = 1000
+
+# Redis 鍵名前綴
+DEFAULT_REDIS_PREFIX = "mcp-feedback"
+
+# 只在會話詳情使用的快照欄位，列出摘要時不讀取
+SNAPSHOT_DETAIL_FIELDS = ("feedback_result", "user_messages", "user_messages_offset")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_created_at ON sessions(created_at);
+CREATE TABLE IF NOT EXISTS command_logs (
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    PRIMARY KEY (session_id, seq)
+);
+"""
+
+EventCallback = Callable[[dict[str, Any]], None]
+
+
+def summarize_snapshot(snapshot: dict[str, Any]) -> dict[str, Any]:
+    """去除 SNAPSHOT_DETAIL_FIELDS 的快照摘要"""
+    return {
+        key: value
+        for key, value in snapshot.items()
+        if key not in SNAPSHOT_DETAIL_FIELDS
+    }
+
+
+def get_session_store_backend() -> str | None:
+    """從 MCP_SESSION_STORE 讀取存儲後端，未設定或無效時返回 None"""
+    backend = os.getenv("MCP_SESSION_STORE", "").strip().lower()
+    if not backend:
+        return None
+    if backend not in SUPPORTED_BACKENDS:
+        debug_log(f"未知的會話存儲後端 {backend}，持久化已停用")
+        return None
+    return backend
+
+
+def is_session_store_enabled() -> bool:
+    """是否透過 MCP_SESSION_STORE 啟用會話存儲"""
+    return get_session_store_backend() is not None
+
+
+def get_max_resident_sessions() -> int:
+    """從環境變數 MCP_SESSION_STORE_MAX_RESIDENT 讀取常駐會話上限"""
+    try:
+        return max(
+            int(
+                os.getenv(
+                    "MCP_SESSION_STORE_MAX_RESIDENT",
+                    str(DEFAULT_MAX_RESIDENT_SESSIONS),
+                )
+            ),
+            0,
+        )
+    except ValueError:
+        return DEFAULT_MAX_RESIDENT_SESSIONS
+
+
+def get_max_stored_log_lines() -> int:
+    """從環境變數 MCP_SESSION_STORE_MAX_LOG_LINES 讀取每個會話保留的日誌行數"""
+    try:
+        return max(
+            int(
+                os.getenv(
+                    "MCP_SESSION_STORE_MAX_LOG_LINES",
+                    str(DEFAULT_MAX_STORED_LOG_LINES),
+                )
+            ),
+            1,
+        )
+    except ValueError:
+        return DEFAULT_MAX_STORED_LOG_LINES
+
+
+class SessionStore(ABC):
+    """
+    會話存儲介面
+
+    寫入方法不阻塞呼叫端；讀取方法會先等待已排入的寫入提交，
+    確保讀到自己剛寫入的資料。命令日誌每個會話只保留最新的
+    max_log_lines 行，get_logs 的位置與總數都以保留的部分計算。
+    """
+
+    backend = ""
+
+    def __init__(self, max_log_lines: int | None = None) -> None:
+        self._subscribers: list[EventCallback] = []
+        self.max_log_lines = (
+            get_max_stored_log_lines() if max_log_lines is None else max_log_lines
+        )
+
+    # ===== 寫入 =====
+
+    @abstractmethod
+    def save_snapshot(self, snapshot: dict[str, Any]) -> None:
+        """保存會話快照（需包含 session_id）"""
+
+    def append_log(self, session_id: str, line: str) -> None:
+        """追加一行命令日誌"""
+        self.append_logs(session_id, [line])
+
+    @abstractmethod
+    def append_logs(self, session_id: str, lines: Iterable[str]) -> None:
+        """追加多行命令日誌（超出 max_log_lines 時丟棄最舊的行）"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """刪除會話與其命令日誌"""
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """等待所有寫入提交完成"""
+        return True
+
+    def close(self) -> None:
+        """提交剩餘寫入並釋放連線與事件訂閱"""
+        self._subscribers.clear()
+
+    # ===== 讀取 =====
+
+    @abstractmethod
+    def load_session(self, session_id: str) -> dict[str, Any] | None:
+        """讀取會話快照"""
+
+    @abstractmethod
+    def list_sessions(
+        self, offset: int = 0, limit: int = 50, summary: bool = False
+    ) -> tuple[list[dict[str, Any]], int]:
+        """
+        按創建時間倒序列出會話快照，返回 (快照列表, 總數)
+
+        summary 為 True 時只返回摘要（不含 SNAPSHOT_DETAIL_FIELDS）。
+        """
+
+    @abstractmethod
+    def get_logs(
+        self, session_id: str, offset: int = 0, limit: int = 200
+    ) -> tuple[list[str], int]:
+        """分頁讀取命令日誌，返回 (日誌行, 總數)"""
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取存儲統計"""
+        return {"backend": self.backend}
+
+    # ===== 發布/訂閱 =====
+
+    def publish(self, payload: dict[str, Any]) -> None:
+        """發布會話事件給所有訂閱者（預設只在進程內廣播）"""
+        for callback in list(self._subscribers):
+            try:
+                callback(payload)
+            except Exception as e:
+                debug_log(f"會話事件訂閱者執行失敗: {e}")
+
+    def subscribe(self, callback: EventCallback) -> None:
+        """訂閱會話事件"""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: EventCallback) -> None:
+        """取消訂閱會話事件"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+
+def _page_info(offset: int, limit: int) -> tuple[int, int]:
+    return max(offset, 0), max(limit, 0)
+
+
+class MemorySessionStore(SessionStore):
+    """進程內會話存儲"""
+
+    backend = "memory"
+
+    def __init__(self, max_log_lines: int | None = None) -> None:
+        super().__init__(max_log_lines)
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, dict[str, Any]] = {}
+        self._logs: dict[str, deque[str]] = {}
+
+    def save_snapshot(self, snapshot: dict[str, Any]) -> None:
+        with self._lock:
+            self._snapshots[snapshot["session_id"]] = dict(snapshot)
+
+    def append_logs(self, session_id: str, lines: Iterable[str]) -> None:
+        with self._lock:
+            logs = self._logs.get(session_id)
+            if logs is None:
+                logs = self._logs[session_id] = deque(maxlen=self.max_log_lines)
+            logs.extend(lines)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._snapshots.pop(session_id, None)
+            self._logs.pop(session_id, None)
+
+    def load_session(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            snapshot = self._snapshots.get(session_id)
+            return dict(snapshot) if snapshot else None
+
+    def list_sessions(
+        self, offset: int = 0, limit: int = 50, summary: bool = False
+    ) -> tuple[list[dict[str, Any]], int]:
+        offset, limit = _page_info(offset, limit)
+        project = summarize_snapshot if summary else dict
+        with self._lock:
+            ordered = sorted(
+                self._snapshots.values(),
+                key=lambda s: s.get("created_at", 0),
+                reverse=True,
+            )
+            return [project(s) for s in ordered[offset : offset + limit]], len(ordered)
+
+    def get_logs(
+        self, session_id: str, offset: int = 0, limit: int = 200
+    ) -> tuple[list[str], int]:
+        offset, limit = _page_info(offset, limit)
+        with self._lock:
+            logs = self._logs.get(session_id) or deque()
+            return list(islice(logs, offset, offset + limit)), len(logs)
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"backend": self.backend, "sessions": len(self._snapshots)}
+
+
+class _BatchingSessionStore(SessionStore):
+    """以背景線程群組提交寫入的存儲基底"""
+
+    def __init__(
+        self,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        max_log_lines: int | None = None,
+    ):
+        super().__init__(max_log_lines)
+        self.commit_interval = commit_interval
+        self._queue: queue.Queue[tuple[str, Any] | None] = queue.Queue()
+        # 待提交的日誌行按會話合併，每個會話只在佇列中佔一個項目
+        self._log_buffers: dict[str, deque[str]] = {}
+        self._log_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Condition()
+        self._writer: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"batches": 0, "operations": 0, "coalesced": 0}
+
+    # ===== 寫入（非阻塞，交由背景線程提交） =====
+
+    def save_snapshot(self, snapshot: dict[str, Any]) -> None:
+        self._enqueue(("snapshot", snapshot))
+
+    def append_logs(self, session_id: str, lines: Iterable[str]) -> None:
+        if self._closed:
+            return
+        with self._log_lock:
+            buffer = self._log_buffers.get(session_id)
+            is_new = buffer is None
+            if buffer is None:
+                buffer = self._log_buffers[session_id] = deque(
+                    maxlen=self.max_log_lines
+                )
+            buffer.extend(lines)
+        if is_new:
+            self._enqueue(("logs", session_id))
+
+    def delete(self, session_id: str) -> None:
+        with self._log_lock:
+            self._log_buffers.pop(session_id, None)
+        self._enqueue(("delete", session_id))
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._pending_lock:
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._pending_lock.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+        super().close()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {**self.stats, "backend": self.backend, "pending": self._pending}
+
+    # ===== 後端實作 =====
+
+    @abstractmethod
+    def _open_writer(self) -> Any:
+        """在寫入線程中建立後端連線"""
+
+    def _close_writer(self, conn: Any) -> None:
+        """關閉寫入線程的後端連線"""
+
+    @abstractmethod
+    def _write_batch(
+        self,
+        conn: Any,
+        snapshots: dict[str, dict[str, Any]],
+        logs: list[tuple[str, str]],
+        deletes: list[str],
+        events: list[dict[str, Any]],
+    ) -> None:
+        """將合併後的一批操作提交到後端（events 為排入的待發布事件）"""
+
+    # ===== 內部實現 =====
+
+    def _flush_if_pending(self) -> None:
+        if self._pending > 0:
+            self.flush()
+
+    def _enqueue(self, item: tuple[str, Any]) -> None:
+        if self._closed:
+            return
+        self._ensure_writer()
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put(item)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._writer_loop,
+                    name=f"SessionStoreWriter-{self.backend}",
+                    daemon=True,
+                )
+                self._writer.start()
+
+    def _writer_loop(self) -> None:
+        conn = self._open_writer()
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.commit_interval
+            while len(batch) < MAX_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    next_item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    running = False
+                    break
+                batch.append(next_item)
+
+            try:
+                self._commit_batch(conn, batch)
+            except Exception as e:
+                debug_log(f"會話存儲批次寫入失敗: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending -= len(batch)
+                    self._pending_lock.notify_all()
+
+        self._close_writer(conn)
+
+    def _commit_batch(self, conn: Any, batch: list) -> None:
+        # 同一批次內同一會話只寫入最新快照
+        snapshots: dict[str, dict[str, Any]] = {}
+        logs: list[tuple[str, str]] = []
+        deletes: list[str] = []
+        events: list[dict[str, Any]] = []
+        log_items = 0
+
+        for kind, payload in batch:
+            if kind == "event":
+                events.append(payload)
+            elif kind == "snapshot":
+                snapshots[payload["session_id"]] = payload
+            elif kind == "logs":
+                log_items += 1
+                with self._log_lock:
+                    lines = self._log_buffers.pop(payload, None) or ()
+                logs.extend((payload, line) for line in lines)
+            elif kind == "delete":
+                snapshots.pop(payload, None)
+                logs = [log for log in logs if log[0] != payload]
+                deletes.append(payload)
+
+        self._write_batch(conn, snapshots, logs, deletes, events)
+
+        self.stats["batches"] += 1
+        self.stats["operations"] += len(batch)
+        self.stats["coalesced"] += (
+            len(batch) - len(snapshots) - log_items - len(deletes) - len(events)
+        )
+
+
+class SQLiteSessionStore(_BatchingSessionStore):
+    """SQLite 會話存儲（WAL 模式，群組提交寫入）"""
+
+    backend = "sqlite"
+
+    def __init__(
+        self,
+        db_path: Path,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        max_log_lines: int | None = None,
+    ):
+        super().__init__(commit_interval, max_log_lines)
+        self.db_path = db_path
+        self._read_conn: sqlite3.Connection | None = None
+        self._read_lock = threading.Lock()
+
+    def close(self) -> None:
+        super().close()
+        with self._read_lock:
+            if self._read_conn is not None:
+                self._read_conn.close()
+                self._read_conn = None
+
+    def load_session(self, session_id: str) -> dict[str, Any] | None:
+        self._flush_if_pending()
+        with self._read_lock:
+            row = (
+                self._get_read_conn()
+                .execute(
+                    "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+                )
+                .fetchone()
+            )
+        return json_codec.loads(row[0]) if row else None
+
+    def list_sessions(
+        self, offset: int = 0, limit: int = 50, summary: bool = False
+    ) -> tuple[list[dict[str, Any]], int]:
+        offset, limit = _page_info(offset, limit)
+        self._flush_if_pending()
+        # 摘要在 SQLite 內去除 SNAPSHOT_DETAIL_FIELDS，Python 端不解碼用戶消息
+        query = (
+            "SELECT json_remove(data, '$.feedback_result', '$.user_messages', "
+            "'$.user_messages_offset') FROM sessions "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?"
+            if summary
+            else "SELECT data FROM sessions ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        )
+        with self._read_lock:
+            conn = self._get_read_conn()
+            total = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            rows = conn.execute(query, (limit, offset)).fetchall()
+        return [json_codec.loads(row[0]) for row in rows], total
+
+    def get_logs(
+        self, session_id: str, offset: int = 0, limit: int = 200
+    ) -> tuple[list[str], int]:
+        offset, limit = _page_info(offset, limit)
+        self._flush_if_pending()
+        with self._read_lock:
+            conn = self._get_read_conn()
+            total = conn.execute(
+                "SELECT COUNT(*) FROM command_logs WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()[0]
+            rows = conn.execute(
+                "SELECT line FROM command_logs WHERE session_id = ? "
+                "ORDER BY seq LIMIT ? OFFSET ?",
+                (session_id, limit, offset),
+            ).fetchall()
+        return [row[0] for row in rows], total
+
+    def get_stats(self) -> dict[str, Any]:
+        return {**super().get_stats(), "db_path": str(self.db_path)}
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 模式下 NORMAL 只在檢查點時 fsync，崩潰時最多遺失最後一批
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SQLITE_SCHEMA)
+        return conn
+
+    def _get_read_conn(self) -> sqlite3.Connection:
+        if self._read_conn is None:
+            self._read_conn = self._connect()
+        return self._read_conn
+
+    def _open_writer(self) -> sqlite3.Connection:
+        return self._connect()
+
+    def _close_writer(self, conn: sqlite3.Connection) -> None:
+        conn.close()
+
+    def _write_batch(
+        self,
+        conn: sqlite3.Connection,
+        snapshots: dict[str, dict[str, Any]],
+        logs: list[tuple[str, str]],
+        deletes: list[str],
+        events: list[dict[str, Any]],
+    ) -> None:
+        now = time.time()
+        with conn:
+            for session_id in deletes:
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.execute(
+                    "DELETE FROM command_logs WHERE session_id = ?", (session_id,)
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions "
+                "(session_id, created_at, updated_at, status, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        session_id,
+                        snapshot.get("created_at", now),
+                        now,
+                        snapshot.get("status", ""),
+                        json_codec.dumps(snapshot),
+                    )
+                    for session_id, snapshot in snapshots.items()
+                ],
+            )
+            # 序號在同一交易內依主鍵索引遞增，重啟後仍能接續
+            conn.executemany(
+                "INSERT INTO command_logs (session_id, seq, line) VALUES (?, "
+                "(SELECT COALESCE(MAX(seq) + 1, 0) FROM command_logs "
+                "WHERE session_id = ?), ?)",
+                [(session_id, session_id, line) for session_id, line in logs],
+            )
+            # 每個會話只保留最新的 max_log_lines 行（序號連續遞增）
+            conn.executemany(
+                "DELETE FROM command_logs WHERE session_id = ? AND seq <= "
+                "(SELECT MAX(seq) FROM command_logs WHERE session_id = ?) - ?",
+                [
+                    (session_id, session_id, self.max_log_lines)
+                    for session_id in {session_id for session_id, _ in logs}
+                ],
+            )
+
+
+class RedisSessionStore(_BatchingSessionStore):
+    """
+    Redis 協議會話存儲（多節點共用，群組提交以管線送出）
+
+    鍵名配置：
+        {prefix}:session:{id}  會話快照 JSON
+        {prefix}:summary:{id}  會話摘要 JSON（不含 SNAPSHOT_DETAIL_FIELDS）
+        {prefix}:sessions      以創建時間為分數的有序集合
+        {prefix}:logs:{id}     命令日誌列表
+        {prefix}:events        會話事件頻道
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        url: str = DEFAULT_REDIS_URL,
+        prefix: str = DEFAULT_REDIS_PREFIX,
+        commit_interval: float = DEFAULT_COMMIT_INTERVAL,
+        max_log_lines: int | None = None,
+    ):
+        super().__init__(commit_interval, max_log_lines)
+        self.url = url
+        self.prefix = prefix
+        self.events_channel = f"{prefix}:events"
+        self._client = RedisClient(url)
+        self._subscriber: RedisSubscriber | None = None
+        self._subscriber_lock = threading.Lock()
+
+    def close(self) -> None:
+        super().close()
+        if self._subscriber is not None:
+            self._subscriber.close()
+            self._subscriber = None
+        self._client.close()
+
+    def load_session(self, session_id: str) -> dict[str, Any] | None:
+        self._flush_if_pending()
+        data = self._client.execute("GET", self._session_key(session_id))
+        return json_codec.loads(data) if data else None
+
+    def list_sessions(
+        self, offset: int = 0, limit: int = 50, summary: bool = False
+    ) -> tuple[list[dict[str, Any]], int]:
+        offset, limit = _page_info(offset, limit)
+        self._flush_if_pending()
+        index_key = f"{self.prefix}:sessions"
+        if limit == 0:
+            return [], self._client.execute("ZCARD", index_key)
+        total, session_ids = self._client.pipeline(
+            [
+                ("ZCARD", index_key),
+                ("ZREVRANGE", index_key, offset, offset + limit - 1),
+            ]
+        )
+        if not session_ids:
+            return [], total
+        ids = [sid.decode("utf-8") for sid in session_ids]
+        if not summary:
+            values = self._client.execute(
+                "MGET", *(self._session_key(sid) for sid in ids)
+            )
+            return [json_codec.loads(value) for value in values if value], total
+
+        values = self._client.execute("MGET", *(self._summary_key(sid) for sid in ids))
+        # 沒有摘要鍵的舊資料改讀完整快照
+        missing = [sid for sid, value in zip(ids, values, strict=True) if not value]
+        full = (
+            dict(
+                zip(
+                    missing,
+                    self._client.execute(
+                        "MGET", *(self._session_key(sid) for sid in missing)
+                    ),
+                    strict=True,
+                )
+            )
+            if missing
+            else {}
+        )
+        sessions = []
+        for sid, value in zip(ids, values, strict=True):
+            if value:
+                sessions.append(json_codec.loads(value))
+            elif full.get(sid):
+                sessions.append(summarize_snapshot(json_codec.loads(full[sid])))
+        return sessions, total
+
+    def get_logs(
+        self, session_id: str, offset: int = 0, limit: int = 200
+    ) -> tuple[list[str], int]:
+        offset, limit = _page_info(offset, limit)
+        self._flush_if_pending()
+        logs_key = self._logs_key(session_id)
+        if limit == 0:
+            return [], self._client.execute("LLEN", logs_key)
+        total, lines = self._client.pipeline(
+            [("LLEN", logs_key), ("LRANGE", logs_key, offset, offset + limit - 1)]
+        )
+        return [line.decode("utf-8") for line in lines], total
+
+    def get_stats(self) -> dict[str, Any]:
+        return {**super().get_stats(), "url": self.url, "prefix": self.prefix}
+
+    def publish(self, payload: dict[str, Any]) -> None:
+        """
+        經由 Redis 頻道發布，所有節點（包含自己）的訂閱者都會收到
+
+        發布會從事件循環上調用，因此只排入背景寫入線程，隨下一批一起送出，
+        不在呼叫端做任何網路 I/O。
+        """
+        self._enqueue(("event", payload))
+
+    def subscribe(self, callback: EventCallback) -> None:
+        super().subscribe(callback)
+        with self._subscriber_lock:
+            if self._subscriber is None:
+                self._subscriber = RedisSubscriber(
+                    self._client, self.events_channel, self._on_message
+                )
+
+    def wait_subscribed(self, timeout: float = 5.0) -> bool:
+        """等待訂閱連線生效"""
+        return self._subscriber is not None and self._subscriber.wait_ready(timeout)
+
+    def _on_message(self, data: bytes) -> None:
+        SessionStore.publish(self, json_codec.loads(data))
+
+    def _session_key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}"
+
+    def _summary_key(self, session_id: str) -> str:
+        return f"{self.prefix}:summary:{session_id}"
+
+    def _logs_key(self, session_id: str) -> str:
+        return f"{self.prefix}:logs:{session_id}"
+
+    def _open_writer(self) -> RedisClient:
+        return RedisClient(self.url)
+
+    def _close_writer(self, conn: RedisClient) -> None:
+        conn.close()
+
+    def _write_batch(
+        self,
+        conn: RedisClient,
+        snapshots: dict[str, dict[str, Any]],
+        logs: list[tuple[str, str]],
+        deletes: list[str],
+        events: list[dict[str, Any]],
+    ) -> None:
+        index_key = f"{self.prefix}:sessions"
+        commands: list[tuple[Any, ...]] = []
+        for session_id in deletes:
+            commands.append(
+                (
+                    "DEL",
+                    self._session_key(session_id),
+                    self._summary_key(session_id),
+                    self._logs_key(session_id),
+                )
+            )
+            commands.append(("ZREM", index_key, session_id))
+        for session_id, snapshot in snapshots.items():
+            commands.append(
+                ("SET", self._session_key(session_id), json_codec.dumps(snapshot))
+            )
+            commands.append(
+                (
+                    "SET",
+                    self._summary_key(session_id),
+                    json_codec.dumps(summarize_snapshot(snapshot)),
+                )
+            )
+            commands.append(
+                ("ZADD", index_key, snapshot.get("created_at", 0), session_id)
+            )
+        for session_id, line in logs:
+            commands.append(("RPUSH", self._logs_key(session_id), line))
+        # 每個會話只保留最新的 max_log_lines 行
+        for session_id in {session_id for session_id, _ in logs}:
+            commands.append(
+                ("LTRIM", self._logs_key(session_id), -self.max_log_lines, -1)
+            )
+        # 事件在同批快照之後發布，其他節點收到時已能讀到最新快照
+        for payload in events:
+            commands.append(("PUBLISH", self.events_channel, json_codec.dumps(payload)))
+        conn.pipeline(commands)
+
+
+def create_session_store(backend: str) -> SessionStore:
+    """依後端名稱與環境變數建立會話存儲"""
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "redis":
+        return RedisSessionStore(
+            os.getenv("MCP_SESSION_STORE_URL") or DEFAULT_REDIS_URL,
+            os.getenv("MCP_SESSION_STORE_PREFIX") or DEFAULT_REDIS_PREFIX,
+        )
+    if backend == "sqlite":
+        db_dir = Path(
+            os.getenv("MCP_SESSION_STORE_DIR")
+            or Path.home() / ".config" / "mcp-feedback-enhanced"
+        )
+        return SQLiteSessionStore(db_dir / DB_FILE_NAME)
+    raise ValueError(f"不支援的會話存儲後端: {backend}")
+
+
+_session_store: SessionStore | None = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore | None:
+    """獲取全域會話存儲，未啟用時返回 None"""
+    global _session_store
+    backend = get_session_store_backend()
+    if backend is None:
+        return None
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = create_session_store(backend)
+            debug_log(f"會話存儲已啟用: {_session_store.get_stats()}")
+        return _session_store
+
+
+def reset_session_store() -> None:
+    """關閉並重置全域存儲（環境變數變更後或測試使用）"""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is not None:
+            _session_store.close()
+        _session_store = None
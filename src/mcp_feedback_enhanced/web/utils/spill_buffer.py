@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+溢出到磁碟的有界環形緩衝區
+==========================
+
+以位元組計量的環形緩衝區，用於會話的命令日誌與用戶消息。記憶體中只保留
+最新的項目，超出上限的最舊項目以 JSONL 追加到每個會話的溢出檔案，
+並以稀疏偏移索引（每 OFFSET_STRIDE 行記錄一次）支援任意範圍讀取，
+讓單一會話的記憶體用量有明確上限。
+
+對外提供與 list 相容的常用介面（len、索引與切片、迭代、append、clear），
+既有程式碼不必修改；大量資料時應改用 tail() 與 read_range()。
+"""
+
+import os
+import threading
+from array import array
+from collections import deque
+from collections.abc import Iterator
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from ...debug import web_debug_log as debug_log
+from . import json_codec
+
+
+# 預設每個會話的記憶體上限（位元組）
+DEFAULT_LOG_BUFFER_BYTES = 2 * 1024 * 1024
+DEFAULT_MESSAGE_BUFFER_BYTES = 2 * 1024 * 1024
+
+# 從溢出檔案一次讀取的最大區塊
+READ_CHUNK_SIZE = 1024 * 1024
+
+# 迭代時每次讀取的項目數量
+ITER_BATCH_SIZE = 1024
+
+# 偏移索引的間隔行數：只記錄第 0、OFFSET_STRIDE、2 * OFFSET_STRIDE… 行的偏移，
+# 讀取時從最近的檢查點開始跳過多餘的行
+OFFSET_STRIDE = 64
+
+
+def _get_bytes_env(name: str, default: int) -> int:
+    try:
+        return max(int(os.getenv(name, str(default))), 0)
+    except ValueError:
+        return default
+
+
+def get_log_buffer_bytes() -> int:
+    """從環境變數 MCP_SESSION_LOG_BUFFER_BYTES 讀取命令日誌的記憶體上限"""
+    return _get_bytes_env("MCP_SESSION_LOG_BUFFER_BYTES", DEFAULT_LOG_BUFFER_BYTES)
+
+
+def get_message_buffer_bytes() -> int:
+    """從環境變數 MCP_SESSION_MESSAGE_BUFFER_BYTES 讀取用戶消息的記憶體上限"""
+    return _get_bytes_env(
+        "MCP_SESSION_MESSAGE_BUFFER_BYTES", DEFAULT_MESSAGE_BUFFER_BYTES
+    )
+
+
+class SpillRingBuffer:
+    """以位元組計量、溢出到磁碟的環形緩衝區"""
+
+    def __init__(self, spill_path: Path, max_bytes: int):
+        self.spill_path = spill_path
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        # 記憶體中的項目與其編碼大小，對應全域索引 [_spilled, _spilled + len)
+        self._memory: deque[tuple[Any, int]] = deque()
+        self._memory_bytes = 0
+        # 已溢出的項目數量與每 OFFSET_STRIDE 行一個的起始偏移
+        self._spilled = 0
+        self._offsets = array("q")
+        self._spill_size = 0
+
+    # ===== list 相容介面 =====
+
+    def append(self, item: Any) -> None:
+        """追加項目，超出記憶體上限時將最舊的項目溢出到磁碟"""
+        encoded = json_codec.dumps_bytes(item)
+        with self._lock:
+            self._memory.append((item, len(encoded)))
+            self._memory_bytes += len(encoded)
+            if self._memory_bytes > self.max_bytes:
+                self._spill_oldest()
+
+    def extend(self, items: Any) -> None:
+        for item in items:
+            self.append(item)
+
+    def clear(self) -> None:
+        """清空所有項目並刪除溢出檔案"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._spilled = 0
+            self._offsets = array("q")
+            self._spill_size = 0
+            try:
+                self.spill_path.unlink(missing_ok=True)
+            except OSError as e:
+                debug_log(f"刪除溢出檔案失敗: {e}")
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._memory)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        """逐批讀取溢出檔案再到記憶體部分，不一次載入全部項目"""
+        end = len(self)
+        offset = 0
+        while offset < end:
+            items = self.read_range(offset, min(ITER_BATCH_SIZE, end - offset))
+            if not items:
+                return
+            yield from items
+            offset += len(items)
+
+    def __getitem__(self, index: int | slice) -> Any:
+        total = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(total)
+            if step != 1:
+                return list(self)[index]
+            return self.read_range(start, max(stop - start, 0))
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError("SpillRingBuffer index out of range")
+        return self.read_range(index, 1)[0]
+
+    # ===== 範圍讀取 =====
+
+    def read_range(self, offset: int, limit: int) -> list[Any]:
+        """讀取 [offset, offset + limit) 的項目，溢出部分從磁碟讀取"""
+        with self._lock:
+            total = len(self)
+            start = max(offset, 0)
+            end = min(start + max(limit, 0), total)
+            if start >= end:
+                return []
+            result = []
+            if start < self._spilled:
+                result = self._read_spilled(start, min(end, self._spilled))
+            memory_start = max(start - self._spilled, 0)
+            memory_end = end - self._spilled
+            if memory_end > 0:
+                result.extend(
+                    item for item, _ in islice(self._memory, memory_start, memory_end)
+                )
+            return result
+
+    def tail(self, count: int) -> list[Any]:
+        """讀取最新的 count 個項目"""
+        total = len(self)
+        return self.read_range(max(total - count, 0), count)
+
+    def tail_bytes(self, max_bytes: int) -> list[Any]:
+        """讀取總大小不超過 max_bytes 的最新項目（只取記憶體中的部分）"""
+        with self._lock:
+            items: list[Any] = []
+            used = 0
+            for item, size in reversed(self._memory):
+                if used + size > max_bytes:
+                    break
+                items.append(item)
+                used += size
+            items.reverse()
+            return items
+
+    def memory_snapshot(self) -> tuple[int, list[Any]]:
+        """返回記憶體中項目的起始全域索引與項目（不讀取溢出檔案）"""
+        with self._lock:
+            return self._spilled, [item for item, _ in self._memory]
+
+    def get_stats(self) -> dict[str, Any]:
+        """獲取緩衝區統計"""
+        with self._lock:
+            return {
+                "total": len(self),
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "spilled_items": self._spilled,
+                "spill_bytes": self._spill_size,
+            }
+
+    # ===== 內部實現 =====
+
+    def _spill_oldest(self) -> None:
+        """將最舊的項目寫入溢出檔案，直到記憶體用量回到上限內"""
+        lines = []
+        while self._memory and self._memory_bytes > self.max_bytes:
+            item, size = self._memory.popleft()
+            self._memory_bytes -= size
+            lines.append(json_codec.dumps_bytes(item) + b"\n")
+
+        try:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "ab") as f:
+                f.write(b"".join(lines))
+        except OSError as e:
+            # 無法寫入磁碟時直接丟棄，仍維持記憶體上限
+            debug_log(f"寫入溢出檔案失敗，丟棄 {len(lines)} 個項目: {e}")
+            return
+
+        for line in lines:
+            if self._spilled % OFFSET_STRIDE == 0:
+                self._offsets.append(self._spill_size)
+            self._spill_size += len(line)
+            self._spilled += 1
+
+    def _read_spilled(self, start: int, end: int) -> list[Any]:
+        if start >= end:
+            return []
+        # 從 start 之前最近的檢查點讀到 end 之後最近的檢查點
+        skip = start % OFFSET_STRIDE
+        begin = self._offsets[start // OFFSET_STRIDE]
+        end_checkpoint = -(-end // OFFSET_STRIDE)
+        finish = (
+            self._offsets[end_checkpoint]
+            if end_checkpoint < len(self._offsets)
+            else self._spill_size
+        )
+        wanted = end - start
+        items: list[Any] = []
+        try:
+            with open(self.spill_path, "rb") as f:
+                f.seek(begin)
+                remaining = finish - begin
+                pending = b""
+                while remaining > 0 and len(items) < wanted:
+                    chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    lines = (pending + chunk).split(b"\n")
+                    pending = lines.pop()
+                    if skip:
+                        dropped = min(skip, len(lines))
+                        del lines[:dropped]
+                        skip -= dropped
+                    lines = lines[: wanted - len(items)]
+                    items.extend(json_codec.loads(line) for line in lines if line)
+        except OSError as e:
+            debug_log(f"讀取溢出檔案失敗: {e}")
+        return items
@@ -0,0 +1,266 @@
+"""
+記憶體靜態資源快取
+==================
+
+web/static 只有幾十個小檔案，逐次請求都從磁碟讀取並重新計算快取標頭並不划算。
+啟動時把整個靜態目錄載入記憶體，並預先計算強 ETag、Content-Type 與完整的
+回應標頭；條件請求（If-None-Match）直接返回 304，不做任何磁碟 I/O。
+
+可壓縮的檔案在背景線程中以最高等級預先壓縮為 gzip 與 brotli（需安裝 brotli）
+版本，依 Accept-Encoding 直接提供，GZipMiddleware 不再逐次重新壓縮。
+每個版本有各自的強 ETag，並附帶 Vary: Accept-Encoding。
+
+超過 MCP_STATIC_CACHE_MAX_FILE（bytes，預設 1 MiB）的檔案、Range 請求與
+快取外的路徑交由 StaticFiles 從磁碟提供。開發時可設定 MCP_STATIC_CACHE=false
+停用快取，讓修改後的檔案立即生效。
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from pathlib import Path
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from ...debug import web_debug_log as debug_log
+from .compression_config import CompressionManager, get_compression_manager
+
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    brotli = None  # type: ignore[assignment]
+    BROTLI_AVAILABLE = False
+
+
+DEFAULT_MAX_CACHED_FILE_SIZE = 1024 * 1024
+
+
+def is_static_cache_enabled() -> bool:
+    """是否啟用記憶體靜態資源快取（MCP_STATIC_CACHE，預設 true）"""
+    return os.getenv("MCP_STATIC_CACHE", "true").lower() not in ("false", "0", "no")
+
+
+def get_max_cached_file_size() -> int:
+    """單一檔案的快取大小上限（MCP_STATIC_CACHE_MAX_FILE）"""
+    try:
+        return int(
+            os.getenv("MCP_STATIC_CACHE_MAX_FILE", str(DEFAULT_MAX_CACHED_FILE_SIZE))
+        )
+    except ValueError:
+        return DEFAULT_MAX_CACHED_FILE_SIZE
+
+
+@dataclass
+class StaticAsset:
+    """載入記憶體的靜態檔案與預先計算的回應標頭"""
+
+    body: bytes
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+    not_modified_headers: dict[str, str] = field(default_factory=dict)
+    # 預先壓縮的版本：內容編碼 → 壓縮後的資源
+    variants: dict[str, "StaticAsset"] = field(default_factory=dict)
+
+
+def guess_content_type(path: Path) -> str:
+    """與 StaticFiles 相同的 Content-Type（文字類型附加 UTF-8 編碼）"""
+    content_type = mimetypes.guess_type(path.name)[0] or "text/plain"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def load_static_asset(path: Path, cache_control: str) -> StaticAsset:
+    """讀取檔案並預先計算強 ETag 與回應標頭"""
+    body = path.read_bytes()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    not_modified_headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "last-modified": formatdate(path.stat().st_mtime, usegmt=True),
+    }
+    headers = {
+        **not_modified_headers,
+        "content-type": guess_content_type(path),
+        "content-length": str(len(body)),
+        "accept-ranges": "bytes",
+    }
+    return StaticAsset(body, etag, headers, not_modified_headers)
+
+
+def compress_variants(data: bytes) -> dict[str, bytes]:
+    """以最高等級壓縮，只保留比原始內容小的版本（brotli 優先）"""
+    variants = {}
+    if BROTLI_AVAILABLE:
+        variants["br"] = brotli.compress(data, quality=11)
+    variants["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+    return {
+        encoding: body for encoding, body in variants.items() if len(body) < len(data)
+    }
+
+
+def with_variants(asset: StaticAsset, variants: dict[str, bytes]) -> StaticAsset:
+    """建立附帶預先壓縮版本的資源（每個版本有各自的 ETag 與標頭）"""
+    vary = {"vary": "Accept-Encoding"}
+    compressed = {}
+    for encoding, body in variants.items():
+        etag = f'{asset.etag[:-1]}-{encoding}"'
+        not_modified_headers = {**asset.not_modified_headers, "etag": etag, **vary}
+        headers = {
+            **asset.headers,
+            **not_modified_headers,
+            "content-encoding": encoding,
+            "content-length": str(len(body)),
+        }
+        compressed[encoding] = StaticAsset(body, etag, headers, not_modified_headers)
+    return StaticAsset(
+        asset.body,
+        asset.etag,
+        {**asset.headers, **vary},
+        {**asset.not_modified_headers, **vary},
+        compressed,
+    )
+
+
+def select_encoding(
+    accept_encoding: str | None, available: dict[str, Any]
+) -> str | None:
+    """依 Accept-Encoding（含 q 值）選擇預先壓縮的版本，同分時依 available 的順序"""
+    if not accept_encoding or not available:
+        return None
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        weights[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """If-None-Match 是否包含指定的 ETag（弱比較，RFC 9110 13.1.2）"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in header.split(",")
+    )
+
+
+class CachedStaticFiles(StaticFiles):
+    """從記憶體提供靜態檔案的 StaticFiles"""
+
+    def __init__(
+        self,
+        *,
+        directory: str | Path,
+        cache_max_age: int,
+        compression_manager: CompressionManager | None = None,
+    ):
+        super().__init__(directory=directory)
+        self.assets: dict[str, StaticAsset] = {}
+        self.stats: dict[str, Any] = {
+            "hits": 0,
+            "not_modified": 0,
+            "misses": 0,
+            "cached_bytes": 0,
+        }
+        self.compression_manager = compression_manager or get_compression_manager()
+        self._load(Path(directory), f"public, max-age={cache_max_age}")
+
+        # 預先壓縮在背景進行（brotli 最高等級較慢），完成前由 GZipMiddleware 動態壓縮
+        self.precompressed = threading.Event()
+        threading.Thread(
+            target=self._precompress, name="static-precompress", daemon=True
+        ).start()
+
+    def _load(self, root: Path, cache_control: str) -> None:
+        max_size = get_max_cached_file_size()
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or path.stat().st_size > max_size:
+                continue
+            # 與 StaticFiles.get_path 相同的鍵（作業系統路徑分隔符）
+            key = os.path.normpath(path.relative_to(root))
+            asset = load_static_asset(path, cache_control)
+            self.assets[key] = asset
+            self.stats["cached_bytes"] += len(asset.body)
+        debug_log(
+            f"已載入 {len(self.assets)} 個靜態檔案到記憶體"
+            f"（{self.stats['cached_bytes']} bytes）"
+        )
+
+    def _precompress(self) -> None:
+        config = self.compression_manager.config
+        try:
+            for key, asset in list(self.assets.items()):
+                content_type = asset.headers["content-type"]
+                if not config.should_compress(content_type, len(asset.body)):
+                    continue
+                variants = compress_variants(asset.body)
+                if not variants:
+                    continue
+                self.assets[key] = with_variants(asset, variants)
+                self.compression_manager.record_precompressed_asset(
+                    len(asset.body),
+                    {encoding: len(body) for encoding, body in variants.items()},
+                )
+            debug_log(
+                f"靜態檔案預先壓縮完成（brotli: {'可用' if BROTLI_AVAILABLE else '未安裝'}）"
+            )
+        except Exception as e:
+            debug_log(f"靜態檔案預先壓縮失敗，改由 GZipMiddleware 動態壓縮: {e}")
+        finally:
+            self.precompressed.set()
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        asset = self.assets.get(path)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            self.stats["misses"] += 1
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        if "range" in request_headers:
+            self.stats["misses"] += 1
+            return await super().get_response(path, scope)
+
+        original_size = len(asset.body)
+        encoding = select_encoding(
+            request_headers.get("accept-encoding"), asset.variants
+        )
+        if encoding is not None:
+            asset = asset.variants[encoding]
+
+        if if_none_match(request_headers.get("if-none-match"), asset.etag):
+            self.stats["not_modified"] += 1
+            return Response(status_code=304, headers=asset.not_modified_headers)
+
+        self.stats["hits"] += 1
+        if encoding is not None:
+            self.compression_manager.record_precompressed_response(
+                original_size, len(asset.body)
+            )
+        body = b"" if scope["method"] == "HEAD" else asset.body
+        return Response(body, headers=asset.headers)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+WebSocket 傳輸格式協商
+======================
+
+透過 WebSocket 子協議協商訊息編碼：
+- mcp-feedback.msgpack：MessagePack 二進位幀（需安裝 msgpack）
+- mcp-feedback.json：JSON 文字幀
+- 未提供子協議的舊客戶端：JSON 文字幀
+
+permessage-deflate 壓縮由 uvicorn 在握手時協商，可透過環境變數
+MCP_WS_DEFLATE=false 關閉；MCP_WS_MSGPACK=false 可停用 MessagePack。
+"""
+
+import os
+from typing import Any
+
+from fastapi import WebSocketDisconnect
+
+from . import json_codec
+
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:  # pragma: no cover - 依安裝環境而定
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+
+WIRE_FORMAT_JSON = "json"
+WIRE_FORMAT_MSGPACK = "msgpack"
+
+JSON_SUBPROTOCOL = "mcp-feedback.json"
+MSGPACK_SUBPROTOCOL = "mcp-feedback.msgpack"
+
+# 協商結果存放在 ASGI scope 中，隨連接一起釋放
+_SCOPE_KEY = "mcp_feedback.wire_format"
+
+
+def _env_enabled(name: str, default: bool = True) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() not in ("0", "false", "no", "off")
+
+
+def is_deflate_enabled() -> bool:
+    """是否啟用 permessage-deflate（環境變數 MCP_WS_DEFLATE）"""
+    return _env_enabled("MCP_WS_DEFLATE")
+
+
+def is_msgpack_enabled() -> bool:
+    """是否可使用 MessagePack（需安裝 msgpack 且未被 MCP_WS_MSGPACK 停用）"""
+    return MSGPACK_AVAILABLE and _env_enabled("MCP_WS_MSGPACK")
+
+
+def negotiate_wire_format(websocket: Any) -> tuple[str, str | None]:
+    """
+    根據客戶端提供的子協議選擇傳輸格式
+
+    Returns:
+        tuple: (傳輸格式, 要回應的子協議；舊客戶端為 None)
+    """
+    offered = websocket.scope.get("subprotocols") or []
+
+    if MSGPACK_SUBPROTOCOL in offered and is_msgpack_enabled():
+        return WIRE_FORMAT_MSGPACK, MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in offered:
+        return WIRE_FORMAT_JSON, JSON_SUBPROTOCOL
+    return WIRE_FORMAT_JSON, None
+
+
+def is_deflate_offered(websocket: Any) -> bool:
+    """客戶端是否在握手中提供 permessage-deflate 擴展"""
+    extensions = websocket.headers.get("sec-websocket-extensions", "")
+    return is_deflate_enabled() and "permessage-deflate" in extensions
+
+
+async def accept(websocket: Any) -> str:
+    """接受 WebSocket 連接並記錄協商的傳輸格式"""
+    wire_format, subprotocol = negotiate_wire_format(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    websocket.scope[_SCOPE_KEY] = wire_format
+    return wire_format
+
+
+def get_wire_format(websocket: Any) -> str:
+    """獲取連接的傳輸格式（未協商的連接使用 JSON）"""
+    scope = getattr(websocket, "scope", None)
+    if isinstance(scope, dict):
+        return str(scope.get(_SCOPE_KEY, WIRE_FORMAT_JSON))
+    return WIRE_FORMAT_JSON
+
+
+def encode_message(message: Any, wire_format: str) -> bytes:
+    """依傳輸格式編碼訊息"""
+    if wire_format == WIRE_FORMAT_MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    return json_codec.dumps_bytes(message)
+
+
+def decode_message(data: str | bytes) -> Any:
+    """解碼收到的訊息：文字幀為 JSON，二進位幀為 MessagePack"""
+    if isinstance(data, bytes):
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("收到 MessagePack 幀但未安裝 msgpack")
+        return msgpack.unpackb(data, raw=False)
+    return json_codec.loads(data)
+
+
+async def send_message(websocket: Any, message: Any) -> None:
+    """依連接協商的格式發送訊息"""
+    wire_format = get_wire_format(websocket)
+    if wire_format == WIRE_FORMAT_MSGPACK:
+        await websocket.send_bytes(encode_message(message, wire_format))
+    else:
+        await websocket.send_text(json_codec.dumps(message))
+
+
+async def receive_message(websocket: Any) -> Any:
+    """接收並解碼一則訊息，連接斷開時拋出 WebSocketDisconnect"""
+    event = await websocket.receive()
+    if event["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(event.get("code", 1000), event.get("reason"))
+
+    data = event.get("bytes")
+    if data is None:
+        data = event.get("text", "")
+    return decode_message(data)
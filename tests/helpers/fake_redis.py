@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+本地假 Redis 伺服器
+
+以 RESP2 協議實作會話存儲用到的命令子集，讓 Redis 後端不依賴真實 Redis 即可測試。
+"""
+
+import socketserver
+import threading
+from typing import Any
+
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, Exception):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, str) and value == "OK":
+        return b"+OK\r\n"
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+    if isinstance(value, str):
+        value = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _read_command(reader) -> list[bytes] | None:
+    line = reader.readline()
+    if not line:
+        return None
+    count = int(line[1:-2])
+    args = []
+    for _ in range(count):
+        length = int(reader.readline()[1:-2])
+        args.append(reader.read(length + 2)[:-2])
+    return args
+
+
+class FakeRedisServer:
+    """在背景線程運行的假 Redis 伺服器"""
+
+    def __init__(self):
+        self.strings: dict[bytes, bytes] = {}
+        self.lists: dict[bytes, list[bytes]] = {}
+        self.zsets: dict[bytes, dict[bytes, float]] = {}
+        self.subscribers: dict[bytes, list[Any]] = {}
+        self.lock = threading.RLock()
+        self.command_count = 0
+        # 設為 True 時，下一個命令套用後不回覆並關閉連線（模擬讀取逾時或斷線）
+        self.drop_next_reply = False
+        self.handlers: list[Any] = []
+
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake.handlers.append(self)
+                while True:
+                    try:
+                        args = _read_command(self.rfile)
+                    except (OSError, ValueError):
+                        return
+                    if args is None:
+                        return
+                    reply = fake.execute(args, self)
+                    if fake.drop_next_reply:
+                        fake.drop_next_reply = False
+                        return
+                    try:
+                        self.wfile.write(reply)
+                        self.wfile.flush()
+                    except OSError:
+                        return
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        self.url = f"redis://127.0.0.1:{self.port}/0"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> "FakeRedisServer":
+        self.thread.start()
+        return self
+
+    def disconnect_all(self) -> None:
+        """關閉所有客戶端連線（模擬伺服器關閉閒置連線）"""
+        for handler in list(self.handlers):
+            try:
+                handler.connection.shutdown(2)
+            except OSError:
+                pass
+        self.handlers.clear()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def execute(self, args: list[bytes], handler) -> bytes:
+        name = args[0].upper().decode()
+        params = args[1:]
+        with self.lock:
+            self.command_count += 1
+            if name == "SUBSCRIBE":
+                for channel in params:
+                    self.subscribers.setdefault(channel, []).append(handler)
+                return b"".join(
+                    _encode([b"subscribe", channel, i + 1])
+                    for i, channel in enumerate(params)
+                )
+            try:
+                return _encode(getattr(self, f"cmd_{name.lower()}")(*params))
+            except AttributeError:
+                return _encode(Exception(f"unknown command '{name}'"))
+
+    # ===== 命令 =====
+
+    def cmd_ping(self):
+        return "OK"
+
+    def cmd_select(self, db):
+        return "OK"
+
+    def cmd_get(self, key):
+        return self.strings.get(key)
+
+    def cmd_set(self, key, value):
+        self.strings[key] = value
+        return "OK"
+
+    def cmd_mget(self, *keys):
+        return [self.strings.get(key) for key in keys]
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            for store in (self.strings, self.lists, self.zsets):
+                if store.pop(key, None) is not None:
+                    removed += 1
+        return removed
+
+    def cmd_rpush(self, key, *values):
+        items = self.lists.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def cmd_llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def cmd_lrange(self, key, start, stop):
+        items = self.lists.get(key, [])
+        stop = int(stop)
+        return items[int(start) : None if stop == -1 else stop + 1]
+
+    def cmd_ltrim(self, key, start, stop):
+        items = self.lists.get(key, [])
+        start, stop = int(start), int(stop)
+        if start < 0:
+            start = max(len(items) + start, 0)
+        self.lists[key] = items[start : None if stop == -1 else stop + 1]
+        return "OK"
+
+    def cmd_zadd(self, key, score, member):
+        zset = self.zsets.setdefault(key, {})
+        added = member not in zset
+        zset[member] = float(score)
+        return int(added)
+
+    def cmd_zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def cmd_zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def cmd_zrevrange(self, key, start, stop):
+        zset = self.zsets.get(key, {})
+        ordered = sorted(zset, key=lambda m: (zset[m], m), reverse=True)
+        stop = int(stop)
+        return ordered[int(start) : None if stop == -1 else stop + 1]
+
+    def cmd_publish(self, channel, message):
+        receivers = self.subscribers.get(channel, [])
+        for handler in list(receivers):
+            try:
+                handler.wfile.write(_encode([b"message", channel, message]))
+                handler.wfile.flush()
+            except OSError:
+                receivers.remove(handler)
+        return len(receivers)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+預先回答佇列測試
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web import main as web_main
+from mcp_feedback_enhanced.web.models import SessionStatus
+from mcp_feedback_enhanced.web.utils.answer_queue import (
+    AnswerQueue,
+    AnswerQueueFullError,
+)
+
+
+API_TOKEN = "test-token"  # noqa: S105
+HEADERS = {"Authorization": f"Bearer {API_TOKEN}"}
+
+
+class TestAnswerQueue:
+    """AnswerQueue 測試"""
+
+    def test_fifo_per_project(self, tmp_path):
+        """測試同一專案先進先出，不同專案互不影響"""
+        queue = AnswerQueue()
+        queue.enqueue(str(tmp_path / "a"), "第一")
+        queue.enqueue(str(tmp_path / "b"), "其他專案")
+        queue.enqueue(str(tmp_path / "a" / "."), "第二")
+
+        assert queue.count(str(tmp_path / "a")) == 2
+        assert queue.pop(str(tmp_path / "a"))["feedback"] == "第一"
+        assert queue.pop(str(tmp_path / "a"))["feedback"] == "第二"
+        assert queue.pop(str(tmp_path / "a")) is None
+        assert queue.count(str(tmp_path / "b")) == 1
+
+    def test_limit_and_remove(self, tmp_path):
+        """測試佇列上限與移除指定回饋"""
+        queue = AnswerQueue(max_per_project=1)
+        entry = queue.enqueue(str(tmp_path), "唯一", images=[{"name": "a.png"}])
+        with pytest.raises(AnswerQueueFullError):
+            queue.enqueue(str(tmp_path), "太多")
+
+        listed = queue.list_entries(str(tmp_path))
+        assert listed[0]["image_count"] == 1
+        assert "images" not in listed[0]
+
+        assert queue.remove(entry["id"])
+        assert not queue.remove(entry["id"])
+        assert queue.list_entries() == []
+
+
+class TestAnswerAhead:
+    """預先回答流程測試"""
+
+    @pytest.mark.asyncio
+    async def test_call_is_answered_from_queue(
+        self, web_ui_manager, test_project_dir, monkeypatch
+    ):
+        """測試呼叫到達時直接使用排隊的回饋，不啟動伺服器"""
+        monkeypatch.setattr(web_main, "_web_ui_manager", web_ui_manager)
+        web_ui_manager.answer_queue.enqueue(str(test_project_dir), "繼續下一步")
+
+        result = await web_main.launch_web_feedback_ui(
+            str(test_project_dir), "完成了第一步", timeout=60
+        )
+
+        assert result["interactive_feedback"] == "繼續下一步"
+        assert web_ui_manager.server_thread is None
+        session = web_ui_manager.get_session(result["session_id"])
+        assert session.feedback_completed.is_set()
+        assert session.status != SessionStatus.WAITING
+        assert web_ui_manager.answer_queue.count(str(test_project_dir)) == 0
+
+    def test_rest_endpoints(self, web_ui_manager, test_project_dir, monkeypatch):
+        """測試透過 REST 端點排入、列出與移除回饋"""
+        monkeypatch.setenv("MCP_API_TOKEN", API_TOKEN)
+        client = TestClient(web_ui_manager.app, headers=HEADERS)
+
+        response = client.post(
+            "/api/answer-queue",
+            json={"project_directory": str(test_project_dir), "feedback": "好"},
+        )
+        assert response.status_code == 200
+        answer_id = response.json()["answer"]["id"]
+        assert response.json()["queued"] == 1
+
+        listed = client.get(
+            "/api/answer-queue", params={"project_directory": str(test_project_dir)}
+        ).json()
+        assert [a["feedback"] for a in listed["answers"]] == ["好"]
+
+        assert client.delete(f"/api/answer-queue/{answer_id}").status_code == 200
+        assert client.delete(f"/api/answer-queue/{answer_id}").status_code == 404
+        assert (
+            client.post("/api/answer-queue", json={"feedback": "x"}).status_code == 400
+        )
+
+    def test_rest_endpoints_require_token(
+        self, web_ui_manager, test_project_dir, monkeypatch
+    ):
+        """測試 REST 端點需要 API 權杖，未設定 MCP_API_TOKEN 時停用"""
+        client = TestClient(web_ui_manager.app)
+        body = {"project_directory": str(test_project_dir), "feedback": "好"}
+
+        monkeypatch.delenv("MCP_API_TOKEN", raising=False)
+        assert client.post("/api/answer-queue", json=body).status_code == 403
+
+        monkeypatch.setenv("MCP_API_TOKEN", API_TOKEN)
+        assert client.post("/api/answer-queue", json=body).status_code == 401
+        assert client.get("/api/answer-queue").status_code == 401
+        assert client.delete("/api/answer-queue/missing").status_code == 401
+        assert web_ui_manager.answer_queue.count(str(test_project_dir)) == 0
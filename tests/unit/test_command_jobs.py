@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+命令工作表測試
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from mcp_feedback_enhanced.web.utils import command_jobs
+from mcp_feedback_enhanced.web.utils.command_jobs import CommandJobTable, JobStatus
+from mcp_feedback_enhanced.web.utils.command_log import CommandLogRegistry
+
+
+def spawn(code: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    )
+
+
+class Recorder:
+    """收集工作表送出的訊息"""
+
+    def __init__(self):
+        self.messages: list[dict] = []
+        self.completed = asyncio.Event()
+        self.expected = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def send(self, message: dict) -> bool:
+        await self.release.wait()
+        self.messages.append(message)
+        if message["type"] == "command_complete":
+            self.expected -= 1
+            if self.expected <= 0:
+                self.completed.set()
+        return True
+
+    def of_type(self, message_type: str) -> list[dict]:
+        return [m for m in self.messages if m["type"] == message_type]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = CommandLogRegistry(tmp_path, "session")
+    yield registry
+    registry.clear()
+
+
+class TestCommandJobTable:
+    """CommandJobTable 測試"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_jobs_have_own_output_and_exit(self, registry):
+        """測試多個命令同時執行，各自有輸出與結束狀態"""
+        recorder = Recorder()
+        recorder.expected = 2
+        table = CommandJobTable(recorder.send, max_jobs=2)
+
+        first = table.start(
+            spawn("print('a\\n' * 3, end='')"), registry.start("a"), "a"
+        )
+        second = table.start(
+            spawn("import sys; print('b'); sys.exit(3)"), registry.start("b"), "b"
+        )
+        assert not table.has_capacity()
+
+        await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+
+        outputs: dict[str, str] = {}
+        for message in recorder.of_type("command_output"):
+            outputs[message["command_id"]] = (
+                outputs.get(message["command_id"], "") + message["output"]
+            )
+        assert outputs[first.job_id] == "a\na\na\n"
+        assert outputs[second.job_id] == "b\n"
+        exit_codes = {
+            m["command_id"]: m["exit_code"]
+            for m in recorder.of_type("command_complete")
+        }
+        assert exit_codes == {first.job_id: 0, second.job_id: 3}
+        assert first.log_file.line_count == 3
+        assert table.running_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_output_is_delivered_round_robin(self, registry, monkeypatch):
+        """測試輸出量大的工作不會連續佔用傳送"""
+        monkeypatch.setattr(command_jobs, "OUTPUT_QUANTUM", 10)
+        recorder = Recorder()
+        recorder.expected = 2
+        table = CommandJobTable(recorder.send, max_jobs=2)
+        # 暫停傳送，直到兩個工作的輸出都已讀完並排入佇列
+        recorder.release.clear()
+        big_job = table.start(
+            spawn("print('x\\n' * 100, end='')"), registry.start("big"), "big"
+        )
+        small_job = table.start(
+            spawn("print('y\\n' * 20, end='')"), registry.start("small"), "small"
+        )
+        while big_job.is_running or small_job.is_running:
+            await asyncio.sleep(0.01)
+        recorder.release.set()
+        await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+
+        order = [m["command_id"] for m in recorder.of_type("command_output")]
+        assert all(len(m["output"]) <= 20 for m in recorder.of_type("command_output"))
+        # 小工作的最後一批輸出早於大工作的最後一批
+        last_small = max(i for i, cid in enumerate(order) if cid == small_job.job_id)
+        last_big = max(i for i, cid in enumerate(order) if cid == big_job.job_id)
+        assert last_small < last_big
+        assert order.count(small_job.job_id) >= 2
+
+    @pytest.mark.asyncio
+    async def test_cancel_single_job(self, registry):
+        """測試取消一個工作不影響另一個"""
+        recorder = Recorder()
+        recorder.expected = 2
+        table = CommandJobTable(recorder.send, max_jobs=2)
+
+        slow = table.start(
+            spawn("import time; print('start', flush=True); time.sleep(30)"),
+            registry.start("slow"),
+            "slow",
+        )
+        quick = table.start(spawn("print('done')"), registry.start("quick"), "quick")
+
+        assert await asyncio.to_thread(table.cancel, slow.job_id)
+        assert not table.cancel(slow.job_id)
+        await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+
+        statuses = {
+            m["command_id"]: m["status"] for m in recorder.of_type("command_complete")
+        }
+        assert statuses == {
+            slow.job_id: JobStatus.CANCELLED.value,
+            quick.job_id: JobStatus.COMPLETED.value,
+        }
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(sys.platform == "win32", reason="需要 POSIX 信號")
+    async def test_terminate_does_not_block_event_loop(self, registry, monkeypatch):
+        """測試終止忽略 SIGTERM 的命令時不在調用線程等待，逾時後強制終止"""
+        monkeypatch.setattr(command_jobs, "TERMINATE_TIMEOUT", 1)
+        recorder = Recorder()
+        recorder.expected = 1
+        table = CommandJobTable(recorder.send)
+        job = table.start(
+            spawn(
+                "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN);"
+                " print('ready', flush=True); time.sleep(30)"
+            ),
+            registry.start("stubborn"),
+            "stubborn",
+        )
+        while not recorder.of_type("command_output"):
+            await asyncio.sleep(0.01)
+
+        started = time.monotonic()
+        assert table.terminate_all() == 1
+        assert time.monotonic() - started < 0.5
+
+        await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+        complete = recorder.of_type("command_complete")[0]
+        assert complete["status"] == JobStatus.CANCELLED.value
+        assert complete["exit_code"] == -signal.SIGKILL
+        assert job.process.returncode == -signal.SIGKILL
+
+    @pytest.mark.asyncio
+    async def test_complete_message_reports_usage(self, registry):
+        """測試命令完成訊息帶有資源用量"""
+        recorder = Recorder()
+        recorder.expected = 1
+        table = CommandJobTable(recorder.send)
+
+        job = table.start(
+            spawn("x = bytearray(32 * 1024 * 1024); print('ok')"),
+            registry.start("alloc"),
+            "alloc",
+        )
+        await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+
+        usage = recorder.of_type("command_complete")[0]["usage"]
+        assert usage == job.usage
+        assert usage["output_bytes"] == 3
+        assert usage["output_lines"] == 1
+        assert usage["wall_time"] >= 0
+        if hasattr(os, "wait4"):
+            assert job.process.returncode == 0
+            assert usage["cpu_user"] is not None
+            assert usage["peak_rss_bytes"] >= 32 * 1024 * 1024
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not hasattr(os, "wait4"), reason="需要 os.wait4")
+    async def test_concurrent_poll_does_not_steal_exit_status(self, registry):
+        """測試其他線程同時 poll() 時，退出碼與資源用量仍由讀取線程取得"""
+        recorder = Recorder()
+        recorder.expected = 5
+        table = CommandJobTable(recorder.send, max_jobs=5)
+        jobs = [
+            table.start(
+                spawn("import sys; print('x'); sys.exit(3)"),
+                registry.start(f"exit-{i}"),
+                f"exit-{i}",
+            )
+            for i in range(5)
+        ]
+
+        stop = threading.Event()
+        polled: list[int | None] = []
+
+        def poller():
+            # 模擬其他線程（例如健康檢查）同時查詢狀態
+            while not stop.is_set():
+                polled.extend(job.process.poll() for job in jobs)
+
+        thread = threading.Thread(target=poller)
+        thread.start()
+        try:
+            await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert [m["exit_code"] for m in recorder.of_type("command_complete")] == [3] * 5
+        assert all(job.usage["cpu_user"] is not None for job in jobs)
+        assert 0 not in polled
+        assert [job.process.poll() for job in jobs] == [3] * 5
+
+    @pytest.mark.asyncio
+    async def test_job_process_reports_reaped_status(self, registry):
+        """測試 JobProcess 的 wait() 等待讀取線程回收，回收後不再送出信號"""
+        recorder = Recorder()
+        recorder.expected = 1
+        table = CommandJobTable(recorder.send)
+        job = table.start(
+            spawn("import sys, time; time.sleep(0.2); sys.exit(5)"),
+            registry.start("exit-5"),
+            "exit-5",
+        )
+
+        with pytest.raises(subprocess.TimeoutExpired):
+            job.process.wait(timeout=0.01)
+        assert await asyncio.to_thread(job.process.wait, 10) == 5
+        await asyncio.wait_for(recorder.completed.wait(), timeout=10)
+
+        job.process.terminate()
+        job.process.kill()
+        assert job.process.poll() == 5
+
+    def test_max_jobs_from_env(self, monkeypatch):
+        """測試從環境變數讀取同時執行上限"""
+        monkeypatch.setenv("MCP_MAX_CONCURRENT_COMMANDS", "7")
+        assert command_jobs.get_max_concurrent_commands() == 7
+        monkeypatch.setenv("MCP_MAX_CONCURRENT_COMMANDS", "bad")
+        assert command_jobs.get_max_concurrent_commands() == 4
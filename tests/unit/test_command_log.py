@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+命令輸出日誌檔案測試
+"""
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.utils import command_log
+from mcp_feedback_enhanced.web.utils.command_log import (
+    CommandLogFile,
+    CommandLogRegistry,
+)
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    log = CommandLogFile(tmp_path / "cmd.log", "cmd-1", "make build")
+    for i in range(1000):
+        log.append(f"line {i}\n")
+    yield log
+    log.delete()
+
+
+class TestCommandLogFile:
+    """CommandLogFile 測試"""
+
+    def test_range_uses_sparse_index(self, log_file):
+        """測試範圍讀取橫跨索引區段，且讀取前會寫出緩衝區"""
+        page = log_file.read_range(255, 3)
+
+        assert page["lines"] == ["line 255", "line 256", "line 257"]
+        assert page["total"] == 1000
+        assert page["next_start"] == 258
+
+    def test_tail(self, log_file):
+        """測試讀取最後幾行"""
+        page = log_file.tail(2)
+
+        assert page["lines"] == ["line 998", "line 999"]
+        assert page["next_start"] is None
+
+    def test_search_literal_and_regex(self, log_file):
+        """測試字面與正則搜尋，以及分頁繼續"""
+        first = log_file.search("line 99", limit=2)
+        assert [m["line"] for m in first["matches"]] == [99, 990]
+        assert first["next_start"] == 991
+
+        rest = log_file.search("line 99", start=first["next_start"])
+        assert [m["text"] for m in rest["matches"]][-1] == "line 999"
+
+        regex = log_file.search(r"^line 5\d$", regex=True)
+        assert [m["line"] for m in regex["matches"]] == list(range(50, 60))
+
+        with pytest.raises(ValueError):
+            log_file.search("(", regex=True)
+
+    def test_search_line_numbers_while_appending(self, log_file):
+        """測試搜尋以快照為準：掃描期間追加的行不影響行號與結果"""
+        stop = threading.Event()
+
+        def writer():
+            i = 1000
+            while not stop.is_set():
+                log_file.append(f"line {i}")
+                i += 1
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(20):
+                result = log_file.search("line 7", start=300, limit=5)
+                assert [m["line"] for m in result["matches"]] == [
+                    700,
+                    701,
+                    702,
+                    703,
+                    704,
+                ]
+                assert all(m["text"] == f"line {m['line']}" for m in result["matches"])
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_read_after_finish(self, log_file):
+        """測試命令結束後仍可讀取"""
+        log_file.finish(0)
+
+        assert log_file.read_range(0, 1)["lines"] == ["line 0"]
+        assert log_file.get_info()["exit_code"] == 0
+
+    def test_empty_log(self, tmp_path):
+        """測試沒有輸出的命令"""
+        log = CommandLogFile(tmp_path / "empty.log", "cmd-1", "true")
+        assert log.tail(10)["lines"] == []
+        assert log.search("x")["matches"] == []
+        log.delete()
+
+    def test_registry_keeps_latest(self, tmp_path, monkeypatch):
+        """測試超過上限時刪除最舊的日誌檔案"""
+        monkeypatch.setattr(command_log, "MAX_COMMAND_LOGS_PER_SESSION", 2)
+        registry = CommandLogRegistry(tmp_path, "session")
+        first = registry.start("a")
+        registry.start("b")
+        registry.start("c")
+
+        assert registry.get(first.command_id) is None
+        assert not first.path.exists()
+        assert [info["command"] for info in registry.list_info()] == ["b", "c"]
+        registry.clear()
+
+
+class TestCommandLogRoutes:
+    """命令日誌 API 測試"""
+
+    def test_http_log_api(self, web_ui_manager, test_project_dir):
+        """測試列出命令與分頁讀取輸出"""
+        session_id = web_ui_manager.create_session(str(test_project_dir), "summary")
+        session = web_ui_manager.get_session(session_id)
+        log = session.command_runs.start("echo hi")
+        for i in range(10):
+            log.append(f"output {i}")
+        client = TestClient(web_ui_manager.app)
+        base = f"/api/sessions/{session_id}/commands"
+
+        assert client.get(base).json()["commands"][0]["line_count"] == 10
+        tail = client.get(f"{base}/{log.command_id}/log?tail=2").json()
+        assert tail["lines"] == ["output 8", "output 9"]
+        found = client.get(f"{base}/{log.command_id}/log?q=output 3").json()
+        assert found["matches"][0]["line"] == 3
+        assert client.get(f"{base}/missing/log").status_code == 404
+        bad = client.get(f"{base}/{log.command_id}/log?q=(&regex=1")
+        assert bad.status_code == 400
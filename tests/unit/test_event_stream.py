@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+SSE 回退通道測試
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.routes.main_routes import session_event_stream
+from mcp_feedback_enhanced.web.utils import event_stream
+from tests.fixtures.test_data import TestData
+
+
+class FakeRequest:
+    """模擬始終保持連接的請求"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def parse_event(raw: str) -> tuple[str | None, dict]:
+    """解析 SSE 事件文字，返回 (事件 ID, 資料)"""
+    event_id = None
+    data = None
+    for line in raw.strip().splitlines():
+        if line.startswith("id: "):
+            event_id = line[4:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+    return event_id, data
+
+
+async def next_event_of_type(stream, message_type: str) -> tuple[str | None, dict]:
+    """略過其他事件，返回下一個指定類型的事件"""
+    while True:
+        event_id, data = parse_event(await anext(stream))
+        if data["type"] == message_type:
+            return event_id, data
+
+
+class TestEventStreamFormat:
+    """SSE 格式工具測試"""
+
+    def test_event_id_round_trip(self):
+        """測試事件 ID 的建立與解析"""
+        event_id = event_stream.build_event_id("abc-123", 7)
+
+        assert event_stream.parse_event_id(event_id) == ("abc-123", 7)
+        assert event_stream.parse_event_id("invalid") == (None, None)
+        assert event_stream.parse_event_id("abc:x") == (None, None)
+
+    def test_sequenced_messages_carry_event_id(self):
+        """測試帶序號的訊息附上事件 ID"""
+        raw = event_stream.format_event(
+            {"type": "command_output", "output": "a\nb", "seq": 3}, "s1"
+        )
+
+        event_id, data = parse_event(raw)
+        assert event_id == "s1:3"
+        assert data["output"] == "a\nb"
+        assert raw.endswith("\n\n")
+
+
+class TestSessionEventStream:
+    """SSE 串流行為測試"""
+
+    @pytest.mark.asyncio
+    async def test_initial_sync_and_live_messages(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試首次連接完整同步，之後推送即時訊息"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+        stream = session_event_stream(web_ui_manager, FakeRequest())
+
+        assert (await anext(stream)).startswith("retry:")
+        _, established = parse_event(await anext(stream))
+        assert established["type"] == "connection_established"
+        assert established["transport"] == "sse"
+        assert established["resumed"] is False
+        _, status = parse_event(await anext(stream))
+        assert status["type"] == "status_update"
+        assert web_ui_manager.event_stream_count == 1
+
+        await session.send_message({"type": "command_output", "output": "x"})
+        event_id, data = parse_event(await anext(stream))
+        assert event_id == f"{session.session_id}:1"
+        assert data["output"] == "x"
+
+        await stream.aclose()
+        assert web_ui_manager.event_stream_count == 0
+        assert session.replay_buffer.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_resume_from_last_event_id(self, web_ui_manager, test_project_dir):
+        """測試從最後收到的序號續傳"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+        for i in range(3):
+            session.replay_buffer.record({"type": "command_output", "output": str(i)})
+
+        stream = session_event_stream(
+            web_ui_manager, FakeRequest(), session.session_id, 1
+        )
+        await anext(stream)
+        _, established = parse_event(await anext(stream))
+        assert established["resumed"] is True
+
+        replayed = [parse_event(await anext(stream))[1]["seq"] for _ in range(2)]
+        assert replayed == [2, 3]
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_follows_new_session(self, web_ui_manager, test_project_dir):
+        """測試會話切換時串流自動跟隨並通知新會話"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        stream = session_event_stream(web_ui_manager, FakeRequest())
+        for _ in range(3):
+            await anext(stream)
+
+        web_ui_manager.create_session(str(test_project_dir), "第二個會話")
+        new_session = web_ui_manager.get_current_session()
+
+        event_id, data = parse_event(await anext(stream))
+        assert data["type"] == "session_updated"
+        assert data["session_info"]["session_id"] == new_session.session_id
+        assert event_id == f"{new_session.session_id}:{data['seq']}"
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_replies_to_sse_requests_use_event_stream(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試經由 HTTP 發送的請求，其回覆經由事件串流送回"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+        stream = session_event_stream(web_ui_manager, FakeRequest())
+        for _ in range(3):
+            await anext(stream)
+
+        client = TestClient(web_ui_manager.app)
+        response = await asyncio.to_thread(
+            client.post,
+            "/api/events/message",
+            json={"type": "command_log_request", "request_id": "r1"},
+        )
+        assert response.status_code == 200
+
+        event_id, data = await next_event_of_type(stream, "command_log_page")
+        assert event_id is None
+        assert data["request_id"] == "r1"
+        assert data["error"] == "Command log not found"
+        assert all(
+            m["type"] != "command_log_page" for m in session.replay_buffer.get_since(0)
+        )
+
+        response = await asyncio.to_thread(
+            client.post,
+            "/api/events/message",
+            json={"type": "cancel_command", "command_id": "cmd-9"},
+        )
+        event_id, data = await next_event_of_type(stream, "command_error")
+        assert event_id == f"{session.session_id}:{data['seq']}"
+        await stream.aclose()
+
+
+class TestEventStreamRoutes:
+    """SSE 相關路由測試"""
+
+    def test_events_without_session_returns_404(self, web_ui_manager):
+        """測試沒有活躍會話時返回 404"""
+        client = TestClient(web_ui_manager.app)
+
+        assert client.get("/api/events").status_code == 404
+
+    def test_post_message_is_handled_like_websocket(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試 SSE 客戶端可透過 HTTP 發送 WebSocket 格式的訊息"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+        client = TestClient(web_ui_manager.app)
+
+        response = client.post("/api/events/message", json={"type": "get_status"})
+
+        assert response.status_code == 200
+        assert session.replay_buffer.get_since(0)[-1]["type"] == "status_update"
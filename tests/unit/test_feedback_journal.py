@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+回饋日誌測試
+"""
+
+import base64
+import sys
+
+import pytest
+
+from mcp_feedback_enhanced.utils import feedback_journal
+from mcp_feedback_enhanced.utils.feedback_journal import FeedbackJournal
+
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x01" * 32
+
+
+def make_journal(tmp_path, **kwargs) -> FeedbackJournal:
+    return FeedbackJournal(tmp_path / "journal", **kwargs)
+
+
+class TestFeedbackJournal:
+    """FeedbackJournal 測試"""
+
+    def test_record_writes_in_background(self, tmp_path):
+        """測試記錄由背景線程追加到日誌"""
+        journal = make_journal(tmp_path)
+        try:
+            journal.record({"session_id": "s1", "interactive_feedback": "好"})
+            journal.record({"session_id": "s2", "interactive_feedback": "再改"})
+            assert journal.flush()
+
+            records = journal.read_records()
+            assert [r["session_id"] for r in records] == ["s1", "s2"]
+            assert records[0]["saved_at"] > 0
+            assert journal.get_stats()["records"] == 2
+        finally:
+            journal.close()
+
+    def test_images_are_content_addressed_sidecars(self, tmp_path):
+        """測試圖片以雜湊旁檔保存，相同內容只寫一次，日誌只含引用"""
+        journal = make_journal(tmp_path)
+        image = {"name": "shot.png", "data": PNG_BYTES, "size": len(PNG_BYTES)}
+        try:
+            journal.record({"session_id": "s1", "images": [image]})
+            journal.record(
+                {
+                    "session_id": "s2",
+                    "images": [
+                        {
+                            "name": "copy.png",
+                            "data": base64.b64encode(PNG_BYTES).decode(),
+                        }
+                    ],
+                }
+            )
+            journal.flush()
+
+            records = journal.read_records()
+            references = [r["images"][0] for r in records]
+            assert references[0]["sha256"] == references[1]["sha256"]
+            assert "data" not in references[0]
+            assert journal.read_image(references[0]["sha256"]) == PNG_BYTES
+            assert journal.get_stats()["images_written"] == 1
+            # 原始結果不受影響
+            assert image["data"] == PNG_BYTES
+        finally:
+            journal.close()
+
+    def test_rotation_by_size_and_count(self, tmp_path):
+        """測試分段超過大小時輪替，只保留指定數量並清理不再引用的圖片"""
+        journal = make_journal(tmp_path, max_segment_bytes=200, max_segments=2)
+        try:
+            journal.record(
+                {
+                    "session_id": "old",
+                    "interactive_feedback": "x" * 300,
+                    "images": [{"name": "old.png", "data": PNG_BYTES}],
+                }
+            )
+            for i in range(4):
+                journal.record(
+                    {"session_id": f"s{i}", "interactive_feedback": "y" * 300}
+                )
+            journal.flush()
+
+            stats = journal.get_stats()
+            assert stats["segments"] == 2
+            assert stats["rotations"] == 4
+            assert [r["session_id"] for r in journal.read_records()] == ["s2", "s3"]
+            assert list(journal.images_dir.iterdir()) == []
+        finally:
+            journal.close()
+
+    def test_rotation_keeps_images_of_kept_records(self, tmp_path):
+        """測試輪替清理不刪除保留記錄（含剛寫入的記錄）引用的圖片"""
+        journal = make_journal(tmp_path, max_segment_bytes=10, max_segments=2)
+        try:
+            for i in range(4):
+                journal.record(
+                    {
+                        "session_id": f"s{i}",
+                        "images": [{"name": "a.png", "data": PNG_BYTES + bytes([i])}],
+                    }
+                )
+            journal.flush()
+
+            records = journal.read_records()
+            assert [r["session_id"] for r in records] == ["s2", "s3"]
+            kept = {image["file"] for r in records for image in r["images"]}
+            assert len(kept) == 2
+            assert {p.name for p in journal.images_dir.iterdir()} == kept
+        finally:
+            journal.close()
+
+    def test_sidecar_bytes_count_toward_rotation(self, tmp_path):
+        """測試圖片旁檔大小計入分段大小，大圖片也會觸發輪替"""
+        journal = make_journal(tmp_path, max_segment_bytes=4096)
+        big_image = PNG_BYTES + b"\x02" * 8192
+        try:
+            journal.record(
+                {"session_id": "s1", "images": [{"name": "a.png", "data": big_image}]}
+            )
+            journal.record({"session_id": "s2"})
+            journal.flush()
+
+            assert journal.get_stats()["rotations"] == 1
+            assert journal.get_stats()["segments"] == 2
+        finally:
+            journal.close()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="以 fcntl 模擬其他進程持有鎖")
+    def test_writes_wait_for_directory_lock(self, tmp_path):
+        """測試其他進程持有日誌目錄鎖時，寫入等待鎖釋放後才進行"""
+        journal = make_journal(tmp_path)
+        journal.images_dir.mkdir(parents=True)
+        try:
+            # flock 以開啟的檔案描述為單位，另一個描述可模擬其他進程
+            with open(
+                journal.journal_dir / feedback_journal.LOCK_FILE_NAME, "a+b"
+            ) as f:
+                feedback_journal._lock(f)
+                journal.record({"session_id": "s1"})
+                assert not journal.flush(timeout=0.2)
+                assert journal.read_records() == []
+                feedback_journal._unlock(f)
+
+            assert journal.flush()
+            assert [r["session_id"] for r in journal.read_records()] == ["s1"]
+        finally:
+            journal.close()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+回饋 MCP 資源測試
+"""
+
+import base64
+import json
+
+import pytest
+from fastmcp import Client
+
+from mcp_feedback_enhanced import server
+from mcp_feedback_enhanced.utils.feedback_resources import (
+    get_result_cache,
+    read_image,
+    read_log_page,
+    read_session_summary,
+)
+from mcp_feedback_enhanced.web import main as web_main
+
+
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+
+
+@pytest.fixture
+def cached_result(monkeypatch):
+    """只存在於結果快取中的回饋結果"""
+    monkeypatch.setattr(web_main, "_web_ui_manager", None)
+    monkeypatch.setenv("MCP_RESOURCE_LOG_PAGE_LINES", "2")
+    result = {
+        "session_id": "cached-session",
+        "interactive_feedback": "看起來不錯",
+        "command_logs": "line 0\nline 1\nline 2",
+        "images": [{"name": "shot.jpg", "data": PNG_BYTES, "size": len(PNG_BYTES)}],
+    }
+    get_result_cache().put(result["session_id"], result)
+    yield result
+    get_result_cache().clear()
+
+
+class TestFeedbackResources:
+    """資源讀取測試"""
+
+    def test_log_pages(self, cached_result):
+        """測試日誌分頁與下一頁 URI"""
+        first = read_log_page("cached-session", 0)
+        assert first["lines"] == ["line 0", "line 1"]
+        assert first["page_count"] == 2
+        assert first["next"] == "feedback://sessions/cached-session/logs/1"
+
+        last = read_log_page("cached-session", 1)
+        assert last["lines"] == ["line 2"]
+        assert last["next"] is None
+
+    def test_image_and_summary(self, cached_result):
+        """測試圖片以 Base64 讀取，摘要只包含引用"""
+        image = read_image("cached-session", 0)
+        assert image["mime_type"] == "image/jpeg"
+        assert base64.b64decode(image["data"]) == PNG_BYTES
+
+        summary = read_session_summary("cached-session")
+        assert summary["interactive_feedback"] == "看起來不錯"
+        assert summary["logs"]["total_lines"] == 3
+        assert summary["images"][0]["uri"] == (
+            "feedback://sessions/cached-session/images/0"
+        )
+        assert "data" not in summary["images"][0]
+
+        with pytest.raises(ValueError):
+            read_image("cached-session", 5)
+        with pytest.raises(ValueError):
+            read_session_summary("missing")
+
+    def test_live_session_logs(self, web_ui_manager, test_project_dir, monkeypatch):
+        """測試 Web UI 中的會話直接分頁讀取完整日誌"""
+        monkeypatch.setattr(web_main, "_web_ui_manager", web_ui_manager)
+        monkeypatch.setenv("MCP_RESOURCE_LOG_PAGE_LINES", "2")
+        session_id = web_ui_manager.create_session(str(test_project_dir), "summary")
+        session = web_ui_manager.get_session(session_id)
+        for i in range(5):
+            session.add_log(f"output {i}")
+
+        page = read_log_page(session_id, 1)
+
+        assert page["total_lines"] == 5
+        assert page["lines"] == ["output 2", "output 3"]
+
+    @pytest.mark.asyncio
+    async def test_reference_text(self, cached_result):
+        """測試引用模式只回傳 URI，不包含日誌與圖片內容"""
+        text = await server.create_reference_text(cached_result)
+
+        assert "看起來不錯" in text
+        assert "feedback://sessions/cached-session/logs/0" in text
+        assert "feedback://sessions/cached-session/images/0" in text
+        assert "line 1" not in text
+
+    @pytest.mark.asyncio
+    async def test_resources_registered(self, cached_result):
+        """測試透過 MCP 協議讀取資源"""
+        async with Client(server.mcp) as client:
+            templates = await client.list_resource_templates()
+            assert "feedback://sessions/{session_id}/logs/{page}" in {
+                t.uriTemplate for t in templates
+            }
+
+            contents = await client.read_resource(
+                "feedback://sessions/cached-session/logs/1"
+            )
+            assert json.loads(contents[0].text)["lines"] == ["line 2"]
+
+            contents = await client.read_resource(
+                "feedback://sessions/cached-session/images/0"
+            )
+            image = json.loads(contents[0].text)
+            assert base64.b64decode(image["data"]) == PNG_BYTES
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+追加式會話歷史存儲測試
+"""
+
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.utils import history_store
+from mcp_feedback_enhanced.web.utils.history_store import SessionHistoryStore
+
+
+def make_session(session_id: str, saved_at: float, **extra) -> dict:
+    """建立會話歷史記錄"""
+    return {"session_id": session_id, "saved_at": saved_at, **extra}
+
+
+def count_lines(store: SessionHistoryStore) -> int:
+    return len(store.path.read_text(encoding="utf-8").splitlines())
+
+
+class TestSessionHistoryStore:
+    """SessionHistoryStore 測試"""
+
+    def test_append_only_writes_changes(self, tmp_path):
+        """測試只追加變更的會話"""
+        store = SessionHistoryStore(tmp_path)
+
+        assert store.append([make_session("a", 1), make_session("b", 2)]) == 2
+        assert store.append([make_session("a", 1)]) == 0
+        assert store.append([make_session("a", 1, status="completed")]) == 1
+        assert count_lines(store) == 3
+
+        assert store.get("a")["status"] == "completed"
+
+    def test_read_page_newest_first(self, tmp_path):
+        """測試按時間倒序分頁讀取"""
+        store = SessionHistoryStore(tmp_path)
+        store.append([make_session(f"s{i}", i) for i in range(5)])
+
+        page, total = store.read_page(1, 2)
+
+        assert total == 5
+        assert [s["session_id"] for s in page] == ["s3", "s2"]
+
+    def test_removed_and_reload(self, tmp_path):
+        """測試移除記錄在重新載入後仍然生效"""
+        store = SessionHistoryStore(tmp_path)
+        store.append([make_session("a", 1), make_session("b", 2)], last_cleanup=5)
+        store.append([], removed=["a"])
+
+        reloaded = SessionHistoryStore(tmp_path)
+        sessions, total = reloaded.read_page()
+
+        assert total == 1
+        assert sessions[0]["session_id"] == "b"
+        assert reloaded.last_cleanup == 5
+
+    def test_compact_applies_retention(self, tmp_path):
+        """測試壓縮只保留最新記錄並套用保留期限"""
+        now_ms = time.time() * 1000
+        store = SessionHistoryStore(tmp_path)
+        store.append([make_session("old", now_ms - 10 * 3600 * 1000)])
+        store.append([make_session("new", now_ms)])
+        store.append([make_session("new", now_ms, status="completed")])
+
+        removed = store.compact(retention_hours=1)
+
+        assert removed == 1
+        assert count_lines(store) == 1
+        assert SessionHistoryStore(tmp_path).get("new")["status"] == "completed"
+
+    def test_auto_compact(self, tmp_path, monkeypatch):
+        """測試日誌過長時自動壓縮"""
+        monkeypatch.setattr(history_store, "AUTO_COMPACT_SLACK", 2)
+        store = SessionHistoryStore(tmp_path)
+
+        for i in range(10):
+            store.append([make_session("a", 1, revision=i)])
+
+        assert count_lines(store) <= 4
+        assert store.get("a")["revision"] == 9
+
+    def test_sees_appends_from_other_process(self, tmp_path):
+        """測試補讀其他進程追加的記錄"""
+        first = SessionHistoryStore(tmp_path)
+        second = SessionHistoryStore(tmp_path)
+        first.append([make_session("a", 1)])
+
+        second.append([make_session("b", 2)])
+        first.compact()
+
+        assert second.read_page()[1] == 2
+        assert first.read_page()[1] == 2
+
+    def test_ignores_partial_line(self, tmp_path):
+        """測試寫入到一半的最後一行會被略過"""
+        store = SessionHistoryStore(tmp_path)
+        store.append([make_session("a", 1)])
+        with open(store.path, "ab") as f:
+            f.write(b'{"op": "put", "session": {"session_id"')
+
+        assert SessionHistoryStore(tmp_path).read_page()[1] == 1
+
+    def test_migrates_legacy_json(self, tmp_path):
+        """測試從舊版 session_history.json 遷移"""
+        legacy = tmp_path / "session_history.json"
+        legacy.write_text(
+            json.dumps({"sessions": [make_session("a", 1)], "lastCleanup": 9}),
+            encoding="utf-8",
+        )
+
+        store = SessionHistoryStore(tmp_path)
+
+        assert store.get("a") is not None
+        assert store.last_cleanup == 9
+        assert store.path.exists()
+
+
+class TestSessionHistoryRoutes:
+    """會話歷史 API 測試"""
+
+    @pytest.fixture
+    def client(self, web_ui_manager, tmp_path, monkeypatch):
+        monkeypatch.setattr("pathlib.Path.home", lambda: tmp_path)
+        return TestClient(web_ui_manager.app)
+
+    def test_append_load_and_clear(self, client):
+        """測試追加、分頁載入與清空"""
+        client.post(
+            "/api/session-history/append",
+            json={"sessions": [make_session("a", 1), make_session("b", 2)]},
+        )
+        response = client.post(
+            "/api/session-history/append",
+            json={"sessions": [make_session("c", 3)], "removed": ["a"]},
+        )
+        assert response.json()["written"] == 2
+
+        loaded = client.get("/api/load-session-history?limit=1").json()
+        assert loaded["total"] == 2
+        assert [s["session_id"] for s in loaded["sessions"]] == ["c"]
+
+        client.post("/api/session-history/clear")
+        assert client.get("/api/load-session-history").json()["sessions"] == []
+
+    def test_legacy_save_replaces_history(self, client):
+        """測試舊版整批保存仍以完整列表取代"""
+        client.post(
+            "/api/save-session-history",
+            json={"sessions": [make_session("a", 1), make_session("b", 2)]},
+        )
+        client.post(
+            "/api/save-session-history", json={"sessions": [make_session("b", 2)]}
+        )
+
+        loaded = client.get("/api/load-session-history").json()
+        assert [s["session_id"] for s in loaded["sessions"]] == ["b"]
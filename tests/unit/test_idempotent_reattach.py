@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+重試呼叫冪等重新連接測試
+"""
+
+import asyncio
+
+import anyio
+import pytest
+
+from mcp_feedback_enhanced.web.models import SessionStatus
+from mcp_feedback_enhanced.web.utils.idempotency import (
+    derive_idempotency_key,
+    resolve_idempotency_key,
+)
+
+
+class TestIdempotencyKey:
+    """冪等鍵推導測試"""
+
+    def test_derived_key_is_stable(self):
+        """測試相同的專案目錄與摘要推導出相同的鍵"""
+        key = derive_idempotency_key("/tmp/project/", "完成了 A")
+        assert key == derive_idempotency_key("/tmp/project", "完成了 A\n")
+        assert key != derive_idempotency_key("/tmp/project", "完成了 B")
+
+    def test_explicit_key_and_opt_out(self, monkeypatch):
+        """測試明確提供的鍵優先，停用推導時只使用明確的鍵"""
+        assert resolve_idempotency_key("retry-1", "/tmp", "s") == "retry-1"
+
+        monkeypatch.setenv("MCP_IDEMPOTENT_REATTACH", "false")
+        assert resolve_idempotency_key("", "/tmp", "s") is None
+        assert resolve_idempotency_key("retry-1", "/tmp", "s") == "retry-1"
+
+
+class TestSessionReattach:
+    """WebUIManager 重新連接測試"""
+
+    def test_reattach_pending_session(self, web_ui_manager, test_project_dir):
+        """測試相同的鍵重新連接到等待中的會話，不同的鍵不會"""
+        session_id = web_ui_manager.create_session(
+            str(test_project_dir), "summary", idempotency_key="k1"
+        )
+
+        assert web_ui_manager.reattach_session("k2") is None
+        session = web_ui_manager.reattach_session("k1")
+        assert session is not None
+        assert session.session_id == session_id
+        assert web_ui_manager.current_session is session
+
+    @pytest.mark.asyncio
+    async def test_submitted_session_is_not_reattached(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試已提交回饋的會話不會被重新連接"""
+        web_ui_manager.create_session(
+            str(test_project_dir), "summary", idempotency_key="k1"
+        )
+        await web_ui_manager.current_session.submit_feedback("好", [])
+
+        assert web_ui_manager.reattach_session("k1") is None
+
+    @pytest.mark.asyncio
+    async def test_reattach_revives_cancelled_session(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試被取消的會話在重試時恢復等待並保留用戶消息與命令日誌"""
+        web_ui_manager.create_session(
+            str(test_project_dir), "summary", idempotency_key="k1"
+        )
+        session = web_ui_manager.current_session
+        session.add_user_message({"content": "草稿"})
+        session.add_log("build output")
+
+        with anyio.move_on_after(0.2):
+            await session.wait_for_feedback(timeout=60)
+        assert session.status == SessionStatus.CANCELLED
+
+        assert web_ui_manager.reattach_session("k1") is session
+        assert session.status == SessionStatus.WAITING
+        assert not session.feedback_completed.is_set()
+        assert session.cleanup_timer is not None
+        assert len(session.user_messages) == 1
+
+        wait = asyncio.create_task(session.wait_for_feedback(timeout=60))
+        await asyncio.sleep(0.1)
+        await session.submit_feedback("完成", [])
+        result = await asyncio.wait_for(wait, timeout=5)
+        assert result["interactive_feedback"] == "完成"
+        assert "build output" in result["command_logs"]
+
+    @pytest.mark.asyncio
+    async def test_cancelling_superseded_call_keeps_session(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試已有重試呼叫在等待時，取消舊呼叫不會結束會話"""
+        web_ui_manager.create_session(
+            str(test_project_dir), "summary", idempotency_key="k1"
+        )
+        session = web_ui_manager.current_session
+
+        old_call = asyncio.create_task(session.wait_for_feedback(timeout=60))
+        await asyncio.sleep(0.1)
+        assert web_ui_manager.reattach_session("k1") is session
+        retried_call = asyncio.create_task(session.wait_for_feedback(timeout=60))
+        await asyncio.sleep(0.1)
+
+        old_call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await old_call
+        assert session.status == SessionStatus.WAITING
+        assert not retried_call.done()
+
+        await session.submit_feedback("完成", [])
+        result = await asyncio.wait_for(retried_call, timeout=5)
+        assert result["interactive_feedback"] == "完成"
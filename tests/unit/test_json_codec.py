@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+JSON 編解碼器測試
+"""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from mcp_feedback_enhanced.web.utils import json_codec
+
+
+@pytest.fixture(autouse=True)
+def reset_codec():
+    """每個測試前後重置全域編解碼器"""
+    json_codec.reset_json_codec()
+    yield
+    json_codec.reset_json_codec()
+
+
+SAMPLE_PAYLOAD = {
+    "type": "command_output",
+    "output": "測試輸出 ✅\n",
+    "nested": {"list": [1, 2.5, None, True], "empty": {}},
+}
+
+
+class TestJSONCodec:
+    """編解碼器測試"""
+
+    def test_stdlib_codec_forced_by_env(self):
+        """測試可透過環境變數強制使用標準庫"""
+        with patch.dict("os.environ", {"MCP_JSON_CODEC": "json"}):
+            assert json_codec.get_json_codec().name == "json"
+
+    def test_auto_prefers_orjson_when_available(self):
+        """測試 auto 模式在安裝 orjson 時使用 orjson"""
+        with patch.dict("os.environ", {"MCP_JSON_CODEC": "auto"}):
+            expected = "orjson" if json_codec.ORJSON_AVAILABLE else "json"
+            assert json_codec.get_json_codec().name == expected
+
+    @pytest.mark.parametrize("codec_name", ["json", "orjson"])
+    def test_round_trip_matches_stdlib(self, codec_name):
+        """測試各編解碼器的輸出與標準庫語義一致"""
+        if codec_name == "orjson" and not json_codec.ORJSON_AVAILABLE:
+            pytest.skip("orjson 未安裝")
+
+        with patch.dict("os.environ", {"MCP_JSON_CODEC": codec_name}):
+            encoded = json_codec.dumps_bytes(SAMPLE_PAYLOAD)
+
+            assert isinstance(encoded, bytes)
+            assert json.loads(encoded) == SAMPLE_PAYLOAD
+            assert json_codec.loads(encoded) == SAMPLE_PAYLOAD
+            assert json_codec.loads(encoded.decode("utf-8")) == SAMPLE_PAYLOAD
+            # 非 ASCII 字元直接以 UTF-8 輸出
+            assert "測試輸出".encode() in encoded
+
+    def test_orjson_falls_back_for_unsupported_values(self):
+        """測試 orjson 不支援的值回退到標準庫"""
+        if not json_codec.ORJSON_AVAILABLE:
+            pytest.skip("orjson 未安裝")
+
+        big_number = {"value": 2**70}
+        assert json.loads(json_codec.dumps_bytes(big_number)) == big_number
+
+    def test_file_round_trip_is_indented(self, tmp_path):
+        """測試設定檔案以縮排格式讀寫"""
+        settings_file = tmp_path / "ui_settings.json"
+
+        json_codec.dump_file({"layoutMode": "combined-vertical"}, settings_file)
+
+        content = settings_file.read_text(encoding="utf-8")
+        assert '\n  "layoutMode"' in content
+        assert json_codec.load_file(settings_file) == {
+            "layoutMode": "combined-vertical"
+        }
+
+    def test_fast_json_response_renders_bytes(self):
+        """測試 REST 回應使用編解碼器序列化"""
+        response = json_codec.FastJSONResponse(content=SAMPLE_PAYLOAD)
+
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == SAMPLE_PAYLOAD
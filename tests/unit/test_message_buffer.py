@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+訊息重放緩衝區測試
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.models import WebFeedbackSession
+from mcp_feedback_enhanced.web.utils.message_buffer import MessageReplayBuffer
+from tests.fixtures.test_data import TestData
+
+
+class TestMessageReplayBuffer:
+    """重放緩衝區測試"""
+
+    def test_sequence_numbers_are_monotonic(self):
+        """測試可重放訊息獲得遞增序號"""
+        buffer = MessageReplayBuffer(max_size=10)
+
+        first = buffer.record({"type": "command_output", "output": "a"})
+        second = buffer.record({"type": "status_update", "status_info": {}})
+
+        assert first["seq"] == 1
+        assert second["seq"] == 2
+        assert buffer.last_seq == 2
+
+    def test_control_messages_are_not_sequenced(self):
+        """測試連接控制類訊息不分配序號"""
+        buffer = MessageReplayBuffer(max_size=10)
+
+        ping = buffer.record({"type": "ping"})
+
+        assert "seq" not in ping
+        assert buffer.last_seq == 0
+        assert buffer.get_since(0) == []
+
+    def test_get_since_returns_missed_messages(self):
+        """測試從指定序號續傳"""
+        buffer = MessageReplayBuffer(max_size=10)
+        for i in range(5):
+            buffer.record({"type": "command_output", "output": str(i)})
+
+        missed = buffer.get_since(3)
+
+        assert missed is not None
+        assert [m["seq"] for m in missed] == [4, 5]
+
+    def test_eviction_forces_full_sync(self):
+        """測試落後超過緩衝區範圍時無法續傳"""
+        buffer = MessageReplayBuffer(max_size=3)
+        for i in range(6):
+            buffer.record({"type": "command_output", "output": str(i)})
+
+        assert buffer.get_since(1) is None
+        assert [m["seq"] for m in buffer.get_since(3)] == [4, 5, 6]
+
+    def test_unknown_future_sequence_forces_full_sync(self):
+        """測試客戶端序號超前（例如伺服器重啟）時無法續傳"""
+        buffer = MessageReplayBuffer(max_size=3)
+        buffer.record({"type": "command_output", "output": "a"})
+
+        assert buffer.get_since(10) is None
+
+    @pytest.mark.asyncio
+    async def test_publish_reaches_subscribers_without_sequence(self):
+        """測試非重放訊息只推送給訂閱者，不分配序號也不進入緩衝區"""
+        buffer = MessageReplayBuffer(max_size=10)
+        assert buffer.publish({"type": "command_log_page"}) is False
+
+        queue = buffer.subscribe()
+        assert buffer.publish({"type": "command_log_page", "request_id": "r1"})
+        assert buffer.publish({"type": "command_error", "error": "x"})
+
+        reply = await asyncio.wait_for(queue.get(), timeout=1)
+        assert reply == {"type": "command_log_page", "request_id": "r1"}
+        assert (await asyncio.wait_for(queue.get(), timeout=1))["seq"] == 1
+        assert [m["type"] for m in buffer.get_since(0)] == ["command_error"]
+        buffer.unsubscribe(queue)
+
+    def test_clear_keeps_sequence(self):
+        """測試清空後不重用序號"""
+        buffer = MessageReplayBuffer(max_size=3)
+        buffer.record({"type": "command_output", "output": "a"})
+        buffer.clear()
+
+        assert buffer.get_since(0) is None
+        assert buffer.record({"type": "command_output", "output": "b"})["seq"] == 2
+
+
+class TestSessionReplay:
+    """會話續傳測試"""
+
+    @pytest.mark.asyncio
+    async def test_messages_buffered_without_websocket(self, test_project_dir):
+        """測試斷線期間的訊息仍會被緩衝"""
+        session = WebFeedbackSession(
+            "test-session", str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+
+        sent = await session.send_message({"type": "command_output", "output": "x"})
+
+        assert sent is False
+        assert session.replay_buffer.last_seq == 1
+
+    def test_websocket_resume_replays_delta(self, web_ui_manager, test_project_dir):
+        """測試重連時只補發缺少的訊息"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+        base_seq = session.replay_buffer.last_seq
+        for i in range(3):
+            session.replay_buffer.record({"type": "command_output", "output": str(i)})
+
+        client = TestClient(web_ui_manager.app)
+        url = f"/ws?session_id={session.session_id}&last_seq={base_seq + 1}"
+        with client.websocket_connect(url) as ws:
+            established = ws.receive_json()
+            assert established["type"] == "connection_established"
+            assert established["resumed"] is True
+            assert established["seq"] == base_seq + 3
+
+            assert ws.receive_json()["seq"] == base_seq + 2
+            assert ws.receive_json()["seq"] == base_seq + 3
+
+    def test_websocket_resume_falls_back_for_other_session(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試會話不符時回退到完整同步"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+
+        client = TestClient(web_ui_manager.app)
+        with client.websocket_connect("/ws?session_id=other&last_seq=5") as ws:
+            established = ws.receive_json()
+            assert established["resumed"] is False
+
+            follow_up = ws.receive_json()
+            assert follow_up["type"] in ("session_updated", "status_update")
+            assert follow_up["seq"] == established["seq"] + 1
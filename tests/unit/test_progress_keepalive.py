@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+等待回饋進度保活測試
+"""
+
+import asyncio
+
+import pytest
+from fastmcp import Client
+
+from mcp_feedback_enhanced import server, web
+from mcp_feedback_enhanced.web.models import WebFeedbackSession
+from mcp_feedback_enhanced.web.utils.progress import run_progress_keepalive
+
+
+class TestProgressKeepalive:
+    """run_progress_keepalive 測試"""
+
+    @pytest.mark.asyncio
+    async def test_reports_until_feedback_arrives(self, tmp_path):
+        """測試等待期間定期回報，收到回饋後停止"""
+        session = WebFeedbackSession("progress-session", str(tmp_path), "summary")
+        updates = []
+
+        async def report(update):
+            updates.append(update)
+            if len(updates) == 3:
+                session.feedback_completed.set()
+
+        try:
+            await asyncio.wait_for(
+                run_progress_keepalive(session, report, interval=0.01), timeout=2
+            )
+        finally:
+            session.cleanup()
+
+        assert len(updates) == 3
+        assert updates[0]["session_id"] == "progress-session"
+        assert updates[0]["tab_connected"] is False
+        assert updates[0]["elapsed"] <= updates[-1]["elapsed"]
+
+    @pytest.mark.asyncio
+    async def test_report_failure_stops_keepalive(self, tmp_path):
+        """測試回報失敗時停止保活而不拋出異常"""
+        session = WebFeedbackSession("progress-session", str(tmp_path), "summary")
+
+        async def report(update):
+            raise RuntimeError("client gone")
+
+        try:
+            await asyncio.wait_for(
+                run_progress_keepalive(session, report, interval=0.01), timeout=2
+            )
+            assert not session.feedback_completed.is_set()
+        finally:
+            session.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_tool_sends_progress_notifications(self, monkeypatch):
+        """測試 interactive_feedback 把進度轉為 MCP 進度通知"""
+
+        async def fake_launch(
+            project_dir, summary, timeout, idempotency_key, progress_callback
+        ):
+            await progress_callback(
+                {"session_id": "s", "elapsed": 15.0, "tab_connected": True}
+            )
+            return {"session_id": "", "interactive_feedback": "好"}
+
+        monkeypatch.setattr(web, "launch_web_feedback_ui", fake_launch)
+        received = []
+
+        async def progress_handler(progress, total, message):
+            received.append((progress, total, message))
+
+        async with Client(server.mcp) as client:
+            tools = {tool.name: tool for tool in await client.list_tools()}
+            assert "ctx" not in tools["interactive_feedback"].inputSchema["properties"]
+
+            result = await client.call_tool(
+                "interactive_feedback",
+                {"timeout": 600},
+                progress_handler=progress_handler,
+            )
+
+        assert "好" in result[0].text
+        assert received[0][:2] == (15.0, 600)
+        assert "分頁已連接" in received[0][2]
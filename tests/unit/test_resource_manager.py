@@ -285,6 +285,30 @@ class TestResourceManager:
         os.remove(temp_file)
         os.rmdir(temp_dir)
 
+    def test_command_usage_stats(self):
+        """測試命令資源用量按程式名稱彙總"""
+        rm = get_resource_manager()
+        usage = {
+            "wall_time": 2.0,
+            "cpu_user": 1.5,
+            "cpu_system": 0.5,
+            "peak_rss_bytes": 4096,
+            "output_bytes": 100,
+        }
+
+        rm.record_command_usage("/usr/bin/usage-test-build --all", usage)
+        rm.record_command_usage("usage-test-build", {**usage, "peak_rss_bytes": 8192})
+
+        stats = rm.get_resource_stats()["command_usage"]
+        entry = next(
+            e for e in stats["top_commands"] if e["command"] == "usage-test-build"
+        )
+        assert entry["runs"] == 2
+        assert entry["cpu_time"] == 4.0
+        assert entry["peak_rss_bytes"] == 8192
+        assert entry["output_bytes"] == 200
+        assert stats["commands_run"] >= 2
+
     def test_get_detailed_info(self):
         """測試獲取詳細信息"""
         rm = get_resource_manager()
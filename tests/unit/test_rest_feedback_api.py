@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+程式化回饋 REST API 測試
+"""
+
+import base64
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+API_TOKEN = "test-token"  # noqa: S105
+HEADERS = {"Authorization": f"Bearer {API_TOKEN}"}
+
+
+@pytest.fixture
+def api_client(web_ui_manager, monkeypatch):
+    monkeypatch.setenv("MCP_API_TOKEN", API_TOKEN)
+    return TestClient(web_ui_manager.app)
+
+
+class TestRestFeedbackApi:
+    """/api/pending-sessions 與 /api/sessions/{id}/feedback 測試"""
+
+    def test_requires_token(self, web_ui_manager, monkeypatch):
+        """測試未設定權杖時停用，權杖錯誤時拒絕"""
+        client = TestClient(web_ui_manager.app)
+        monkeypatch.delenv("MCP_API_TOKEN", raising=False)
+        assert client.get("/api/pending-sessions").status_code == 403
+
+        monkeypatch.setenv("MCP_API_TOKEN", API_TOKEN)
+        response = client.get(
+            "/api/pending-sessions", headers={"Authorization": "Bearer wrong"}
+        )
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+        assert (
+            client.get(
+                "/api/pending-sessions", headers={"X-API-Token": API_TOKEN}
+            ).status_code
+            == 200
+        )
+
+    def test_submit_feedback_for_pending_session(
+        self, api_client, web_ui_manager, test_project_dir
+    ):
+        """測試列出等待中的會話並提交回饋（含圖片）"""
+        session_id = web_ui_manager.create_session(str(test_project_dir), "摘要")
+
+        pending = api_client.get("/api/pending-sessions", headers=HEADERS).json()
+        assert [s["session_id"] for s in pending["sessions"]] == [session_id]
+
+        image = base64.b64encode(b"\x89PNG fake").decode()
+        response = api_client.post(
+            f"/api/sessions/{session_id}/feedback",
+            headers=HEADERS,
+            json={
+                "feedback": "看起來不錯",
+                "images": [{"name": "a.png", "data": image, "size": 9}],
+            },
+        )
+        assert response.status_code == 200
+        assert response.json()["images_count"] == 1
+
+        session = web_ui_manager.get_session(session_id)
+        assert session.feedback_completed.is_set()
+        assert session.feedback_result == "看起來不錯"
+
+        again = api_client.post(
+            f"/api/sessions/{session_id}/feedback",
+            headers=HEADERS,
+            json={"feedback": "第二次"},
+        )
+        assert again.status_code == 409
+        pending = api_client.get("/api/pending-sessions", headers=HEADERS).json()
+        assert pending["sessions"] == []
+
+    def test_submit_rejects_bad_requests(
+        self, api_client, web_ui_manager, test_project_dir
+    ):
+        """測試未知會話返回 404，格式錯誤返回 400"""
+        session_id = web_ui_manager.create_session(str(test_project_dir), "摘要")
+        assert (
+            api_client.post(
+                "/api/sessions/missing/feedback", headers=HEADERS, json={}
+            ).status_code
+            == 404
+        )
+        assert (
+            api_client.post(
+                f"/api/sessions/{session_id}/feedback",
+                headers=HEADERS,
+                json={"feedback": 1},
+            ).status_code
+            == 400
+        )
+
+    def test_long_poll_returns_new_session(
+        self, api_client, web_ui_manager, test_project_dir
+    ):
+        """測試長輪詢在新會話建立時返回"""
+        version = api_client.get("/api/pending-sessions", headers=HEADERS).json()[
+            "version"
+        ]
+        timer = threading.Timer(
+            0.1, web_ui_manager.create_session, (str(test_project_dir), "新的呼叫")
+        )
+        timer.start()
+        try:
+            response = api_client.get(
+                "/api/pending-sessions",
+                headers=HEADERS,
+                params={"since": version, "wait": 10},
+            )
+        finally:
+            timer.join()
+
+        data = response.json()
+        assert data["version"] > version
+        assert [s["summary"] for s in data["sessions"]] == ["新的呼叫"]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+回傳結果壓縮測試
+"""
+
+import base64
+
+from mcp_feedback_enhanced.server import create_feedback_text
+from mcp_feedback_enhanced.utils.result_compaction import (
+    compact_log_lines,
+    compact_log_text,
+    estimate_tokens,
+    get_result_log_budget,
+)
+
+
+class TestCompactLogLines:
+    """compact_log_lines 測試"""
+
+    def test_small_logs_are_unchanged(self):
+        """測試預算內的日誌原樣返回"""
+        lines = ["$ make", "building", "done"]
+        assert compact_log_lines(lines, budget=1000) == "\n".join(lines)
+
+    def test_collapses_repeated_lines(self):
+        """測試連續重複的行合併並標註次數"""
+        lines = ["start", *(["waiting..."] * 50), "end"]
+
+        assert compact_log_lines(lines, budget=1000).splitlines() == [
+            "start",
+            "waiting...  [重複 50 次]",
+            "end",
+        ]
+
+    def test_keeps_head_tail_and_errors_within_budget(self):
+        """測試保留開頭、結尾與中間的錯誤行，並標註省略行數"""
+        lines = [f"compiling module {i}" for i in range(1000)]
+        lines[500] = "ERROR: module 500 failed to compile"
+
+        result = compact_log_lines(lines, budget=1200)
+        kept = result.splitlines()
+
+        assert len(result.encode("utf-8")) < 1400
+        assert kept[0] == "compiling module 0"
+        assert kept[-1] == "compiling module 999"
+        assert "ERROR: module 500 failed to compile" in kept
+        assert any(line.startswith("... 已省略") for line in kept)
+        # 省略標記的行數加上保留的行數等於原始行數
+        omitted = sum(
+            int(line.split()[2]) for line in kept if line.startswith("... 已省略")
+        )
+        assert omitted + len(kept) - result.count("... 已省略") == 1000
+
+    def test_token_budget(self, monkeypatch):
+        """測試以估算 token 限制預算"""
+        monkeypatch.setenv("MCP_RESULT_LOG_MAX_TOKENS", "100")
+        assert get_result_log_budget() == 400
+
+        lines = ["編譯中文模組"] * 3 + [f"步驟 {i} 完成" for i in range(200)]
+        result = compact_log_lines(lines)
+        assert estimate_tokens(result) <= 150
+
+    def test_compact_text(self):
+        """測試按行壓縮文字"""
+        assert compact_log_text("") == ""
+        assert compact_log_text("a\na\nb\n", budget=100) == "a  [重複 2 次]\nb"
+
+
+class TestFeedbackTextCompaction:
+    """create_feedback_text 壓縮測試"""
+
+    def test_command_logs_are_compacted(self, monkeypatch):
+        """測試回饋文字中的命令日誌經過壓縮"""
+        monkeypatch.setenv("MCP_RESULT_LOG_MAX_BYTES", "2000")
+        logs = "\n".join(f"test case {i} passed" for i in range(5000))
+
+        text = create_feedback_text(
+            {"interactive_feedback": "ok", "command_logs": logs}
+        )
+
+        assert len(text.encode("utf-8")) < 3000
+        assert "test case 4999 passed" in text
+
+    def test_full_base64_respects_budget(self, monkeypatch):
+        """測試完整 Base64 超出預算時省略"""
+        monkeypatch.setenv("MCP_RESULT_BASE64_MAX_BYTES", "100")
+        small = base64.b64encode(b"x" * 30).decode()
+        large = base64.b64encode(b"y" * 300).decode()
+        feedback = {
+            "images": [
+                {"name": "small.png", "data": small, "size": 30},
+                {"name": "large.png", "data": large, "size": 300},
+            ],
+            "settings": {"enable_base64_detail": True},
+        }
+
+        text = create_feedback_text(feedback)
+
+        assert f"data:image/png;base64,{small}" in text
+        assert large not in text
+        assert "已省略（超出回傳大小預算）" in text
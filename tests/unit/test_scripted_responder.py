@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+無頭腳本回應器測試
+"""
+
+import json
+import sys
+
+import pytest
+from fastmcp import Client
+
+from mcp_feedback_enhanced import server, web
+from mcp_feedback_enhanced.utils.scripted_responder import (
+    ScriptedResponder,
+    get_scripted_responder,
+)
+
+
+class TestScriptedResponder:
+    """ScriptedResponder 測試"""
+
+    @pytest.mark.asyncio
+    async def test_rules_first_match_wins(self, tmp_path):
+        """測試依序比對規則，沒有符合時使用預設回答"""
+        rules = tmp_path / "rules.json"
+        rules.write_text(
+            json.dumps(
+                {
+                    "default": "繼續",
+                    "rules": [
+                        {"summary": "測試失敗", "response": "先修測試"},
+                        {"project": "other", "response": "其他專案"},
+                        {"summary": "完成", "response": {"interactive_feedback": "好"}},
+                    ],
+                }
+            ),
+            encoding="utf-8",
+        )
+        responder = ScriptedResponder("rules", str(rules))
+
+        result = await responder.respond(str(tmp_path), "重構完成")
+        assert result["interactive_feedback"] == "好"
+        assert result["responder"]["rule"] == 2
+        assert result["session_id"].startswith("responder-")
+
+        result = await responder.respond(str(tmp_path), "沒有規則")
+        assert result["interactive_feedback"] == "繼續"
+        assert responder.get_stats()["defaulted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_consumed_in_order(self, tmp_path):
+        """測試佇列依序回答，用完後使用預設回答"""
+        answers = tmp_path / "answers.jsonl"
+        answers.write_text(
+            '"第一"\n\n{"interactive_feedback": "第二", "command_logs": "ok"}\n第三\n',
+            encoding="utf-8",
+        )
+        responder = ScriptedResponder("queue", str(answers), "結束")
+
+        replies = [await responder.respond(str(tmp_path), "s") for _ in range(4)]
+
+        assert [r["interactive_feedback"] for r in replies] == [
+            "第一",
+            "第二",
+            "第三",
+            "結束",
+        ]
+        assert replies[1]["command_logs"] == "ok"
+        assert responder.get_stats()["queue_remaining"] == 0
+
+    @pytest.mark.asyncio
+    async def test_script_receives_call_on_stdin(self, tmp_path):
+        """測試腳本從 stdin 取得呼叫內容，stdout 作為回饋"""
+        script = tmp_path / "answer.py"
+        script.write_text(
+            "import json, sys\n"
+            "call = json.load(sys.stdin)\n"
+            "print(json.dumps({'interactive_feedback': "
+            "'收到: ' + call['summary'] + ' #' + str(call['call'])}))\n",
+            encoding="utf-8",
+        )
+        responder = ScriptedResponder("script", f'"{sys.executable}" "{script}"')
+
+        result = await responder.respond(str(tmp_path), "摘要")
+
+        assert result["interactive_feedback"] == "收到: 摘要 #1"
+        assert result["responder"]["exit_code"] == 0
+
+    @pytest.mark.asyncio
+    async def test_script_failure_raises(self, tmp_path):
+        """測試腳本失敗時拋出錯誤而不是回答空字串"""
+        responder = ScriptedResponder(
+            "script", f'"{sys.executable}" -c "import sys; sys.exit(3)"'
+        )
+        with pytest.raises(RuntimeError, match="3"):
+            await responder.respond(str(tmp_path), "摘要")
+
+    def test_invalid_configuration(self, monkeypatch):
+        """測試未知模式或缺少來源時拒絕建立"""
+        with pytest.raises(ValueError):
+            ScriptedResponder("browser", "x")
+        with pytest.raises(ValueError):
+            ScriptedResponder("queue", "")
+
+        monkeypatch.delenv("MCP_RESPONDER", raising=False)
+        assert get_scripted_responder() is None
+
+
+class TestResponderTool:
+    """interactive_feedback 使用回應器測試"""
+
+    @pytest.mark.asyncio
+    async def test_tool_answers_without_web_ui(self, tmp_path, monkeypatch):
+        """測試設定回應器後工具不啟動 Web UI"""
+        answers = tmp_path / "answers.txt"
+        answers.write_text("自動回答\n", encoding="utf-8")
+        monkeypatch.setenv("MCP_RESPONDER", "queue")
+        monkeypatch.setenv("MCP_RESPONDER_SOURCE", str(answers))
+
+        async def fail_launch(*args, **kwargs):
+            raise AssertionError("不應啟動 Web UI")
+
+        monkeypatch.setattr(web, "launch_web_feedback_ui", fail_launch)
+        recorded = []
+        monkeypatch.setattr(server.get_feedback_journal(), "record", recorded.append)
+
+        async with Client(server.mcp) as client:
+            result = await client.call_tool(
+                "interactive_feedback",
+                {"project_directory": str(tmp_path), "summary": "完成"},
+            )
+
+        assert "自動回答" in result[0].text
+        assert recorded[0]["responder"]["mode"] == "queue"
+        assert recorded[0]["responder"]["summary"] == "完成"
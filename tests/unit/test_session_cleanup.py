@@ -7,9 +7,11 @@
 """
 
 import asyncio
+import json
 import time
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 
+import anyio
 import pytest
 
 # 移除手動路徑操作，讓 mypy 和 pytest 使用正確的模組解析
@@ -159,8 +161,8 @@ class TestWebFeedbackSessionCleanup:
         """測試異步清理"""
         # 模擬 WebSocket 連接
         mock_websocket = Mock()
-        mock_websocket.send_json = Mock(return_value=asyncio.Future())
-        mock_websocket.send_json.return_value.set_result(None)
+        mock_websocket.send_text = Mock(return_value=asyncio.Future())
+        mock_websocket.send_text.return_value.set_result(None)
         mock_websocket.close = Mock(return_value=asyncio.Future())
         mock_websocket.close.return_value.set_result(None)
         mock_websocket.client_state.DISCONNECTED = False
@@ -171,13 +173,50 @@ class TestWebFeedbackSessionCleanup:
         await self.session._cleanup_resources_enhanced(CleanupReason.TIMEOUT)
 
         # 檢查 WebSocket 是否被正確處理
-        mock_websocket.send_json.assert_called_once()
+        mock_websocket.send_text.assert_called_once()
 
         # 檢查清理統計
         stats = self.session.get_cleanup_stats()
         assert stats["cleanup_count"] == 1
         assert stats["cleanup_reason"] == CleanupReason.TIMEOUT.value
 
+    @pytest.mark.asyncio
+    async def test_cancelled_wait_releases_resources(self):
+        """測試 MCP 請求取消時立即釋放等待線程與計時器並通知分頁"""
+        mock_websocket = Mock()
+        mock_websocket.send_text = AsyncMock()
+        self.session.websocket = mock_websocket
+        self.session.update_timeout_settings(enabled=True, timeout_seconds=300)
+        assert self.session.user_timeout_timer is not None
+
+        # MCP SDK 以 anyio 取消範圍取消工具呼叫
+        with anyio.move_on_after(0.2) as scope:
+            await self.session.wait_for_feedback(timeout=60)
+        assert scope.cancelled_caught
+
+        assert self.session.status == SessionStatus.CANCELLED
+        assert self.session.is_terminal()
+        assert self.session.feedback_completed.is_set()
+        assert self.session.cleanup_timer is None
+        assert self.session.user_timeout_timer is None
+
+        await self.session._notice_task
+        notice = json.loads(mock_websocket.send_text.call_args.args[0])
+        assert notice["code"] == "session.cancelled"
+        # 分頁連接保留給下一個會話
+        assert self.session.websocket is mock_websocket
+
+    @pytest.mark.asyncio
+    async def test_cancelled_task_propagates(self):
+        """測試取消等待任務時 CancelledError 繼續向上傳遞"""
+        task = asyncio.create_task(self.session.wait_for_feedback(timeout=60))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert self.session.status == SessionStatus.CANCELLED
+
     def test_status_update_resets_timer(self):
         """測試狀態更新重置定時器"""
         old_timer = self.session.cleanup_timer
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+會話詳情端點測試
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.routes import main_routes
+from tests.fixtures.test_data import TestData
+
+
+@pytest.fixture
+def session_with_history(web_ui_manager, test_project_dir):
+    """建立帶有用戶消息與命令日誌的會話"""
+    web_ui_manager.create_session(
+        str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+    )
+    session = web_ui_manager.get_current_session()
+    for i in range(5):
+        session.user_messages.append({"timestamp": i, "content": f"訊息 {i}"})
+    for i in range(3):
+        session.add_log(f"日誌 {i}")
+    return session
+
+
+class TestSessionDetail:
+    """/api/sessions/{session_id} 測試"""
+
+    def test_list_carries_summaries_only(self, web_ui_manager, session_with_history):
+        """測試會話列表只帶摘要與數量"""
+        client = TestClient(web_ui_manager.app)
+
+        listed = client.get("/api/all-sessions").json()["sessions"][0]
+
+        assert "user_messages" not in listed
+        assert listed["user_message_count"] == 5
+
+        projected = client.get("/api/all-sessions?fields=user_messages").json()
+        assert len(projected["sessions"][0]["user_messages"]) == 5
+
+    def test_list_projection_is_bounded(
+        self, web_ui_manager, session_with_history, monkeypatch
+    ):
+        """測試以 fields 請求用戶消息時只帶最新一頁與起始索引"""
+        monkeypatch.setattr(main_routes, "MAX_DETAIL_PAGE_SIZE", 2)
+        client = TestClient(web_ui_manager.app)
+
+        projected = client.get("/api/all-sessions?fields=user_messages").json()
+        listed = projected["sessions"][0]
+        assert [m["content"] for m in listed["user_messages"]] == ["訊息 3", "訊息 4"]
+        assert listed["user_messages_offset"] == 3
+
+    def test_detail_pages_messages_and_logs(self, web_ui_manager, session_with_history):
+        """測試用戶消息與命令日誌分頁"""
+        client = TestClient(web_ui_manager.app)
+        url = f"/api/sessions/{session_with_history.session_id}"
+
+        first = client.get(url, params={"messages_limit": 2, "logs_limit": 2}).json()
+        assert [m["content"] for m in first["user_messages"]["items"]] == [
+            "訊息 0",
+            "訊息 1",
+        ]
+        assert first["user_messages"]["next_offset"] == 2
+        assert first["command_logs"]["items"] == ["日誌 0", "日誌 1"]
+        assert first["is_current"] is True
+
+        last = client.get(url, params={"messages_offset": 4}).json()
+        assert last["user_messages"]["total"] == 5
+        assert len(last["user_messages"]["items"]) == 1
+        assert last["user_messages"]["next_offset"] is None
+
+    def test_unknown_session_and_bad_params(self, web_ui_manager, session_with_history):
+        """測試不存在的會話與無效參數"""
+        client = TestClient(web_ui_manager.app)
+
+        assert client.get("/api/sessions/missing").status_code == 404
+        response = client.get(
+            f"/api/sessions/{session_with_history.session_id}?messages_limit=abc"
+        )
+        assert response.status_code == 400
+
+    def test_history_save_backfills_live_messages(
+        self, web_ui_manager, session_with_history, tmp_path, monkeypatch
+    ):
+        """測試保存歷史時以伺服器端資料補齊未載入的用戶消息"""
+        monkeypatch.setattr("pathlib.Path.home", lambda: tmp_path)
+        client = TestClient(web_ui_manager.app)
+
+        client.post(
+            "/api/save-session-history",
+            json={"sessions": [{"session_id": session_with_history.session_id}]},
+        )
+        saved = client.get("/api/load-session-history").json()
+
+        assert len(saved["sessions"][0]["user_messages"]) == 5
+
+    def test_history_backfill_reads_only_missing_messages(
+        self, web_ui_manager, session_with_history, monkeypatch
+    ):
+        """測試補齊時只讀取前端缺少的部分，且每次有上限"""
+        monkeypatch.setattr(main_routes, "MAX_DETAIL_PAGE_SIZE", 2)
+        local = [{"timestamp": 0, "content": "訊息 0"}]
+        sessions = main_routes.backfill_user_messages(
+            web_ui_manager,
+            [{"session_id": session_with_history.session_id, "user_messages": local}],
+        )
+
+        assert [m["content"] for m in sessions[0]["user_messages"]] == [
+            "訊息 0",
+            "訊息 1",
+            "訊息 2",
+        ]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+會話增量事件測試
+"""
+
+import asyncio
+
+import pytest
+
+from mcp_feedback_enhanced.web.models import SessionStatus, WebFeedbackSession
+from tests.fixtures.test_data import TestData
+
+
+class TestSessionEvents:
+    """會話事件發出測試"""
+
+    @pytest.fixture
+    def session(self, test_project_dir):
+        session = WebFeedbackSession(
+            "event-session", str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        events = []
+        session.event_listeners.append(events.append)
+        session.events = events
+        return session
+
+    def test_next_step_emits_status_changed(self, session):
+        """測試狀態流轉發出 session_status_changed"""
+        session.next_step()
+
+        event = session.events[-1]
+        assert event["type"] == "session_status_changed"
+        assert event["session_id"] == "event-session"
+        assert event["status"] == SessionStatus.ACTIVE.value
+
+    def test_terminal_state_does_not_emit(self, session):
+        """測試無法流轉時不發出事件"""
+        session.set_error()
+        count = len(session.events)
+
+        assert session.next_step() is False
+        assert len(session.events) == count
+
+    def test_add_user_message_emits_event(self, session):
+        """測試新增用戶消息發出 user_message_added"""
+        session.add_user_message({"content": "hello"})
+
+        event = session.events[-1]
+        assert event["type"] == "user_message_added"
+        assert event["message"]["content"] == "hello"
+
+    def test_failing_listener_does_not_break_session(self, session):
+        """測試監聽器失敗不影響會話操作"""
+
+        def broken_listener(message):
+            raise RuntimeError("boom")
+
+        session.event_listeners.insert(0, broken_listener)
+
+        assert session.next_step() is True
+        assert session.events[-1]["type"] == "session_status_changed"
+
+
+class TestManagerSessionEvents:
+    """WebUIManager 事件發布測試"""
+
+    def test_create_session_publishes_session_added(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試建立會話時推送 session_added（無事件循環時寫入緩衝區）"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+
+        buffered = session.replay_buffer.get_since(0)
+        assert buffered[-1]["type"] == "session_added"
+        assert buffered[-1]["session"]["session_id"] == session.session_id
+
+    def test_old_session_events_go_to_current_channel(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試舊會話的狀態變更經由新的活躍會話推送"""
+        web_ui_manager.create_session(str(test_project_dir), "第一個會話")
+        old_session = web_ui_manager.get_current_session()
+        old_session.next_step()
+        old_session.next_step()
+
+        web_ui_manager.create_session(str(test_project_dir), "第二個會話")
+        new_session = web_ui_manager.get_current_session()
+        old_session.add_user_message({"content": "late"})
+
+        types = [m["type"] for m in new_session.replay_buffer.get_since(0)]
+        assert types == ["session_added", "user_message_added"]
+
+    @pytest.mark.asyncio
+    async def test_events_delivered_over_websocket(
+        self, web_ui_manager, test_project_dir
+    ):
+        """測試有事件循環時透過 WebSocket 即時推送"""
+        web_ui_manager.create_session(
+            str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+        )
+        session = web_ui_manager.get_current_session()
+        sent = []
+
+        class FakeWebSocket:
+            async def send_text(self, data):
+                sent.append(data)
+
+        session.websocket = FakeWebSocket()
+        session.next_step()
+        await asyncio.sleep(0)
+
+        assert any('"session_status_changed"' in data for data in sent)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+會話註冊表與 /api/all-sessions 條件請求測試
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.utils import session_registry
+from mcp_feedback_enhanced.web.utils.session_registry import SessionRegistry
+
+
+def fake_session(created_at: float):
+    """建立只含排序所需屬性的假會話"""
+    return SimpleNamespace(created_at=created_at)
+
+
+class TestSessionRegistry:
+    """SessionRegistry 測試"""
+
+    def test_mutations_bump_version(self):
+        """測試新增、變更、移除都會遞增版本"""
+        registry = SessionRegistry()
+        registry["a"] = fake_session(1.0)
+        assert registry.version == 1
+
+        registry.touch("a")
+        del registry["a"]
+        assert registry.version == 3
+        assert "a" not in registry
+
+    @pytest.mark.asyncio
+    async def test_wait_for_change(self):
+        """測試長輪詢等待由其他線程的變更喚醒，沒有變更時逾時"""
+        registry = SessionRegistry()
+        version = registry.version
+
+        assert not await registry.wait_for_change(version, 0.05)
+
+        timer = threading.Timer(0.05, registry.touch)
+        timer.start()
+        try:
+            assert await registry.wait_for_change(version, 5)
+        finally:
+            timer.join()
+        assert registry.version == version + 1
+        assert await registry.wait_for_change(version, 0)
+
+    def test_changes_since(self):
+        """測試依版本計算變更與移除的會話"""
+        registry = SessionRegistry()
+        registry["a"] = fake_session(1.0)
+        registry["b"] = fake_session(2.0)
+        version = registry.version
+
+        registry.touch("a")
+        registry.pop("b")
+
+        assert registry.changes_since(version) == (["a"], ["b"])
+        assert registry.changes_since(registry.version) == ([], [])
+        assert registry.changes_since(registry.version + 1) is None
+
+    def test_remote_changes(self):
+        """測試遠端會話變更遞增版本並出現在增量中"""
+        registry = SessionRegistry()
+        registry["a"] = fake_session(1.0)
+        version = registry.version
+
+        registry.touch_remote("remote")
+        registry.touch_remote("a")
+
+        assert registry.version == version + 2
+        assert registry.changes_since(version) == (["a", "remote"], [])
+
+    def test_pruned_removals_require_full_sync(self, monkeypatch):
+        """測試已移除記錄被裁剪後，過舊的版本需要完整同步"""
+        monkeypatch.setattr(session_registry, "MAX_REMOVED_RECORDS", 1)
+        registry = SessionRegistry()
+        registry["a"] = fake_session(1.0)
+        registry["b"] = fake_session(2.0)
+        del registry["a"]
+        del registry["b"]
+
+        assert registry.changes_since(0) is None
+        assert registry.changes_since(registry.version - 1) == ([], ["b"])
+
+    def test_cursor_pagination(self):
+        """測試游標分頁按創建時間倒序且跨頁不重複"""
+        registry = SessionRegistry()
+        for i in range(5):
+            registry[f"s{i}"] = fake_session(float(i))
+
+        first, cursor = registry.page(None, 2)
+        second, cursor = registry.page(cursor, 2)
+        third, cursor = registry.page(cursor, 2)
+
+        assert first == ["s4", "s3"]
+        assert second == ["s2", "s1"]
+        assert third == ["s0"]
+        assert cursor is None
+
+    def test_invalid_cursor(self):
+        """測試無效游標"""
+        registry = SessionRegistry()
+
+        with pytest.raises(ValueError):
+            registry.page("not-a-cursor", 10)
+
+
+class TestAllSessionsEndpoint:
+    """/api/all-sessions 端點測試"""
+
+    @pytest.fixture
+    def client(self, web_ui_manager, test_project_dir):
+        for i in range(3):
+            web_ui_manager.create_session(str(test_project_dir), f"會話 {i}")
+        return TestClient(web_ui_manager.app)
+
+    def test_etag_and_not_modified(self, client, web_ui_manager):
+        """測試未變更的輪詢返回 304，變更後返回新資料"""
+        response = client.get("/api/all-sessions")
+        etag = response.headers["etag"]
+        assert response.json()["total"] == 3
+
+        cached = client.get("/api/all-sessions", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+
+        web_ui_manager.get_current_session().add_user_message({"content": "hi"})
+        changed = client.get("/api/all-sessions", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_fields_projection(self, client):
+        """測試欄位投影只返回指定欄位（session_id 一律包含）"""
+        response = client.get("/api/all-sessions?fields=status,is_current")
+
+        for session in response.json()["sessions"]:
+            assert set(session) == {"session_id", "status", "is_current"}
+
+        assert client.get("/api/all-sessions?fields=secret").status_code == 400
+
+    def test_limit_and_cursor(self, client):
+        """測試分頁參數"""
+        first = client.get("/api/all-sessions?limit=2").json()
+        assert len(first["sessions"]) == 2
+
+        cursor = first["next_cursor"]
+        second = client.get("/api/all-sessions", params={"cursor": cursor}).json()
+        assert len(second["sessions"]) == 1
+        assert second["next_cursor"] is None
+
+        assert client.get("/api/all-sessions?limit=0").status_code == 400
+
+    def test_since_returns_delta(self, client, web_ui_manager):
+        """測試 since= 只返回變更過的會話與已移除的會話"""
+        version = client.get("/api/all-sessions").json()["version"]
+        sessions = list(web_ui_manager.sessions.values())
+        sessions[0].add_user_message({"content": "hi"})
+        web_ui_manager.remove_session(sessions[1].session_id)
+
+        delta = client.get(f"/api/all-sessions?since={version}").json()
+
+        assert delta["delta"] is True
+        assert [s["session_id"] for s in delta["sessions"]] == [sessions[0].session_id]
+        assert delta["removed"] == [sessions[1].session_id]
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+持久化會話存儲測試
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web import main
+from mcp_feedback_enhanced.web.models import SessionStatus
+from mcp_feedback_enhanced.web.utils import session_store
+from mcp_feedback_enhanced.web.utils.redis_client import RedisClient
+from mcp_feedback_enhanced.web.utils.session_store import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SQLiteSessionStore,
+)
+from tests.fixtures.test_data import TestData
+from tests.helpers.fake_redis import FakeRedisServer
+
+
+@pytest.fixture
+def fake_redis():
+    server = FakeRedisServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def redis_store(fake_redis):
+    store = RedisSessionStore(fake_redis.url, prefix="test")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteSessionStore(tmp_path / "sessions.db")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def persistent_manager(web_ui_manager, store):
+    """啟用持久化存儲的 WebUIManager"""
+    web_ui_manager.session_store = store
+    return web_ui_manager
+
+
+class TestSQLiteSessionStore:
+    """SQLiteSessionStore 測試"""
+
+    def test_snapshot_and_logs_roundtrip(self, store):
+        """測試快照與命令日誌寫入後可讀回"""
+        store.save_snapshot({"session_id": "a", "created_at": 1, "status": "waiting"})
+        for i in range(3):
+            store.append_log("a", f"line {i}")
+
+        assert store.load_session("a")["status"] == "waiting"
+        assert store.get_logs("a", 1, 10) == (["line 1", "line 2"], 3)
+        assert store.load_session("missing") is None
+
+    def test_group_commit_coalesces_snapshots(self, store):
+        """測試同一批次內同一會話的快照合併為一次寫入"""
+        for i in range(20):
+            store.save_snapshot({"session_id": "a", "created_at": 1, "revision": i})
+        store.flush()
+
+        assert store.load_session("a")["revision"] == 19
+        assert store.stats["batches"] < 20
+        assert store.stats["coalesced"] > 0
+
+    def test_survives_reopen(self, tmp_path):
+        """測試重新開啟後（模擬伺服器重啟）資料仍在"""
+        first = SQLiteSessionStore(tmp_path / "sessions.db")
+        first.save_snapshot({"session_id": "a", "created_at": 1, "status": "waiting"})
+        first.append_log("a", "before restart")
+        first.close()
+
+        second = SQLiteSessionStore(tmp_path / "sessions.db")
+        second.append_log("a", "after restart")
+
+        assert second.load_session("a")["status"] == "waiting"
+        assert second.get_logs("a")[0] == ["before restart", "after restart"]
+        _, total = second.list_sessions()
+        assert total == 1
+        second.close()
+
+    def test_log_lines_share_one_queue_item(self, store):
+        """測試同一會話待提交的日誌行在寫入佇列中只佔一個項目"""
+        for i in range(1000):
+            store.append_log("a", f"line {i}")
+
+        assert store._queue.qsize() <= 1
+        assert store.get_logs("a", 998, 10) == (["line 998", "line 999"], 1000)
+
+    def test_delete(self, store):
+        """測試刪除會話同時移除日誌"""
+        store.save_snapshot({"session_id": "a", "created_at": 1})
+        store.append_log("a", "line")
+        store.delete("a")
+
+        assert store.load_session("a") is None
+        assert store.get_logs("a") == ([], 0)
+
+    def test_disabled_by_default(self, monkeypatch):
+        """測試未設定環境變數時不啟用"""
+        monkeypatch.delenv("MCP_SESSION_STORE", raising=False)
+        assert session_store.get_session_store() is None
+
+
+class TestManagerPersistence:
+    """WebUIManager 持久化整合測試"""
+
+    def test_session_changes_are_persisted(self, persistent_manager, store):
+        """測試狀態、用戶消息與日誌變更會寫入存儲"""
+        session_id = persistent_manager.create_session(
+            "/tmp/project", TestData.SAMPLE_SESSION["summary"]
+        )
+        session = persistent_manager.get_current_session()
+        session.add_user_message({"content": "hello"})
+        session.add_log("output")
+        session.next_step("處理中")
+        session.next_step("已送出反饋")
+
+        snapshot = store.load_session(session_id)
+        assert snapshot["status"] == SessionStatus.FEEDBACK_SUBMITTED.value
+        assert snapshot["user_messages"][0]["content"] == "hello"
+        assert store.get_logs(session_id)[0] == ["output"]
+
+    def test_evicted_session_served_from_store(
+        self, persistent_manager, store, monkeypatch
+    ):
+        """測試已結束的冷會話移出記憶體後仍可透過詳情端點取得"""
+        monkeypatch.setenv("MCP_SESSION_STORE_MAX_RESIDENT", "0")
+        first_id = persistent_manager.create_session("/tmp/a", "first")
+        persistent_manager.get_current_session().add_log("first output")
+        persistent_manager.get_current_session().next_step("處理中")
+        persistent_manager.get_current_session().next_step("已送出反饋")
+        persistent_manager.create_session("/tmp/b", "second")
+        persistent_manager.create_session("/tmp/c", "third")
+
+        assert first_id not in persistent_manager.sessions
+
+        client = TestClient(persistent_manager.app)
+        detail = client.get(f"/api/sessions/{first_id}").json()
+
+        assert detail["restored"] is True
+        assert detail["is_current"] is False
+        assert detail["status"] == SessionStatus.COMPLETED.value
+        assert detail["command_logs"]["items"] == ["first output"]
+
+    def test_evicted_session_listed_from_store(
+        self, persistent_manager, store, monkeypatch
+    ):
+        """測試會話列表在記憶體中的會話之後列出已移出記憶體的會話"""
+        monkeypatch.setenv("MCP_SESSION_STORE_MAX_RESIDENT", "0")
+        first_id = persistent_manager.create_session("/tmp/a", "first")
+        persistent_manager.get_current_session().next_step("處理中")
+        persistent_manager.get_current_session().next_step("已送出反饋")
+        current_id = persistent_manager.create_session("/tmp/b", "second")
+
+        assert first_id not in persistent_manager.sessions
+
+        client = TestClient(persistent_manager.app)
+        sessions = client.get("/api/all-sessions").json()["sessions"]
+        assert [s["session_id"] for s in sessions] == [current_id, first_id]
+        assert sessions[1]["restored"] is True
+        assert sessions[1]["is_current"] is False
+        assert "feedback_result" not in sessions[1]
+
+        first = client.get("/api/all-sessions?limit=1").json()
+        assert [s["session_id"] for s in first["sessions"]] == [current_id]
+        second = client.get(
+            "/api/all-sessions", params={"cursor": first["next_cursor"]}
+        ).json()
+        assert [s["session_id"] for s in second["sessions"]] == [first_id]
+        assert second["next_cursor"] is None
+
+    def test_unpaginated_listing_is_capped(
+        self, persistent_manager, store, monkeypatch
+    ):
+        """測試未指定 limit 時持久化會話仍分頁，且只讀取摘要"""
+        monkeypatch.setattr(main, "MAX_STORED_SESSIONS_PER_PAGE", 2)
+        for i in range(3):
+            store.save_snapshot(
+                {
+                    "session_id": f"s{i}",
+                    "created_at": i,
+                    "user_messages": [{"content": "大量訊息"}],
+                }
+            )
+
+        client = TestClient(persistent_manager.app)
+        first = client.get("/api/all-sessions").json()
+        assert [s["session_id"] for s in first["sessions"]] == ["s2", "s1"]
+        assert first["next_cursor"] is not None
+
+        snapshots, _ = persistent_manager.list_stored_sessions()
+        assert all("user_messages" not in s for s in snapshots)
+
+        second = client.get(
+            "/api/all-sessions", params={"cursor": first["next_cursor"]}
+        ).json()
+        assert [s["session_id"] for s in second["sessions"]] == ["s0"]
+        assert second["next_cursor"] is None
+
+    def test_store_failure_falls_back_to_live_sessions(self, persistent_manager, store):
+        """測試存儲無法連接時，會話列表與詳情仍由記憶體中的會話提供"""
+        session_id = persistent_manager.create_session("/tmp/a", "live")
+
+        def unavailable(*args, **kwargs):
+            raise ConnectionRefusedError(111, "Connection refused")
+
+        store.list_sessions = unavailable
+        store.load_session = unavailable
+        client = TestClient(persistent_manager.app)
+
+        response = client.get("/api/all-sessions")
+        assert response.status_code == 200
+        assert [s["session_id"] for s in response.json()["sessions"]] == [session_id]
+        assert client.get("/api/sessions/missing").status_code == 404
+
+
+class TestBackends:
+    """各後端共同行為測試"""
+
+    @pytest.fixture(params=["memory", "sqlite", "redis"])
+    def backend(self, request, tmp_path):
+        if request.param == "memory":
+            store = MemorySessionStore()
+        elif request.param == "sqlite":
+            store = SQLiteSessionStore(tmp_path / "sessions.db")
+        else:
+            server = FakeRedisServer().start()
+            request.addfinalizer(server.stop)
+            store = RedisSessionStore(server.url, prefix="test")
+        yield store
+        store.close()
+
+    def test_list_and_logs(self, backend):
+        """測試分頁列出與日誌讀取"""
+        for i in range(3):
+            backend.save_snapshot({"session_id": f"s{i}", "created_at": i})
+        backend.append_log("s1", "a")
+        backend.append_log("s1", "b")
+
+        sessions, total = backend.list_sessions(1, 5)
+        assert total == 3
+        assert [s["session_id"] for s in sessions] == ["s1", "s0"]
+        assert backend.get_logs("s1", 1, 5) == (["b"], 2)
+
+        backend.save_snapshot(
+            {"session_id": "s1", "created_at": 1, "user_messages": ["m"]}
+        )
+        summaries, _ = backend.list_sessions(0, 5, summary=True)
+        assert summaries[1] == {"session_id": "s1", "created_at": 1}
+        assert backend.list_sessions(1, 1)[0][0]["user_messages"] == ["m"]
+
+        backend.delete("s1")
+        assert backend.load_session("s1") is None
+        assert backend.get_logs("s1") == ([], 0)
+
+    def test_logs_capped_per_session(self, backend):
+        """測試每個會話只保留最新的 max_log_lines 行日誌"""
+        backend.max_log_lines = 5
+        for i in range(12):
+            backend.append_log("a", f"line {i}")
+        backend.append_logs("a", ["line 12", "line 13"])
+
+        lines, total = backend.get_logs("a")
+        assert total == 5
+        assert lines == [f"line {i}" for i in range(9, 14)]
+
+    def test_create_from_env(self, monkeypatch):
+        """測試依環境變數選擇後端，未知後端視為停用"""
+        monkeypatch.setenv("MCP_SESSION_STORE", "Memory")
+        assert session_store.get_session_store_backend() == "memory"
+        monkeypatch.setenv("MCP_SESSION_STORE", "etcd")
+        assert session_store.get_session_store_backend() is None
+
+
+class TestRedisSessionStore:
+    """Redis 後端測試（本地假 Redis 伺服器）"""
+
+    def test_group_commit_uses_pipeline(self, redis_store, fake_redis):
+        """測試同一批次的快照合併後以管線寫入"""
+        for i in range(10):
+            redis_store.save_snapshot({"session_id": "a", "created_at": 1, "rev": i})
+        redis_store.flush()
+
+        assert redis_store.load_session("a")["rev"] == 9
+        # 每批只寫入一次快照 SET、摘要 SET 與 ZADD
+        assert fake_redis.command_count <= redis_store.stats["batches"] * 3 + 1
+
+    def test_pubsub_across_nodes(self, fake_redis):
+        """測試一個節點發布的事件會送達另一個節點的訂閱者"""
+        node_a = RedisSessionStore(fake_redis.url, prefix="test")
+        node_b = RedisSessionStore(fake_redis.url, prefix="test")
+        received = []
+        done = threading.Event()
+
+        def on_event(payload):
+            received.append(payload)
+            done.set()
+
+        try:
+            node_b.subscribe(on_event)
+            assert node_b.wait_subscribed()
+            node_a.publish({"node_id": "a", "event": {"type": "session_added"}})
+
+            assert done.wait(5)
+            assert received[0]["event"]["type"] == "session_added"
+        finally:
+            node_a.close()
+            node_b.close()
+
+    def test_shared_sessions_across_nodes(self, fake_redis):
+        """測試不同節點共用會話快照與日誌"""
+        node_a = RedisSessionStore(fake_redis.url, prefix="test")
+        node_b = RedisSessionStore(fake_redis.url, prefix="test")
+        try:
+            node_a.save_snapshot({"session_id": "a", "created_at": 1})
+            node_a.append_log("a", "from node a")
+            node_a.flush()
+
+            assert node_b.load_session("a")["session_id"] == "a"
+            assert node_b.get_logs("a")[0] == ["from node a"]
+        finally:
+            node_a.close()
+            node_b.close()
+
+    def test_publish_does_not_block_on_network(self):
+        """測試發布只排入背景線程，Redis 無法連線時呼叫端不等待"""
+        store = RedisSessionStore("redis://127.0.0.1:1/0", prefix="test")
+        try:
+            started = time.monotonic()
+            store.publish({"event": {"type": "session_added"}})
+            assert time.monotonic() - started < 0.5
+            assert store.get_stats()["pending"] == 1
+        finally:
+            store.close()
+
+
+class TestRedisClient:
+    """RedisClient 重試行為測試"""
+
+    def test_writes_are_not_resent_after_sending(self, fake_redis):
+        """測試送出後才斷線的寫入不會重送"""
+        client = RedisClient(fake_redis.url)
+        try:
+            fake_redis.drop_next_reply = True
+            with pytest.raises((ConnectionError, OSError)):
+                client.execute("RPUSH", "log", "line")
+            assert fake_redis.lists[b"log"] == [b"line"]
+        finally:
+            client.close()
+
+    def test_reads_are_retried(self, fake_redis):
+        """測試唯讀命令在斷線後重試一次"""
+        client = RedisClient(fake_redis.url)
+        try:
+            client.execute("SET", "key", "value")
+            fake_redis.drop_next_reply = True
+            assert client.execute("GET", "key") == b"value"
+        finally:
+            client.close()
+
+    def test_idle_connection_closed_by_server(self, fake_redis):
+        """測試閒置連線被伺服器關閉後，寫入在送出前重連而不遺失"""
+        client = RedisClient(fake_redis.url)
+        try:
+            client.execute("RPUSH", "log", "first")
+            fake_redis.disconnect_all()
+            time.sleep(0.05)
+            client.execute("RPUSH", "log", "second")
+            assert fake_redis.lists[b"log"] == [b"first", b"second"]
+        finally:
+            client.close()
+
+
+class TestManagerPubSub:
+    """WebUIManager 跨節點事件測試"""
+
+    def test_remote_events_are_dispatched(self, web_ui_manager, monkeypatch):
+        """測試其他節點的事件會推送到本節點，自身事件不會重複推送"""
+        store = MemorySessionStore()
+        web_ui_manager.session_store = store
+        store.subscribe(web_ui_manager._on_store_event)
+        dispatched = []
+        monkeypatch.setattr(
+            web_ui_manager, "_dispatch_session_event", dispatched.append
+        )
+
+        web_ui_manager.create_session("/tmp/project", "local")
+        store.publish({"node_id": "other-node", "event": {"type": "remote"}})
+
+        assert [event["type"] for event in dispatched] == ["session_added", "remote"]
+
+    def test_remote_events_invalidate_session_list(self, web_ui_manager, store):
+        """測試其他節點的事件讓 ETag 失效，增量回應包含該會話"""
+        web_ui_manager.session_store = store
+        client = TestClient(web_ui_manager.app)
+        first = client.get("/api/all-sessions")
+        etag = first.headers["etag"]
+        version = first.json()["version"]
+
+        store.save_snapshot(
+            {"session_id": "remote", "created_at": 1, "status": "waiting"}
+        )
+        web_ui_manager._on_store_event(
+            {
+                "node_id": "other-node",
+                "event": {
+                    "type": "session_status_changed",
+                    "session_id": "remote",
+                },
+            }
+        )
+
+        assert (
+            client.get("/api/all-sessions", headers={"If-None-Match": etag}).status_code
+            == 200
+        )
+        delta = client.get("/api/all-sessions", params={"since": version}).json()
+        assert delta["delta"] is True
+        assert [s["session_id"] for s in delta["sessions"]] == ["remote"]
+        assert delta["sessions"][0]["restored"] is True
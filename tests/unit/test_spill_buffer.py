@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+溢出到磁碟的有界環形緩衝區測試
+"""
+
+from mcp_feedback_enhanced.web.models import WebFeedbackSession
+from mcp_feedback_enhanced.web.models.feedback_session import build_stored_detail_info
+from mcp_feedback_enhanced.web.utils import spill_buffer
+from mcp_feedback_enhanced.web.utils.spill_buffer import (
+    OFFSET_STRIDE,
+    SpillRingBuffer,
+)
+
+
+def make_buffer(tmp_path, max_bytes=40) -> SpillRingBuffer:
+    return SpillRingBuffer(tmp_path / "spill.jsonl", max_bytes)
+
+
+class TestSpillRingBuffer:
+    """SpillRingBuffer 測試"""
+
+    def test_memory_is_bounded_by_bytes(self, tmp_path):
+        """測試記憶體用量不超過上限，超出部分寫入溢出檔案"""
+        buffer = make_buffer(tmp_path)
+        for i in range(20):
+            buffer.append(f"line {i:02d}")
+
+        stats = buffer.get_stats()
+        assert stats["memory_bytes"] <= 40
+        assert stats["spilled_items"] > 0
+        assert buffer.spill_path.exists()
+        assert len(buffer) == 20
+
+    def test_list_compatible_reads(self, tmp_path):
+        """測試索引、切片與迭代橫跨磁碟與記憶體"""
+        buffer = make_buffer(tmp_path)
+        expected = [f"line {i:02d}" for i in range(20)]
+        buffer.extend(expected)
+
+        assert list(buffer) == expected
+        assert buffer[0] == "line 00"
+        assert buffer[-1] == "line 19"
+        assert buffer[3:8] == expected[3:8]
+        assert buffer.tail(3) == expected[-3:]
+        assert buffer.read_range(18, 10) == expected[18:]
+
+    def test_dict_items_and_clear(self, tmp_path):
+        """測試字典項目與清空時刪除溢出檔案"""
+        buffer = make_buffer(tmp_path, max_bytes=64)
+        for i in range(10):
+            buffer.append({"timestamp": i, "content": "訊息"})
+
+        assert buffer[0] == {"timestamp": 0, "content": "訊息"}
+
+        buffer.clear()
+        assert len(buffer) == 0
+        assert not buffer.spill_path.exists()
+
+    def test_sparse_offset_index(self, tmp_path):
+        """測試偏移索引只記錄檢查點，跨檢查點的範圍讀取仍正確"""
+        buffer = make_buffer(tmp_path, max_bytes=20)
+        expected = [f"line {i:03d}" for i in range(300)]
+        buffer.extend(expected)
+
+        spilled = buffer.get_stats()["spilled_items"]
+        assert len(buffer._offsets) == -(-spilled // OFFSET_STRIDE)
+        assert buffer.read_range(0, 3) == expected[:3]
+        assert buffer.read_range(60, 10) == expected[60:70]
+        assert buffer.read_range(OFFSET_STRIDE, 1) == [expected[OFFSET_STRIDE]]
+        assert buffer.read_range(130, 150) == expected[130:280]
+        assert list(buffer) == expected
+
+    def test_iteration_streams_in_batches(self, tmp_path, monkeypatch):
+        """測試迭代逐批讀取溢出檔案，不一次載入全部項目"""
+        monkeypatch.setattr(spill_buffer, "ITER_BATCH_SIZE", 8)
+        buffer = make_buffer(tmp_path, max_bytes=20)
+        expected = [f"line {i:03d}" for i in range(100)]
+        buffer.extend(expected)
+
+        reads = []
+        original = buffer._read_spilled
+
+        def spy(start, end):
+            reads.append(end - start)
+            return original(start, end)
+
+        monkeypatch.setattr(buffer, "_read_spilled", spy)
+        iterator = iter(buffer)
+        assert next(iterator) == "line 000"
+        assert reads == [8]
+
+        # 迭代開始後追加的項目不會被讀到
+        buffer.append("late")
+        assert [next(iterator), *iterator] == expected[1:]
+        assert max(reads) <= 8
+
+    def test_tail_bytes(self, tmp_path):
+        """測試按位元組預算取最新項目"""
+        buffer = make_buffer(tmp_path, max_bytes=1000)
+        buffer.extend(["a" * 8, "b" * 8, "c" * 8])
+
+        # 每個項目編碼後為 10 位元組（含引號）
+        assert buffer.tail_bytes(25) == ["b" * 8, "c" * 8]
+
+
+class TestSessionBuffers:
+    """WebFeedbackSession 使用有界緩衝區的測試"""
+
+    def test_result_logs_are_bounded(self, monkeypatch):
+        """測試回傳給 MCP 的日誌經過壓縮並標註省略行數"""
+        monkeypatch.setenv("MCP_SESSION_LOG_BUFFER_BYTES", "200")
+        monkeypatch.setenv("MCP_RESULT_LOG_MAX_BYTES", "400")
+        session = WebFeedbackSession("spill-test", "/tmp", "summary")
+        try:
+            for i in range(100):
+                session.add_log(f"build output line {i}")
+
+            result = session.get_result_logs()
+
+            assert result.startswith("build output line 0")
+            assert "... 已省略" in result
+            assert result.endswith("build output line 99")
+            assert len(result.encode("utf-8")) < 500
+            assert session.get_detail_info(logs_limit=1)["command_logs"]["items"] == [
+                "build output line 0"
+            ]
+        finally:
+            session.cleanup()
+
+    def test_persisted_state_keeps_memory_tail(self, monkeypatch):
+        """測試持久化快照只含記憶體中的用戶消息，詳情分頁以全域索引計算"""
+        monkeypatch.setenv("MCP_SESSION_MESSAGE_BUFFER_BYTES", "300")
+        session = WebFeedbackSession("spill-persist", "/tmp", "summary")
+        try:
+            for i in range(50):
+                session.user_messages.append({"timestamp": i, "content": f"m{i}"})
+
+            state = session.get_persisted_state()
+            base = state["user_messages_offset"]
+            assert base > 0
+            assert state["user_message_count"] == 50
+            assert len(state["user_messages"]) == 50 - base
+            assert state["user_messages"][-1]["content"] == "m49"
+
+            class Store:
+                def get_logs(self, session_id, offset, limit):
+                    return [], 0
+
+            detail = build_stored_detail_info(Store(), state, messages_offset=0)
+            messages = detail["user_messages"]
+            assert messages["offset"] == base
+            assert messages["total"] == 50
+            assert messages["items"][0]["content"] == f"m{base}"
+            assert "user_messages_offset" not in detail
+        finally:
+            session.cleanup()
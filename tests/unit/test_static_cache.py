@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+記憶體靜態資源快取測試
+"""
+
+import gzip
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.utils.compression_config import (
+    CompressionConfig,
+    CompressionManager,
+)
+from mcp_feedback_enhanced.web.utils.static_cache import (
+    CachedStaticFiles,
+    if_none_match,
+    select_encoding,
+)
+
+
+STYLES = "body { color: red; }\n" * 200
+
+
+def make_client(tmp_path, compression_manager=None):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log('hi');", encoding="utf-8")
+    (tmp_path / "big.bin").write_bytes(b"x" * 64)
+    (tmp_path / "styles.css").write_text(STYLES, encoding="utf-8")
+    static = CachedStaticFiles(
+        directory=tmp_path,
+        cache_max_age=3600,
+        compression_manager=compression_manager or CompressionManager(),
+    )
+    assert static.precompressed.wait(10)
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=100)
+    app.mount("/static", static, name="static")
+    return TestClient(app), static
+
+
+class TestCachedStaticFiles:
+    """CachedStaticFiles 測試"""
+
+    def test_serves_from_memory_with_strong_etag(self, tmp_path):
+        """測試從記憶體提供檔案，修改磁碟檔案不影響已載入的內容"""
+        client, static = make_client(tmp_path)
+        (tmp_path / "js" / "app.js").write_text("changed", encoding="utf-8")
+
+        response = client.get(
+            "/static/js/app.js", headers={"Accept-Encoding": "identity"}
+        )
+
+        assert response.status_code == 200
+        assert response.text == "console.log('hi');"
+        assert response.headers["content-type"].startswith("text/javascript")
+        assert response.headers["cache-control"] == "public, max-age=3600"
+        assert response.headers["etag"].startswith('"')
+        assert static.stats["hits"] == 1
+
+    def test_conditional_get_returns_304(self, tmp_path):
+        """測試 If-None-Match 相符時返回 304"""
+        client, static = make_client(tmp_path)
+        etag = client.get(
+            "/static/js/app.js", headers={"Accept-Encoding": "identity"}
+        ).headers["etag"]
+
+        response = client.get(
+            "/static/js/app.js", headers={"If-None-Match": f'W/"other", {etag}'}
+        )
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert static.stats["not_modified"] == 1
+
+    def test_large_files_and_missing_paths_use_disk(self, tmp_path, monkeypatch):
+        """測試超過大小上限的檔案由磁碟提供，不存在的路徑返回 404"""
+        monkeypatch.setenv("MCP_STATIC_CACHE_MAX_FILE", "32")
+        client, static = make_client(tmp_path)
+
+        assert "big.bin" not in static.assets
+        assert client.get("/static/big.bin").content == b"x" * 64
+        assert client.get("/static/missing.js").status_code == 404
+        assert static.stats["misses"] == 2
+
+    def test_serves_precompressed_gzip(self, tmp_path):
+        """測試依 Accept-Encoding 提供預先壓縮的版本，不經過動態壓縮"""
+        manager = CompressionManager(CompressionConfig(minimum_size=100))
+        client, static = make_client(tmp_path, manager)
+        asset = static.assets["styles.css"]
+        assert "gzip" in asset.variants
+        # 太小的檔案不預先壓縮
+        assert not static.assets[os.path.join("js", "app.js")].variants
+
+        response = client.get("/static/styles.css", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content.decode() == STYLES
+        # 預先壓縮的內容原樣送出（GZipMiddleware 沒有重新壓縮）
+        assert gzip.decompress(asset.variants["gzip"].body).decode() == STYLES
+        assert int(response.headers["content-length"]) == len(
+            asset.variants["gzip"].body
+        )
+
+        identity = client.get(
+            "/static/styles.css", headers={"Accept-Encoding": "identity"}
+        )
+        assert "content-encoding" not in identity.headers
+        assert identity.headers["etag"] != response.headers["etag"]
+
+        not_modified = client.get(
+            "/static/styles.css",
+            headers={
+                "Accept-Encoding": "gzip",
+                "If-None-Match": response.headers["etag"],
+            },
+        )
+        assert not_modified.status_code == 304
+
+        stats = manager.get_stats()["precompressed"]
+        assert stats["assets"] == 1
+        assert stats["requests"] == 1
+        assert stats["bytes_saved"] == len(STYLES) - len(asset.variants["gzip"].body)
+
+    def test_serves_precompressed_brotli(self, tmp_path):
+        """測試安裝 brotli 時優先提供 brotli 版本"""
+        pytest.importorskip("brotli")
+        manager = CompressionManager(CompressionConfig(minimum_size=100))
+        client, _ = make_client(tmp_path, manager)
+
+        response = client.get(
+            "/static/styles.css", headers={"Accept-Encoding": "gzip, br"}
+        )
+        assert response.headers["content-encoding"] == "br"
+
+    def test_select_encoding(self):
+        """測試 Accept-Encoding 協商（含 q 值與萬用字元）"""
+        available = {"br": None, "gzip": None}
+        assert select_encoding("gzip, deflate, br", available) == "br"
+        assert select_encoding("gzip;q=1.0, br;q=0.5", available) == "gzip"
+        assert select_encoding("br;q=0, gzip", available) == "gzip"
+        assert select_encoding("*", {"gzip": None}) == "gzip"
+        assert select_encoding("identity", available) is None
+        assert select_encoding("gzip", {}) is None
+
+    def test_if_none_match(self):
+        """測試 If-None-Match 比較"""
+        assert if_none_match("*", '"a"')
+        assert if_none_match('W/"a"', '"a"')
+        assert not if_none_match('"b"', '"a"')
+        assert not if_none_match(None, '"a"')
+
+
+class TestWebUIStaticFiles:
+    """Web UI 靜態檔案測試"""
+
+    def test_manager_serves_cached_assets(self, web_ui_manager):
+        """測試 Web UI 的靜態檔案帶有強 ETag 並支援 304"""
+        static = next(
+            route.app for route in web_ui_manager.app.routes if route.name == "static"
+        )
+        assert static.precompressed.wait(30)
+        client = TestClient(web_ui_manager.app)
+        response = client.get("/static/js/app.js", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        etag = response.headers["etag"]
+
+        response = client.get(
+            "/static/js/app.js",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+        )
+        assert response.status_code == 304
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+WebSocket 傳輸格式協商測試
+"""
+
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mcp_feedback_enhanced.web.utils import wire_format
+from tests.fixtures.test_data import TestData
+
+
+msgpack = pytest.importorskip("msgpack")
+
+
+@pytest.fixture
+def client(web_ui_manager, test_project_dir):
+    """建立帶有活躍會話的測試客戶端"""
+    web_ui_manager.create_session(
+        str(test_project_dir), TestData.SAMPLE_SESSION["summary"]
+    )
+    return TestClient(web_ui_manager.app)
+
+
+class TestWireFormatNegotiation:
+    """傳輸格式協商測試"""
+
+    def test_msgpack_negotiated_when_offered(self, client):
+        """測試客戶端提供 MessagePack 子協議時使用二進位幀"""
+        with client.websocket_connect(
+            "/ws",
+            subprotocols=[
+                wire_format.MSGPACK_SUBPROTOCOL,
+                wire_format.JSON_SUBPROTOCOL,
+            ],
+        ) as ws:
+            assert ws.accepted_subprotocol == wire_format.MSGPACK_SUBPROTOCOL
+
+            established = msgpack.unpackb(ws.receive_bytes())
+            assert established["type"] == "connection_established"
+            assert established["wire_format"] == wire_format.WIRE_FORMAT_MSGPACK
+
+            # 客戶端也可以用 MessagePack 發送
+            msgpack.unpackb(ws.receive_bytes())
+            ws.send_bytes(msgpack.packb({"type": "heartbeat", "timestamp": 1}))
+            response = msgpack.unpackb(ws.receive_bytes())
+            assert response["type"] == "heartbeat_response"
+
+    def test_json_subprotocol(self, client):
+        """測試只提供 JSON 子協議時使用文字幀"""
+        with client.websocket_connect(
+            "/ws", subprotocols=[wire_format.JSON_SUBPROTOCOL]
+        ) as ws:
+            assert ws.accepted_subprotocol == wire_format.JSON_SUBPROTOCOL
+            established = ws.receive_json()
+            assert established["wire_format"] == wire_format.WIRE_FORMAT_JSON
+
+    def test_legacy_client_without_subprotocol(self, client):
+        """測試未提供子協議的舊客戶端仍使用 JSON"""
+        with client.websocket_connect("/ws") as ws:
+            assert ws.accepted_subprotocol is None
+            assert ws.receive_json()["type"] == "connection_established"
+
+    def test_msgpack_can_be_disabled(self, client):
+        """測試 MCP_WS_MSGPACK=false 時回退到 JSON"""
+        with (
+            patch.dict("os.environ", {"MCP_WS_MSGPACK": "false"}),
+            client.websocket_connect(
+                "/ws",
+                subprotocols=[
+                    wire_format.MSGPACK_SUBPROTOCOL,
+                    wire_format.JSON_SUBPROTOCOL,
+                ],
+            ) as ws,
+        ):
+            assert ws.accepted_subprotocol == wire_format.JSON_SUBPROTOCOL
+            assert ws.receive_json()["type"] == "connection_established"
+
+    def test_msgpack_is_smaller_than_json(self):
+        """測試 MessagePack 編碼比 JSON 更精簡"""
+        message = {
+            "type": "status_update",
+            "status_info": {"status": "waiting", "created_at": 1700000000000},
+            "seq": 42,
+        }
+
+        packed = wire_format.encode_message(message, wire_format.WIRE_FORMAT_MSGPACK)
+        encoded = wire_format.encode_message(message, wire_format.WIRE_FORMAT_JSON)
+
+        assert len(packed) < len(encoded)
+        assert wire_format.decode_message(packed) == message
+        assert wire_format.decode_message(encoded.decode("utf-8")) == message